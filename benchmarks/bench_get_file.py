@@ -0,0 +1,82 @@
+"""
+/getFile 预览吞吐压测：模拟多个同时拖动进度条的预览流，每个流不断发随机 Range 请求。
+
+    python benchmarks/bench_get_file.py --filename <videoFile 下的文件名> --streams 50 --duration 20
+
+先启动 sau_backend.py（或 gunicorn 部署），输出总吞吐、请求数和延迟分位数；
+--full 改为每次下载整个文件，用来对比分段请求的效果。
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+
+def _file_size(url):
+    request = urllib.request.Request(url, method="HEAD")
+    with urllib.request.urlopen(request) as response:
+        return int(response.headers["Content-Length"])
+
+
+def _stream(url, size, chunk, full, deadline, stats, lock):
+    transferred, latencies, statuses = 0, [], Counter()
+    while time.monotonic() < deadline:
+        headers = {}
+        if not full:
+            start = random.randrange(0, max(1, size - chunk))
+            headers["Range"] = f"bytes={start}-{min(size, start + chunk) - 1}"
+        started = time.monotonic()
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response:
+            statuses[response.status] += 1
+            while True:
+                block = response.read(256 * 1024)
+                if not block:
+                    break
+                transferred += len(block)
+        latencies.append(time.monotonic() - started)
+    with lock:
+        stats["bytes"] += transferred
+        stats["latencies"].extend(latencies)
+        stats["statuses"].update(statuses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /getFile preview streaming")
+    parser.add_argument("--base-url", default="http://localhost:5409")
+    parser.add_argument("--filename", required=True, help="videoFile 下的文件名")
+    parser.add_argument("--streams", type=int, default=20, help="同时进行的预览流数量")
+    parser.add_argument("--duration", type=float, default=10, help="压测时长（秒）")
+    parser.add_argument("--chunk", type=int, default=1024 * 1024, help="每次 Range 请求的字节数")
+    parser.add_argument("--full", action="store_true", help="每次请求整个文件")
+    args = parser.parse_args()
+
+    url = f"{args.base_url}/getFile?filename={quote(args.filename)}"
+    size = _file_size(url)
+    stats = {"bytes": 0, "latencies": [], "statuses": Counter()}
+    lock = threading.Lock()
+    started = time.monotonic()
+    deadline = started + args.duration
+    with ThreadPoolExecutor(max_workers=args.streams) as executor:
+        futures = [executor.submit(_stream, url, size, args.chunk, args.full, deadline, stats, lock)
+                   for _ in range(args.streams)]
+        for future in futures:
+            future.result()
+    elapsed = time.monotonic() - started
+
+    latencies = sorted(stats["latencies"])
+    print(f"file size: {size / 1024 / 1024:.1f} MB, streams: {args.streams}, "
+          f"mode: {'full' if args.full else f'range {args.chunk // 1024} KB'}")
+    print(f"requests: {len(latencies)} ({len(latencies) / elapsed:.1f}/s), statuses: {dict(stats['statuses'])}")
+    print(f"throughput: {stats['bytes'] / elapsed / 1024 / 1024:.1f} MB/s")
+    if latencies:
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"latency p50: {statistics.median(latencies) * 1000:.1f} ms, p95: {p95 * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
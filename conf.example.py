@@ -4,3 +4,92 @@ BASE_DIR = Path(__file__).parent.resolve()
 XHS_SERVER = "http://127.0.0.1:11901"
 LOCAL_CHROME_PATH = ""   # change me necessary！ for example C:/Program Files/Google/Chrome/Application/chrome.exe
 LOCAL_CHROME_HEADLESS = False
+
+# 共享浏览器池：同一组启动参数常驻的浏览器数量、单个浏览器并发上下文上限、累计多少个任务后回收重启
+BROWSER_POOL_SIZE = 2
+BROWSER_POOL_MAX_CONTEXTS = 8
+BROWSER_POOL_MAX_JOBS = 50
+# 批量校验账号 cookie 时的并发数
+ACCOUNT_CHECK_CONCURRENCY = 8
+# cookie 校验结果缓存时长（秒）
+COOKIE_CACHE_TTL = 600
+# 校验账号时先用 HTTP 接口探测登录态，无法判断时再开浏览器
+COOKIE_PROBE_ENABLED = True
+COOKIE_PROBE_TIMEOUT = 5
+# 后台执行发布任务的线程数
+PUBLISH_WORKERS = 2
+# 每个 worker 进程同时进行的 文件×账号 任务上限（所有发布任务一起计数），同一账号的任务始终串行
+PUBLISH_CONCURRENCY = 4
+# 各平台的并发上限，键为 xiaohongshu / tencent / douyin / kuaishou；同时也限制各平台在所有 worker 上执行中的任务数
+PLATFORM_CONCURRENCY = {
+    "douyin": 2,
+}
+# 发布 worker 空闲时轮询任务表的间隔（秒）
+PUBLISH_POLL_INTERVAL = 2
+# 发布任务表所在的数据库，多台机器共用时指向共享路径，默认 db/database.db
+PUBLISH_DB_PATH = None
+# 发布任务租约时长（秒），worker 中断后租约到期任务会被其他 worker 接手
+PUBLISH_LEASE_SECONDS = 60
+# 发布任务最多执行次数（含首次）及失败后的重试间隔（秒，按次数递增）
+PUBLISH_MAX_ATTEMPTS = 3
+PUBLISH_RETRY_DELAY = 60
+# 校验 cookie 和上传时拦截用不到的图片、字体、埋点等请求，以加快页面加载、降低内存
+ROUTE_FILTER_ENABLED = True
+# 按平台追加拦截/放行的 URL 正则，键为 douyin / tencent / kuaishou / xiaohongshu / tiktok / baijiahao / common
+ROUTE_FILTER_BLOCK = {}
+ROUTE_FILTER_ALLOW = {}
+# 按平台追加视频上传接口的 URL 正则，匹配的请求完全不经过拦截路由
+ROUTE_FILTER_SKIP = {}
+# 浏览器池新建的上下文默认注入反检测脚本（脚本只读一次常驻内存，文件修改后自动重新加载）
+BROWSER_POOL_STEALTH = True
+# 各上传阶段的时间预算（秒），超时任务直接失败并记录阶段名和耗时；键为 open_page / upload / metadata / schedule / publish
+STEP_BUDGETS = {}
+# 阶段内两次重试之间的默认间隔（秒）
+STEP_RETRY_INTERVAL = 0.5
+# 发布重试时在内存里保留的页面快照数；快照附带低清截图的最小间隔（秒）
+CAPTURE_RING_SIZE = 5
+CAPTURE_SCREENSHOTS = True
+CAPTURE_SCREENSHOT_INTERVAL = 5
+# 发布失败时快照保存在 logs/captures 下，总大小上限（MB），超出后删除最早的记录
+CAPTURE_QUOTA_MB = 200
+# 阶段内重试间隔的上限（秒），间隔从 STEP_RETRY_INTERVAL 开始指数增长
+STEP_RETRY_MAX_INTERVAL = 5
+# 平台熔断：连续失败多少次后暂停该平台的发布任务，熔断多久（秒）后放行一个探测任务
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_COOLDOWN = 300
+# 半开状态的探测任务多久没有结论（如所在 worker 挂掉）就把探测名额放给其他 worker（秒）
+CIRCUIT_PROBE_TIMEOUT = 1800
+# 发布频率限制（未配置的平台不限速）：per_hour 平台每小时最多发布数，min_interval 两次发布最小间隔（秒），
+# account_per_hour / account_min_interval 为单个账号的限制；超限的任务留在队列里，worker 先执行其他任务
+PUBLISH_RATE_LIMITS = {
+    "xiaohongshu": {"account_per_hour": 5, "account_min_interval": 30},
+    "douyin": {"account_per_hour": 10, "account_min_interval": 30},
+}
+# 认领任务时一次查看的到期任务数，前面的任务超出发布频率时改认领后面的
+PUBLISH_CLAIM_SCAN = 20
+# 扫码登录 SSE 连接：空闲时的心跳间隔（秒）和单次登录的最长时长（秒）
+LOGIN_SSE_HEARTBEAT = 15
+LOGIN_SSE_TIMEOUT = 300
+# 扫码登录：等待扫码的时长（秒）、单个登录会话总时长上限（秒，应小于 LOGIN_SSE_TIMEOUT）、同时进行的登录数
+LOGIN_SCAN_TIMEOUT = 200
+LOGIN_SESSION_TIMEOUT = 280
+LOGIN_MAX_SESSIONS = 10
+# 分片上传：建议的分片大小（字节，需小于 MAX_CONTENT_LENGTH）和未完成会话的保留时长（秒）
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+UPLOAD_SESSION_TTL = 86400
+# 素材预览（/getFile）的浏览器缓存时长（秒）
+MEDIA_CACHE_MAX_AGE = 86400
+# 素材缩略图：最长边（像素）、格式（webp / jpeg）、视频封面帧最长边和截取位置（秒）、后台生成线程数
+THUMBNAIL_SIZE = 320
+THUMBNAIL_FORMAT = "webp"
+POSTER_SIZE = 720
+POSTER_SEEK = 1.0
+THUMBNAIL_WORKERS = 2
+# /getThumbnail 等待现场生成的最长秒数和浏览器缓存时长（秒）
+THUMBNAIL_WAIT = 5
+THUMBNAIL_CACHE_MAX_AGE = 2592000
+# ffmpeg 可执行文件路径，为空时从 PATH 查找；用于截取视频封面帧
+FFMPEG_PATH = None
+# /getFiles、/getAccounts 分页：不传 limit 时的每页条数和 limit 上限
+LIST_DEFAULT_LIMIT = 50
+LIST_MAX_LIMIT = 200
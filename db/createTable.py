@@ -29,10 +29,73 @@ cursor.execute('''CREATE TABLE IF NOT EXISTS file_records (
     filename TEXT NOT NULL,               -- 文件名
     filesize REAL,                     -- 文件大小（单位：MB）
     upload_time DATETIME DEFAULT CURRENT_TIMESTAMP, -- 上传时间，默认当前时间
-    file_path TEXT                        -- 文件路径
+    file_path TEXT,                       -- 文件路径
+    sha256 TEXT,                          -- 内容摘要，对应 media_blobs
+    uuid TEXT,                            -- 素材 uuid
+    media_type TEXT                       -- 素材类型：video / image / other
 )
 ''')
 
+# 创建素材内容表：相同内容只存一份，ref_count 为引用它的 file_records 数量
+cursor.execute('''CREATE TABLE IF NOT EXISTS media_blobs (
+    sha256 TEXT PRIMARY KEY,              -- 内容摘要
+    file_path TEXT NOT NULL,              -- videoFile 下的文件名（{sha256}{扩展名}）
+    size INTEGER NOT NULL,                -- 文件大小（字节）
+    ref_count INTEGER NOT NULL DEFAULT 0, -- 引用计数，归零时删除文件
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+''')
+
+# 创建发布任务表
+cursor.execute('''CREATE TABLE IF NOT EXISTS publish_jobs (
+    id TEXT PRIMARY KEY,                  -- 任务 id
+    type INTEGER NOT NULL,                -- 平台标识
+    payload TEXT NOT NULL,                -- 发布参数（JSON）
+    state TEXT NOT NULL DEFAULT 'queued', -- queued / running / succeeded / failed
+    error TEXT,                           -- 失败原因
+    created_at REAL NOT NULL,             -- 创建时间（时间戳）
+    started_at REAL,                      -- 开始执行时间
+    finished_at REAL,                     -- 结束时间
+    run_at REAL NOT NULL DEFAULT 0,       -- 最早可执行时间，失败重试时延后
+    attempts INTEGER NOT NULL DEFAULT 0,  -- 已执行次数
+    max_attempts INTEGER NOT NULL DEFAULT 3, -- 最多执行次数
+    lease_owner TEXT,                     -- 当前持有租约的 worker
+    lease_expires_at REAL,                -- 租约到期时间，过期后可被其他 worker 接手
+    done_pairs TEXT NOT NULL DEFAULT '[]' -- 已完成的 文件×账号 组合（JSON）
+)
+''')
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_publish_jobs_state_run_at ON publish_jobs (state, run_at)')
+
+# 创建平台熔断状态表，所有 worker 进程共用
+cursor.execute('''CREATE TABLE IF NOT EXISTS circuit_breakers (
+    platform TEXT PRIMARY KEY,            -- 平台名
+    state TEXT NOT NULL,                  -- closed / open / half_open
+    failures INTEGER NOT NULL DEFAULT 0,  -- 连续失败次数
+    trips INTEGER NOT NULL DEFAULT 0,     -- 累计熔断次数
+    opened_at REAL,                       -- 最近一次熔断时间
+    probe_owner TEXT,                     -- 半开状态下执行探测任务的 worker
+    probe_started_at REAL,                -- 探测开始时间，超时后放给其他 worker
+    last_error TEXT                       -- 最近一次失败原因
+)
+''')
+
+# 创建发布频率令牌桶表，key 为 平台 或 平台:账号文件名，所有 worker 进程共用
+cursor.execute('''CREATE TABLE IF NOT EXISTS rate_limits (
+    key TEXT PRIMARY KEY,                 -- 平台 或 平台:账号
+    tokens REAL NOT NULL,                 -- 剩余令牌
+    updated_at REAL NOT NULL,             -- 上次补充令牌的时间
+    last_at REAL                          -- 上次发布时间
+)
+''')
+
+# 创建列表接口（/getFiles、/getAccounts）筛选、排序、分页用到的索引
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_records_upload_time ON file_records (upload_time, id)')
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_records_filename ON file_records (filename, id)')
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_records_uuid ON file_records (uuid)')
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_records_sha256 ON file_records (sha256)')
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_records_media_type ON file_records (media_type, id)')
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_info_type_status ON user_info (type, status, id)')
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_info_user_name ON user_info (userName, id)')
 
 # 提交更改
 conn.commit()
@@ -2,127 +2,194 @@ import asyncio
 import configparser
 import os
 
-from playwright.async_api import async_playwright
 from xhs import XhsClient
 
+import conf
 from conf import BASE_DIR, LOCAL_CHROME_HEADLESS
 from utils.base_social_media import set_init_script
+from utils.browser_pool import pooled_context, use_browser_pool
+from utils.cookie_cache import cookie_cache
+from utils.cookie_probe import probe_cookie, use_http_client
 from utils.log import tencent_logger, kuaishou_logger, douyin_logger
 from pathlib import Path
 from uploader.xhs_uploader.main import sign_local
 
-
-async def cookie_auth_douyin(account_file):
-    async with async_playwright() as playwright:
-        browser = await playwright.chromium.launch(headless=LOCAL_CHROME_HEADLESS)
-        context = await browser.new_context(storage_state=account_file)
-        context = await set_init_script(context)
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://creator.douyin.com/creator-micro/content/upload")
+# 批量校验账号时同时打开的检查页数量
+ACCOUNT_CHECK_CONCURRENCY = getattr(conf, "ACCOUNT_CHECK_CONCURRENCY", 8)
+
+
+async def _check_douyin(context):
+    context = await set_init_script(context, platform="douyin", profile="check")
+    # 创建一个新的页面
+    page = await context.new_page()
+    # 访问指定的 URL
+    await page.goto("https://creator.douyin.com/creator-micro/content/upload")
+    try:
+        await page.wait_for_url("https://creator.douyin.com/creator-micro/content/upload", timeout=5000)
+        # 2024.06.17 抖音创作者中心改版
+        # 判断
+        # 等待“扫码登录”元素出现，超时 5 秒（如果 5 秒没出现，说明 cookie 有效）
         try:
-            await page.wait_for_url("https://creator.douyin.com/creator-micro/content/upload", timeout=5000)
-            # 2024.06.17 抖音创作者中心改版
-            # 判断
-            # 等待“扫码登录”元素出现，超时 5 秒（如果 5 秒没出现，说明 cookie 有效）
-            try:
-                await page.get_by_text("扫码登录").wait_for(timeout=5000)
-                douyin_logger.error("[+] cookie 失效，需要扫码登录")
-                return False
-            except:
-                douyin_logger.success("[+]  cookie 有效")
-                return True
-        except:
-            douyin_logger.error("[+] 等待5秒 cookie 失效")
-            await context.close()
-            await browser.close()
+            await page.get_by_text("扫码登录").wait_for(timeout=5000)
+            douyin_logger.error("[+] cookie 失效，需要扫码登录")
             return False
+        except:
+            douyin_logger.success("[+]  cookie 有效")
+            return True
+    except:
+        douyin_logger.error("[+] 等待5秒 cookie 失效")
+        return False
+
+
+async def cookie_auth_douyin(account_file):
+    async with pooled_context({'headless': LOCAL_CHROME_HEADLESS}, storage_state=account_file) as context:
+        return await _check_douyin(context)
+
+
+async def _check_tencent(context):
+    context = await set_init_script(context, platform="tencent", profile="check")
+    # 创建一个新的页面
+    page = await context.new_page()
+    # 访问指定的 URL
+    await page.goto("https://channels.weixin.qq.com/platform/post/create")
+    try:
+        await page.wait_for_selector('div.title-name:has-text("微信小店")', timeout=5000)  # 等待5秒
+        tencent_logger.error("[+] 等待5秒 cookie 失效")
+        return False
+    except:
+        tencent_logger.success("[+] cookie 有效")
+        return True
 
 
 async def cookie_auth_tencent(account_file):
-    async with async_playwright() as playwright:
-        browser = await playwright.chromium.launch(headless=LOCAL_CHROME_HEADLESS)
-        context = await browser.new_context(storage_state=account_file)
-        context = await set_init_script(context)
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://channels.weixin.qq.com/platform/post/create")
-        try:
-            await page.wait_for_selector('div.title-name:has-text("微信小店")', timeout=5000)  # 等待5秒
-            tencent_logger.error("[+] 等待5秒 cookie 失效")
-            return False
-        except:
-            tencent_logger.success("[+] cookie 有效")
-            return True
+    async with pooled_context({'headless': LOCAL_CHROME_HEADLESS}, storage_state=account_file) as context:
+        return await _check_tencent(context)
+
+
+async def _check_ks(context):
+    context = await set_init_script(context, platform="kuaishou", profile="check")
+    # 创建一个新的页面
+    page = await context.new_page()
+    # 访问指定的 URL
+    await page.goto("https://cp.kuaishou.com/article/publish/video")
+    try:
+        await page.wait_for_selector("div.names div.container div.name:text('机构服务')", timeout=5000)  # 等待5秒
+
+        kuaishou_logger.info("[+] 等待5秒 cookie 失效")
+        return False
+    except:
+        kuaishou_logger.success("[+] cookie 有效")
+        return True
 
 
 async def cookie_auth_ks(account_file):
-    async with async_playwright() as playwright:
-        browser = await playwright.chromium.launch(headless=LOCAL_CHROME_HEADLESS)
-        context = await browser.new_context(storage_state=account_file)
-        context = await set_init_script(context)
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://cp.kuaishou.com/article/publish/video")
-        try:
-            await page.wait_for_selector("div.names div.container div.name:text('机构服务')", timeout=5000)  # 等待5秒
-
-            kuaishou_logger.info("[+] 等待5秒 cookie 失效")
-            return False
-        except:
-            kuaishou_logger.success("[+] cookie 有效")
-            return True
+    async with pooled_context({'headless': LOCAL_CHROME_HEADLESS}, storage_state=account_file) as context:
+        return await _check_ks(context)
 
 
-async def cookie_auth_xhs(account_file):
-    async with async_playwright() as playwright:
-        browser = await playwright.chromium.launch(headless=LOCAL_CHROME_HEADLESS)
-        context = await browser.new_context(storage_state=account_file)
-        context = await set_init_script(context)
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问创作中心发布页（旧路径变更后更稳定）
-        await page.goto("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=normal")
-        try:
-            await page.wait_for_url("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=*", timeout=8000)
-        except Exception:
-            print("[+] 等待5秒 cookie 失效")
-            await context.close()
-            await browser.close()
-            return False
+async def _check_xhs(context):
+    context = await set_init_script(context, platform="xiaohongshu", profile="check")
+    # 创建一个新的页面
+    page = await context.new_page()
+    # 访问创作中心发布页（旧路径变更后更稳定）
+    await page.goto("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=normal")
+    try:
+        await page.wait_for_url("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=*", timeout=8000)
+    except Exception:
+        print("[+] 等待5秒 cookie 失效")
+        return False
 
-        # 登录态检测：出现登录入口则判定失效
-        if await page.get_by_text('手机号登录').count() or await page.get_by_text('扫码登录').count() or await page.get_by_text('登录').count():
-            print("[+] 等待5秒 cookie 失效")
-            await context.close()
-            await browser.close()
-            return False
+    # 登录态检测：出现登录入口则判定失效
+    if await page.get_by_text('手机号登录').count() or await page.get_by_text('扫码登录').count() or await page.get_by_text('登录').count():
+        print("[+] 等待5秒 cookie 失效")
+        return False
 
-        print("[+] cookie 有效")
-        await context.close()
-        await browser.close()
-        return True
+    print("[+] cookie 有效")
+    return True
 
 
-async def check_cookie(type, file_path):
+async def cookie_auth_xhs(account_file):
+    async with pooled_context({'headless': LOCAL_CHROME_HEADLESS}, storage_state=account_file) as context:
+        return await _check_xhs(context)
+
+
+# type 对应的登录态检查，参数为已加载 cookie 的浏览器上下文
+CONTEXT_CHECKS = {
+    1: _check_xhs,
+    2: _check_tencent,
+    3: _check_douyin,
+    4: _check_ks,
+}
+
+
+async def check_cookie(type, file_path, context=None):
+    """
+    校验账号 cookie 是否有效。context 为刚完成扫码登录的上下文时直接在其中检查，不再另开浏览器。
+    """
+    account_file = Path(BASE_DIR / "cookiesFile" / file_path)
+    # 近期校验过、刚发布成功或登录态 cookie 已过期的账号直接返回缓存结果，不再开浏览器
+    cached = cookie_cache.get(account_file)
+    if cached is not None:
+        return cached
+    # 先用 HTTP 接口探测，结论不明确时再开浏览器校验
+    flag = await probe_cookie(type, account_file)
+    if flag is not None:
+        cookie_cache.record(account_file, flag)
+        return flag
+    if context is not None and type in CONTEXT_CHECKS:
+        flag = await CONTEXT_CHECKS[type](context)
+        cookie_cache.record(account_file, flag)
+        return flag
     match type:
         # 小红书
         case 1:
-            return await cookie_auth_xhs(Path(BASE_DIR / "cookiesFile" / file_path))
+            flag = await cookie_auth_xhs(account_file)
         # 视频号
         case 2:
-            return await cookie_auth_tencent(Path(BASE_DIR / "cookiesFile" / file_path))
+            flag = await cookie_auth_tencent(account_file)
         # 抖音
         case 3:
-            return await cookie_auth_douyin(Path(BASE_DIR / "cookiesFile" / file_path))
+            flag = await cookie_auth_douyin(account_file)
         # 快手
         case 4:
-            return await cookie_auth_ks(Path(BASE_DIR / "cookiesFile" / file_path))
+            flag = await cookie_auth_ks(account_file)
         case _:
             return False
+    cookie_cache.record(account_file, flag)
+    return flag
+
+
+async def check_cookies(accounts, concurrency=None):
+    """
+    并发校验一批账号，accounts 为 (type, filePath) 列表，按完成先后产出 (下标, 是否有效)。
+    同一平台的账号排在一起交给固定宽度的协程池，所有检查共享同一个浏览器池。
+    """
+    concurrency = concurrency or ACCOUNT_CHECK_CONCURRENCY
+    pending = asyncio.Queue()
+    for index in sorted(range(len(accounts)), key=lambda i: accounts[i][0]):
+        pending.put_nowait(index)
+    results = asyncio.Queue()
+
+    async def worker():
+        while not pending.empty():
+            index = pending.get_nowait()
+            type, file_path = accounts[index]
+            try:
+                flag = await check_cookie(type, file_path)
+            except Exception as e:
+                print(f"校验账号 {file_path} 时出错: {e}")
+                flag = False
+            await results.put((index, flag))
+
+    async with use_http_client(), use_browser_pool():
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(accounts)))]
+        try:
+            for _ in range(len(accounts)):
+                yield await results.get()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
 
 # a = asyncio.run(check_cookie(1,"3a6cfdc0-3d51-11f0-8507-44e51723d63c.json"))
 # print(a)
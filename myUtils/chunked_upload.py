@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import conf
+from conf import BASE_DIR
+
+# 分片上传的建议分片大小（字节），单个分片请求仍受 MAX_CONTENT_LENGTH 限制
+UPLOAD_CHUNK_SIZE = getattr(conf, "UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)
+# 未完成的上传会话保留多久（秒），超时的临时文件在下次发起上传时清理
+UPLOAD_SESSION_TTL = getattr(conf, "UPLOAD_SESSION_TTL", 24 * 3600)
+# 从请求体读取、写入磁盘的缓冲大小（字节）
+UPLOAD_BUFFER_SIZE = 1024 * 1024
+
+
+class UploadNotFound(KeyError):
+    """上传会话不存在或已结束。"""
+
+
+class UploadOffsetMismatch(ValueError):
+    """分片的起始位置和服务端已接收的长度不一致，客户端应从 expected 处续传。"""
+
+    def __init__(self, expected):
+        self.expected = expected
+        super().__init__(f"分片起始位置不正确，应从 {expected} 开始")
+
+
+class ChunkedUploads(object):
+    """
+    分片、可续传的文件上传：init 创建会话，按顺序 put 分片，finalize 校验并移动到 videoFile。
+    分片直接追加写入 videoFile 下的临时文件，边写边计算 SHA-256，完成后原地改名，不再二次拷贝；
+    已接收长度以临时文件大小为准，连接中断或服务重启后客户端查询 offset 即可续传。
+    """
+
+    def __init__(self, target_dir=None, tmp_dir=None, ttl=None):
+        self.target_dir = Path(target_dir or BASE_DIR / "videoFile")
+        # 临时目录和目标目录在同一文件系统上，完成时 os.replace 不产生拷贝
+        self.tmp_dir = Path(tmp_dir or self.target_dir / ".uploads")
+        self.ttl = UPLOAD_SESSION_TTL if ttl is None else ttl
+        self._hashers = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _part_path(self, upload_id):
+        return self.tmp_dir / f"{upload_id}.part"
+
+    def _meta_path(self, upload_id):
+        return self.tmp_dir / f"{upload_id}.json"
+
+    def _session_lock(self, upload_id):
+        with self._lock:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def _load(self, upload_id):
+        if not upload_id or not all(ch in "0123456789abcdef" for ch in upload_id):
+            raise UploadNotFound(upload_id)
+        try:
+            meta = json.loads(self._meta_path(upload_id).read_text(encoding="utf-8"))
+            meta["offset"] = self._part_path(upload_id).stat().st_size
+        except (OSError, ValueError):
+            raise UploadNotFound(upload_id)
+        return meta
+
+    def init(self, filename, size, record=False):
+        """创建上传会话，record 为 True 时完成后写入素材库（/uploadSave 的行为）。"""
+        filename = Path(str(filename or "")).name
+        if not filename:
+            raise ValueError("filename is required")
+        size = int(size)
+        if size < 0:
+            raise ValueError("size must be >= 0")
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.cleanup()
+        upload_id = uuid.uuid4().hex
+        meta = {"uploadId": upload_id, "filename": filename, "size": size, "record": bool(record),
+                "createdAt": time.time()}
+        self._part_path(upload_id).touch()
+        self._meta_path(upload_id).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        self._hashers[upload_id] = (hashlib.sha256(), 0)
+        return self.status(upload_id)
+
+    def status(self, upload_id):
+        meta = self._load(upload_id)
+        meta["chunkSize"] = UPLOAD_CHUNK_SIZE
+        return meta
+
+    def write_chunk(self, upload_id, offset, stream, length=None):
+        """
+        把 stream 中的数据从 offset 处追加写入，返回写入后的总长度。
+        offset 必须等于已接收长度；length 为请求体长度，读完或 stream 结束即停止。
+        """
+        with self._session_lock(upload_id):
+            meta = self._load(upload_id)
+            if int(offset) != meta["offset"]:
+                raise UploadOffsetMismatch(meta["offset"])
+            hasher, hashed = self._hashers.get(upload_id, (None, 0))
+            if hasher is not None and hashed != meta["offset"]:
+                # 服务重启或中断后内存里的摘要和文件对不上，改为完成时整体计算
+                hasher = None
+            remaining = meta["size"] - meta["offset"]
+            if length is not None and int(length) > remaining:
+                raise ValueError(f"分片超出文件大小，最多还能写入 {remaining} 字节")
+            to_read = remaining if length is None else int(length)
+            written = meta["offset"]
+            try:
+                with open(self._part_path(upload_id), "ab") as part:
+                    while to_read > 0:
+                        block = stream.read(min(UPLOAD_BUFFER_SIZE, to_read))
+                        if not block:
+                            break
+                        part.write(block)
+                        if hasher is not None:
+                            hasher.update(block)
+                        written += len(block)
+                        to_read -= len(block)
+            finally:
+                self._hashers[upload_id] = (hasher, written) if hasher is not None else (None, 0)
+            return written
+
+    def finalize(self, upload_id, sha256=None):
+        """
+        校验长度和摘要后把临时文件改名为 videoFile/{uuid}_{filename}，返回文件信息。
+        sha256 由客户端提供时必须一致，否则保留会话供客户端重新上传。
+        """
+        with self._session_lock(upload_id):
+            meta = self._load(upload_id)
+            if meta["offset"] != meta["size"]:
+                raise UploadOffsetMismatch(meta["offset"])
+            hasher, hashed = self._hashers.get(upload_id, (None, 0))
+            if hasher is not None and hashed == meta["size"]:
+                digest = hasher.hexdigest()
+            else:
+                digest = file_sha256(self._part_path(upload_id))
+            if sha256 and sha256.lower() != digest:
+                raise ValueError(f"文件摘要不一致: {digest}")
+            final_filename = f"{uuid.uuid1()}_{meta['filename']}"
+            os.replace(self._part_path(upload_id), self.target_dir / final_filename)
+            self._discard(upload_id)
+        return {"filename": meta["filename"], "filepath": final_filename, "size": meta["size"],
+                "sha256": digest, "record": meta["record"]}
+
+    def abort(self, upload_id):
+        with self._session_lock(upload_id):
+            self._load(upload_id)
+            self._part_path(upload_id).unlink(missing_ok=True)
+            self._discard(upload_id)
+
+    def _discard(self, upload_id):
+        self._meta_path(upload_id).unlink(missing_ok=True)
+        self._hashers.pop(upload_id, None)
+        with self._lock:
+            self._locks.pop(upload_id, None)
+
+    def cleanup(self, now=None):
+        """删除超过 ttl 未完成的上传会话。"""
+        now = time.time() if now is None else now
+        for meta_path in self.tmp_dir.glob("*.json"):
+            try:
+                if now - meta_path.stat().st_mtime < self.ttl:
+                    continue
+            except OSError:
+                continue
+            upload_id = meta_path.stem
+            part_path = self._part_path(upload_id)
+            # 仍在写入的会话以临时文件的修改时间为准
+            if part_path.exists() and now - part_path.stat().st_mtime < self.ttl:
+                continue
+            part_path.unlink(missing_ok=True)
+            self._discard(upload_id)
+
+
+def file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(UPLOAD_BUFFER_SIZE), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+chunked_uploads = ChunkedUploads()
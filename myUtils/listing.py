@@ -0,0 +1,173 @@
+import base64
+import json
+
+import conf
+from myUtils.media_store import ensure_file_columns
+
+# 列表接口默认和最大的每页条数，始终分页返回
+LIST_DEFAULT_LIMIT = getattr(conf, "LIST_DEFAULT_LIMIT", 50)
+LIST_MAX_LIMIT = getattr(conf, "LIST_MAX_LIMIT", 200)
+
+# 列表查询用到的索引，createTable.py 建表时同样创建
+LIST_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_file_records_upload_time ON file_records (upload_time, id)",
+    "CREATE INDEX IF NOT EXISTS idx_file_records_filename ON file_records (filename, id)",
+    "CREATE INDEX IF NOT EXISTS idx_file_records_uuid ON file_records (uuid)",
+    "CREATE INDEX IF NOT EXISTS idx_file_records_sha256 ON file_records (sha256)",
+    "CREATE INDEX IF NOT EXISTS idx_file_records_media_type ON file_records (media_type, id)",
+    "CREATE INDEX IF NOT EXISTS idx_user_info_type_status ON user_info (type, status, id)",
+    "CREATE INDEX IF NOT EXISTS idx_user_info_user_name ON user_info (userName, id)",
+)
+
+# 允许排序的列（都有索引），前端字段名到列名
+FILE_SORTS = {"id": "id", "uploadTime": "upload_time", "upload_time": "upload_time", "filename": "filename"}
+ACCOUNT_SORTS = {"id": "id", "userName": "userName", "name": "userName", "type": "type", "status": "status"}
+
+_ready = set()
+
+
+class ListQueryError(ValueError):
+    """分页、筛选参数不合法。"""
+
+
+def ensure_list_schema(conn, db_path=None):
+    """补齐 file_records 的 uuid、media_type 列并创建列表索引，每个数据库文件只执行一次。"""
+    if db_path is not None and str(db_path) in _ready:
+        return
+    ensure_file_columns(conn)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for statement in LIST_INDEXES:
+        if statement.split(" ON ")[1].split(" ")[0] in tables:
+            conn.execute(statement)
+    conn.commit()
+    if db_path is not None:
+        _ready.add(str(db_path))
+
+
+def encode_cursor(sort, descending, value, row_id):
+    payload = json.dumps([sort, descending, value, row_id], ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, sort, descending):
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_descending, value, row_id = json.loads(payload)
+    except (ValueError, TypeError):
+        raise ListQueryError("invalid cursor")
+    # 游标只对生成它的排序方式有效
+    if cursor_sort != sort or cursor_descending != descending:
+        raise ListQueryError("cursor does not match sort")
+    return value, row_id
+
+
+def _int_arg(args, name, minimum=None, maximum=None):
+    value = args.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ListQueryError(f"{name} must be an integer")
+    if minimum is not None and value < minimum:
+        raise ListQueryError(f"{name} must be >= {minimum}")
+    return min(value, maximum) if maximum is not None else value
+
+
+def _page_args(args, sorts, default_sort):
+    sort_name = args.get("sort") or default_sort
+    if sort_name not in sorts:
+        raise ListQueryError(f"unsupported sort: {sort_name}")
+    cursor = args.get("cursor") or None
+    limit = _int_arg(args, "limit", minimum=1, maximum=LIST_MAX_LIMIT) or LIST_DEFAULT_LIMIT
+    # 默认新的在前
+    order = (args.get("order") or "desc").lower()
+    if order not in ("asc", "desc"):
+        raise ListQueryError("order must be asc or desc")
+    return sorts[sort_name], order == "desc", cursor, limit
+
+
+def paginate(conn, table, clauses, params, sort, descending, cursor, limit):
+    """
+    按 (sort, id) 做游标分页：下一页从上一页最后一行之后开始，用索引定位，不需要 OFFSET 扫描前面的行。
+    返回 (行, 下一页游标)，没有下一页时游标为 None。
+    """
+    clauses, params = list(clauses), list(params)
+    op, direction = ("<", "DESC") if descending else (">", "ASC")
+    if cursor is not None:
+        value, row_id = decode_cursor(cursor, sort, descending)
+        if sort == "id":
+            clauses.append(f"id {op} ?")
+            params.append(row_id)
+        else:
+            clauses.append(f"({sort} {op} ? OR ({sort} = ? AND id {op} ?))")
+            params += [value, value, row_id]
+    sql = f"SELECT * FROM {table}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += f" ORDER BY id {direction}" if sort == "id" else f" ORDER BY {sort} {direction}, id {direction}"
+    # 多取一行判断是否还有下一页
+    sql += " LIMIT ?"
+    params.append(limit + 1)
+    rows = conn.execute(sql, params).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, descending, last[sort], last["id"])
+    return rows, next_cursor
+
+
+def _prefix(column, value):
+    """
+    按前缀匹配（区分大小写）：写成范围条件，直接用 (column, id) 索引定位，
+    不像 LIKE '%x%' 那样扫全表。
+    """
+    return f"{column} >= ? AND {column} < ?", [value, value + "\U0010ffff"]
+
+
+def list_files(conn, args):
+    """
+    素材列表：name 按文件名前缀匹配，type 为 video / image，since / until 按上传时间（YYYY-MM-DD[ HH:MM:SS]）筛选；
+    sort 可选 id / uploadTime / filename，order 为 asc / desc，limit + cursor 翻页。
+    """
+    clauses, params = [], []
+    if args.get("name"):
+        clause, values = _prefix("filename", args["name"])
+        clauses.append(clause)
+        params += values
+    media_type = args.get("type")
+    if media_type:
+        if media_type not in ("video", "image"):
+            raise ListQueryError("type must be video or image")
+        clauses.append("media_type = ?")
+        params.append(media_type)
+    if args.get("since"):
+        clauses.append("upload_time >= ?")
+        params.append(args["since"])
+    if args.get("until"):
+        # 只给日期时包含当天
+        until = args["until"]
+        clauses.append("upload_time <= ?")
+        params.append(f"{until} 23:59:59" if len(until) == 10 else until)
+    sort, descending, cursor, limit = _page_args(args, FILE_SORTS, "id")
+    return paginate(conn, "file_records", clauses, params, sort, descending, cursor, limit)
+
+
+def list_accounts(conn, args):
+    """
+    账号列表：type 为平台（1 小红书 2 视频号 3 抖音 4 快手），status 为 0 失效 / 1 有效，name 按账号名前缀匹配；
+    sort 可选 id / userName / type / status，order 为 asc / desc，limit + cursor 翻页。
+    """
+    clauses, params = [], []
+    for name in ("type", "status"):
+        value = _int_arg(args, name)
+        if value is not None:
+            clauses.append(f"{name} = ?")
+            params.append(value)
+    if args.get("name"):
+        clause, values = _prefix("userName", args["name"])
+        clauses.append(clause)
+        params += values
+    sort, descending, cursor, limit = _page_args(args, ACCOUNT_SORTS, "id")
+    return paginate(conn, "user_info", clauses, params, sort, descending, cursor, limit)
@@ -1,31 +1,126 @@
 import asyncio
+import queue
 import sqlite3
+import time
 
-from playwright.async_api import async_playwright
-
+import conf
 from myUtils.auth import check_cookie
 from utils.base_social_media import set_init_script
+from utils.browser_pool import BrowserLoop, pooled_context
 import uuid
 from pathlib import Path
 from conf import BASE_DIR, LOCAL_CHROME_HEADLESS
 
-# 抖音登录
-async def douyin_cookie_gen(id,status_queue):
+# 登录 SSE 连接空闲时发送心跳的间隔（秒），心跳写失败即可发现客户端已断开
+LOGIN_SSE_HEARTBEAT = getattr(conf, "LOGIN_SSE_HEARTBEAT", 15)
+# 单次扫码登录 SSE 连接的最长时长（秒），超时后发送 500 并关闭
+LOGIN_SSE_TIMEOUT = getattr(conf, "LOGIN_SSE_TIMEOUT", 300)
+# 登录结果消息，发出后关闭 SSE 连接
+LOGIN_TERMINAL_MESSAGES = ("200", "500")
+# 二维码展示后等待扫码跳转的时长（秒）
+LOGIN_SCAN_TIMEOUT = getattr(conf, "LOGIN_SCAN_TIMEOUT", 200)
+# 单个登录会话的总时长上限（秒，含排队、扫码和登录后校验），应小于 LOGIN_SSE_TIMEOUT
+LOGIN_SESSION_TIMEOUT = getattr(conf, "LOGIN_SESSION_TIMEOUT", 280)
+# 同时进行的扫码登录数，超出的排队等待
+LOGIN_MAX_SESSIONS = getattr(conf, "LOGIN_MAX_SESSIONS", 10)
+
+# 登录浏览器的启动参数，同一组参数的登录共用浏览器池里的浏览器
+LOGIN_LAUNCH_OPTIONS = {
+    'args': [
+        '--lang en-GB'
+    ],
+    'headless': LOCAL_CHROME_HEADLESS,
+}
+DOUYIN_LOGIN_LAUNCH_OPTIONS = {
+    'headless': LOCAL_CHROME_HEADLESS
+}
+
+
+def sse_stream(status_queue, on_close=None, heartbeat=None, timeout=None, on_abort=None):
+    """
+    把登录线程写入队列的消息（二维码地址、200/500 结果）转成 SSE。
+    阻塞读取队列，空闲时只按心跳间隔醒来；收到结果或超时后结束，结束或客户端断开时调用 on_close。
+    在收到登录结果之前结束（客户端断开或超时）时先调用 on_abort。
+    """
+    heartbeat = heartbeat or LOGIN_SSE_HEARTBEAT
+    deadline = time.monotonic() + (timeout or LOGIN_SSE_TIMEOUT)
+    finished = False
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                yield "data: 500\n\n"
+                return
+            try:
+                msg = status_queue.get(timeout=min(heartbeat, remaining))
+            except queue.Empty:
+                yield ": heartbeat\n\n"
+                continue
+            if str(msg) in LOGIN_TERMINAL_MESSAGES:
+                finished = True
+            yield f"data: {msg}\n\n"
+            if finished:
+                return
+    finally:
+        if not finished and on_abort is not None:
+            on_abort()
+        if on_close is not None:
+            on_close()
+
+
+async def wait_for_scan(page, original_url, timeout=None):
+    """等待扫码后主框架跳转离开 original_url，超时返回 False。"""
     url_changed_event = asyncio.Event()
-    async def on_url_change():
-        # 检查是否是主框架的变化
-        if page.url != original_url:
+
+    def on_frame_navigated(frame):
+        # 只关注主框架的变化
+        if frame == page.main_frame and page.url != original_url:
             url_changed_event.set()
-    async with async_playwright() as playwright:
-        options = {
-            'headless': LOCAL_CHROME_HEADLESS
-        }
-        # Make sure to run headed.
-        browser = await playwright.chromium.launch(**options)
-        # Setup context however you like.
-        context = await browser.new_context()  # Pass any options
+
+    page.on('framenavigated', on_frame_navigated)
+    try:
+        # 等待 URL 变化或超时
+        await asyncio.wait_for(url_changed_event.wait(), timeout=timeout or LOGIN_SCAN_TIMEOUT)
+        print("监听页面跳转成功")
+        return True
+    except asyncio.TimeoutError:
+        print("监听页面跳转超时")
+        return False
+
+
+async def finish_login(type, id, context, page, original_url, status_queue):
+    """
+    等待扫码完成后保存 cookie，并直接在登录用的上下文里校验登录态，校验通过才写入账号表。
+    """
+    if not await wait_for_scan(page, original_url):
+        status_queue.put("500")
+        return None
+    uuid_v1 = uuid.uuid1()
+    print(f"UUID v1: {uuid_v1}")
+    # 确保cookiesFile目录存在
+    cookies_dir = Path(BASE_DIR / "cookiesFile")
+    cookies_dir.mkdir(exist_ok=True)
+    await context.storage_state(path=cookies_dir / f"{uuid_v1}.json")
+    result = await check_cookie(type, f"{uuid_v1}.json", context=context)
+    if not result:
+        status_queue.put("500")
+        return None
+    with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+                       INSERT INTO user_info (type, filePath, userName, status)
+                       VALUES (?, ?, ?, ?)
+                       ''', (type, f"{uuid_v1}.json", id, 1))
+        conn.commit()
+        print("✅ 用户状态已记录")
+    status_queue.put("200")
+
+
+# 抖音登录
+async def douyin_cookie_gen(id,status_queue):
+    # 从当前事件循环的浏览器池取一个独立上下文，退出时关闭上下文、浏览器留给其他登录
+    async with pooled_context(DOUYIN_LOGIN_LAUNCH_OPTIONS) as context:
         context = await set_init_script(context)
-        # Pause the page, and start recording manually.
         page = await context.new_page()
         await page.goto("https://creator.douyin.com/")
         original_url = page.url
@@ -34,76 +129,17 @@ async def douyin_cookie_gen(id,status_queue):
         src = await img_locator.get_attribute("src")
         print("✅ 图片地址:", src)
         status_queue.put(src)
-        # 监听页面的 'framenavigated' 事件，只关注主框架的变化
-        page.on('framenavigated',
-                lambda frame: asyncio.create_task(on_url_change()) if frame == page.main_frame else None)
-        try:
-            # 等待 URL 变化或超时
-            await asyncio.wait_for(url_changed_event.wait(), timeout=200)  # 最多等待 200 秒
-            print("监听页面跳转成功")
-        except asyncio.TimeoutError:
-            print("监听页面跳转超时")
-            await page.close()
-            await context.close()
-            await browser.close()
-            status_queue.put("500")
-            return None
-        uuid_v1 = uuid.uuid1()
-        print(f"UUID v1: {uuid_v1}")
-        # 确保cookiesFile目录存在
-        cookies_dir = Path(BASE_DIR / "cookiesFile")
-        cookies_dir.mkdir(exist_ok=True)
-        await context.storage_state(path=cookies_dir / f"{uuid_v1}.json")
-        result = await check_cookie(3, f"{uuid_v1}.json")
-        if not result:
-            status_queue.put("500")
-            await page.close()
-            await context.close()
-            await browser.close()
-            return None
-        await page.close()
-        await context.close()
-        await browser.close()
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                                INSERT INTO user_info (type, filePath, userName, status)
-                                VALUES (?, ?, ?, ?)
-                                ''', (3, f"{uuid_v1}.json", id, 1))
-            conn.commit()
-            print("✅ 用户状态已记录")
-        status_queue.put("200")
+        await finish_login(3, id, context, page, original_url, status_queue)
 
 
 # 视频号登录
 async def get_tencent_cookie(id,status_queue):
-    url_changed_event = asyncio.Event()
-    async def on_url_change():
-        # 检查是否是主框架的变化
-        if page.url != original_url:
-            url_changed_event.set()
-
-    async with async_playwright() as playwright:
-        options = {
-            'args': [
-                '--lang en-GB'
-            ],
-            'headless': LOCAL_CHROME_HEADLESS,  # Set headless option here
-        }
-        # Make sure to run headed.
-        browser = await playwright.chromium.launch(**options)
-        # Setup context however you like.
-        context = await browser.new_context()  # Pass any options
-        # Pause the page, and start recording manually.
+    async with pooled_context(LOGIN_LAUNCH_OPTIONS) as context:
         context = await set_init_script(context)
         page = await context.new_page()
         await page.goto("https://channels.weixin.qq.com")
         original_url = page.url
 
-        # 监听页面的 'framenavigated' 事件，只关注主框架的变化
-        page.on('framenavigated',
-                lambda frame: asyncio.create_task(on_url_change()) if frame == page.main_frame else None)
-
         # 等待 iframe 出现（最多等 60 秒）
         iframe_locator = page.frame_locator("iframe").first
 
@@ -114,65 +150,13 @@ async def get_tencent_cookie(id,status_queue):
         src = await img_locator.get_attribute("src")
         print("✅ 图片地址:", src)
         status_queue.put(src)
+        await finish_login(2, id, context, page, original_url, status_queue)
 
-        try:
-            # 等待 URL 变化或超时
-            await asyncio.wait_for(url_changed_event.wait(), timeout=200)  # 最多等待 200 秒
-            print("监听页面跳转成功")
-        except asyncio.TimeoutError:
-            status_queue.put("500")
-            print("监听页面跳转超时")
-            await page.close()
-            await context.close()
-            await browser.close()
-            return None
-        uuid_v1 = uuid.uuid1()
-        print(f"UUID v1: {uuid_v1}")
-        # 确保cookiesFile目录存在
-        cookies_dir = Path(BASE_DIR / "cookiesFile")
-        cookies_dir.mkdir(exist_ok=True)
-        await context.storage_state(path=cookies_dir / f"{uuid_v1}.json")
-        result = await check_cookie(2,f"{uuid_v1}.json")
-        if not result:
-            status_queue.put("500")
-            await page.close()
-            await context.close()
-            await browser.close()
-            return None
-        await page.close()
-        await context.close()
-        await browser.close()
-
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                                INSERT INTO user_info (type, filePath, userName, status)
-                                VALUES (?, ?, ?, ?)
-                                ''', (2, f"{uuid_v1}.json", id, 1))
-            conn.commit()
-            print("✅ 用户状态已记录")
-        status_queue.put("200")
 
 # 快手登录
 async def get_ks_cookie(id,status_queue):
-    url_changed_event = asyncio.Event()
-    async def on_url_change():
-        # 检查是否是主框架的变化
-        if page.url != original_url:
-            url_changed_event.set()
-    async with async_playwright() as playwright:
-        options = {
-            'args': [
-                '--lang en-GB'
-            ],
-            'headless': LOCAL_CHROME_HEADLESS,  # Set headless option here
-        }
-        # Make sure to run headed.
-        browser = await playwright.chromium.launch(**options)
-        # Setup context however you like.
-        context = await browser.new_context()  # Pass any options
+    async with pooled_context(LOGIN_LAUNCH_OPTIONS) as context:
         context = await set_init_script(context)
-        # Pause the page, and start recording manually.
         page = await context.new_page()
         await page.goto("https://cp.kuaishou.com")
 
@@ -185,70 +169,13 @@ async def get_ks_cookie(id,status_queue):
         original_url = page.url
         print("✅ 图片地址:", src)
         status_queue.put(src)
-        # 监听页面的 'framenavigated' 事件，只关注主框架的变化
-        page.on('framenavigated',
-                lambda frame: asyncio.create_task(on_url_change()) if frame == page.main_frame else None)
+        await finish_login(4, id, context, page, original_url, status_queue)
 
-        try:
-            # 等待 URL 变化或超时
-            await asyncio.wait_for(url_changed_event.wait(), timeout=200)  # 最多等待 200 秒
-            print("监听页面跳转成功")
-        except asyncio.TimeoutError:
-            status_queue.put("500")
-            print("监听页面跳转超时")
-            await page.close()
-            await context.close()
-            await browser.close()
-            return None
-        uuid_v1 = uuid.uuid1()
-        print(f"UUID v1: {uuid_v1}")
-        # 确保cookiesFile目录存在
-        cookies_dir = Path(BASE_DIR / "cookiesFile")
-        cookies_dir.mkdir(exist_ok=True)
-        await context.storage_state(path=cookies_dir / f"{uuid_v1}.json")
-        result = await check_cookie(4, f"{uuid_v1}.json")
-        if not result:
-            status_queue.put("500")
-            await page.close()
-            await context.close()
-            await browser.close()
-            return None
-        await page.close()
-        await context.close()
-        await browser.close()
-
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                                        INSERT INTO user_info (type, filePath, userName, status)
-                                        VALUES (?, ?, ?, ?)
-                                        ''', (4, f"{uuid_v1}.json", id, 1))
-            conn.commit()
-            print("✅ 用户状态已记录")
-        status_queue.put("200")
 
 # 小红书登录
 async def xiaohongshu_cookie_gen(id,status_queue):
-    url_changed_event = asyncio.Event()
-
-    async def on_url_change():
-        # 检查是否是主框架的变化
-        if page.url != original_url:
-            url_changed_event.set()
-
-    async with async_playwright() as playwright:
-        options = {
-            'args': [
-                '--lang en-GB'
-            ],
-            'headless': LOCAL_CHROME_HEADLESS,  # Set headless option here
-        }
-        # Make sure to run headed.
-        browser = await playwright.chromium.launch(**options)
-        # Setup context however you like.
-        context = await browser.new_context()  # Pass any options
+    async with pooled_context(LOGIN_LAUNCH_OPTIONS) as context:
         context = await set_init_script(context)
-        # Pause the page, and start recording manually.
         page = await context.new_page()
         await page.goto("https://creator.xiaohongshu.com/")
         await page.locator('img.css-wemwzq').click()
@@ -259,47 +186,85 @@ async def xiaohongshu_cookie_gen(id,status_queue):
         original_url = page.url
         print("✅ 图片地址:", src)
         status_queue.put(src)
-        # 监听页面的 'framenavigated' 事件，只关注主框架的变化
-        page.on('framenavigated',
-                lambda frame: asyncio.create_task(on_url_change()) if frame == page.main_frame else None)
+        await finish_login(1, id, context, page, original_url, status_queue)
+
 
+# type 对应的扫码登录流程：1 小红书 2 视频号 3 抖音 4 快手
+LOGIN_COOKIE_GENS = {
+    '1': xiaohongshu_cookie_gen,
+    '2': get_tencent_cookie,
+    '3': douyin_cookie_gen,
+    '4': get_ks_cookie,
+}
+
+
+class LoginSessionManager(object):
+    """
+    扫码登录会话管理：所有登录在同一个常驻事件循环线程里执行，共享该循环的浏览器池，每个登录一个上下文。
+    同时进行的登录数受 max_sessions 限制，超出的排队；每个会话（含排队）有总时长上限，超时发送 500。
+    """
+
+    def __init__(self, max_sessions=None, timeout=None, cookie_gens=None):
+        self.max_sessions = max_sessions or LOGIN_MAX_SESSIONS
+        self.timeout = timeout or LOGIN_SESSION_TIMEOUT
+        self.cookie_gens = LOGIN_COOKIE_GENS if cookie_gens is None else cookie_gens
+        self.sessions = {}
+        self._futures = {}
+        self._semaphore = None
+        # 整个循环生命周期内持有浏览器池，登录之间浏览器不关闭
+        self._browser_loop = BrowserLoop("login-sessions")
+
+    def start(self, type, id, status_queue):
+        """提交一次扫码登录，返回会话 id；不支持的平台类型直接发送 500 并返回 None。"""
+        cookie_gen = self.cookie_gens.get(str(type))
+        if cookie_gen is None:
+            status_queue.put("500")
+            return None
+        session_id = uuid.uuid4().hex
+        self.sessions[session_id] = {"type": str(type), "id": id, "state": "queued", "createdAt": time.time()}
+        future = self._browser_loop.submit(self._run(session_id, cookie_gen, id, status_queue))
+        self._futures[session_id] = future
+        # 会话可能在登记之前就已结束，由回调移除，已完成的 future 会立即调用
+        future.add_done_callback(lambda _: self._futures.pop(session_id, None))
+        return session_id
+
+    async def _run(self, session_id, cookie_gen, id, status_queue):
+        deadline = asyncio.get_running_loop().time() + self.timeout
+        if self._semaphore is None:
+            # 只在常驻循环线程里创建和使用
+            self._semaphore = asyncio.Semaphore(self.max_sessions)
+        acquired = False
         try:
-            # 等待 URL 变化或超时
-            await asyncio.wait_for(url_changed_event.wait(), timeout=200)  # 最多等待 200 秒
-            print("监听页面跳转成功")
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout)
+            acquired = True
+            self.sessions[session_id]["state"] = "running"
+            remaining = deadline - asyncio.get_running_loop().time()
+            await asyncio.wait_for(cookie_gen(id, status_queue), timeout=max(0, remaining))
         except asyncio.TimeoutError:
+            print(f"登录会话超时 {id}")
             status_queue.put("500")
-            print("监听页面跳转超时")
-            await page.close()
-            await context.close()
-            await browser.close()
-            return None
-        uuid_v1 = uuid.uuid1()
-        print(f"UUID v1: {uuid_v1}")
-        # 确保cookiesFile目录存在
-        cookies_dir = Path(BASE_DIR / "cookiesFile")
-        cookies_dir.mkdir(exist_ok=True)
-        await context.storage_state(path=cookies_dir / f"{uuid_v1}.json")
-        result = await check_cookie(1, f"{uuid_v1}.json")
-        if not result:
+        except Exception as e:
+            # 登录流程异常退出时也要发出结果，SSE 连接才能结束
+            print(f"登录失败 {id}: {e}")
             status_queue.put("500")
-            await page.close()
-            await context.close()
-            await browser.close()
-            return None
-        await page.close()
-        await context.close()
-        await browser.close()
-
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                           INSERT INTO user_info (type, filePath, userName, status)
-                           VALUES (?, ?, ?, ?)
-                           ''', (1, f"{uuid_v1}.json", id, 1))
-            conn.commit()
-            print("✅ 用户状态已记录")
-        status_queue.put("200")
-
-# a = asyncio.run(xiaohongshu_cookie_gen(4,None))
-# print(a)
+        finally:
+            if acquired:
+                self._semaphore.release()
+            self.sessions.pop(session_id, None)
+
+    def cancel(self, session_id):
+        """客户端在收到登录结果前断开时，取消还在进行的登录，释放上下文和并发名额。"""
+        future = self._futures.get(session_id)
+        if future is not None:
+            future.cancel()
+
+    def snapshot(self):
+        return [dict(session, sessionId=session_id) for session_id, session in list(self.sessions.items())]
+
+    def stop(self):
+        """结束事件循环线程并关闭共享浏览器。"""
+        self._browser_loop.stop()
+        self._semaphore = None
+
+
+login_sessions = LoginSessionManager()
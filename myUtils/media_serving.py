@@ -0,0 +1,148 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+
+import conf
+
+# 素材预览的浏览器缓存时长（秒）；以内容摘要命名的文件内容不会变，额外标记 immutable
+MEDIA_CACHE_MAX_AGE = getattr(conf, "MEDIA_CACHE_MAX_AGE", 86400)
+# 不支持零拷贝时分块读取文件的大小（字节）
+MEDIA_READ_SIZE = 256 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_SHA256_NAME_RE = re.compile(r"^[0-9a-f]{64}(\.\w+)?$")
+
+
+class RangeNotSatisfiable(ValueError):
+    """请求的字节范围超出文件大小。"""
+
+
+def parse_range(header, size):
+    """
+    解析单段 Range 头，返回 (start, end)（含 end）；没有或无法解析的 Range 返回 None，按整个文件返回。
+    多段范围同样按整个文件处理，浏览器拖动进度条只会发单段请求。
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N：最后 N 个字节
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable(header)
+    return start, end
+
+
+def make_etag(path, stat):
+    """以内容摘要命名的文件直接用摘要做 ETag，其余文件用修改时间和大小。"""
+    name = os.path.basename(path)
+    if _SHA256_NAME_RE.match(name):
+        return f'"{name.split(".")[0]}"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match 用弱比较
+    return etag in [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+def _not_modified_since(header, mtime):
+    if not header:
+        return False
+    try:
+        return int(mtime) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def is_not_modified(headers, etag, mtime):
+    """If-None-Match 优先于 If-Modified-Since。"""
+    if headers.get("If-None-Match"):
+        return _etag_matches(headers.get("If-None-Match"), etag)
+    return _not_modified_since(headers.get("If-Modified-Since"), mtime)
+
+
+def _if_range_allows(header, etag, mtime):
+    """If-Range 和当前文件一致时才返回部分内容，否则返回整个文件。"""
+    if not header:
+        return True
+    header = header.strip()
+    if header.startswith('"') or header.startswith("W/"):
+        return header == etag
+    try:
+        return int(mtime) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def iter_file(f, length):
+    """从文件当前位置读取 length 个字节，读完关闭文件。"""
+    try:
+        while length > 0:
+            block = f.read(min(MEDIA_READ_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        f.close()
+
+
+def serve_file(path, headers, file_wrapper=None, method="GET", cache_control=None, wrapper_honors_length=False):
+    """
+    按请求头返回 (状态码, 响应头, 响应体)：支持单段 Range、If-Range、ETag / Last-Modified 条件请求。
+    cache_control 为空时按 MEDIA_CACHE_MAX_AGE 设置缓存。
+    零拷贝依赖 WSGI 服务器提供的 wsgi.file_wrapper（如 gunicorn 用 sendfile 发送），Flask 自带的 app.run
+    开发服务器没有 file_wrapper，只能按块读取固定长度。file_wrapper 一般会发送到文件末尾，只用于读到末尾的响应；
+    wrapper_honors_length 为 True 时（gunicorn 的 sendfile 从文件当前位置起只发送 Content-Length 个字节），
+    中间的范围也交给 file_wrapper。
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = make_etag(path, stat)
+    immutable = ", immutable" if _SHA256_NAME_RE.match(os.path.basename(path)) else ""
+    response_headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": cache_control or f"public, max-age={MEDIA_CACHE_MAX_AGE}{immutable}",
+        "Content-Type": mimetypes.guess_type(path)[0] or "application/octet-stream",
+    }
+    if is_not_modified(headers, etag, stat.st_mtime):
+        return 304, response_headers, []
+
+    status, start, end = 200, 0, size - 1
+    if _if_range_allows(headers.get("If-Range"), etag, stat.st_mtime):
+        try:
+            byte_range = parse_range(headers.get("Range"), size)
+        except RangeNotSatisfiable:
+            response_headers["Content-Range"] = f"bytes */{size}"
+            return 416, response_headers, []
+        if byte_range is not None:
+            status, (start, end) = 206, byte_range
+            response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    length = max(0, end - start + 1)
+    response_headers["Content-Length"] = str(length)
+    if method == "HEAD":
+        return status, response_headers, []
+
+    f = open(path, "rb")
+    f.seek(start)
+    if file_wrapper is not None and (wrapper_honors_length or end == size - 1):
+        return status, response_headers, file_wrapper(f, MEDIA_READ_SIZE)
+    return status, response_headers, iter_file(f, length)
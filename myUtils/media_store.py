@@ -0,0 +1,186 @@
+import hashlib
+import os
+import sqlite3
+import uuid
+from pathlib import Path
+
+from conf import BASE_DIR
+from myUtils.publish_payload import is_image_file, is_video_file
+
+# 从请求体读取、写入磁盘的缓冲大小（字节）
+MEDIA_BUFFER_SIZE = 1024 * 1024
+
+
+def media_type_of(file_name):
+    """素材类型：video / image / other，落库到 file_records.media_type 供列表按类型筛选。"""
+    if is_video_file(file_name):
+        return "video"
+    if is_image_file(file_name):
+        return "image"
+    return "other"
+
+
+def ensure_file_columns(conn):
+    """
+    给旧版本的 file_records 补上 sha256、uuid、media_type 列。uuid 原来每次查询时从 file_path 拆出，
+    现在落库：旧记录按原规则回填，文件名里没有 uuid 的记录生成一个；media_type 按扩展名回填。
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(file_records)")}
+    if not columns:
+        return
+    if "sha256" not in columns:
+        conn.execute("ALTER TABLE file_records ADD COLUMN sha256 TEXT")
+    if "uuid" not in columns:
+        conn.execute("ALTER TABLE file_records ADD COLUMN uuid TEXT")
+        conn.execute(
+            "UPDATE file_records SET uuid = substr(file_path, 1, instr(file_path, '_') - 1) "
+            "WHERE uuid IS NULL AND instr(file_path, '_') > 1"
+        )
+        conn.execute("UPDATE file_records SET uuid = lower(hex(randomblob(16))) WHERE uuid IS NULL")
+    if "media_type" not in columns:
+        conn.execute("ALTER TABLE file_records ADD COLUMN media_type TEXT")
+        rows = conn.execute("SELECT id, file_path, filename FROM file_records").fetchall()
+        conn.executemany(
+            "UPDATE file_records SET media_type = ? WHERE id = ?",
+            [(media_type_of(row[1] or row[2]), row[0]) for row in rows],
+        )
+
+
+class MediaStore(object):
+    """
+    按内容寻址的素材库：文件以 SHA-256 命名存放在 videoFile 下（{sha256}{扩展名}），
+    media_blobs 表记录每个文件被多少条 file_records 引用。重复上传相同内容只增加引用计数、不再写盘，
+    删除素材时引用计数归零才删除文件。没有 sha256 的旧记录仍按原来的方式直接删除文件。
+    """
+
+    def __init__(self, db_path=None, root=None):
+        self.db_path = db_path or Path(BASE_DIR / "db" / "database.db")
+        self.root = Path(root or BASE_DIR / "videoFile")
+        self.tmp_dir = self.root / ".uploads"
+        self._ready = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def ensure_table(self):
+        if self._ready:
+            return
+        with self._connect() as conn:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS media_blobs (
+                sha256 TEXT PRIMARY KEY,
+                file_path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                ref_count INTEGER NOT NULL DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            ''')
+            ensure_file_columns(conn)
+            conn.commit()
+        self._ready = True
+
+    def save_stream(self, stream):
+        """把上传流写到临时文件并同时计算摘要，返回 (临时文件路径, sha256, 字节数)。"""
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.tmp_dir / f"{uuid.uuid4().hex}.tmp"
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                for block in iter(lambda: stream.read(MEDIA_BUFFER_SIZE), b""):
+                    f.write(block)
+                    hasher.update(block)
+                    size += len(block)
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return tmp_path, hasher.hexdigest(), size
+
+    def add(self, filename, sha256, size=None, *, src_path):
+        """
+        新增一条素材记录，返回 (记录, 是否命中已有内容)。内容已存在时只增加引用计数并删除 src_path；
+        否则把 src_path 改名为内容文件。sha256 必须是服务端对 src_path 算出的摘要，不接受客户端声明的哈希直接秒传。
+        """
+        self.ensure_table()
+        sha256 = sha256.lower()
+        conn = self._connect()
+        try:
+            # 先拿写锁，同时上传相同内容时只有一个请求落盘
+            conn.execute("BEGIN IMMEDIATE")
+            blob = conn.execute("SELECT * FROM media_blobs WHERE sha256 = ?", (sha256,)).fetchone()
+            deduplicated = blob is not None and (self.root / blob["file_path"]).exists()
+            if deduplicated:
+                blob_path, size = blob["file_path"], blob["size"]
+                conn.execute("UPDATE media_blobs SET ref_count = ref_count + 1 WHERE sha256 = ?", (sha256,))
+            else:
+                blob_path = f"{sha256}{Path(filename).suffix.lower()}"
+                size = os.path.getsize(src_path) if size is None else size
+                os.replace(src_path, self.root / blob_path)
+                # 记录还在但文件丢失时用这次上传的内容补上
+                conn.execute(
+                    "INSERT INTO media_blobs (sha256, file_path, size, ref_count) VALUES (?, ?, ?, 1) "
+                    "ON CONFLICT(sha256) DO UPDATE SET file_path = excluded.file_path, size = excluded.size, "
+                    "ref_count = ref_count + 1",
+                    (sha256, blob_path, size),
+                )
+            cursor = conn.execute(
+                "INSERT INTO file_records (filename, filesize, file_path, sha256, uuid, media_type) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (filename, round(float(size) / (1024 * 1024), 2), blob_path, sha256, str(uuid.uuid1()),
+                 media_type_of(blob_path)),
+            )
+            record_id = cursor.lastrowid
+            conn.commit()
+        finally:
+            conn.close()
+        if deduplicated:
+            Path(src_path).unlink(missing_ok=True)
+        return {"id": record_id, "filename": filename, "filepath": blob_path, "sha256": sha256}, deduplicated
+
+    def remove(self, record_id):
+        """删除一条素材记录，返回被删除的记录；内容文件没有其他引用时一并删除。"""
+        self.ensure_table()
+        unlink = None
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            record = conn.execute("SELECT * FROM file_records WHERE id = ?", (record_id,)).fetchone()
+            if record is None:
+                conn.rollback()
+                return None
+            record = dict(record)
+            conn.execute("DELETE FROM file_records WHERE id = ?", (record_id,))
+            if record.get("sha256"):
+                conn.execute("UPDATE media_blobs SET ref_count = ref_count - 1 WHERE sha256 = ?", (record["sha256"],))
+                blob = conn.execute("SELECT * FROM media_blobs WHERE sha256 = ?", (record["sha256"],)).fetchone()
+                if blob is not None and blob["ref_count"] <= 0:
+                    conn.execute("DELETE FROM media_blobs WHERE sha256 = ?", (record["sha256"],))
+                    unlink = blob["file_path"]
+            elif record.get("file_path"):
+                unlink = record["file_path"]
+            # 在写锁内删除文件：同时上传相同内容的请求要等提交后才能判断内容是否存在，不会引用到刚删掉的文件
+            if unlink:
+                self._unlink(unlink)
+            conn.commit()
+        finally:
+            conn.close()
+        # 实际删除的文件，调用方据此清理缩略图等派生文件
+        record["deleted_file"] = unlink
+        return record
+
+    def _unlink(self, relative_path):
+        file_path = self.root / relative_path
+        if not file_path.exists():
+            print(f"⚠️ 实际文件不存在: {file_path}")
+            return
+        try:
+            file_path.unlink()
+            print(f"✅ 实际文件已删除: {file_path}")
+        except Exception as e:
+            # 即使删除文件失败，数据库记录也照常删除，避免数据不一致
+            print(f"⚠️ 删除实际文件失败: {e}")
+
+
+media_store = MediaStore()
@@ -1,13 +1,140 @@
 import asyncio
+import contextvars
+import weakref
 from pathlib import Path
 
+import conf
 from conf import BASE_DIR
 from uploader.douyin_uploader.main import DouYinVideo, DouYinImage
 from uploader.ks_uploader.main import KSVideo
 from uploader.tencent_uploader.main import TencentVideo
 from uploader.xiaohongshu_uploader.main import XiaoHongShuVideo, XiaoHongShuImage
+from utils.account_lease import account_leases
+from utils.browser_pool import use_browser_pool
+from utils.circuit_breaker import CircuitOpenError, circuit_breakers
 from utils.constant import TencentZoneTypes
 from utils.files_times import generate_schedule_time_next_day
+from utils.network import RETRYABLE, classify_error
+from utils.rate_limiter import RateLimitedError, account_key, rate_limiter
+from utils.step_budget import StepBudgetExceeded
+
+# 同一个事件循环（worker 进程）里同时进行的 文件×账号 任务上限，所有发布任务一起计数
+PUBLISH_CONCURRENCY = getattr(conf, "PUBLISH_CONCURRENCY", 4)
+# 各平台的并发上限，未配置的平台只受 PUBLISH_CONCURRENCY 限制；任务队列认领时同样按它限制各平台执行中的任务数
+PLATFORM_CONCURRENCY = getattr(conf, "PLATFORM_CONCURRENCY", {})
+
+# 当前发布任务的进度记录，由 publish_jobs 的 worker 设置；任务恢复执行时跳过已完成的 文件×账号 组合
+publish_progress = contextvars.ContextVar("publish_progress", default=None)
+# 发布 worker 的常驻事件循环（BrowserLoop），由 publish_jobs 的 worker 设置
+publish_loop = contextvars.ContextVar("publish_loop", default=None)
+
+
+_slots = weakref.WeakKeyDictionary()
+
+
+def publish_slots(platform):
+    """
+    当前事件循环里共享的并发名额 (平台名额, 总名额)：同一个 worker 循环里的多个发布任务一起计数，
+    不会每次 run_uploads 各拿一份上限。
+    """
+    slots = _slots.setdefault(asyncio.get_running_loop(), {})
+
+    def slot(key, limit):
+        key = (key, max(1, limit))
+        if key not in slots:
+            slots[key] = asyncio.Semaphore(key[1])
+        return slots[key]
+
+    return slot(platform, PLATFORM_CONCURRENCY.get(platform, PUBLISH_CONCURRENCY)), slot(None, PUBLISH_CONCURRENCY)
+
+
+def upload_key(app):
+    """一个 文件×账号 组合的唯一标识，图文按整组图片计。"""
+    files = getattr(app, "file_paths", None) or [getattr(app, "file_path", "")]
+    return f"{getattr(app, 'account_file', '')}|{','.join(str(file) for file in files)}"
+
+
+def is_platform_failure(error):
+    """页面超时、阶段超预算等算平台异常；登录失效、内容被拒这类账号或内容问题不计入熔断。"""
+    return isinstance(error, StepBudgetExceeded) or classify_error(error) == RETRYABLE
+
+
+async def run_uploads(apps, platform=None):
+    """
+    并发执行一批 文件×账号 发布任务，共享同一个事件循环和浏览器池。
+    总并发受 PUBLISH_CONCURRENCY 限制，单个平台再受 PLATFORM_CONCURRENCY 限制，名额由同一事件循环里的所有批次共享；
+    同一账号的任务按提交顺序串行（跨任务由账号租约保证），不同账号并行，单个任务失败不影响其余任务。
+    平台熔断后剩余任务不再执行，整体抛出 CircuitOpenError，由任务队列延后重排；
+    超出平台或账号发布频率的任务同样跳过，其余任务都成功时抛出 RateLimitedError，任务延后到有余量时再执行。
+    """
+    progress = publish_progress.get()
+    # 任务队列里执行时用队列的熔断器和限速器（状态存放在任务库，各 worker 共享），直接调用时用进程内的
+    breakers = progress.circuit_breakers if progress is not None else circuit_breakers
+    limiter = progress.rate_limiter if progress is not None else rate_limiter
+    breaker = breakers.get(platform) if platform else None
+    if progress is not None:
+        apps = [app for app in apps if not progress.is_done(upload_key(app))]
+    # 先占平台名额再占总名额，等平台名额的任务不会占着总名额挡住其他平台
+    platform_slot, total_slot = publish_slots(platform)
+    by_account = {}
+    for app in apps:
+        by_account.setdefault(str(getattr(app, "account_file", "")), []).append(app)
+
+    async def run_account(account_apps):
+        errors = []
+        for app in account_apps:
+            # 先拿账号租约再占并发名额，避免其他任务在同一账号上并发写 cookie 文件
+            async with account_leases.lease(getattr(app, "account_file", "")), platform_slot, total_slot:
+                if breaker is not None and breaker.is_open():
+                    errors.append(CircuitOpenError(platform, breaker.retry_after()))
+                    continue
+                account = getattr(app, "account_file", "")
+                # 认领任务时已为该账号占用过额度的第一次发布不再重复占用
+                reserved = progress is not None and progress.take_reservation(account)
+                wait = limiter.reserve(platform, account) if platform and not reserved else 0
+                if wait > 0:
+                    errors.append(RateLimitedError(platform, wait, account_key(account)))
+                    continue
+                try:
+                    await app.main()
+                    if breaker is not None:
+                        breaker.record_success()
+                    if progress is not None:
+                        progress.mark_done(upload_key(app))
+                except Exception as e:
+                    print(f"发布失败 {getattr(app, 'account_file', '')}: {e}")
+                    errors.append(e)
+                    if breaker is not None and is_platform_failure(e):
+                        breaker.record_failure(e)
+                    # 只在失败时把页面快照写到磁盘
+                    capture = getattr(app, "page_capture", None)
+                    if capture is not None:
+                        try:
+                            print(f"失败现场已保存到 {await capture.persist(type(e).__name__)}")
+                        except Exception:
+                            pass
+        return errors
+
+    async with use_browser_pool():
+        results = await asyncio.gather(*(run_account(account_apps) for account_apps in by_account.values()))
+    errors = [error for account_errors in results for error in account_errors]
+    if breaker is not None and any(isinstance(error, CircuitOpenError) for error in errors):
+        raise CircuitOpenError(platform, breaker.retry_after())
+    if errors and all(isinstance(error, RateLimitedError) for error in errors):
+        raise RateLimitedError(platform, min(error.retry_after for error in errors))
+    if errors:
+        raise RuntimeError(f"{len(errors)}/{len(apps)} 个发布任务失败: {errors[0]}")
+
+
+def run_publish(apps, platform):
+    """
+    执行一批发布：在 worker 里时交给 worker 的常驻事件循环，浏览器池在任务之间复用；
+    命令行等直接调用时单独起一个事件循环，结束后关闭浏览器。
+    """
+    loop = publish_loop.get()
+    if loop is None:
+        return asyncio.run(run_uploads(apps, platform))
+    return loop.run(run_uploads(apps, platform))
 
 
 def post_video_tencent(title,files,tags,account_file,category=TencentZoneTypes.LIFESTYLE.value,enableTimer=False,videos_per_day = 1, daily_times=None,start_days = 0, is_draft=False):
@@ -18,6 +145,7 @@ def post_video_tencent(title,files,tags,account_file,category=TencentZoneTypes.L
         publish_datetimes = generate_schedule_time_next_day(len(files), videos_per_day, daily_times,start_days)
     else:
         publish_datetimes = [0 for i in range(len(files))]
+    apps = []
     for index, file in enumerate(files):
         for cookie in account_file:
             print(f"文件路径{str(file)}")
@@ -26,7 +154,8 @@ def post_video_tencent(title,files,tags,account_file,category=TencentZoneTypes.L
             print(f"标题：{title}")
             print(f"Hashtag：{tags}")
             app = TencentVideo(title, str(file), tags, publish_datetimes[index], cookie, category, is_draft)
-            asyncio.run(app.main(), debug=False)
+            apps.append(app)
+    run_publish(apps, 'tencent')
 
 
 def post_video_DouYin(title,files,tags,account_file,category=TencentZoneTypes.LIFESTYLE.value,enableTimer=False,videos_per_day = 1, daily_times=None,start_days = 0,
@@ -40,18 +169,21 @@ def post_video_DouYin(title,files,tags,account_file,category=TencentZoneTypes.LI
         publish_datetime = 0
         if enableTimer:
             publish_datetime = generate_schedule_time_next_day(1, videos_per_day, daily_times, start_days)[0]
+        apps = []
         for cookie in account_file:
             print(f"图文文件数量：{len(files)}")
             print(f"标题：{title}")
             print(f"Hashtag：{tags}")
             app = DouYinImage(title, files, tags, publish_datetime, cookie, body, visibility, music_mode, music_keyword)
-            asyncio.run(app.main(), debug=False)
+            apps.append(app)
+        run_publish(apps, 'douyin')
         return
 
     if enableTimer:
         publish_datetimes = generate_schedule_time_next_day(len(files), videos_per_day, daily_times,start_days)
     else:
         publish_datetimes = [0 for i in range(len(files))]
+    apps = []
     for index, file in enumerate(files):
         for cookie in account_file:
             print(f"文件路径{str(file)}")
@@ -60,7 +192,8 @@ def post_video_DouYin(title,files,tags,account_file,category=TencentZoneTypes.LI
             print(f"标题：{title}")
             print(f"Hashtag：{tags}")
             app = DouYinVideo(title, str(file), tags, publish_datetimes[index], cookie, thumbnail_path, productLink, productTitle)
-            asyncio.run(app.main(), debug=False)
+            apps.append(app)
+    run_publish(apps, 'douyin')
 
 
 def post_video_ks(title,files,tags,account_file,category=TencentZoneTypes.LIFESTYLE.value,enableTimer=False,videos_per_day = 1, daily_times=None,start_days = 0):
@@ -71,6 +204,7 @@ def post_video_ks(title,files,tags,account_file,category=TencentZoneTypes.LIFEST
         publish_datetimes = generate_schedule_time_next_day(len(files), videos_per_day, daily_times,start_days)
     else:
         publish_datetimes = [0 for i in range(len(files))]
+    apps = []
     for index, file in enumerate(files):
         for cookie in account_file:
             print(f"文件路径{str(file)}")
@@ -79,7 +213,8 @@ def post_video_ks(title,files,tags,account_file,category=TencentZoneTypes.LIFEST
             print(f"标题：{title}")
             print(f"Hashtag：{tags}")
             app = KSVideo(title, str(file), tags, publish_datetimes[index], cookie)
-            asyncio.run(app.main(), debug=False)
+            apps.append(app)
+    run_publish(apps, 'kuaishou')
 
 def post_video_xhs(
         title,
@@ -103,6 +238,7 @@ def post_video_xhs(
         publish_datetime = 0
         if enableTimer:
             publish_datetime = generate_schedule_time_next_day(1, videos_per_day, daily_times, start_days)[0]
+        apps = []
         for cookie in account_file:
             print(f"图文文件数量：{len(files)}")
             print(f"标题：{title}")
@@ -117,7 +253,8 @@ def post_video_xhs(
                 visibility,
                 body,
             )
-            asyncio.run(app.main(), debug=False)
+            apps.append(app)
+        run_publish(apps, 'xiaohongshu')
         return
 
     file_num = len(files)
@@ -125,6 +262,7 @@ def post_video_xhs(
         publish_datetimes = generate_schedule_time_next_day(file_num, videos_per_day, daily_times, start_days)
     else:
         publish_datetimes = [0 for _ in range(file_num)]
+    apps = []
     for index, file in enumerate(files):
         for cookie in account_file:
             # 打印视频文件名、标题和 hashtag
@@ -132,7 +270,8 @@ def post_video_xhs(
             print(f"标题：{title}")
             print(f"Hashtag：{tags}")
             app = XiaoHongShuVideo(title, file, tags, publish_datetimes[index], cookie, None, original_declare, visibility)
-            asyncio.run(app.main(), debug=False)
+            apps.append(app)
+    run_publish(apps, 'xiaohongshu')
 
 
 
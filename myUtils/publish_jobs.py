@@ -0,0 +1,422 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from pathlib import Path
+
+import conf
+from conf import BASE_DIR
+from myUtils.postVideo import (
+    PLATFORM_CONCURRENCY,
+    post_video_tencent,
+    post_video_DouYin,
+    post_video_ks,
+    post_video_xhs,
+    publish_loop,
+    publish_progress,
+)
+from utils.browser_pool import BrowserLoop
+from utils.circuit_breaker import CircuitBreakerRegistry, CircuitOpenError
+from utils.rate_limiter import RateLimitedError, RateLimiter, account_key
+
+# 后台执行发布任务的线程数
+PUBLISH_WORKERS = getattr(conf, "PUBLISH_WORKERS", 2)
+# worker 空闲时轮询任务表的间隔（秒）
+PUBLISH_POLL_INTERVAL = getattr(conf, "PUBLISH_POLL_INTERVAL", 2)
+# 任务表所在的数据库，多台机器共用同一个数据库文件时指向共享路径
+PUBLISH_DB_PATH = getattr(conf, "PUBLISH_DB_PATH", None)
+# 认领任务的租约时长（秒），执行期间自动续约；worker 挂掉后租约到期，任务可被其他 worker 接手
+PUBLISH_LEASE_SECONDS = getattr(conf, "PUBLISH_LEASE_SECONDS", 60)
+# 单个任务最多执行几次（含首次），失败后按 PUBLISH_RETRY_DELAY * 已执行次数 延后重试
+PUBLISH_MAX_ATTEMPTS = getattr(conf, "PUBLISH_MAX_ATTEMPTS", 3)
+PUBLISH_RETRY_DELAY = getattr(conf, "PUBLISH_RETRY_DELAY", 60)
+# 认领时一次查看的到期任务数，排在前面的任务超出发布频率时改认领后面的任务
+PUBLISH_CLAIM_SCAN = getattr(conf, "PUBLISH_CLAIM_SCAN", 20)
+
+# type 平台标识：1 小红书 2 视频号 3 抖音 4 快手
+PUBLISHERS = {
+    1: post_video_xhs,
+    2: post_video_tencent,
+    3: post_video_DouYin,
+    4: post_video_ks,
+}
+# type 对应的熔断器平台名
+JOB_PLATFORMS = {
+    1: "xiaohongshu",
+    2: "tencent",
+    3: "douyin",
+    4: "kuaishou",
+}
+
+JOB_STATES = ("queued", "running", "succeeded", "failed")
+
+# 旧版本建的表缺少的列，启动时补上
+_MIGRATIONS = {
+    "run_at": "REAL NOT NULL DEFAULT 0",
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+    "max_attempts": f"INTEGER NOT NULL DEFAULT {PUBLISH_MAX_ATTEMPTS}",
+    "lease_owner": "TEXT",
+    "lease_expires_at": "REAL",
+    "done_pairs": "TEXT NOT NULL DEFAULT '[]'",
+}
+
+
+def job_accounts(payload):
+    """任务涉及的账号（按任务参数里的顺序），统一用 cookie 文件名标识。"""
+    try:
+        accounts = json.loads(payload).get("account_file") or []
+    except (TypeError, ValueError, AttributeError):
+        accounts = []
+    return list(dict.fromkeys(account_key(account) for account in accounts))
+
+
+class JobProgress(object):
+    """一个任务里已完成的 文件×账号 组合，每完成一个立即落库并顺带续约。"""
+
+    def __init__(self, job_queue, job_id, owner, done_pairs, reserved=None):
+        self.job_queue = job_queue
+        self.job_id = job_id
+        self.owner = owner
+        self.done = set(done_pairs)
+        self.reserved = reserved
+        self._lock = threading.Lock()
+
+    @property
+    def circuit_breakers(self):
+        return self.job_queue.circuit_breakers
+
+    @property
+    def rate_limiter(self):
+        return self.job_queue.rate_limiter
+
+    def take_reservation(self, account):
+        """认领任务时已为该账号占用了一次发布额度，第一次发布直接使用，不再重复占用。"""
+        with self._lock:
+            if self.reserved is not None and self.reserved == account_key(account):
+                self.reserved = None
+                return True
+            return False
+
+    def is_done(self, key):
+        return key in self.done
+
+    def mark_done(self, key):
+        with self._lock:
+            self.done.add(key)
+            done_pairs = json.dumps(sorted(self.done), ensure_ascii=False)
+        with self.job_queue._connect() as conn:
+            conn.execute(
+                "UPDATE publish_jobs SET done_pairs = ?, lease_expires_at = ? WHERE id = ? AND lease_owner = ?",
+                (done_pairs, time.time() + self.job_queue.lease_seconds, self.job_id, self.owner),
+            )
+            conn.commit()
+
+
+class PublishJobQueue(object):
+    """
+    发布任务队列：任务先落库（publish_jobs 表）再由 worker 从库里认领执行，接口只需返回任务 id。
+    worker 可以是本进程内的线程、sau_worker.py 启动的独立进程，也可以在其他机器上共用同一个数据库文件。
+    认领时加租约，执行期间定期续约；租约过期的任务会被重新认领，并跳过已完成的 文件×账号 组合。
+    熔断器和发布频率的状态和任务存放在同一个数据库里，所有 worker 共享。
+    同一个队列的 worker 线程共用一个常驻事件循环和浏览器池，浏览器在任务之间复用。
+    """
+
+    def __init__(self, db_path=None, workers=None, poll_interval=None, lease_seconds=None, circuit_breakers=None,
+                 rate_limiter=None):
+        self.db_path = db_path or PUBLISH_DB_PATH or Path(BASE_DIR / "db" / "database.db")
+        self.circuit_breakers = circuit_breakers or CircuitBreakerRegistry(db_path=self.db_path)
+        self.rate_limiter = rate_limiter or RateLimiter(db_path=self.db_path)
+        self.browser_loop = BrowserLoop("publish-loop")
+        self.workers = PUBLISH_WORKERS if workers is None else workers
+        self.poll_interval = poll_interval or PUBLISH_POLL_INTERVAL
+        self.lease_seconds = lease_seconds or PUBLISH_LEASE_SECONDS
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._started = False
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def worker_id():
+        return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+    def ensure_table(self):
+        with self._connect() as conn:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS publish_jobs (
+                id TEXT PRIMARY KEY,
+                type INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'queued',
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+            ''')
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(publish_jobs)")}
+            for column, definition in _MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE publish_jobs ADD COLUMN {column} {definition}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_publish_jobs_state_run_at ON publish_jobs (state, run_at)")
+            conn.commit()
+
+    def start(self, workers=None):
+        """建表并启动进程内 worker 线程；workers=0 表示任务交给独立的 worker 进程执行。"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self.ensure_table()
+            workers = self.workers if workers is None else workers
+            self._threads = [
+                threading.Thread(target=self.run_worker, name=f"publish-worker-{i}", daemon=True)
+                for i in range(workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def submit(self, type, kwargs, run_at=None):
+        """
+        落库并排队一个发布任务，kwargs 为对应 post_video_* 函数的参数，返回任务 id。
+        只负责入队，不启动 worker：任务由显式 start 的 worker 线程或独立的 sau_worker.py 进程执行。
+        """
+        if type not in PUBLISHERS:
+            raise ValueError(f"不支持的平台类型: {type}")
+        self.ensure_table()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO publish_jobs (id, type, payload, state, created_at, run_at, max_attempts) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, type, json.dumps(kwargs, ensure_ascii=False), now, run_at or now, PUBLISH_MAX_ATTEMPTS),
+            )
+            conn.commit()
+        self._wakeup.set()
+        return job_id
+
+    def claim_next(self, owner=None):
+        """
+        原子地认领一个到期的排队任务，或租约已过期的执行中任务；没有可执行任务时返回 None。
+        已用完执行次数且租约过期的任务直接标记为失败。
+        熔断中的平台的任务留在队列里；半开状态的平台只放行一个探测任务。
+        平台或账号超出发布频率的任务也留在队列里，worker 改认领其他到期任务，不原地等待；
+        认领成功时在同一事务里为任务的第一个账号占用一次发布额度，多个 worker 不会同时拿到同一份额度。
+        账号正被其他执行中（租约未过期）任务使用的任务同样跳过，同一账号同一时刻只在一个 worker 里发布，
+        多个进程、多台机器共用任务表时也成立；平台执行中的任务数达到 PLATFORM_CONCURRENCY 时该平台的任务也先不认领。
+        """
+        owner = owner or self.worker_id()
+        now = time.time()
+        row = None
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE 先拿写锁，多个进程、多台机器同时认领也不会拿到同一个任务
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE publish_jobs SET state = 'failed', error = '租约过期且已达到最大执行次数', "
+                "finished_at = ?, lease_owner = NULL WHERE state = 'running' AND lease_expires_at < ? "
+                "AND attempts >= max_attempts",
+                (now, now),
+            )
+            # 熔断状态在同一事务里判断并占用探测名额
+            allowed = [job_type for job_type, platform in JOB_PLATFORMS.items()
+                       if self.circuit_breakers.get(platform).try_acquire(owner, conn=conn)]
+            if not allowed:
+                conn.commit()
+                return None
+            type_filter = f"AND type IN ({', '.join('?' * len(allowed))})"
+            rows = conn.execute(
+                "SELECT id, type, payload, done_pairs FROM publish_jobs "
+                "WHERE ((state = 'queued' AND run_at <= ?) OR (state = 'running' AND lease_expires_at < ?)) "
+                f"{type_filter} ORDER BY run_at LIMIT ?",
+                (now, now, *allowed, PUBLISH_CLAIM_SCAN),
+            ).fetchall()
+            busy, running_jobs = set(), {}
+            for running in conn.execute(
+                    "SELECT type, payload FROM publish_jobs WHERE state = 'running' AND lease_expires_at >= ?", (now,)):
+                busy.update(job_accounts(running["payload"]))
+                running_jobs[running["type"]] = running_jobs.get(running["type"], 0) + 1
+            for candidate in rows:
+                accounts = job_accounts(candidate["payload"])
+                limit = PLATFORM_CONCURRENCY.get(JOB_PLATFORMS[candidate["type"]])
+                if limit is not None and running_jobs.get(candidate["type"], 0) >= limit:
+                    continue
+                if busy.intersection(accounts) or not self._reserve(candidate["type"], accounts, conn):
+                    continue
+                row = dict(candidate, reserved=accounts[0] if accounts else None)
+                break
+            if row is not None:
+                conn.execute(
+                    "UPDATE publish_jobs SET state = 'running', started_at = ?, attempts = attempts + 1, "
+                    "lease_owner = ?, lease_expires_at = ? WHERE id = ?",
+                    (now, owner, now + self.lease_seconds, row["id"]),
+                )
+            # 没有认领到的平台交还探测名额
+            for job_type in allowed:
+                if row is None or row["type"] != job_type:
+                    self.circuit_breakers.get(JOB_PLATFORMS[job_type]).release(owner, conn=conn)
+            conn.commit()
+            return row
+        finally:
+            conn.close()
+
+    def _reserve(self, job_type, accounts, conn):
+        """任务所属平台和涉及的账号都还能发布时，为第一个账号占用一次发布额度并返回 True。"""
+        platform = JOB_PLATFORMS[job_type]
+        if self.rate_limiter.delay(platform, accounts, conn=conn) > 0:
+            return False
+        return not accounts or self.rate_limiter.reserve(platform, accounts[0], conn=conn) <= 0
+
+    def renew_lease(self, job_id, owner):
+        """续约，返回 False 表示租约已被其他 worker 接手。"""
+        with self._connect() as conn:
+            renewed = conn.execute(
+                "UPDATE publish_jobs SET lease_expires_at = ? WHERE id = ? AND lease_owner = ? AND state = 'running'",
+                (time.time() + self.lease_seconds, job_id, owner),
+            ).rowcount
+            conn.commit()
+        return bool(renewed)
+
+    def stop(self):
+        """通知进程内 worker 线程在当前任务结束后退出，并关闭共用的浏览器。"""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join()
+        self.browser_loop.stop()
+
+    def run_worker(self, stop_event=None):
+        """worker 主循环：认领任务并执行，队列为空时等待新任务或轮询间隔。"""
+        stop_event = stop_event or self._stop
+        while not stop_event.is_set():
+            try:
+                job = self.claim_next()
+            except sqlite3.Error as e:
+                # 数据库暂时被锁等情况，稍后重试，不让 worker 退出
+                print(f"认领发布任务失败: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def run_pending(self):
+        """在当前线程把已到期的任务逐个执行完后返回。"""
+        while True:
+            job = self.claim_next()
+            if job is None:
+                return
+            self._run(job)
+
+    def _heartbeat(self, job_id, owner, done):
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                if not self.renew_lease(job_id, owner):
+                    print(f"发布任务 {job_id} 的租约已丢失")
+                    return
+            except sqlite3.Error as e:
+                print(f"发布任务 {job_id} 续约失败: {e}")
+
+    def _run(self, job):
+        job_id = job["id"]
+        owner = self.worker_id()
+        progress = JobProgress(self, job_id, owner, json.loads(job["done_pairs"] or "[]"), job.get("reserved"))
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, owner, done), daemon=True)
+        heartbeat.start()
+        token = publish_progress.set(progress)
+        loop_token = publish_loop.set(self.browser_loop)
+        error = None
+        held = None
+        try:
+            PUBLISHERS[job["type"]](**json.loads(job["payload"]))
+        except (CircuitOpenError, RateLimitedError) as e:
+            print(f"发布任务 {job_id} 暂缓: {e}")
+            held = e
+        except Exception as e:
+            print(f"发布任务 {job_id} 失败: {e}")
+            traceback.print_exc()
+            error = str(e)
+        finally:
+            publish_progress.reset(token)
+            publish_loop.reset(loop_token)
+            done.set()
+            heartbeat.join()
+            self.circuit_breakers.get(JOB_PLATFORMS[job["type"]]).release(owner)
+
+        now = time.time()
+        with self._connect() as conn:
+            if held is not None:
+                # 平台熔断或发布频率超限导致未执行完，放回队列等恢复，不占用执行次数
+                conn.execute(
+                    "UPDATE publish_jobs SET state = 'queued', run_at = ?, attempts = attempts - 1, error = ?, "
+                    "lease_owner = NULL WHERE id = ? AND lease_owner = ?",
+                    (now + held.retry_after, str(held), job_id, owner),
+                )
+            elif error is None:
+                conn.execute(
+                    "UPDATE publish_jobs SET state = 'succeeded', error = NULL, finished_at = ?, lease_owner = NULL "
+                    "WHERE id = ? AND lease_owner = ?",
+                    (now, job_id, owner),
+                )
+            else:
+                # 还有执行次数就延后重新排队，已完成的组合不会重复发布
+                conn.execute(
+                    "UPDATE publish_jobs SET "
+                    "state = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END, "
+                    "run_at = ? + ? * attempts, "
+                    "finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END, "
+                    "error = ?, lease_owner = NULL WHERE id = ? AND lease_owner = ?",
+                    (now, PUBLISH_RETRY_DELAY, now, error, job_id, owner),
+                )
+            conn.commit()
+
+    @staticmethod
+    def _to_dict(row):
+        return {
+            "id": row["id"],
+            "type": row["type"],
+            "state": row["state"],
+            "error": row["error"],
+            "payload": json.loads(row["payload"]),
+            "attempts": row["attempts"],
+            "maxAttempts": row["max_attempts"],
+            "donePairs": json.loads(row["done_pairs"] or "[]"),
+            "leaseOwner": row["lease_owner"],
+            "runAt": row["run_at"],
+            "createdAt": row["created_at"],
+            "startedAt": row["started_at"],
+            "finishedAt": row["finished_at"],
+        }
+
+    def get(self, job_id):
+        self.ensure_table()
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM publish_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, state=None, limit=50, offset=0):
+        self.ensure_table()
+        sql, params = "SELECT * FROM publish_jobs", []
+        if state:
+            sql += " WHERE state = ?"
+            params.append(state)
+        sql += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+
+publish_queue = PublishJobQueue()
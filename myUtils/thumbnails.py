@@ -0,0 +1,161 @@
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import conf
+from conf import BASE_DIR
+from myUtils.publish_payload import is_image_file, is_video_file
+
+# 缩略图最长边（像素）和格式（webp 或 jpeg）
+THUMBNAIL_SIZE = getattr(conf, "THUMBNAIL_SIZE", 320)
+THUMBNAIL_FORMAT = getattr(conf, "THUMBNAIL_FORMAT", "webp")
+# 视频封面帧的最长边（像素）和截取位置（秒），视频短于该位置时取第一帧
+POSTER_SIZE = getattr(conf, "POSTER_SIZE", 720)
+POSTER_SEEK = getattr(conf, "POSTER_SEEK", 1.0)
+# 后台生成缩略图的线程数
+THUMBNAIL_WORKERS = getattr(conf, "THUMBNAIL_WORKERS", 2)
+# /getThumbnail 在缩略图未生成时最多等待的秒数，以及浏览器缓存时长（秒）
+THUMBNAIL_WAIT = getattr(conf, "THUMBNAIL_WAIT", 5)
+THUMBNAIL_CACHE_MAX_AGE = getattr(conf, "THUMBNAIL_CACHE_MAX_AGE", 30 * 86400)
+# 抽取视频帧用的 ffmpeg，找不到时视频只有在装了 ffmpeg 后才会有封面
+FFMPEG_PATH = getattr(conf, "FFMPEG_PATH", None) or shutil.which("ffmpeg")
+
+KINDS = ("thumb", "poster")
+
+
+def _ffmpeg(args, timeout=60):
+    if not FFMPEG_PATH:
+        raise RuntimeError("ffmpeg not found")
+    subprocess.run([FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y", *args],
+                   check=True, capture_output=True, timeout=timeout)
+
+
+def _scale_filter(max_edge):
+    return f"scale='min({max_edge},iw)':'min({max_edge},ih)':force_original_aspect_ratio=decrease"
+
+
+def render_image(src, dst, max_edge, image_format):
+    """把图片缩小到最长边 max_edge 并另存，优先用 Pillow，未安装时用 ffmpeg。"""
+    try:
+        from PIL import Image
+    except ImportError:
+        _ffmpeg(["-i", str(src), "-vf", _scale_filter(max_edge), "-frames:v", "1", str(dst)])
+        return
+    with Image.open(src) as image:
+        image.thumbnail((max_edge, max_edge))
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(dst, format="WEBP" if image_format == "webp" else "JPEG", quality=80)
+
+
+def extract_frame(src, dst, max_edge, seek):
+    """用 ffmpeg 截取视频的一帧作为封面，视频比 seek 短时改取第一帧。"""
+    for position in dict.fromkeys([seek, 0]):
+        try:
+            _ffmpeg(["-ss", str(position), "-i", str(src), "-frames:v", "1", "-vf", _scale_filter(max_edge), str(dst)])
+        except subprocess.CalledProcessError:
+            continue
+        if Path(dst).exists() and Path(dst).stat().st_size > 0:
+            return
+    raise RuntimeError(f"无法从视频中截取画面: {src}")
+
+
+class ThumbnailCache(object):
+    """
+    素材的缩略图和视频封面帧缓存，存放在 videoFile/.thumbs 下，按素材文件名命名，
+    以内容摘要命名的素材重复上传时共用同一份缩略图。上传后由后台线程池生成，接口取用时未生成则现场补上。
+    """
+
+    def __init__(self, source_dir=None, cache_dir=None, workers=None):
+        self.source_dir = Path(source_dir or BASE_DIR / "videoFile")
+        self.cache_dir = Path(cache_dir or self.source_dir / ".thumbs")
+        self.workers = workers or THUMBNAIL_WORKERS
+        self._executor = None
+        self._pending = {}
+        self._failed = set()
+        self._lock = threading.Lock()
+
+    def path_for(self, file_path, kind="thumb"):
+        stem = Path(file_path).name
+        if kind == "poster":
+            return self.cache_dir / f"{stem}.poster.jpg"
+        return self.cache_dir / f"{stem}.{THUMBNAIL_SIZE}.{'webp' if THUMBNAIL_FORMAT == 'webp' else 'jpg'}"
+
+    def submit(self, file_path):
+        """在后台生成缩略图，返回 Future；已经在生成的素材返回同一个 Future。"""
+        file_path = Path(file_path).name
+        with self._lock:
+            future = self._pending.get(file_path)
+            if future is not None and not future.done():
+                return future
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="thumbnail")
+            future = self._pending[file_path] = self._executor.submit(self._generate, file_path)
+        # 任务可能已经结束，此时回调在当前线程立即执行，必须在释放锁之后注册
+        future.add_done_callback(lambda done: self._forget(file_path, done))
+        return future
+
+    def _forget(self, file_path, future):
+        with self._lock:
+            if self._pending.get(file_path) is future:
+                self._pending.pop(file_path)
+
+    def get(self, file_path, kind="thumb", wait=None):
+        """返回缩略图路径；还没生成时提交生成并最多等待 wait 秒，生成失败或不支持的类型返回 None。"""
+        if kind == "poster" and not is_video_file(file_path):
+            # 图片没有封面帧，用缩略图代替
+            kind = "thumb"
+        target = self.path_for(file_path, kind)
+        if target.exists():
+            return target
+        if Path(file_path).name in self._failed:
+            return None
+        future = self.submit(file_path)
+        try:
+            future.result(timeout=THUMBNAIL_WAIT if wait is None else wait)
+        except Exception:
+            return None
+        return target if target.exists() else None
+
+    def _generate(self, file_path):
+        src = self.source_dir / file_path
+        if not src.is_file():
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        thumb, poster = self.path_for(file_path, "thumb"), self.path_for(file_path, "poster")
+        try:
+            if is_video_file(file_path):
+                if not poster.exists():
+                    self._write(poster, lambda tmp: extract_frame(src, tmp, POSTER_SIZE, POSTER_SEEK))
+                if not thumb.exists():
+                    self._write(thumb, lambda tmp: render_image(poster, tmp, THUMBNAIL_SIZE, THUMBNAIL_FORMAT))
+            elif is_image_file(file_path):
+                if not thumb.exists():
+                    self._write(thumb, lambda tmp: render_image(src, tmp, THUMBNAIL_SIZE, THUMBNAIL_FORMAT))
+        except Exception as e:
+            # 记下失败的素材，避免每次请求都重新尝试
+            print(f"⚠️ 生成缩略图失败 {file_path}: {e}")
+            self._failed.add(file_path)
+            raise
+
+    @staticmethod
+    def _write(target, render):
+        # 先写临时文件再改名，并发请求不会读到写了一半的图片
+        tmp = target.with_name(f".{target.name}.{threading.get_ident()}{target.suffix}")
+        try:
+            render(tmp)
+            os.replace(tmp, target)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def discard(self, file_path):
+        """素材文件删除后清理对应的缩略图。"""
+        for kind in KINDS:
+            self.path_for(file_path, kind).unlink(missing_ok=True)
+        self._failed.discard(Path(file_path).name)
+
+
+thumbnail_cache = ThumbnailCache()
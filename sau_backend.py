@@ -1,17 +1,25 @@
+import argparse
 import asyncio
+import json
 import os
 import sqlite3
 import threading
-import time
 import uuid
 from pathlib import Path
+from urllib.parse import quote
 from queue import Queue
 from flask_cors import CORS
-from myUtils.auth import check_cookie
+from myUtils.auth import check_cookies
+from myUtils.chunked_upload import UploadNotFound, UploadOffsetMismatch, chunked_uploads
+from myUtils.listing import ListQueryError, ensure_list_schema, list_accounts, list_files
+from myUtils.media_serving import serve_file
+from myUtils.media_store import media_store
+from myUtils.thumbnails import KINDS, THUMBNAIL_CACHE_MAX_AGE, thumbnail_cache
 from flask import Flask, request, jsonify, Response, render_template, send_from_directory
 from conf import BASE_DIR
-from myUtils.login import get_tencent_cookie, douyin_cookie_gen, get_ks_cookie, xiaohongshu_cookie_gen
+from myUtils.login import login_sessions, sse_stream
 from myUtils.postVideo import post_video_tencent, post_video_DouYin, post_video_ks, post_video_xhs
+from myUtils.publish_jobs import JOB_STATES, publish_queue
 from myUtils.publish_payload import (
     normalize_content_type,
     normalize_original_declare,
@@ -19,6 +27,9 @@ from myUtils.publish_payload import (
     validate_douyin_publish_payload,
     validate_xiaohongshu_publish_payload,
 )
+from sau_worker import start_workers
+from utils.account_lease import account_leases
+from utils.circuit_breaker import PLATFORMS
 
 active_queues = {}
 app = Flask(__name__)
@@ -30,34 +41,40 @@ CORS(app)
 app.config['MAX_CONTENT_LENGTH'] = 160 * 1024 * 1024
 
 
-async def validate_all_accounts_and_sync_db():
-    """校验所有账号cookie并将状态同步到数据库，返回与/getValidAccounts相同结构的数据列表。"""
+async def validate_all_accounts_and_sync_db(on_result=None):
+    """
+    校验所有账号cookie并将状态同步到数据库，返回与/getValidAccounts相同结构的数据列表。
+    账号在有界协程池中并发校验，每完成一个回调一次 on_result(row)，最后在一个事务里批量写回状态。
+    """
     with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
         cursor = conn.cursor()
         cursor.execute('''
         SELECT * FROM user_info''')
         rows = cursor.fetchall()
-        rows_list = [list(row) for row in rows]
-
-        print("\n📋 当前数据表内容（校验前）：")
-        for row in rows:
-            print(row)
-
-        for row in rows_list:
-            flag = await check_cookie(row[1], row[2])
-            status = 1 if flag else 0
-            row[4] = status
-            cursor.execute(
-                '''
-                UPDATE user_info 
-                SET status = ? 
-                WHERE id = ?
-                ''',
-                (status, row[0]),
-            )
+    rows_list = [list(row) for row in rows]
+
+    print("\n📋 当前数据表内容（校验前）：")
+    for row in rows:
+        print(row)
+
+    async for index, flag in check_cookies([(row[1], row[2]) for row in rows_list]):
+        row = rows_list[index]
+        row[4] = 1 if flag else 0
+        if on_result:
+            on_result(row)
+
+    with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
+        conn.executemany(
+            '''
+            UPDATE user_info 
+            SET status = ? 
+            WHERE id = ?
+            ''',
+            [(row[4], row[0]) for row in rows_list],
+        )
         conn.commit()
-        print("✅ 账号状态校验完成并已同步数据库")
-        return rows_list
+    print("✅ 账号状态校验完成并已同步数据库")
+    return rows_list
 
 # 获取当前目录（假设 index.html 和 assets 在这里）
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -119,10 +136,40 @@ def get_file():
         return {"error": "Invalid filename"}, 400
 
     # 拼接完整路径
-    file_path = str(Path(BASE_DIR / "videoFile"))
+    base_path = Path(BASE_DIR / "videoFile").resolve()
+    file_path = (base_path / filename).resolve()
+    if not file_path.is_relative_to(base_path) or not file_path.is_file():
+        return {"error": "File not found"}, 404
+
+    # 按 Range / 条件请求头返回文件，拖动进度条只传输需要的片段，未变化的文件返回 304；
+    # 部署在 gunicorn 下时用 sendfile 零拷贝发送，它按 Content-Length 截止，任意范围都可以交给它
+    status, headers, body = serve_file(file_path, request.headers,
+                                       file_wrapper=request.environ.get('wsgi.file_wrapper'),
+                                       method=request.method,
+                                       wrapper_honors_length=request.environ.get(
+                                           'SERVER_SOFTWARE', '').startswith('gunicorn'))
+    return Response(body, status=status, headers=headers, direct_passthrough=True)
+
+
+@app.route('/getThumbnail', methods=['GET'])
+def get_thumbnail():
+    # 素材缩略图（kind=thumb）或视频封面帧（kind=poster），未生成时现场生成，最多等待 THUMBNAIL_WAIT 秒
+    filename = request.args.get('filename')
+    kind = request.args.get('kind', 'thumb')
+    if not filename or kind not in KINDS:
+        return {"error": "filename is required"}, 400
+    if '..' in filename or filename.startswith('/') or Path(filename).name != filename:
+        return {"error": "Invalid filename"}, 400
+    if not Path(BASE_DIR / "videoFile" / filename).is_file():
+        return {"error": "File not found"}, 404
 
-    # 返回文件
-    return send_from_directory(file_path,filename)
+    thumbnail = thumbnail_cache.get(filename, kind)
+    if thumbnail is None:
+        return {"error": "Thumbnail not available"}, 404
+    # 缩略图跟随素材文件名，素材内容不变，可以长期缓存
+    status, headers, body = serve_file(thumbnail, request.headers, method=request.method,
+                                       cache_control=f"public, max-age={THUMBNAIL_CACHE_MAX_AGE}, immutable")
+    return Response(body, status=status, headers=headers, direct_passthrough=True)
 
 
 @app.route('/uploadSave', methods=['POST'])
@@ -150,32 +197,21 @@ def upload_save():
         filename = file.filename
 
     try:
-        # 生成 UUID v1
-        uuid_v1 = uuid.uuid1()
-        print(f"UUID v1: {uuid_v1}")
-
-        # 构造文件名和路径
-        final_filename = f"{uuid_v1}_{filename}"
-        filepath = Path(BASE_DIR / "videoFile" / f"{uuid_v1}_{filename}")
-
-        # 保存文件
-        file.save(filepath)
-
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                                INSERT INTO file_records (filename, filesize, file_path)
-            VALUES (?, ?, ?)
-                                ''', (filename, round(float(os.path.getsize(filepath)) / (1024 * 1024),2), final_filename))
-            conn.commit()
-            print("✅ 上传文件已记录")
+        # 边写临时文件边计算摘要，素材库已有相同内容时只增加引用，不再保存副本
+        tmp_path, sha256, size = media_store.save_stream(file.stream)
+        record, deduplicated = media_store.add(filename, sha256, size, src_path=tmp_path)
+        print("✅ 上传文件已记录" + ("（内容已存在）" if deduplicated else ""))
+        # 后台生成缩略图和视频封面帧
+        thumbnail_cache.submit(record["filepath"])
 
         return jsonify({
             "code": 200,
             "msg": "File uploaded and saved successfully",
             "data": {
                 "filename": filename,
-                "filepath": final_filename
+                "filepath": record["filepath"],
+                "sha256": sha256,
+                "deduplicated": deduplicated
             }
         }), 200
 
@@ -187,38 +223,123 @@ def upload_save():
             "data": None
         }), 500
 
+@app.route('/upload/init', methods=['POST'])
+def upload_init():
+    # 分片上传第一步：创建会话，返回 uploadId 和建议的分片大小；save 为 true 时完成后写入素材库
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename')
+    custom_filename = data.get('customFilename')
+    if custom_filename and filename:
+        filename = custom_filename + "." + str(filename).split('.')[-1]
+    # 去重在 finalize 里按服务端算出的 sha256 进行，客户端声明的哈希不能直接引用已有内容
+    try:
+        session = chunked_uploads.init(filename, data.get('size'), record=bool(data.get('save')))
+    except (TypeError, ValueError) as e:
+        return jsonify({"code": 400, "msg": str(e), "data": None}), 400
+    return jsonify({"code": 200, "msg": None, "data": session}), 200
+
+
+@app.route('/upload/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    # 查询已接收的长度，断线后从 offset 处续传
+    try:
+        return jsonify({"code": 200, "msg": None, "data": chunked_uploads.status(upload_id)}), 200
+    except UploadNotFound:
+        return jsonify({"code": 404, "msg": "upload not found", "data": None}), 404
+
+
+@app.route('/upload/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    # 请求体为分片原始字节（application/octet-stream），offset 为分片在文件中的起始位置
+    offset = request.args.get('offset', request.headers.get('Upload-Offset'))
+    if offset is None or not str(offset).isdigit():
+        return jsonify({"code": 400, "msg": "offset is required", "data": None}), 400
+    try:
+        written = chunked_uploads.write_chunk(upload_id, int(offset), request.stream, request.content_length)
+    except UploadNotFound:
+        return jsonify({"code": 404, "msg": "upload not found", "data": None}), 404
+    except UploadOffsetMismatch as e:
+        return jsonify({"code": 409, "msg": str(e), "data": {"offset": e.expected}}), 409
+    except ValueError as e:
+        return jsonify({"code": 400, "msg": str(e), "data": None}), 400
+    return jsonify({"code": 200, "msg": None, "data": {"offset": written}}), 200
+
+
+@app.route('/upload/<upload_id>/finalize', methods=['POST'])
+def upload_finalize(upload_id):
+    # 所有分片写完后调用，可带 sha256 校验文件完整性
+    data = request.get_json(silent=True) or {}
+    try:
+        result = chunked_uploads.finalize(upload_id, data.get('sha256'))
+    except UploadNotFound:
+        return jsonify({"code": 404, "msg": "upload not found", "data": None}), 404
+    except UploadOffsetMismatch as e:
+        return jsonify({"code": 409, "msg": str(e), "data": {"offset": e.expected}}), 409
+    except ValueError as e:
+        return jsonify({"code": 400, "msg": str(e), "data": None}), 400
+
+    deduplicated = False
+    if result["record"]:
+        # 存入素材库：文件改名为内容摘要，已有相同内容时删除这次上传的副本
+        record, deduplicated = media_store.add(
+            result["filename"], result["sha256"], result["size"],
+            src_path=Path(BASE_DIR / "videoFile" / result["filepath"]))
+        result["filepath"] = record["filepath"]
+        print("✅ 上传文件已记录")
+        thumbnail_cache.submit(record["filepath"])
+
+    return jsonify({
+        "code": 200,
+        "msg": "File uploaded successfully",
+        "data": {
+            "filename": result["filename"],
+            "filepath": result["filepath"],
+            "sha256": result["sha256"],
+            "deduplicated": deduplicated
+        }
+    }), 200
+
+
+@app.route('/upload/<upload_id>', methods=['DELETE'])
+def upload_abort(upload_id):
+    try:
+        chunked_uploads.abort(upload_id)
+    except UploadNotFound:
+        return jsonify({"code": 404, "msg": "upload not found", "data": None}), 404
+    return jsonify({"code": 200, "msg": "upload aborted", "data": None}), 200
+
+
 @app.route('/getFiles', methods=['GET'])
 def get_all_files():
+    """
+    素材列表，支持 name / type / since / until 筛选和 sort / order 排序；
+    按 limit（默认 LIST_DEFAULT_LIMIT）分页返回，nextCursor 为下一页游标，没有下一页时为 null。
+    """
+    db_path = Path(BASE_DIR / "db" / "database.db")
     try:
         # 使用 with 自动管理数据库连接
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
+        with sqlite3.connect(db_path) as conn:
             conn.row_factory = sqlite3.Row  # 允许通过列名访问结果
-            cursor = conn.cursor()
-
-            # 查询所有记录
-            cursor.execute("SELECT * FROM file_records")
-            rows = cursor.fetchall()
+            ensure_list_schema(conn, db_path)
+            rows, next_cursor = list_files(conn, request.args)
 
-            # 将结果转为字典列表，并提取UUID
             data = []
             for row in rows:
                 row_dict = dict(row)
-                # 从 file_path 中提取 UUID (文件名的第一部分，下划线前)
+                row_dict['uuid'] = row_dict.get('uuid') or ''
+                # 列表页用缩略图展示，不需要加载原文件
                 if row_dict.get('file_path'):
-                    file_path_parts = row_dict['file_path'].split('_', 1)  # 只分割第一个下划线
-                    if len(file_path_parts) > 0:
-                        row_dict['uuid'] = file_path_parts[0]  # UUID 部分
-                    else:
-                        row_dict['uuid'] = ''
-                else:
-                    row_dict['uuid'] = ''
+                    row_dict['thumbnail'] = f"/getThumbnail?filename={quote(row_dict['file_path'])}"
                 data.append(row_dict)
 
             return jsonify({
                 "code": 200,
                 "msg": "success",
-                "data": data
+                "data": data,
+                "nextCursor": next_cursor
             }), 200
+    except ListQueryError as e:
+        return jsonify({"code": 400, "msg": str(e), "data": None}), 400
     except Exception as e:
         return jsonify({
             "code": 500,
@@ -229,26 +350,27 @@ def get_all_files():
 
 @app.route("/getAccounts", methods=['GET'])
 def getAccounts():
-    """快速获取所有账号信息，不进行cookie验证"""
+    """
+    快速获取账号信息，不进行cookie验证；支持 type / status / name 筛选和 sort / order 排序，
+    按 limit（默认 LIST_DEFAULT_LIMIT）分页返回，nextCursor 为下一页游标，没有下一页时为 null。
+    """
+    db_path = Path(BASE_DIR / "db" / "database.db")
     try:
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
+        with sqlite3.connect(db_path) as conn:
             conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute('''
-            SELECT * FROM user_info''')
-            rows = cursor.fetchall()
+            ensure_list_schema(conn, db_path)
+            rows, next_cursor = list_accounts(conn, request.args)
             rows_list = [list(row) for row in rows]
 
-            print("\n📋 当前数据表内容（快速获取）：")
-            for row in rows:
-                print(row)
-
             return jsonify(
                 {
                     "code": 200,
                     "msg": None,
-                    "data": rows_list
+                    "data": rows_list,
+                    "nextCursor": next_cursor
                 }), 200
+    except ListQueryError as e:
+        return jsonify({"code": 400, "msg": str(e), "data": None}), 400
     except Exception as e:
         print(f"获取账号列表时出错: {str(e)}")
         return jsonify({
@@ -260,6 +382,12 @@ def getAccounts():
 
 @app.route("/getValidAccounts",methods=['GET'])
 async def getValidAccounts():
+    # stream=1 时以 SSE 逐个推送校验结果，最后推送一条 done 事件
+    if request.args.get('stream') in ('1', 'true'):
+        response = Response(validate_accounts_stream(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
     try:
         rows_list = await validate_all_accounts_and_sync_db()
         return jsonify(
@@ -276,6 +404,27 @@ async def getValidAccounts():
             "data": None
         }), 500
 
+
+def validate_accounts_stream():
+    result_queue = Queue()
+
+    def run():
+        try:
+            rows_list = asyncio.run(validate_all_accounts_and_sync_db(on_result=result_queue.put))
+            result_queue.put({"done": True, "code": 200, "data": rows_list})
+        except Exception as e:
+            print(f"校验账号状态时出错: {str(e)}")
+            result_queue.put({"done": True, "code": 500, "msg": f"校验账号状态失败: {str(e)}"})
+
+    threading.Thread(target=run, daemon=True).start()
+    while True:
+        item = result_queue.get()
+        if isinstance(item, dict):
+            yield f"event: done\ndata: {json.dumps(item, ensure_ascii=False)}\n\n"
+            return
+        yield f"data: {json.dumps(item, ensure_ascii=False)}\n\n"
+
+
 @app.route('/deleteFile', methods=['GET'])
 def delete_file():
     file_id = request.args.get('id')
@@ -288,39 +437,16 @@ def delete_file():
         }), 400
 
     try:
-        # 获取数据库连接
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            # 查询要删除的记录
-            cursor.execute("SELECT * FROM file_records WHERE id = ?", (file_id,))
-            record = cursor.fetchone()
-
-            if not record:
-                return jsonify({
-                    "code": 404,
-                    "msg": "File not found",
-                    "data": None
-                }), 404
-
-            record = dict(record)
-
-            # 获取文件路径并删除实际文件
-            file_path = Path(BASE_DIR / "videoFile" / record['file_path'])
-            if file_path.exists():
-                try:
-                    file_path.unlink()  # 删除文件
-                    print(f"✅ 实际文件已删除: {file_path}")
-                except Exception as e:
-                    print(f"⚠️ 删除实际文件失败: {e}")
-                    # 即使删除文件失败，也要继续删除数据库记录，避免数据不一致
-            else:
-                print(f"⚠️ 实际文件不存在: {file_path}")
-
-            # 删除数据库记录
-            cursor.execute("DELETE FROM file_records WHERE id = ?", (file_id,))
-            conn.commit()
+        # 删除记录，内容文件没有其他素材引用时才删除
+        record = media_store.remove(int(file_id))
+        if not record:
+            return jsonify({
+                "code": 404,
+                "msg": "File not found",
+                "data": None
+            }), 404
+        if record.get("deleted_file"):
+            thumbnail_cache.discard(record["deleted_file"])
 
         return jsonify({
             "code": 200,
@@ -391,13 +517,19 @@ def login():
     status_queue = Queue()
     active_queues[id] = status_queue
 
+    # 登录在共享的登录事件循环里执行，和其他登录共用浏览器
+    session_id = login_sessions.start(type, id, status_queue)
+
+    def on_abort():
+        # 收到登录结果前客户端断开，结束还在等待扫码的登录；已出结果的会话自行收尾
+        login_sessions.cancel(session_id)
+
     def on_close():
         print(f"清理队列: {id}")
-        del active_queues[id]
-    # 启动异步任务线程
-    thread = threading.Thread(target=run_async_function, args=(type,id,status_queue), daemon=True)
-    thread.start()
-    response = Response(sse_stream(status_queue,), mimetype='text/event-stream')
+        # 同一账号名可能已经发起了新的登录，只清理自己的队列
+        if active_queues.get(id) is status_queue:
+            del active_queues[id]
+    response = Response(sse_stream(status_queue, on_close=on_close, on_abort=on_abort), mimetype='text/event-stream')
     response.headers['Cache-Control'] = 'no-cache'
     response.headers['X-Accel-Buffering'] = 'no'  # 关键：禁用 Nginx 缓冲
     response.headers['Content-Type'] = 'text/event-stream'
@@ -456,55 +588,129 @@ def postVideo():
             "data": None
         }), 400
 
+    # 按平台组装 post_video_* 的参数，落库排队后立即返回任务 id，由后台线程执行发布
+    match type:
+        case 1:
+            kwargs = dict(title=title, files=file_list, tags=tags, account_file=account_list, category=category,
+                          enableTimer=enableTimer, videos_per_day=videos_per_day, daily_times=daily_times,
+                          start_days=start_days, content_type=content_type, original_declare=original_declare,
+                          visibility=visibility, body=body)
+        case 2:
+            kwargs = dict(title=title, files=file_list, tags=tags, account_file=account_list, category=category,
+                          enableTimer=enableTimer, videos_per_day=videos_per_day, daily_times=daily_times,
+                          start_days=start_days, is_draft=is_draft)
+        case 3:
+            kwargs = dict(title=title, files=file_list, tags=tags, account_file=account_list, category=category,
+                          enableTimer=enableTimer, videos_per_day=videos_per_day, daily_times=daily_times,
+                          start_days=start_days, thumbnail_path=thumbnail_path, productLink=productLink,
+                          productTitle=productTitle, content_type=content_type, body=body, visibility=visibility,
+                          music_mode=music_mode, music_keyword=music_keyword)
+        case 4:
+            kwargs = dict(title=title, files=file_list, tags=tags, account_file=account_list, category=category,
+                          enableTimer=enableTimer, videos_per_day=videos_per_day, daily_times=daily_times,
+                          start_days=start_days)
+        case _:
+            return jsonify({
+                "code": 400,
+                "msg": f"不支持的平台类型: {type}",
+                "data": None
+            }), 400
+
     try:
-        match type:
-            case 1:
-                post_video_xhs(
-                    title,
-                    file_list,
-                    tags,
-                    account_list,
-                    category,
-                    enableTimer,
-                    videos_per_day,
-                    daily_times,
-                    start_days,
-                    content_type,
-                    original_declare,
-                    visibility,
-                    body,
-                )
-            case 2:
-                post_video_tencent(title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times,
-                                   start_days, is_draft)
-            case 3:
-                post_video_DouYin(title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times,
-                          start_days, thumbnail_path, productLink, productTitle, content_type, body, visibility,
-                          music_mode, music_keyword)
-            case 4:
-                post_video_ks(title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times,
-                          start_days)
-    except (ValueError, RuntimeError) as exc:
-        return jsonify({
-            "code": 400,
-            "msg": f"发布失败: {str(exc)}",
-            "data": None
-        }), 400
+        job_id = publish_queue.submit(type, kwargs)
     except Exception as exc:
         return jsonify({
             "code": 500,
-            "msg": f"发布失败: {str(exc)}",
+            "msg": f"发布任务提交失败: {str(exc)}",
             "data": None
         }), 500
-    # 返回响应给客户端
+    # 返回任务 id，发布进度通过 /jobs/<id> 查询
     return jsonify(
         {
             "code": 200,
             "msg": None,
-            "data": None
+            "data": {"jobId": job_id}
         }), 200
 
 
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    state = request.args.get('state')
+    if state and state not in JOB_STATES:
+        return jsonify({
+            "code": 400,
+            "msg": f"未知的任务状态: {state}",
+            "data": None
+        }), 400
+    limit = request.args.get('limit', 50, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    return jsonify({
+        "code": 200,
+        "msg": None,
+        "data": publish_queue.list(state, limit, offset)
+    }), 200
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = publish_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            "code": 404,
+            "msg": "任务不存在",
+            "data": None
+        }), 404
+    return jsonify({
+        "code": 200,
+        "msg": None,
+        "data": job
+    }), 200
+
+
+@app.route('/getAccountLeaseStats', methods=['GET'])
+def get_account_lease_stats():
+    # 各账号租约的获取次数和等待时长，用于观察同账号任务的排队情况
+    return jsonify({
+        "code": 200,
+        "msg": None,
+        "data": account_leases.stats()
+    }), 200
+
+
+@app.route('/circuitBreakers', methods=['GET'])
+def get_circuit_breakers():
+    # 各平台熔断器状态：closed 正常，open 熔断中（任务留在队列），half_open 等待探测任务结果
+    # 状态存放在任务库里，和所有 worker 进程共用
+    return jsonify({
+        "code": 200,
+        "msg": None,
+        "data": publish_queue.circuit_breakers.snapshot()
+    }), 200
+
+
+@app.route('/circuitBreakers/<platform>/reset', methods=['POST'])
+def reset_circuit_breaker(platform):
+    # 确认平台已恢复时手动解除熔断
+    if platform not in PLATFORMS:
+        return jsonify({"code": 400, "msg": f"不支持的平台: {platform}", "data": None}), 400
+    publish_queue.circuit_breakers.get(platform).reset()
+    return jsonify({
+        "code": 200,
+        "msg": "熔断已解除",
+        "data": publish_queue.circuit_breakers.get(platform).snapshot()
+    }), 200
+
+
+@app.route('/rateLimits', methods=['GET'])
+def get_rate_limits():
+    # 各平台、账号的发布令牌余量和还需等待的秒数（只包含已发布过的平台和账号），所有 worker 共用
+    return jsonify({
+        "code": 200,
+        "msg": None,
+        "data": publish_queue.rate_limiter.snapshot()
+    }), 200
+
+
 @app.route('/updateUserinfo', methods=['POST'])
 def updateUserinfo():
     # 获取JSON数据
@@ -709,41 +915,6 @@ def download_cookie():
         }), 500
 
 
-# 包装函数：在线程中运行异步函数
-def run_async_function(type,id,status_queue):
-    match type:
-        case '1':
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(xiaohongshu_cookie_gen(id, status_queue))
-            loop.close()
-        case '2':
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(get_tencent_cookie(id,status_queue))
-            loop.close()
-        case '3':
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(douyin_cookie_gen(id,status_queue))
-            loop.close()
-        case '4':
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(get_ks_cookie(id,status_queue))
-            loop.close()
-
-# SSE 流生成器函数
-def sse_stream(status_queue):
-    while True:
-        if not status_queue.empty():
-            msg = status_queue.get()
-            yield f"data: {msg}\n\n"
-        else:
-            # 避免 CPU 占满
-            time.sleep(0.1)
-
-
 def startup_account_status_refresh():
     """服务启动后后台自动校验一次账号状态。"""
     try:
@@ -753,5 +924,17 @@ def startup_account_status_refresh():
         print(f"⚠️ 启动时账号状态校验失败: {str(e)}")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="social-auto-upload backend")
+    parser.add_argument("-w", "--workers", type=int, default=0,
+                        help="Run publish jobs in N worker processes instead of in-process threads")
+    args = parser.parse_args()
+
     threading.Thread(target=startup_account_status_refresh, daemon=True).start()
+    if args.workers > 0:
+        # 多进程模式：本进程只接收请求，发布任务由独立的 worker 进程执行
+        publish_queue.start(workers=0)
+        start_workers(args.workers)
+    else:
+        # 启动发布任务线程，上次未完成的任务租约到期后会继续执行
+        publish_queue.start()
     app.run(host='0.0.0.0' ,port=5409)
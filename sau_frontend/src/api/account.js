@@ -7,9 +7,9 @@ export const accountApi = {
     return http.get('/getValidAccounts')
   },
 
-  // 获取账号列表（不带验证，快速加载）
-  getAccounts() {
-    return http.get('/getAccounts')
+  // 获取一页账号列表（不带验证，快速加载），传入上一页的 nextCursor 取下一页
+  getAccounts(cursor) {
+    return http.get('/getAccounts', { order: 'asc', ...(cursor ? { cursor } : {}) })
   },
 
   // 添加账号
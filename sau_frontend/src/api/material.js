@@ -2,9 +2,9 @@ import { http } from '@/utils/request'
 
 // 素材管理API
 export const materialApi = {
-  // 获取所有素材
-  getAllMaterials: () => {
-    return http.get('/getFiles')
+  // 获取一页素材，传入上一页的 nextCursor 取下一页
+  getMaterials: (cursor) => {
+    return http.get('/getFiles', { order: 'asc', ...(cursor ? { cursor } : {}) })
   },
   
   // 上传素材
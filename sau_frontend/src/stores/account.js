@@ -2,8 +2,10 @@ import { defineStore } from 'pinia'
 import { ref } from 'vue'
 
 export const useAccountStore = defineStore('account', () => {
-  // 存储所有账号信息
+  // 存储已加载的账号信息
   const accounts = ref([])
+  // 下一页账号的游标，为 null 表示已全部加载
+  const nextCursor = ref(null)
   
   // 平台类型映射
   const platformTypes = {
@@ -13,20 +15,29 @@ export const useAccountStore = defineStore('account', () => {
     4: '快手'
   }
   
-  // 设置账号列表
-  const setAccounts = (accountsData) => {
-    // 转换后端返回的数据格式为前端使用的格式
-    accounts.value = accountsData.map(item => {
-      return {
-        id: item[0],
-        type: item[1],
-        filePath: item[2],
-        name: item[3],
-        status: item[4] === 1 ? '正常' : '异常',
-        platform: platformTypes[item[1]] || '未知',
-        avatar: '/vite.svg' // 默认使用vite.svg作为头像
-      }
-    })
+  // 转换后端返回的数据格式为前端使用的格式
+  const toAccount = (item) => {
+    return {
+      id: item[0],
+      type: item[1],
+      filePath: item[2],
+      name: item[3],
+      status: item[4] === 1 ? '正常' : '异常',
+      platform: platformTypes[item[1]] || '未知',
+      avatar: '/vite.svg' // 默认使用vite.svg作为头像
+    }
+  }
+
+  // 设置账号列表，cursor 为下一页游标
+  const setAccounts = (accountsData, cursor = null) => {
+    accounts.value = accountsData.map(toAccount)
+    nextCursor.value = cursor
+  }
+
+  // 追加下一页账号
+  const appendAccounts = (accountsData, cursor = null) => {
+    accounts.value = [...accounts.value, ...accountsData.map(toAccount)]
+    nextCursor.value = cursor
   }
   
   // 添加账号
@@ -54,7 +65,9 @@ export const useAccountStore = defineStore('account', () => {
   
   return {
     accounts,
+    nextCursor,
     setAccounts,
+    appendAccounts,
     addAccount,
     updateAccount,
     deleteAccount,
@@ -11,8 +11,10 @@ export const useAppStore = defineStore('app', () => {
   // 账号管理页面刷新状态
   const isAccountRefreshing = ref(false)
 
-  // 素材列表数据
+  // 素材列表数据（已加载的页）
   const materials = ref([])
+  // 下一页素材的游标，为 null 表示已全部加载
+  const materialsCursor = ref(null)
   
   // 设置账号管理页面已访问
   const setAccountManagementVisited = () => {
@@ -30,9 +32,16 @@ export const useAppStore = defineStore('app', () => {
     isFirstTimeMaterialManagement.value = true
   }
 
-  // 更新素材列表
-  const setMaterials = (materialList) => {
+  // 更新素材列表，cursor 为下一页游标
+  const setMaterials = (materialList, cursor = null) => {
     materials.value = materialList
+    materialsCursor.value = cursor
+  }
+
+  // 追加下一页素材
+  const appendMaterials = (materialList, cursor = null) => {
+    materials.value = [...materials.value, ...materialList]
+    materialsCursor.value = cursor
   }
 
   // 添加新素材
@@ -58,10 +67,12 @@ export const useAppStore = defineStore('app', () => {
     isFirstTimeMaterialManagement,
     isAccountRefreshing,
     materials,
+    materialsCursor,
     setAccountManagementVisited,
     setMaterialManagementVisited,
     resetVisitStatus,
     setMaterials,
+    appendMaterials,
     addMaterial,
     removeMaterial,
     setAccountRefreshing
@@ -0,0 +1,45 @@
+import argparse
+import multiprocessing
+
+from myUtils.publish_jobs import PUBLISH_WORKERS, PublishJobQueue
+
+
+def worker_main(index):
+    # 每个 worker 进程有一个常驻事件循环和浏览器池，从共享的 publish_jobs 表认领任务，浏览器在任务之间复用
+    print(f"发布 worker 进程 {index} 已启动")
+    job_queue = PublishJobQueue()
+    try:
+        job_queue.run_worker()
+    finally:
+        job_queue.browser_loop.stop()
+
+
+def start_workers(count):
+    """启动 count 个发布 worker 进程并返回进程列表。"""
+    processes = [
+        multiprocessing.Process(target=worker_main, args=(index,), name=f"sau-worker-{index}", daemon=True)
+        for index in range(count)
+    ]
+    for process in processes:
+        process.start()
+    return processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run publish job workers.")
+    parser.add_argument("-w", "--workers", type=int, default=PUBLISH_WORKERS, help="Number of worker processes")
+    args = parser.parse_args()
+
+    # 建表/补列；上次中断的任务租约到期后会被自动接手
+    PublishJobQueue().ensure_table()
+    processes = start_workers(args.workers)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+import sys
+import types
+
+
+# Test environment may not have httpx installed.
+if "httpx" not in sys.modules:
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        httpx_mod = types.ModuleType("httpx")
+
+        class _AsyncClient:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            async def aclose(self):
+                return None
+
+        httpx_mod.AsyncClient = _AsyncClient
+        httpx_mod.HTTPError = Exception
+        sys.modules["httpx"] = httpx_mod
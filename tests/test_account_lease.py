@@ -0,0 +1,147 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from utils.account_lease import (
+    AccountLeaseManager,
+    merge_storage_state,
+    merge_storage_state_file,
+    save_storage_state,
+    write_json_atomic,
+)
+
+
+class FakeContext:
+    def __init__(self, state):
+        self.state = state
+
+    async def storage_state(self, path=None):
+        return self.state
+
+
+class AccountLeaseTests(unittest.IsolatedAsyncioTestCase):
+    async def test_same_account_is_serialized_and_wait_is_recorded(self):
+        leases = AccountLeaseManager(poll_interval=0.005)
+        events = []
+
+        async def job(name, account):
+            async with leases.lease(account):
+                events.append(("start", name))
+                await asyncio.sleep(0.02)
+                events.append(("end", name))
+
+        await asyncio.gather(job("a1", "a.json"), job("a2", "a.json"))
+
+        self.assertEqual([event for event, _ in events], ["start", "end", "start", "end"])
+        stats = leases.stats()[os.path.abspath("a.json")]
+        self.assertEqual(stats["leases"], 2)
+        self.assertEqual(stats["waited"], 1)
+        self.assertGreater(stats["max_wait_seconds"], 0)
+
+    async def test_different_accounts_run_in_parallel(self):
+        leases = AccountLeaseManager(poll_interval=0.005)
+        running = 0
+        peak = 0
+
+        async def job(account):
+            nonlocal running, peak
+            async with leases.lease(account):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.02)
+                running -= 1
+
+        await asyncio.gather(job("a.json"), job("b.json"))
+
+        self.assertEqual(peak, 2)
+
+    async def test_lease_is_honoured_across_event_loops(self):
+        leases = AccountLeaseManager(poll_interval=0.005)
+        acquired = threading.Event()
+        release = threading.Event()
+
+        async def hold():
+            async with leases.lease("a.json"):
+                acquired.set()
+                while not release.is_set():
+                    await asyncio.sleep(0.005)
+
+        thread = threading.Thread(target=lambda: asyncio.run(hold()))
+        thread.start()
+        acquired.wait(1)
+        self.assertTrue(leases.is_leased("a.json"))
+
+        started = time.monotonic()
+        asyncio.get_running_loop().call_later(0.03, release.set)
+        async with leases.lease("a.json"):
+            self.assertGreaterEqual(time.monotonic() - started, 0.02)
+        thread.join(1)
+
+
+class StorageStateTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.account_file = Path(self.tmpdir.name) / "account.json"
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_merge_prefers_new_cookies_and_keeps_unexpired_old_ones(self):
+        now = time.time()
+        old = {"cookies": [
+            {"name": "sid", "domain": ".a.com", "path": "/", "value": "old", "expires": -1},
+            {"name": "keep", "domain": ".a.com", "path": "/", "value": "1", "expires": now + 60},
+            {"name": "stale", "domain": ".a.com", "path": "/", "value": "1", "expires": now - 60},
+        ], "origins": [{"origin": "https://a.com", "localStorage": [{"name": "k", "value": "old"}]}]}
+        new = {"cookies": [
+            {"name": "sid", "domain": ".a.com", "path": "/", "value": "new", "expires": -1},
+        ], "origins": [{"origin": "https://a.com", "localStorage": [{"name": "k", "value": "new"}]}]}
+
+        merged = merge_storage_state(old, new, now=now)
+
+        self.assertEqual({c["name"]: c["value"] for c in merged["cookies"]}, {"sid": "new", "keep": "1"})
+        self.assertEqual(merged["origins"], new["origins"])
+
+    def test_write_json_atomic_leaves_no_temp_files(self):
+        write_json_atomic(self.account_file, {"cookies": []})
+
+        self.assertEqual(json.loads(self.account_file.read_text(encoding="utf-8")), {"cookies": []})
+        self.assertEqual(os.listdir(self.tmpdir.name), ["account.json"])
+
+    async def test_save_storage_state_merges_into_existing_file(self):
+        self.account_file.write_text(json.dumps({"cookies": [
+            {"name": "a", "domain": ".x.com", "path": "/", "value": "1", "expires": -1},
+        ], "origins": []}), encoding="utf-8")
+
+        await save_storage_state(FakeContext({"cookies": [
+            {"name": "b", "domain": ".x.com", "path": "/", "value": "2", "expires": -1},
+        ], "origins": []}), self.account_file)
+
+        saved = json.loads(self.account_file.read_text(encoding="utf-8"))
+        self.assertEqual(sorted(c["name"] for c in saved["cookies"]), ["a", "b"])
+
+    def test_concurrent_writers_do_not_lose_cookies(self):
+        write_json_atomic(self.account_file, {"cookies": [], "origins": []})
+
+        def write(name):
+            merge_storage_state_file(self.account_file, {"cookies": [
+                {"name": name, "domain": ".x.com", "path": "/", "value": "1", "expires": -1},
+            ], "origins": []})
+
+        threads = [threading.Thread(target=write, args=(f"c{i}",)) for i in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        saved = json.loads(self.account_file.read_text(encoding="utf-8"))
+        self.assertEqual(len(saved["cookies"]), 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import patch
+
+
+# Test environment may not have playwright installed.
+if "playwright" not in sys.modules:
+    sys.modules["playwright"] = types.ModuleType("playwright")
+if "playwright.async_api" not in sys.modules:
+    async_api = types.ModuleType("playwright.async_api")
+    async_api.Playwright = object
+    async_api.Page = object
+
+    async def _async_playwright_stub():
+        raise RuntimeError("playwright is not available in test environment")
+
+    async_api.async_playwright = _async_playwright_stub
+    sys.modules["playwright.async_api"] = async_api
+
+from utils import browser_pool
+from utils.base_social_media import load_stealth_script, set_init_script
+from utils.browser_pool import BrowserPool
+
+
+class FakeContext:
+    def __init__(self, options):
+        self.options = options
+        self.closed = False
+        self.init_scripts = []
+
+    async def add_init_script(self, script=None, path=None):
+        self.init_scripts.append(script)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        context = FakeContext(options)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+        self.connected = False
+
+
+class FakeBrowserType:
+    def __init__(self):
+        self.launches = []
+
+    async def launch(self, **options):
+        browser = FakeBrowser()
+        self.launches.append((options, browser))
+        return browser
+
+
+class BrowserPoolTests(unittest.IsolatedAsyncioTestCase):
+    async def test_sequential_jobs_reuse_one_browser(self):
+        pool = BrowserPool(size=2, max_contexts=4)
+        browser_type = FakeBrowserType()
+
+        for _ in range(5):
+            async with pool.new_context(browser_type, {"headless": True}, storage_state="a.json") as context:
+                self.assertEqual(context.options, {"storage_state": "a.json"})
+
+        self.assertEqual(len(browser_type.launches), 1)
+        self.assertTrue(all(context.closed for context in browser_type.launches[0][1].contexts))
+
+    async def test_none_launch_options_are_dropped(self):
+        pool = BrowserPool(size=1, max_contexts=1)
+        browser_type = FakeBrowserType()
+
+        async with pool.new_context(browser_type, {"headless": True, "executable_path": None}):
+            pass
+
+        self.assertEqual(browser_type.launches[0][0], {"headless": True})
+
+    async def test_different_launch_options_use_different_browsers(self):
+        pool = BrowserPool(size=1, max_contexts=4)
+        browser_type = FakeBrowserType()
+
+        async with pool.new_context(browser_type, {"headless": True}):
+            async with pool.new_context(browser_type, {"headless": False}):
+                pass
+
+        self.assertEqual(len(browser_type.launches), 2)
+
+    async def test_browser_recycled_after_max_jobs(self):
+        pool = BrowserPool(size=1, max_contexts=4)
+        browser_type = FakeBrowserType()
+        original_max_jobs = browser_pool.BROWSER_POOL_MAX_JOBS
+        browser_pool.BROWSER_POOL_MAX_JOBS = 2
+        try:
+            for _ in range(3):
+                async with pool.new_context(browser_type, {}):
+                    pass
+        finally:
+            browser_pool.BROWSER_POOL_MAX_JOBS = original_max_jobs
+
+        self.assertEqual(len(browser_type.launches), 2)
+        self.assertTrue(browser_type.launches[0][1].closed)
+
+    async def test_disconnected_browser_is_replaced(self):
+        pool = BrowserPool(size=1, max_contexts=4)
+        browser_type = FakeBrowserType()
+
+        async with pool.new_context(browser_type, {}):
+            pass
+        browser_type.launches[0][1].connected = False
+        async with pool.new_context(browser_type, {}):
+            pass
+
+        self.assertEqual(len(browser_type.launches), 2)
+
+    async def test_context_limit_waits_for_release(self):
+        pool = BrowserPool(size=1, max_contexts=1)
+        browser_type = FakeBrowserType()
+
+        first = await pool.acquire_context(browser_type, {})
+        pending = browser_pool.asyncio.ensure_future(pool.acquire_context(browser_type, {}))
+        await browser_pool.asyncio.sleep(0)
+        self.assertFalse(pending.done())
+
+        await pool.release_context(first)
+        second = await pending
+        await pool.release_context(second)
+
+        self.assertEqual(len(browser_type.launches), 1)
+        self.assertTrue(first.closed)
+        self.assertTrue(second.closed)
+
+    async def test_cancel_during_close_still_returns_the_slot(self):
+        pool = BrowserPool(size=1, max_contexts=1, stealth=False)
+        browser_type = FakeBrowserType()
+        closing = browser_pool.asyncio.Event()
+
+        async def slow_close():
+            closing.set()
+            await browser_pool.asyncio.sleep(10)
+
+        async def job():
+            async with pool.new_context(browser_type, {}) as context:
+                context.close = slow_close
+
+        task = browser_pool.asyncio.ensure_future(job())
+        await closing.wait()
+        task.cancel()
+        with self.assertRaises(browser_pool.asyncio.CancelledError):
+            await task
+
+        self.assertEqual(pool.stats(), [{"active": 0, "jobs": 1, "healthy": True}])
+
+    async def test_contexts_get_stealth_script_once(self):
+        pool = BrowserPool(size=1, max_contexts=2)
+        browser_type = FakeBrowserType()
+
+        async with pool.new_context(browser_type, {}) as context:
+            await set_init_script(context)
+            self.assertEqual(len(context.init_scripts), 1)
+            self.assertIn("navigator", context.init_scripts[0])
+        async with pool.new_context(browser_type, {}, init_script=False) as context:
+            self.assertEqual(context.init_scripts, [])
+
+
+class StealthScriptTests(unittest.TestCase):
+    def test_script_cached_and_reloaded_on_change(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "stealth.js")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("a")
+            self.assertEqual(load_stealth_script(path), "a")
+            with patch("builtins.open", side_effect=AssertionError("re-read")):
+                self.assertEqual(load_stealth_script(path), "a")
+
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("bb")
+            os.utime(path, ns=(0, 10 ** 9))
+            self.assertEqual(load_stealth_script(path), "bb")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import asyncio
+import sys
+import types
+import unittest
+from unittest.mock import patch
+
+
+# Test environment may not have loguru installed.
+if "loguru" not in sys.modules:
+    loguru_mod = types.ModuleType("loguru")
+
+    class _DummyLogger:
+        def add(self, *args, **kwargs):
+            return 1
+
+        def remove(self, *args, **kwargs):
+            return None
+
+        def bind(self, **kwargs):
+            return self
+
+        def __getattr__(self, _name):
+            def _noop(*args, **kwargs):
+                return None
+
+            return _noop
+
+    loguru_mod.logger = _DummyLogger()
+    sys.modules["loguru"] = loguru_mod
+
+# Test environment may not have playwright / xhs / requests installed.
+if "playwright" not in sys.modules:
+    sys.modules["playwright"] = types.ModuleType("playwright")
+if "playwright.async_api" not in sys.modules:
+    async_api = types.ModuleType("playwright.async_api")
+    async_api.Playwright = object
+    async_api.Page = object
+
+    async def _async_playwright_stub():
+        raise RuntimeError("playwright is not available in test environment")
+
+    async_api.async_playwright = _async_playwright_stub
+    sys.modules["playwright.async_api"] = async_api
+if "playwright.sync_api" not in sys.modules:
+    sync_api = types.ModuleType("playwright.sync_api")
+    sync_api.sync_playwright = None
+    sys.modules["playwright.sync_api"] = sync_api
+if "xhs" not in sys.modules:
+    xhs_mod = types.ModuleType("xhs")
+    xhs_mod.XhsClient = object
+    sys.modules["xhs"] = xhs_mod
+if "requests" not in sys.modules:
+    sys.modules["requests"] = types.ModuleType("requests")
+
+from myUtils import auth
+
+
+class CheckCookiesTests(unittest.IsolatedAsyncioTestCase):
+    async def test_check_cookies_runs_concurrently_within_limit(self):
+        running = 0
+        peak = 0
+
+        async def fake_check_cookie(type, file_path):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return file_path.startswith("ok")
+
+        accounts = [(3, "ok_1.json"), (1, "bad_2.json"), (3, "ok_3.json"), (1, "ok_4.json"), (2, "bad_5.json")]
+        with patch.object(auth, "check_cookie", side_effect=fake_check_cookie):
+            results = dict([item async for item in auth.check_cookies(accounts, concurrency=2)])
+
+        self.assertEqual(results, {0: True, 1: False, 2: True, 3: True, 4: False})
+        self.assertEqual(peak, 2)
+
+    async def test_check_cookies_groups_accounts_by_platform(self):
+        started = []
+
+        async def fake_check_cookie(type, file_path):
+            started.append(type)
+            return True
+
+        accounts = [(3, "a.json"), (1, "b.json"), (3, "c.json"), (1, "d.json")]
+        with patch.object(auth, "check_cookie", side_effect=fake_check_cookie):
+            _ = [item async for item in auth.check_cookies(accounts, concurrency=1)]
+
+        self.assertEqual(started, [1, 1, 3, 3])
+
+    async def test_check_cookies_treats_errors_as_invalid(self):
+        async def fake_check_cookie(type, file_path):
+            raise RuntimeError("page crashed")
+
+        with patch.object(auth, "check_cookie", side_effect=fake_check_cookie):
+            results = [item async for item in auth.check_cookies([(1, "a.json")], concurrency=4)]
+
+        self.assertEqual(results, [(0, False)])
+
+    async def test_check_cookie_reuses_login_context(self):
+        context = object()
+        checked = []
+
+        async def fake_check(ctx):
+            checked.append(ctx)
+            return True
+
+        async def no_probe(type, account_file):
+            return None
+
+        def no_browser(*args, **kwargs):
+            raise AssertionError("不应另开浏览器")
+
+        with patch.object(auth, "probe_cookie", side_effect=no_probe), \
+                patch.object(auth, "pooled_context", side_effect=no_browser), \
+                patch.dict(auth.CONTEXT_CHECKS, {3: fake_check}), \
+                patch.object(auth.cookie_cache, "get", return_value=None), \
+                patch.object(auth.cookie_cache, "record") as record:
+            self.assertTrue(await auth.check_cookie(3, "new.json", context=context))
+
+        self.assertEqual(checked, [context])
+        record.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import hashlib
+import io
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from myUtils.chunked_upload import ChunkedUploads, UploadNotFound, UploadOffsetMismatch
+
+
+class ChunkedUploadTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.uploads = ChunkedUploads(target_dir=self.tmpdir.name)
+        self.data = os.urandom(300 * 1024)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_chunks_are_appended_hashed_and_moved_in_place(self):
+        session = self.uploads.init("../clip.mp4", len(self.data), record=True)
+        upload_id = session["uploadId"]
+        self.assertEqual((session["filename"], session["offset"]), ("clip.mp4", 0))
+
+        offset = 0
+        for start in range(0, len(self.data), 100 * 1024):
+            chunk = self.data[start:start + 100 * 1024]
+            offset = self.uploads.write_chunk(upload_id, offset, io.BytesIO(chunk), len(chunk))
+        self.assertEqual(offset, len(self.data))
+
+        result = self.uploads.finalize(upload_id, hashlib.sha256(self.data).hexdigest())
+        target = Path(self.tmpdir.name) / result["filepath"]
+        self.assertEqual(target.read_bytes(), self.data)
+        self.assertTrue(result["filepath"].endswith("_clip.mp4"))
+        self.assertTrue(result["record"])
+        self.assertEqual(list((Path(self.tmpdir.name) / ".uploads").iterdir()), [])
+        with self.assertRaises(UploadNotFound):
+            self.uploads.status(upload_id)
+
+    def test_resume_after_interrupted_chunk_and_restart(self):
+        upload_id = self.uploads.init("a.mp4", len(self.data))["uploadId"]
+        # 连接中断：请求声明 200KB 但只收到 50KB
+        self.uploads.write_chunk(upload_id, 0, io.BytesIO(self.data[:50 * 1024]), 200 * 1024)
+        with self.assertRaises(UploadOffsetMismatch) as ctx:
+            self.uploads.write_chunk(upload_id, 200 * 1024, io.BytesIO(b"x"), 1)
+        self.assertEqual(ctx.exception.expected, 50 * 1024)
+
+        # 服务重启后内存里的摘要丢失，续传的数据仍能正确完成
+        restarted = ChunkedUploads(target_dir=self.tmpdir.name)
+        offset = restarted.status(upload_id)["offset"]
+        restarted.write_chunk(upload_id, offset, io.BytesIO(self.data[offset:]), len(self.data) - offset)
+        result = restarted.finalize(upload_id)
+        self.assertEqual(result["sha256"], hashlib.sha256(self.data).hexdigest())
+
+    def test_rejects_incomplete_oversized_and_mismatched_uploads(self):
+        upload_id = self.uploads.init("a.mp4", 10)["uploadId"]
+        with self.assertRaises(ValueError):
+            self.uploads.write_chunk(upload_id, 0, io.BytesIO(b"x" * 11), 11)
+        with self.assertRaises(UploadOffsetMismatch):
+            self.uploads.finalize(upload_id)
+        self.uploads.write_chunk(upload_id, 0, io.BytesIO(b"x" * 10), 10)
+        with self.assertRaises(ValueError):
+            self.uploads.finalize(upload_id, "0" * 64)
+        # 摘要不一致时保留会话
+        self.assertEqual(self.uploads.status(upload_id)["offset"], 10)
+        self.uploads.abort(upload_id)
+        with self.assertRaises(UploadNotFound):
+            self.uploads.status(upload_id)
+        with self.assertRaises(UploadNotFound):
+            self.uploads.status("../../etc/passwd")
+
+    def test_cleanup_removes_stale_sessions(self):
+        upload_id = self.uploads.init("a.mp4", 10)["uploadId"]
+        self.uploads.cleanup(now=time.time() + self.uploads.ttl + 1)
+        with self.assertRaises(UploadNotFound):
+            self.uploads.status(upload_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,203 @@
+import asyncio
+import sys
+import tempfile
+import time
+import types
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+if "loguru" not in sys.modules:
+    loguru_mod = types.ModuleType("loguru")
+
+    class _DummyLogger:
+        def add(self, *args, **kwargs):
+            return 1
+
+        def remove(self, *args, **kwargs):
+            return None
+
+        def bind(self, **kwargs):
+            return self
+
+        def __getattr__(self, _name):
+            def _noop(*args, **kwargs):
+                return None
+
+            return _noop
+
+    loguru_mod.logger = _DummyLogger()
+    sys.modules["loguru"] = loguru_mod
+
+if "playwright" not in sys.modules:
+    sys.modules["playwright"] = types.ModuleType("playwright")
+if "playwright.async_api" not in sys.modules:
+    async_api = types.ModuleType("playwright.async_api")
+    async_api.Playwright = object
+    async_api.Page = object
+
+    async def _async_playwright_stub():
+        raise RuntimeError("playwright is not available in test environment")
+
+    async_api.async_playwright = _async_playwright_stub
+    sys.modules["playwright.async_api"] = async_api
+
+from myUtils import postVideo, publish_jobs
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError
+from utils.network import LoginExpiredError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def test_trips_after_consecutive_failures_and_probes_once(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker("douyin", failure_threshold=2, cooldown=60, clock=clock)
+        breaker.record_failure(TimeoutError("t"))
+        breaker.record_success()
+        breaker.record_failure(TimeoutError("t"))
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.record_failure(TimeoutError("t"))
+        self.assertTrue(breaker.is_open())
+        self.assertFalse(breaker.try_acquire("w1"))
+        self.assertEqual(breaker.retry_after(), 60)
+
+        clock.now += 60
+        self.assertTrue(breaker.try_acquire("w1"))
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertFalse(breaker.try_acquire("w2"))
+
+        # 探测失败立即重新熔断
+        breaker.record_failure(TimeoutError("t"))
+        self.assertEqual((breaker.state, breaker.trips), (OPEN, 2))
+
+        clock.now += 60
+        self.assertTrue(breaker.try_acquire("w2"))
+        breaker.record_success()
+        self.assertEqual(breaker.snapshot()["state"], CLOSED)
+        self.assertTrue(breaker.try_acquire("w1"))
+
+    def test_released_probe_can_be_taken_by_another_worker(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker("xiaohongshu", failure_threshold=1, cooldown=0, clock=clock)
+        breaker.record_failure()
+        self.assertTrue(breaker.try_acquire("w1"))
+        breaker.release("w2")
+        self.assertFalse(breaker.try_acquire("w2"))
+        breaker.release("w1")
+        self.assertTrue(breaker.try_acquire("w2"))
+
+
+class CircuitBreakerQueueTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmpdir.name) / "database.db"
+        self.registry = CircuitBreakerRegistry(self.db_path, failure_threshold=2, cooldown=600)
+        self.job_queue = publish_jobs.PublishJobQueue(self.db_path, workers=0, circuit_breakers=self.registry)
+        self.patches = [patch.object(postVideo, "circuit_breakers", CircuitBreakerRegistry(failure_threshold=2))]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.tmpdir.cleanup()
+
+    def test_open_platform_jobs_stay_queued(self):
+        calls = []
+        self.registry.get("douyin").record_failure()
+        self.registry.get("douyin").record_failure()
+
+        with patch.dict(publish_jobs.PUBLISHERS, {3: lambda **kw: calls.append(3), 4: lambda **kw: calls.append(4)}):
+            douyin_job = self.job_queue.submit(3, {})
+            ks_job = self.job_queue.submit(4, {})
+            self.job_queue.run_pending()
+
+        self.assertEqual(calls, [4])
+        self.assertEqual(self.job_queue.get(douyin_job)["state"], "queued")
+        self.assertEqual(self.job_queue.get(ks_job)["state"], "succeeded")
+
+    def test_tripping_mid_job_requeues_without_using_an_attempt(self):
+        class FakeApp:
+            def __init__(self, account_file, error=None):
+                self.account_file = account_file
+                self.file_path = "a.mp4"
+                self.error = error
+
+            async def main(self):
+                published.append(self.account_file)
+                if self.error:
+                    raise self.error
+
+        published = []
+
+        def publisher(**kwargs):
+            apps = [FakeApp("x.json", TimeoutError("page changed")),
+                    FakeApp("x.json", TimeoutError("page changed")),
+                    FakeApp("x.json")]
+            asyncio.run(postVideo.run_uploads(apps, "douyin"))
+
+        with patch.dict(publish_jobs.PUBLISHERS, {3: publisher}):
+            job_id = self.job_queue.submit(3, {})
+            self.job_queue.run_pending()
+
+        self.assertEqual(published, ["x.json", "x.json"])
+        job = self.job_queue.get(job_id)
+        self.assertEqual((job["state"], job["attempts"]), ("queued", 0))
+        self.assertGreater(job["runAt"], time.time() + 500)
+        self.assertEqual(self.registry.get("douyin").state, OPEN)
+
+    def test_state_is_shared_between_processes(self):
+        # 另一个 worker 进程（独立的注册表实例）记录的失败，本进程认领时同样生效
+        other_process = CircuitBreakerRegistry(self.db_path, failure_threshold=2, cooldown=600)
+        other_process.get("douyin").record_failure(TimeoutError("t"))
+        other_process.get("douyin").record_failure(TimeoutError("t"))
+
+        with patch.dict(publish_jobs.PUBLISHERS, {3: lambda **kw: None}):
+            job_id = self.job_queue.submit(3, {})
+            self.job_queue.run_pending()
+        self.assertEqual(self.job_queue.get(job_id)["state"], "queued")
+        self.assertEqual(self.registry.snapshot()["douyin"]["state"], OPEN)
+
+        # Web 进程手动解除熔断后 worker 恢复认领
+        CircuitBreakerRegistry(self.db_path).get("douyin").reset()
+        with patch.dict(publish_jobs.PUBLISHERS, {3: lambda **kw: None}):
+            self.job_queue.run_pending()
+        self.assertEqual(self.job_queue.get(job_id)["state"], "succeeded")
+
+    def test_half_open_probe_is_held_across_processes_until_it_times_out(self):
+        clock = FakeClock()
+        first = CircuitBreaker("douyin", failure_threshold=1, cooldown=0, clock=clock, probe_timeout=60,
+                               store=CircuitBreakerRegistry(self.db_path))
+        second = CircuitBreaker("douyin", failure_threshold=1, cooldown=0, clock=clock, probe_timeout=60,
+                                store=CircuitBreakerRegistry(self.db_path))
+        first.record_failure()
+        self.assertTrue(first.try_acquire("w1"))
+        self.assertFalse(second.try_acquire("w2"))
+        # w1 所在进程挂掉没有交还名额，超时后由 w2 探测
+        clock.now += 60
+        self.assertTrue(second.try_acquire("w2"))
+
+    def test_account_errors_do_not_trip_the_breaker(self):
+        class FakeApp:
+            account_file = "x.json"
+            file_path = "a.mp4"
+
+            async def main(self):
+                raise LoginExpiredError("cookie 失效")
+
+        with self.assertRaises(RuntimeError) as ctx:
+            asyncio.run(postVideo.run_uploads([FakeApp(), FakeApp(), FakeApp()], "tencent"))
+        self.assertNotIsInstance(ctx.exception, CircuitOpenError)
+        self.assertEqual(postVideo.circuit_breakers.get("tencent").state, CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()
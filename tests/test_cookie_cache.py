@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from utils.cookie_cache import CookieValidityCache, session_expiry
+
+
+def write_storage_state(path, cookies):
+    Path(path).write_text(json.dumps({"cookies": cookies, "origins": []}), encoding="utf-8")
+
+
+class CookieValidityCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.account_file = Path(self.tmpdir.name) / "account.json"
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_session_expiry_uses_earliest_session_cookie(self):
+        now = time.time()
+        write_storage_state(self.account_file, [
+            {"name": "sessionid", "expires": now + 100},
+            {"name": "sid_tt", "expires": now + 50},
+            {"name": "ttwid", "expires": now + 10},
+            {"name": "web_session", "expires": -1},
+        ])
+
+        self.assertEqual(session_expiry(self.account_file), now + 50)
+
+    def test_session_expiry_none_without_session_cookies(self):
+        write_storage_state(self.account_file, [{"name": "ttwid", "expires": time.time() + 10}])
+
+        self.assertIsNone(session_expiry(self.account_file))
+
+    def test_recorded_result_is_served_within_ttl(self):
+        write_storage_state(self.account_file, [{"name": "sessionid", "expires": time.time() + 3600}])
+        cache = CookieValidityCache(ttl=60)
+
+        self.assertIsNone(cache.get(self.account_file))
+        cache.record(self.account_file, True)
+
+        self.assertTrue(cache.get(self.account_file))
+
+    def test_result_expires_after_ttl(self):
+        write_storage_state(self.account_file, [])
+        cache = CookieValidityCache(ttl=0)
+        cache.record(self.account_file, True)
+
+        self.assertIsNone(cache.get(self.account_file))
+
+    def test_rewritten_file_invalidates_cached_result(self):
+        write_storage_state(self.account_file, [])
+        cache = CookieValidityCache(ttl=60)
+        cache.record(self.account_file, False)
+
+        write_storage_state(self.account_file, [{"name": "sessionid", "expires": time.time() + 3600}])
+        stat = os.stat(self.account_file)
+        os.utime(self.account_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        self.assertIsNone(cache.get(self.account_file))
+
+    def test_expired_session_cookie_is_invalid_without_check(self):
+        write_storage_state(self.account_file, [{"name": "sessionid", "expires": time.time() - 1}])
+        cache = CookieValidityCache(ttl=60)
+
+        self.assertFalse(cache.get(self.account_file))
+        cache.record(self.account_file, True)
+        self.assertFalse(cache.get(self.account_file))
+
+    def test_missing_file_is_invalid(self):
+        cache = CookieValidityCache(ttl=60)
+
+        self.assertFalse(cache.get(Path(self.tmpdir.name) / "missing.json"))
+
+
+if __name__ == "__main__":
+    unittest.main()
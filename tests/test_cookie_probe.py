@@ -0,0 +1,101 @@
+import json
+import tempfile
+import time
+import unittest
+from contextlib import asynccontextmanager
+from pathlib import Path
+from unittest.mock import patch
+
+from utils import cookie_probe
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, data=None, location=None):
+        self.status_code = status_code
+        self._data = data
+        self.is_redirect = location is not None
+        self.headers = {"location": location} if location else {}
+
+    def json(self):
+        if self._data is None:
+            raise ValueError("not json")
+        return self._data
+
+
+class FakeClient:
+    def __init__(self, response=None, error=None):
+        self.response = response
+        self.error = error
+        self.requests = []
+
+    async def request(self, method, url, json=None, headers=None):
+        self.requests.append((method, url, headers))
+        if self.error:
+            raise self.error
+        return self.response
+
+
+class CookieHeaderTests(unittest.TestCase):
+    def test_cookie_header_filters_domain_path_and_expiry(self):
+        now = time.time()
+        cookies = [
+            {"name": "sessionid", "value": "a", "domain": ".douyin.com", "path": "/", "expires": now + 60},
+            {"name": "creator", "value": "b", "domain": "creator.douyin.com", "path": "/web", "expires": -1},
+            {"name": "other_path", "value": "c", "domain": "creator.douyin.com", "path": "/aweme", "expires": -1},
+            {"name": "expired", "value": "d", "domain": ".douyin.com", "path": "/", "expires": now - 60},
+            {"name": "foreign", "value": "e", "domain": ".kuaishou.com", "path": "/", "expires": -1},
+        ]
+
+        header = cookie_probe.cookie_header(cookies, "https://creator.douyin.com/web/api/media/user/info/", now=now)
+
+        self.assertEqual(header, "sessionid=a; creator=b")
+
+
+class ProbeCookieTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.account_file = Path(self.tmpdir.name) / "account.json"
+        self.account_file.write_text(json.dumps({"cookies": [
+            {"name": "sessionid", "value": "a", "domain": ".douyin.com", "path": "/", "expires": -1},
+        ]}), encoding="utf-8")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    async def probe_with(self, client, type=3):
+        @asynccontextmanager
+        async def fake_use_http_client():
+            yield client
+
+        with patch.object(cookie_probe, "use_http_client", fake_use_http_client):
+            return await cookie_probe.probe_cookie(type, self.account_file)
+
+    async def test_logged_in_response_is_valid(self):
+        client = FakeClient(FakeResponse(data={"status_code": 0, "user": {"uid": "1"}}))
+
+        self.assertTrue(await self.probe_with(client))
+        self.assertEqual(client.requests[0][2], {"Cookie": "sessionid=a"})
+
+    async def test_logged_out_response_is_invalid(self):
+        self.assertFalse(await self.probe_with(FakeClient(FakeResponse(data={"status_code": 8}))))
+
+    async def test_redirect_to_login_is_invalid(self):
+        response = FakeResponse(status_code=302, location="https://creator.douyin.com/login")
+
+        self.assertFalse(await self.probe_with(FakeClient(response)))
+
+    async def test_ambiguous_answers_fall_back_to_browser(self):
+        self.assertIsNone(await self.probe_with(FakeClient(FakeResponse(data={"status_code": 7}))))
+        self.assertIsNone(await self.probe_with(FakeClient(FakeResponse(status_code=200, data=None))))
+        self.assertIsNone(await self.probe_with(FakeClient(error=cookie_probe.httpx.HTTPError("timeout"))))
+
+    async def test_unknown_platform_and_missing_cookies_are_not_probed(self):
+        client = FakeClient(FakeResponse(data={"status_code": 0, "user": {}}))
+
+        self.assertIsNone(await self.probe_with(client, type=99))
+        self.assertIsNone(await self.probe_with(client, type=1))
+        self.assertEqual(client.requests, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,8 @@
 import sys
+import tempfile
 import types
 import unittest
+from pathlib import Path
 from unittest.mock import AsyncMock, patch
 
 
@@ -40,6 +42,7 @@ if "playwright.async_api" not in sys.modules:
     sys.modules["playwright.async_api"] = async_api
 
 from uploader.douyin_uploader.main import DouYinImage
+from utils import page_capture
 
 
 class FakeLocator:
@@ -363,6 +366,14 @@ class MusicPage:
 
 
 class DouyinImageUploadErrorDetectionTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # 失败现场写到临时目录，不落到仓库的 logs/ 下
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        capture_dir = patch.object(page_capture, "CAPTURE_DIR", Path(tmpdir.name) / "captures")
+        capture_dir.start()
+        self.addCleanup(capture_dir.stop)
+
     async def test_wait_for_image_editor_url_ignores_hidden_error_text(self):
         uploader = DouYinImage(
             title="标题",
@@ -381,7 +392,7 @@ class DouyinImageUploadErrorDetectionTests(unittest.IsolatedAsyncioTestCase):
             page.url = "https://creator.douyin.com/creator-micro/content/post/image"
             return None
 
-        with patch("uploader.douyin_uploader.main.asyncio.sleep", side_effect=_fast_sleep):
+        with patch("utils.waits.asyncio.sleep", side_effect=_fast_sleep):
             await uploader.wait_for_image_editor_url(page, timeout_ms=2000)
 
     async def test_wait_for_image_editor_url_raises_on_visible_error_text(self):
@@ -416,7 +427,7 @@ class DouyinImageUploadErrorDetectionTests(unittest.IsolatedAsyncioTestCase):
             page.upload_ready = True
             return None
 
-        with patch("uploader.douyin_uploader.main.asyncio.sleep", side_effect=_make_ready):
+        with patch("utils.waits.asyncio.sleep", side_effect=_make_ready):
             await uploader.upload_images(page)
 
         self.assertEqual(page.uploaded, ["a.png"])
@@ -451,7 +462,7 @@ class DouyinImageUploadErrorDetectionTests(unittest.IsolatedAsyncioTestCase):
             page.tab_ready = True
             return None
 
-        with patch("uploader.douyin_uploader.main.asyncio.sleep", side_effect=_make_tab_ready):
+        with patch("utils.waits.asyncio.sleep", side_effect=_make_tab_ready):
             await uploader.switch_to_image_mode(page)
 
         self.assertTrue(page.clicked_publish_image)
@@ -580,7 +591,7 @@ class DouyinImageUploadErrorDetectionTests(unittest.IsolatedAsyncioTestCase):
         async def _fast_sleep(_seconds):
             return None
 
-        with patch("uploader.douyin_uploader.main.asyncio.sleep", side_effect=_fast_sleep):
+        with patch("utils.waits.asyncio.sleep", side_effect=_fast_sleep):
             await uploader.set_music(page)
 
         self.assertTrue(page.sidebar_opened)
@@ -625,6 +636,9 @@ class DouyinImageUploadErrorDetectionTests(unittest.IsolatedAsyncioTestCase):
             async def new_page(self):
                 return self.page
 
+            async def add_init_script(self, script=None, path=None):
+                return None
+
             async def storage_state(self, path=None):
                 self.saved_path = path
                 return None
@@ -677,14 +691,15 @@ class DouyinImageUploadErrorDetectionTests(unittest.IsolatedAsyncioTestCase):
         uploader.read_visibility_value = AsyncMock(return_value="2")
         uploader.dump_debug_artifacts = AsyncMock(return_value="logs/douyin_debug/fake_publish_success")
 
-        async def _identity_context(ctx):
+        async def _identity_context(ctx, **_kwargs):
             return ctx
 
         async def _fast_sleep(_seconds):
             return None
 
         with patch("uploader.douyin_uploader.main.set_init_script", side_effect=_identity_context):
-            with patch("uploader.douyin_uploader.main.asyncio.sleep", side_effect=_fast_sleep):
+            with patch("utils.waits.asyncio.sleep", side_effect=_fast_sleep), \
+                    patch("uploader.douyin_uploader.main.save_storage_state", new_callable=AsyncMock):
                 await uploader.upload(playwright)
 
         uploader.dump_debug_artifacts.assert_not_awaited()
@@ -0,0 +1,134 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from unittest.mock import patch
+
+from myUtils import listing
+from myUtils.listing import ListQueryError, ensure_list_schema, list_accounts, list_files
+
+
+class ListingTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmpdir.name) / "database.db"
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+        # 旧版本的 file_records 没有 sha256、uuid、media_type 列
+        self.conn.execute('''CREATE TABLE file_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT NOT NULL,
+            filesize REAL,
+            upload_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+            file_path TEXT
+        )''')
+        self.conn.execute('''CREATE TABLE user_info (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type INTEGER NOT NULL,
+            filePath TEXT NOT NULL,
+            userName TEXT NOT NULL,
+            status INTEGER DEFAULT 0
+        )''')
+        files = [
+            ("a.mp4", "2026-01-01 10:00:00", "11111111-aaaa_a.mp4"),
+            ("b.png", "2026-01-02 10:00:00", "22222222-bbbb_b.png"),
+            ("c.mov", "2026-01-02 12:00:00", "33333333-cccc_c.mov"),
+            ("100%_d.jpg", "2026-01-03 10:00:00", "nouuid.jpg"),
+            ("e.mp4", "2026-01-03 10:00:00", "55555555-eeee_e.mp4"),
+        ]
+        self.conn.executemany(
+            "INSERT INTO file_records (filename, filesize, upload_time, file_path) VALUES (?, 1, ?, ?)", files)
+        accounts = [(3, "a.json", "抖音一号", 1), (3, "b.json", "抖音二号", 0), (1, "c.json", "小红书", 1),
+                    (2, "d.json", "视频号", 1), (3, "e.json", "抖音三号", 1)]
+        self.conn.executemany("INSERT INTO user_info (type, filePath, userName, status) VALUES (?, ?, ?, ?)", accounts)
+        self.conn.commit()
+        ensure_list_schema(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def _pages(self, lister, args):
+        pages, cursor = [], None
+        while True:
+            page_args = dict(args, cursor=cursor) if cursor else args
+            rows, cursor = lister(self.conn, page_args)
+            pages.append([row["id"] for row in rows])
+            if cursor is None:
+                return pages
+
+    def _plan(self, sql, params=()):
+        return " ".join(row[3] for row in self.conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+    def test_schema_backfills_uuid_and_creates_indexes(self):
+        rows = {row["file_path"]: row for row in self.conn.execute("SELECT * FROM file_records")}
+        self.assertEqual(rows["11111111-aaaa_a.mp4"]["uuid"], "11111111-aaaa")
+        self.assertEqual(len(rows["nouuid.jpg"]["uuid"]), 32)
+        self.assertEqual(rows["33333333-cccc_c.mov"]["media_type"], "video")
+        self.assertEqual(rows["nouuid.jpg"]["media_type"], "image")
+        indexes = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertIn("idx_file_records_upload_time", indexes)
+        self.assertIn("idx_user_info_type_status", indexes)
+        plan = self._plan("SELECT * FROM user_info WHERE type = 3 AND status = 1 ORDER BY id")
+        self.assertIn("idx_user_info_type_status", plan)
+
+    def test_filters_use_indexes(self):
+        plan = self._plan("SELECT * FROM file_records WHERE media_type = ? ORDER BY id DESC", ("video",))
+        self.assertIn("idx_file_records_media_type", plan)
+        clause, params = listing._prefix("filename", "a")
+        plan = self._plan(f"SELECT * FROM file_records WHERE {clause}", params)
+        self.assertIn("idx_file_records_filename", plan)
+        clause, params = listing._prefix("userName", "抖音")
+        plan = self._plan(f"SELECT * FROM user_info WHERE {clause}", params)
+        self.assertIn("idx_user_info_user_name", plan)
+
+    def test_pagination_is_the_default(self):
+        with patch.object(listing, "LIST_DEFAULT_LIMIT", 2):
+            rows, cursor = list_files(self.conn, {})
+            self.assertEqual([row["id"] for row in rows], [5, 4])
+            rows, cursor = list_files(self.conn, {"cursor": cursor})
+        self.assertEqual([row["id"] for row in rows], [3, 2])
+        self.assertIsNotNone(cursor)
+
+    def test_pages_cover_all_rows_once(self):
+        self.assertEqual(self._pages(list_files, {"limit": "2"}), [[5, 4], [3, 2], [1]])
+        # 上传时间相同的记录按 id 排序，不重复也不遗漏
+        self.assertEqual(self._pages(list_files, {"limit": "2", "sort": "uploadTime", "order": "asc"}),
+                         [[1, 2], [3, 4], [5]])
+
+    def test_file_filters(self):
+        rows, _ = list_files(self.conn, {"type": "video", "order": "asc"})
+        self.assertEqual([row["id"] for row in rows], [1, 3, 5])
+        rows, _ = list_files(self.conn, {"name": "100%"})
+        self.assertEqual([row["id"] for row in rows], [4])
+        # 前缀匹配，不匹配文件名中间的内容
+        rows, _ = list_files(self.conn, {"name": "_d"})
+        self.assertEqual(rows, [])
+        rows, _ = list_files(self.conn, {"since": "2026-01-02", "until": "2026-01-02", "order": "asc"})
+        self.assertEqual([row["id"] for row in rows], [2, 3])
+
+    def test_account_filters_and_sort(self):
+        rows, _ = list_accounts(self.conn, {"type": "3", "status": "1", "order": "asc"})
+        self.assertEqual([row["id"] for row in rows], [1, 5])
+        rows, _ = list_accounts(self.conn, {"name": "抖音", "order": "asc"})
+        self.assertEqual([row["id"] for row in rows], [1, 2, 5])
+        self.assertEqual(self._pages(list_accounts, {"limit": "2", "sort": "type", "order": "asc"}),
+                         [[3, 4], [1, 2], [5]])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ListQueryError):
+            list_files(self.conn, {"sort": "filesize"})
+        with self.assertRaises(ListQueryError):
+            list_files(self.conn, {"limit": "0"})
+        with self.assertRaises(ListQueryError):
+            list_accounts(self.conn, {"type": "douyin"})
+        with self.assertRaises(ListQueryError):
+            list_files(self.conn, {"cursor": "not-a-cursor"})
+        _, cursor = list_files(self.conn, {"limit": "2"})
+        with self.assertRaises(ListQueryError):
+            list_files(self.conn, {"limit": "2", "order": "asc", "cursor": cursor})
+
+
+if __name__ == "__main__":
+    unittest.main()
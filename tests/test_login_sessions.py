@@ -0,0 +1,206 @@
+import asyncio
+import queue
+import sys
+import threading
+import types
+import unittest
+from unittest.mock import patch
+
+
+# Test environment may not have loguru installed.
+if "loguru" not in sys.modules:
+    loguru_mod = types.ModuleType("loguru")
+
+    class _DummyLogger:
+        def add(self, *args, **kwargs):
+            return 1
+
+        def remove(self, *args, **kwargs):
+            return None
+
+        def bind(self, **kwargs):
+            return self
+
+        def __getattr__(self, _name):
+            def _noop(*args, **kwargs):
+                return None
+
+            return _noop
+
+    loguru_mod.logger = _DummyLogger()
+    sys.modules["loguru"] = loguru_mod
+
+# Test environment may not have playwright / xhs / requests installed.
+if "playwright" not in sys.modules:
+    sys.modules["playwright"] = types.ModuleType("playwright")
+if "playwright.async_api" not in sys.modules:
+    async_api = types.ModuleType("playwright.async_api")
+    async_api.Playwright = object
+    async_api.Page = object
+
+    async def _async_playwright_stub():
+        raise RuntimeError("playwright is not available in test environment")
+
+    async_api.async_playwright = _async_playwright_stub
+    sys.modules["playwright.async_api"] = async_api
+if "playwright.sync_api" not in sys.modules:
+    sync_api = types.ModuleType("playwright.sync_api")
+    sync_api.sync_playwright = None
+    sys.modules["playwright.sync_api"] = sync_api
+if "xhs" not in sys.modules:
+    xhs_mod = types.ModuleType("xhs")
+    xhs_mod.XhsClient = object
+    sys.modules["xhs"] = xhs_mod
+if "requests" not in sys.modules:
+    sys.modules["requests"] = types.ModuleType("requests")
+
+from myUtils.login import LoginSessionManager, sse_stream
+from utils.browser_pool import BrowserPool, get_browser_pool, pooled_context
+
+
+def _drain(status_queue, timeout=5):
+    messages = []
+    while True:
+        msg = status_queue.get(timeout=timeout)
+        messages.append(msg)
+        if msg in ("200", "500"):
+            return messages
+
+
+class FakeContext:
+    async def add_init_script(self, script=None, path=None):
+        pass
+
+    async def close(self):
+        # 模拟上下文关闭较慢，SSE 在此之前已经发出结果
+        await asyncio.sleep(0.05)
+
+
+class FakeBrowser:
+    def is_connected(self):
+        return True
+
+    async def new_context(self, **options):
+        return FakeContext()
+
+
+class FakeChromium:
+    async def launch(self, **options):
+        return FakeBrowser()
+
+
+class FakePlaywright:
+    chromium = FakeChromium()
+
+
+class LoginSessionManagerTests(unittest.TestCase):
+    def test_logins_share_one_loop_and_respect_the_cap(self):
+        running = 0
+        peak = 0
+        loops = set()
+        lock = threading.Lock()
+
+        async def fake_login(id, status_queue):
+            nonlocal running, peak
+            loops.add(asyncio.get_running_loop())
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            status_queue.put(f"qr-{id}")
+            await asyncio.sleep(0.05)
+            with lock:
+                running -= 1
+            status_queue.put("200")
+
+        manager = LoginSessionManager(max_sessions=2, timeout=5, cookie_gens={"3": fake_login})
+        try:
+            queues = [queue.Queue() for _ in range(5)]
+            for index, status_queue in enumerate(queues):
+                self.assertIsNotNone(manager.start("3", f"user{index}", status_queue))
+            results = [_drain(status_queue) for status_queue in queues]
+        finally:
+            manager.stop()
+
+        self.assertEqual(results[0], ["qr-user0", "200"])
+        self.assertEqual(peak, 2)
+        self.assertEqual(len(loops), 1)
+
+    def test_session_timeout_and_errors_send_failure(self):
+        async def slow_login(id, status_queue):
+            status_queue.put("qr")
+            await asyncio.sleep(10)
+
+        async def broken_login(id, status_queue):
+            raise RuntimeError("page crashed")
+
+        manager = LoginSessionManager(timeout=0.1, cookie_gens={"1": slow_login, "2": broken_login})
+        try:
+            slow, broken, unknown = queue.Queue(), queue.Queue(), queue.Queue()
+            manager.start("1", "a", slow)
+            manager.start("2", "b", broken)
+            self.assertIsNone(manager.start("9", "c", unknown))
+            self.assertEqual(_drain(slow), ["qr", "500"])
+            self.assertEqual(_drain(broken), ["500"])
+            self.assertEqual(_drain(unknown), ["500"])
+        finally:
+            manager.stop()
+
+    def test_cancel_releases_the_slot(self):
+        started = threading.Event()
+
+        async def waiting_login(id, status_queue):
+            started.set()
+            await asyncio.sleep(10)
+
+        async def quick_login(id, status_queue):
+            status_queue.put("200")
+
+        manager = LoginSessionManager(max_sessions=1, timeout=5,
+                                      cookie_gens={"1": waiting_login, "2": quick_login})
+        try:
+            session_id = manager.start("1", "a", queue.Queue())
+            self.assertTrue(started.wait(5))
+            manager.cancel(session_id)
+            quick = queue.Queue()
+            manager.start("2", "b", quick)
+            self.assertEqual(_drain(quick), ["200"])
+        finally:
+            manager.stop()
+
+    def test_successful_sse_logins_return_their_contexts(self):
+        async def pooled_login(id, status_queue):
+            async with pooled_context({}):
+                status_queue.put(f"qr-{id}")
+                status_queue.put("200")
+
+        async def fake_playwright(self):
+            return FakePlaywright()
+
+        async def pool_stats():
+            return get_browser_pool().stats()
+
+        manager = LoginSessionManager(timeout=5, cookie_gens={"3": pooled_login})
+        try:
+            with patch.object(BrowserPool, "get_playwright", fake_playwright):
+                futures = []
+                for index in range(3):
+                    status_queue = queue.Queue()
+                    session_id = manager.start("3", f"user{index}", status_queue)
+                    future = manager._futures.get(session_id)
+                    # 和 /login 一样：只在收到结果前断开时取消
+                    events = list(sse_stream(status_queue, on_abort=lambda: manager.cancel(session_id)))
+                    self.assertEqual(events[-1], "data: 200\n\n")
+                    futures.append(future)
+                for future in futures:
+                    if future is not None:
+                        future.result(timeout=5)
+                stats = manager._browser_loop.run(pool_stats())
+        finally:
+            manager.stop()
+
+        self.assertEqual(stats, [{"active": 0, "jobs": 3, "healthy": True}])
+        self.assertEqual(manager._futures, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import queue
+import sys
+import threading
+import time
+import types
+import unittest
+
+
+if "loguru" not in sys.modules:
+    loguru_mod = types.ModuleType("loguru")
+
+    class _DummyLogger:
+        def add(self, *args, **kwargs):
+            return 1
+
+        def remove(self, *args, **kwargs):
+            return None
+
+        def bind(self, **kwargs):
+            return self
+
+        def __getattr__(self, _name):
+            def _noop(*args, **kwargs):
+                return None
+
+            return _noop
+
+    loguru_mod.logger = _DummyLogger()
+    sys.modules["loguru"] = loguru_mod
+
+if "playwright" not in sys.modules:
+    sys.modules["playwright"] = types.ModuleType("playwright")
+if "playwright.async_api" not in sys.modules:
+    async_api = types.ModuleType("playwright.async_api")
+    async_api.Playwright = object
+    async_api.Page = object
+
+    async def _async_playwright_stub():
+        raise RuntimeError("playwright is not available in test environment")
+
+    async_api.async_playwright = _async_playwright_stub
+    sys.modules["playwright.async_api"] = async_api
+
+from myUtils.login import sse_stream
+
+
+class SseStreamTests(unittest.TestCase):
+    def test_stream_ends_after_terminal_message_and_cleans_up(self):
+        status_queue = queue.Queue()
+        closed = []
+        for msg in ("https://qr.example/1.png", "200"):
+            status_queue.put(msg)
+        events = list(sse_stream(status_queue, on_close=lambda: closed.append(True)))
+        self.assertEqual(events, ["data: https://qr.example/1.png\n\n", "data: 200\n\n"])
+        self.assertEqual(closed, [True])
+
+    def test_idle_stream_sends_heartbeats_until_result(self):
+        status_queue = queue.Queue()
+        threading.Timer(0.25, status_queue.put, args=("500",)).start()
+        started = time.monotonic()
+        events = list(sse_stream(status_queue, heartbeat=0.1, timeout=5))
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(events[-1], "data: 500\n\n")
+        self.assertIn(": heartbeat\n\n", events)
+
+    def test_timeout_sends_failure(self):
+        events = list(sse_stream(queue.Queue(), heartbeat=0.05, timeout=0.1))
+        self.assertEqual(events[-1], "data: 500\n\n")
+
+    def test_client_disconnect_runs_on_close(self):
+        closed = []
+        aborted = []
+        stream = sse_stream(queue.Queue(), on_close=lambda: closed.append(True), heartbeat=0.01,
+                            on_abort=lambda: aborted.append(True))
+        self.assertEqual(next(stream), ": heartbeat\n\n")
+        stream.close()
+        self.assertEqual(closed, [True])
+        self.assertEqual(aborted, [True])
+
+    def test_terminal_message_does_not_abort(self):
+        status_queue = queue.Queue()
+        status_queue.put("200")
+        aborted = []
+        events = list(sse_stream(status_queue, on_abort=lambda: aborted.append(True)))
+        self.assertEqual(events, ["data: 200\n\n"])
+        self.assertEqual(aborted, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+from email.utils import formatdate
+from pathlib import Path
+
+from myUtils.media_serving import RangeNotSatisfiable, parse_range, serve_file
+
+
+class ParseRangeTests(unittest.TestCase):
+    def test_single_ranges(self):
+        self.assertEqual(parse_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_range("bytes=900-", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=990-5000", 1000), (990, 999))
+        self.assertIsNone(parse_range(None, 1000))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 1000))
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range("bytes=1000-", 1000)
+
+
+class ServeFileTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data = os.urandom(1000)
+        self.path = Path(self.tmpdir.name) / "clip.mp4"
+        self.path.write_bytes(self.data)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _body(self, body):
+        return b"".join(body)
+
+    def test_full_and_partial_content(self):
+        status, headers, body = serve_file(self.path, {})
+        self.assertEqual((status, headers["Content-Length"], headers["Accept-Ranges"]), (200, "1000", "bytes"))
+        self.assertEqual(headers["Content-Type"], "video/mp4")
+        self.assertEqual(self._body(body), self.data)
+
+        status, headers, body = serve_file(self.path, {"Range": "bytes=100-199"})
+        self.assertEqual((status, headers["Content-Range"]), (206, "bytes 100-199/1000"))
+        self.assertEqual(self._body(body), self.data[100:200])
+
+        status, headers, _ = serve_file(self.path, {"Range": "bytes=2000-"})
+        self.assertEqual((status, headers["Content-Range"]), (416, "bytes */1000"))
+
+    def test_tail_ranges_use_the_server_file_wrapper(self):
+        wrapped = []
+
+        def file_wrapper(f, block_size):
+            wrapped.append(f.tell())
+            return iter([f.read()])
+
+        status, headers, body = serve_file(self.path, {"Range": "bytes=600-"}, file_wrapper=file_wrapper)
+        self.assertEqual((status, wrapped), (206, [600]))
+        self.assertEqual(self._body(body), self.data[600:])
+        # 中间的范围不能交给 file_wrapper，否则会一直发送到文件末尾
+        _, _, body = serve_file(self.path, {"Range": "bytes=0-9"}, file_wrapper=file_wrapper)
+        self.assertEqual(self._body(body), self.data[:10])
+        self.assertEqual(wrapped, [600])
+
+    def test_gunicorn_sendfile_serves_mid_file_ranges(self):
+        class FileWrapper:
+            # 和 gunicorn 的 FileWrapper 一样只保存文件对象，由服务器 sendfile
+            def __init__(self, filelike, block_size):
+                self.filelike = filelike
+
+        def gunicorn_sendfile(headers, body):
+            # gunicorn 从文件当前位置起发送 Content-Length 个字节
+            with body.filelike as f:
+                return f.read(int(headers["Content-Length"]))
+
+        status, headers, body = serve_file(self.path, {"Range": "bytes=100-199"}, file_wrapper=FileWrapper,
+                                           wrapper_honors_length=True)
+        self.assertEqual((status, headers["Content-Range"]), (206, "bytes 100-199/1000"))
+        self.assertIsInstance(body, FileWrapper)
+        self.assertEqual(gunicorn_sendfile(headers, body), self.data[100:200])
+
+        status, headers, body = serve_file(self.path, {}, file_wrapper=FileWrapper, wrapper_honors_length=True)
+        self.assertEqual(gunicorn_sendfile(headers, body), self.data)
+
+    def test_conditional_requests(self):
+        _, headers, body = serve_file(self.path, {})
+        self._body(body)
+        etag = headers["ETag"]
+        self.assertEqual(serve_file(self.path, {"If-None-Match": etag})[0], 304)
+        self.assertEqual(serve_file(self.path, {"If-None-Match": f'W/{etag}, "other"'})[0], 304)
+        self.assertEqual(serve_file(self.path, {"If-Modified-Since": headers["Last-Modified"]})[0], 304)
+        past = formatdate(self.path.stat().st_mtime - 3600, usegmt=True)
+        status, _, body = serve_file(self.path, {"If-Modified-Since": past})
+        self._body(body)
+        self.assertEqual(status, 200)
+
+        # If-Range 不匹配时返回整个文件
+        status, _, body = serve_file(self.path, {"Range": "bytes=0-9", "If-Range": '"stale"'})
+        self.assertEqual((status, len(self._body(body))), (200, 1000))
+        status, _, body = serve_file(self.path, {"Range": "bytes=0-9", "If-Range": etag})
+        self.assertEqual((status, len(self._body(body))), (206, 10))
+
+    def test_content_addressed_files_are_immutable(self):
+        name = "ab" * 32 + ".mp4"
+        path = Path(self.tmpdir.name) / name
+        path.write_bytes(b"x")
+        status, headers, body = serve_file(path, {}, method="HEAD")
+        self.assertEqual((status, list(body)), (200, []))
+        self.assertEqual(headers["ETag"], f'"{"ab" * 32}"')
+        self.assertIn("immutable", headers["Cache-Control"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import hashlib
+import io
+import sqlite3
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from myUtils.media_store import MediaStore
+
+
+class MediaStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmpdir.name) / "videoFile"
+        self.root.mkdir()
+        self.db_path = Path(self.tmpdir.name) / "database.db"
+        with sqlite3.connect(self.db_path) as conn:
+            # 旧版本的 file_records 没有 sha256 列
+            conn.execute('''CREATE TABLE file_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT NOT NULL,
+                filesize REAL,
+                upload_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+                file_path TEXT
+            )''')
+        self.store = MediaStore(db_path=self.db_path, root=self.root)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _upload(self, filename, data):
+        tmp_path, sha256, size = self.store.save_stream(io.BytesIO(data))
+        return self.store.add(filename, sha256, size, src_path=tmp_path)
+
+    def _ref_count(self, sha256):
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("SELECT ref_count FROM media_blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        return row[0] if row else None
+
+    def test_same_content_is_stored_once(self):
+        first, deduplicated = self._upload("a.MP4", b"clip")
+        self.assertFalse(deduplicated)
+        second, deduplicated = self._upload("b.mp4", b"clip")
+        self.assertTrue(deduplicated)
+
+        sha256 = hashlib.sha256(b"clip").hexdigest()
+        self.assertEqual(first["filepath"], f"{sha256}.mp4")
+        self.assertEqual(second["filepath"], first["filepath"])
+        self.assertEqual(self._ref_count(sha256), 2)
+        self.assertEqual(sorted(p.name for p in self.root.iterdir()), [".uploads", f"{sha256}.mp4"])
+        self.assertEqual(list((self.root / ".uploads").iterdir()), [])
+
+    def test_a_known_hash_alone_cannot_add_a_record(self):
+        self._upload("a.mp4", b"clip")
+        with self.assertRaises(TypeError):
+            self.store.add("c.mp4", hashlib.sha256(b"clip").hexdigest())
+        self.assertEqual(self._ref_count(hashlib.sha256(b"clip").hexdigest()), 1)
+
+    def test_blob_removed_only_after_last_reference(self):
+        first, _ = self._upload("a.mp4", b"clip")
+        second, _ = self._upload("b.mp4", b"clip")
+        blob = self.root / first["filepath"]
+
+        self.assertEqual(self.store.remove(first["id"])["filename"], "a.mp4")
+        self.assertTrue(blob.exists())
+        self.store.remove(second["id"])
+        self.assertFalse(blob.exists())
+        self.assertIsNone(self._ref_count(first["sha256"]))
+        self.assertIsNone(self.store.remove(second["id"]))
+
+    def test_add_waits_for_a_remove_that_is_deleting_the_blob(self):
+        first, _ = self._upload("a.mp4", b"clip")
+        blob = self.root / first["filepath"]
+        unlink = self.store._unlink
+        tmp_path, sha256, size = self.store.save_stream(io.BytesIO(b"clip"))
+        results = []
+
+        def unlink_while_adding(relative_path):
+            # 删除文件的同时有请求上传了相同内容
+            adder = threading.Thread(target=lambda: results.append(
+                self.store.add("b.mp4", sha256, size, src_path=tmp_path)))
+            adder.start()
+            adder.join(0.2)
+            self.assertTrue(adder.is_alive())
+            unlink(relative_path)
+            self.adder = adder
+
+        with patch.object(self.store, "_unlink", unlink_while_adding):
+            self.assertEqual(self.store.remove(first["id"])["deleted_file"], first["filepath"])
+        self.adder.join()
+
+        # 去重在删除提交后才判断，发现内容已不在，用这次上传的文件重新落盘
+        self.assertFalse(results[0][1])
+        self.assertTrue(blob.exists())
+        self.assertEqual(self._ref_count(first["sha256"]), 1)
+
+    def test_legacy_records_delete_their_own_file(self):
+        legacy = self.root / "uuid_old.mp4"
+        legacy.write_bytes(b"old")
+        with sqlite3.connect(self.db_path) as conn:
+            record_id = conn.execute(
+                "INSERT INTO file_records (filename, filesize, file_path) VALUES ('old.mp4', 0, 'uuid_old.mp4')"
+            ).lastrowid
+        self.store.remove(record_id)
+        self.assertFalse(legacy.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
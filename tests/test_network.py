@@ -0,0 +1,88 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from utils import network
+from utils.network import (FATAL, RETRYABLE, LoginExpiredError, RetryPolicy, async_retry, classify_error,
+                           retry_metrics)
+from utils.step_budget import StepBudget, StepBudgetExceeded
+
+
+class ClassifyErrorTests(unittest.TestCase):
+    def test_selector_timeout_is_retryable(self):
+        self.assertEqual(classify_error(TimeoutError("Timeout 3000ms exceeded waiting for selector")), RETRYABLE)
+
+    def test_login_and_rejection_are_fatal(self):
+        self.assertEqual(classify_error(LoginExpiredError("请重新登录")), FATAL)
+        self.assertEqual(classify_error(Exception("cookie 失效，需要扫码登录")), FATAL)
+        self.assertEqual(classify_error(Exception("出现验证，退出")), FATAL)
+
+    def test_step_budget_exceeded_is_fatal(self):
+        self.assertEqual(classify_error(StepBudgetExceeded("douyin", "publish", 10, 5)), FATAL)
+
+
+class RetryPolicyTests(unittest.TestCase):
+    def test_delay_grows_exponentially_with_jitter_and_cap(self):
+        policy = RetryPolicy(base_delay=1, max_delay=5, multiplier=2, jitter=0.5)
+        with patch.object(network.random, "random", return_value=0):
+            self.assertEqual([policy.delay(n) for n in range(1, 5)], [1, 2, 4, 5])
+        with patch.object(network.random, "random", return_value=1):
+            self.assertEqual(policy.delay(2), 1)
+
+    def test_retries_until_success_and_records_metrics(self):
+        calls = []
+
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise TimeoutError("selector timeout")
+            return "ok"
+
+        policy = RetryPolicy(name="test.flaky", max_attempts=5, base_delay=0)
+        self.assertEqual(asyncio.run(policy.run(flaky)), "ok")
+        metrics = retry_metrics.snapshot()["test.flaky"]
+        self.assertEqual((metrics["attempts"], metrics["retryable"], metrics["success"]), (3, 2, 1))
+
+    def test_fatal_error_is_not_retried(self):
+        calls = []
+
+        def expired():
+            calls.append(1)
+            raise LoginExpiredError("登录失效")
+
+        with self.assertRaises(LoginExpiredError):
+            RetryPolicy(max_attempts=5, base_delay=0).run_sync(expired)
+        self.assertEqual(len(calls), 1)
+
+    def test_async_retry_keeps_max_retries_and_timeout(self):
+        calls = []
+
+        @async_retry(timeout=60, max_retries=2, base_delay=0)
+        async def always_fails():
+            calls.append(1)
+            raise ValueError("boom")
+
+        with self.assertRaisesRegex(Exception, "Failed after 2 retries"):
+            asyncio.run(always_fails())
+        self.assertEqual(len(calls), 2)
+
+        @async_retry(timeout=0.01, base_delay=1)
+        async def slow_fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(TimeoutError):
+            asyncio.run(slow_fail())
+
+
+class StepBudgetRetryTests(unittest.TestCase):
+    def test_fatal_error_skips_remaining_budget(self):
+        async def run():
+            budget = StepBudget("kuaishou", "publish", budget=60, interval=0)
+            await budget.retry(LoginExpiredError("登录失效"))
+
+        with self.assertRaises(LoginExpiredError):
+            asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from utils import page_capture
+from utils.page_capture import PageCapture, enforce_quota
+
+
+class FakePage:
+    def __init__(self):
+        self.url = "https://creator.douyin.com/upload"
+        self.screenshots = 0
+
+    async def evaluate(self, _script):
+        return ["抖音", 120, "发布中"]
+
+    async def screenshot(self, **options):
+        self.screenshots += 1
+        return b"jpeg"
+
+    async def content(self):
+        return "<html></html>"
+
+
+class PageCaptureTests(unittest.TestCase):
+    def test_ring_keeps_latest_snapshots_and_throttles_screenshots(self):
+        page = FakePage()
+        capture = PageCapture(page, "douyin", size=2, screenshots=True)
+
+        async def run():
+            for index in range(3):
+                await capture.snapshot(f"publish-{index}")
+
+        asyncio.run(run())
+        self.assertEqual([item["label"] for item in capture.ring], ["publish-1", "publish-2"])
+        self.assertEqual(page.screenshots, 1)
+        self.assertEqual(capture.ring[0]["dom_digest"], capture.ring[1]["dom_digest"])
+
+    def test_snapshot_survives_page_errors(self):
+        class BrokenPage:
+            url = "about:blank"
+
+            async def evaluate(self, _script):
+                raise RuntimeError("page closed")
+
+        capture = PageCapture(BrokenPage(), "kuaishou", screenshots=False)
+        item = asyncio.run(capture.snapshot("publish"))
+        self.assertEqual(item["error"], "page closed")
+
+    def test_persist_writes_snapshots(self):
+        with tempfile.TemporaryDirectory() as tmpdir, patch.object(page_capture, "CAPTURE_DIR", Path(tmpdir)):
+            capture = PageCapture(FakePage(), "douyin")
+
+            async def run():
+                await capture.snapshot("publish", screenshot=True, html=True)
+                return await capture.persist("timeout", {"files.txt": "a.png\n"})
+
+            out_dir = Path(asyncio.run(run()))
+            meta = json.loads((out_dir / "snapshots.json").read_text(encoding="utf-8"))
+            self.assertEqual(meta[0]["screenshot"], "0.jpg")
+            self.assertEqual((out_dir / "0.jpg").read_bytes(), b"jpeg")
+            self.assertTrue((out_dir / "0.html").exists())
+            self.assertTrue((out_dir / "files.txt").exists())
+
+    def test_quota_removes_oldest_captures(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for index, name in enumerate(["old", "mid", "new"]):
+                path = Path(tmpdir) / name
+                path.mkdir()
+                (path / "data").write_bytes(b"x" * 100)
+                os.utime(path, (index, index))
+
+            enforce_quota(tmpdir, 150, keep=Path(tmpdir) / "new")
+            self.assertEqual(sorted(os.listdir(tmpdir)), ["new"])
+
+
+if __name__ == "__main__":
+    unittest.main()
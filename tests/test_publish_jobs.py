@@ -0,0 +1,309 @@
+import asyncio
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import types
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+if "loguru" not in sys.modules:
+    loguru_mod = types.ModuleType("loguru")
+
+    class _DummyLogger:
+        def add(self, *args, **kwargs):
+            return 1
+
+        def remove(self, *args, **kwargs):
+            return None
+
+        def bind(self, **kwargs):
+            return self
+
+        def __getattr__(self, _name):
+            def _noop(*args, **kwargs):
+                return None
+
+            return _noop
+
+    loguru_mod.logger = _DummyLogger()
+    sys.modules["loguru"] = loguru_mod
+
+if "playwright" not in sys.modules:
+    sys.modules["playwright"] = types.ModuleType("playwright")
+if "playwright.async_api" not in sys.modules:
+    async_api = types.ModuleType("playwright.async_api")
+    async_api.Playwright = object
+    async_api.Page = object
+
+    async def _async_playwright_stub():
+        raise RuntimeError("playwright is not available in test environment")
+
+    async_api.async_playwright = _async_playwright_stub
+    sys.modules["playwright.async_api"] = async_api
+
+from myUtils import postVideo, publish_jobs
+from utils import browser_pool
+
+
+class PublishJobQueueTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmpdir.name) / "database.db"
+        # workers=0：测试里在当前线程用 run_pending 执行任务
+        self.job_queue = publish_jobs.PublishJobQueue(self.db_path, workers=0)
+
+    def tearDown(self):
+        self.job_queue.stop()
+        self.tmpdir.cleanup()
+
+    def test_submit_returns_id_and_worker_runs_job(self):
+        calls = []
+
+        with patch.dict(publish_jobs.PUBLISHERS, {3: lambda **kwargs: calls.append(kwargs)}):
+            job_id = self.job_queue.submit(3, {"title": "t", "files": ["a.mp4"]})
+            self.assertEqual(self.job_queue.get(job_id)["state"], "queued")
+            self.job_queue.run_pending()
+
+        self.assertEqual(calls, [{"title": "t", "files": ["a.mp4"]}])
+        job = self.job_queue.get(job_id)
+        self.assertEqual(job["state"], "succeeded")
+        self.assertIsNotNone(job["finishedAt"])
+
+    def test_failed_job_is_retried_later_then_marked_failed(self):
+        def fail(**kwargs):
+            raise RuntimeError("upload broke")
+
+        with patch.dict(publish_jobs.PUBLISHERS, {4: fail}), patch.object(publish_jobs, "PUBLISH_MAX_ATTEMPTS", 2):
+            job_id = self.job_queue.submit(4, {})
+            self.job_queue.run_pending()
+
+            job = self.job_queue.get(job_id)
+            self.assertEqual(job["state"], "queued")
+            self.assertEqual(job["attempts"], 1)
+            self.assertGreater(job["runAt"], time.time())
+            # 未到重试时间不会被认领
+            self.assertIsNone(self.job_queue.claim_next())
+
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("UPDATE publish_jobs SET run_at = 0")
+                conn.commit()
+            self.job_queue.run_pending()
+
+        job = self.job_queue.get(job_id)
+        self.assertEqual(job["state"], "failed")
+        self.assertEqual(job["attempts"], 2)
+        self.assertEqual(job["error"], "upload broke")
+        self.assertEqual([item["id"] for item in self.job_queue.list(state="failed")], [job_id])
+
+    def test_unknown_platform_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.job_queue.submit(99, {})
+
+    def test_submit_only_queues_without_starting_workers(self):
+        # gunicorn 的 Web 进程只入队，发布交给 sau_worker.py
+        job_queue = publish_jobs.PublishJobQueue(self.db_path, workers=2)
+        job_id = job_queue.submit(3, {})
+
+        self.assertEqual(job_queue._threads, [])
+        self.assertEqual(job_queue.get(job_id)["state"], "queued")
+
+    def test_claim_next_never_hands_out_a_job_twice(self):
+        self.job_queue.start()
+        for _ in range(20):
+            self.job_queue.submit(1, {})
+
+        claimed = []
+        other_queue = publish_jobs.PublishJobQueue(self.db_path, workers=0)
+
+        def claim_all(job_queue):
+            while True:
+                job = job_queue.claim_next()
+                if job is None:
+                    return
+                claimed.append(job["id"])
+
+        threads = [threading.Thread(target=claim_all, args=(q,)) for q in (self.job_queue, other_queue) * 2]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(claimed), 20)
+        self.assertEqual(len(set(claimed)), 20)
+
+    def test_worker_threads_pick_up_submitted_jobs(self):
+        done = threading.Event()
+        job_queue = publish_jobs.PublishJobQueue(self.db_path, workers=2, poll_interval=0.05)
+        job_queue.start()
+
+        with patch.dict(publish_jobs.PUBLISHERS, {2: lambda **kwargs: done.set()}):
+            job_id = job_queue.submit(2, {})
+            self.assertTrue(done.wait(2))
+            for _ in range(40):
+                if job_queue.get(job_id)["state"] == "succeeded":
+                    break
+                time.sleep(0.05)
+        job_queue.stop()
+
+        self.assertEqual(job_queue.get(job_id)["state"], "succeeded")
+
+    def test_expired_leases_are_reclaimed_but_live_ones_are_not(self):
+        self.job_queue.ensure_table()
+        now = time.time()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany(
+                "INSERT INTO publish_jobs (id, type, payload, state, created_at, run_at, attempts, lease_owner, "
+                "lease_expires_at) VALUES (?, 1, '{}', ?, ?, ?, ?, ?, ?)",
+                [
+                    ("crashed", "running", 1, 1, 1, "dead-worker", now - 1),
+                    ("live", "running", 2, 2, 1, "live-worker", now + 60),
+                    ("exhausted", "running", 3, 3, 3, "dead-worker", now - 1),
+                    ("queued", "queued", 4, 4, 0, None, None),
+                    ("done", "succeeded", 5, 5, 1, None, None),
+                ],
+            )
+            conn.commit()
+
+        ran = []
+        with patch.dict(publish_jobs.PUBLISHERS, {1: lambda **kwargs: ran.append(kwargs)}):
+            self.job_queue.start()
+            self.job_queue.run_pending()
+
+        self.assertEqual(len(ran), 2)
+        self.assertEqual(self.job_queue.get("crashed")["state"], "succeeded")
+        self.assertEqual(self.job_queue.get("crashed")["attempts"], 2)
+        self.assertEqual(self.job_queue.get("queued")["state"], "succeeded")
+        self.assertEqual(self.job_queue.get("live")["state"], "running")
+        self.assertEqual(self.job_queue.get("exhausted")["state"], "failed")
+
+    def test_jobs_sharing_an_account_with_a_running_job_wait(self):
+        self.job_queue.ensure_table()
+        now = time.time()
+        with sqlite3.connect(self.db_path) as conn:
+            # 另一个 worker 进程正在用 a.json 发布
+            conn.execute(
+                "INSERT INTO publish_jobs (id, type, payload, state, created_at, run_at, attempts, lease_owner, "
+                "lease_expires_at) VALUES ('other', 3, ?, 'running', 1, 1, 1, 'other-worker', ?)",
+                ('{"account_file": ["a.json"]}', now + 60),
+            )
+            conn.commit()
+
+        blocked = self.job_queue.submit(3, {"account_file": ["b.json", "a.json"]})
+        free = self.job_queue.submit(3, {"account_file": ["c.json"]})
+
+        self.assertEqual(self.job_queue.claim_next()["id"], free)
+        self.assertIsNone(self.job_queue.claim_next())
+        self.assertEqual(self.job_queue.get(blocked)["state"], "queued")
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("UPDATE publish_jobs SET state = 'succeeded' WHERE id = 'other'")
+            conn.commit()
+        self.assertEqual(self.job_queue.claim_next()["id"], blocked)
+
+    def test_platform_running_job_limit_is_enforced_at_claim(self):
+        self.job_queue.ensure_table()
+        with sqlite3.connect(self.db_path) as conn:
+            # 另一个 worker 进程正在执行一个抖音任务
+            conn.execute(
+                "INSERT INTO publish_jobs (id, type, payload, state, created_at, run_at, attempts, lease_owner, "
+                "lease_expires_at) VALUES ('other', 3, '{}', 'running', 1, 1, 1, 'other-worker', ?)",
+                (time.time() + 60,),
+            )
+            conn.commit()
+
+        douyin = self.job_queue.submit(3, {})
+        kuaishou = self.job_queue.submit(4, {})
+        with patch.object(publish_jobs, "PLATFORM_CONCURRENCY", {"douyin": 1}):
+            self.assertEqual(self.job_queue.claim_next()["id"], kuaishou)
+            self.assertIsNone(self.job_queue.claim_next())
+
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("UPDATE publish_jobs SET state = 'succeeded' WHERE id = 'other'")
+                conn.commit()
+            self.assertEqual(self.job_queue.claim_next()["id"], douyin)
+
+    def test_resumed_job_skips_finished_pairs(self):
+        class FakeApp:
+            def __init__(self, file_path, account_file, fail=False):
+                self.file_path = file_path
+                self.account_file = account_file
+                self.fail = fail
+
+            async def main(self):
+                published.append((self.file_path, self.account_file))
+                if self.fail and len(published) < 4:
+                    raise RuntimeError("network down")
+
+        published = []
+
+        def publisher(**kwargs):
+            apps = [FakeApp("a.mp4", "x.json"), FakeApp("b.mp4", "x.json", fail=True), FakeApp("a.mp4", "y.json")]
+            asyncio.run(postVideo.run_uploads(apps, "douyin"))
+
+        with patch.dict(publish_jobs.PUBLISHERS, {3: publisher}):
+            job_id = self.job_queue.submit(3, {})
+            self.job_queue.run_pending()
+            self.assertEqual(len(self.job_queue.get(job_id)["donePairs"]), 2)
+
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("UPDATE publish_jobs SET run_at = 0")
+                conn.commit()
+            self.job_queue.run_pending()
+
+        self.assertEqual(published[3:], [("b.mp4", "x.json")])
+        job = self.job_queue.get(job_id)
+        self.assertEqual(job["state"], "succeeded")
+        self.assertEqual(len(job["donePairs"]), 3)
+
+    def test_jobs_share_one_event_loop_and_browser_pool(self):
+        seen = []
+
+        class FakeApp:
+            account_file = "x.json"
+            file_path = "a.mp4"
+
+            async def main(self):
+                seen.append((asyncio.get_running_loop(), browser_pool.get_browser_pool()))
+
+        def publisher(**kwargs):
+            postVideo.run_publish([FakeApp()], "douyin")
+
+        with patch.dict(publish_jobs.PUBLISHERS, {3: publisher}):
+            first = self.job_queue.submit(3, {})
+            second = self.job_queue.submit(3, {})
+            self.job_queue.run_pending()
+            self.assertEqual(self.job_queue.get(first)["state"], "succeeded")
+            self.assertEqual(self.job_queue.get(second)["state"], "succeeded")
+            # 两个任务跑在同一个常驻循环里，池在任务之间没有关闭
+            self.assertEqual(len(seen), 2)
+            self.assertIs(seen[0][0], seen[1][0])
+            self.assertIs(seen[0][1], seen[1][1])
+            self.assertIn(seen[0][0], browser_pool._pool_users)
+
+        self.job_queue.stop()
+        self.assertNotIn(seen[0][0], browser_pool._pool_users)
+
+    def test_ensure_table_migrates_old_schema(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "CREATE TABLE publish_jobs (id TEXT PRIMARY KEY, type INTEGER NOT NULL, payload TEXT NOT NULL, "
+                "state TEXT NOT NULL DEFAULT 'queued', error TEXT, created_at REAL NOT NULL, started_at REAL, "
+                "finished_at REAL)"
+            )
+            conn.execute("INSERT INTO publish_jobs (id, type, payload, created_at) VALUES ('old', 2, '{}', 1)")
+            conn.commit()
+
+        self.job_queue.ensure_table()
+
+        with sqlite3.connect(self.db_path) as conn:
+            indexes = [row[1] for row in conn.execute("PRAGMA index_list(publish_jobs)")]
+        self.assertIn("idx_publish_jobs_state_run_at", indexes)
+        self.assertEqual(self.job_queue.claim_next()["id"], "old")
+
+
+if __name__ == "__main__":
+    unittest.main()
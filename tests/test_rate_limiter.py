@@ -0,0 +1,169 @@
+import asyncio
+import sys
+import tempfile
+import time
+import types
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+if "loguru" not in sys.modules:
+    loguru_mod = types.ModuleType("loguru")
+
+    class _DummyLogger:
+        def add(self, *args, **kwargs):
+            return 1
+
+        def remove(self, *args, **kwargs):
+            return None
+
+        def bind(self, **kwargs):
+            return self
+
+        def __getattr__(self, _name):
+            def _noop(*args, **kwargs):
+                return None
+
+            return _noop
+
+    loguru_mod.logger = _DummyLogger()
+    sys.modules["loguru"] = loguru_mod
+
+if "playwright" not in sys.modules:
+    sys.modules["playwright"] = types.ModuleType("playwright")
+if "playwright.async_api" not in sys.modules:
+    async_api = types.ModuleType("playwright.async_api")
+    async_api.Playwright = object
+    async_api.Page = object
+
+    async def _async_playwright_stub():
+        raise RuntimeError("playwright is not available in test environment")
+
+    async_api.async_playwright = _async_playwright_stub
+    sys.modules["playwright.async_api"] = async_api
+
+from myUtils import postVideo, publish_jobs
+from utils.rate_limiter import RateLimitedError, RateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_per_hour_and_min_interval(self):
+        clock = FakeClock()
+        bucket = TokenBucket(per_hour=2, min_interval=600, clock=clock)
+        self.assertEqual(bucket.delay(), 0)
+        bucket.consume()
+        self.assertEqual(bucket.delay(), 600)
+        clock.now += 600
+        self.assertEqual(bucket.delay(), 0)
+        bucket.consume()
+        # 两个令牌都用完，按每小时 2 个补充，还差的部分需要等待
+        self.assertAlmostEqual(bucket.delay(), 1200)
+        clock.now += 1200
+        self.assertAlmostEqual(bucket.delay(), 0)
+
+
+class RateLimiterTests(unittest.TestCase):
+    def test_platform_and_account_buckets(self):
+        clock = FakeClock()
+        limiter = RateLimiter({"douyin": {"per_hour": 3, "account_min_interval": 60}}, clock=clock)
+        self.assertEqual(limiter.reserve("douyin", "/cookies/a.json"), 0)
+        # 同一账号按文件名识别，和完整路径是同一个
+        self.assertEqual(limiter.delay("douyin", ["a.json"]), 60)
+        self.assertEqual(limiter.delay("douyin", ["b.json"]), 0)
+        self.assertEqual(limiter.reserve("douyin", "b.json"), 0)
+        self.assertEqual(limiter.reserve("douyin", "c.json"), 0)
+        self.assertGreater(limiter.reserve("douyin", "d.json"), 0)
+        self.assertEqual(limiter.reserve("kuaishou", "a.json"), 0)
+        self.assertIn("douyin:a.json", limiter.snapshot())
+
+
+class RateLimitedQueueTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmpdir.name) / "database.db"
+        self.limits = {"douyin": {"account_min_interval": 600}}
+        self.limiter = RateLimiter(self.limits, db_path=self.db_path)
+        self.job_queue = publish_jobs.PublishJobQueue(self.db_path, workers=0, rate_limiter=self.limiter)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_limited_account_is_skipped_for_other_ready_jobs(self):
+        calls = []
+        # 另一个 worker 进程（独立的限速器实例）刚用 a.json 发布过
+        RateLimiter(self.limits, db_path=self.db_path).reserve("douyin", "a.json")
+
+        with patch.dict(publish_jobs.PUBLISHERS, {3: lambda **kw: calls.append(kw["account_file"])}):
+            limited = self.job_queue.submit(3, {"account_file": ["a.json"]})
+            other = self.job_queue.submit(3, {"account_file": ["b.json"]})
+            self.job_queue.run_pending()
+
+        self.assertEqual(calls, [["b.json"]])
+        self.assertEqual(self.job_queue.get(limited)["state"], "queued")
+        self.assertEqual(self.job_queue.get(other)["state"], "succeeded")
+        # 认领时已占用 b.json 的额度，其他进程也看得到
+        self.assertGreater(RateLimiter(self.limits, db_path=self.db_path).delay("douyin", ["b.json"]), 500)
+        self.assertIn("douyin:b.json", self.limiter.snapshot())
+
+    def test_claims_from_several_workers_share_one_budget(self):
+        limits = {"douyin": {"per_hour": 2}}
+        job_queues = [publish_jobs.PublishJobQueue(self.db_path, workers=0,
+                                                   rate_limiter=RateLimiter(limits, db_path=self.db_path))
+                      for _ in range(3)]
+        for i in range(4):
+            job_queues[0].submit(3, {"account_file": [f"{i}.json"]})
+
+        claimed = [job for job in (job_queue.claim_next() for job_queue in job_queues * 2) if job is not None]
+
+        self.assertEqual(len(claimed), 2)
+
+    def test_spacing_within_a_job_requeues_without_using_an_attempt(self):
+        class FakeApp:
+            def __init__(self, file_path):
+                self.account_file = "/cookies/a.json"
+                self.file_path = file_path
+
+            async def main(self):
+                published.append(self.file_path)
+
+        published = []
+
+        def publisher(**kwargs):
+            asyncio.run(postVideo.run_uploads([FakeApp("1.mp4"), FakeApp("2.mp4")], "douyin"))
+
+        with patch.dict(publish_jobs.PUBLISHERS, {3: publisher}):
+            job_id = self.job_queue.submit(3, {"account_file": ["a.json"]})
+            self.job_queue.run_pending()
+
+        self.assertEqual(published, ["1.mp4"])
+        job = self.job_queue.get(job_id)
+        self.assertEqual((job["state"], job["attempts"]), ("queued", 0))
+        self.assertEqual(len(job["donePairs"]), 1)
+        self.assertGreater(job["runAt"], time.time() + 500)
+        self.assertIn("发布过于频繁", job["error"])
+
+    @patch.object(postVideo, "rate_limiter", RateLimiter({"douyin": {"account_min_interval": 600}}))
+    def test_run_uploads_raises_rate_limited(self):
+        class FakeApp:
+            account_file = "a.json"
+            file_path = "a.mp4"
+
+            async def main(self):
+                pass
+
+        with self.assertRaises(RateLimitedError) as ctx:
+            asyncio.run(postVideo.run_uploads([FakeApp(), FakeApp()], "douyin"))
+        self.assertAlmostEqual(ctx.exception.retry_after, 600, delta=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import asyncio
+import unittest
+
+from utils.base_social_media import route_pattern, set_init_script, set_route_filter, should_block
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resource_type = resource_type
+
+
+class FakeRoute:
+    def __init__(self, url, resource_type):
+        self.request = FakeRequest(url, resource_type)
+        self.result = None
+
+    async def abort(self):
+        self.result = "abort"
+
+    async def continue_(self):
+        self.result = "continue"
+
+
+class FakeContext:
+    def __init__(self):
+        self.routes = []
+        self.scripts = []
+
+    async def add_init_script(self, script=None, path=None):
+        self.scripts.append(script)
+
+    async def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+
+class ShouldBlockTests(unittest.TestCase):
+    def test_check_profile_blocks_images_and_fonts(self):
+        self.assertTrue(should_block("douyin", "check", "https://p3.douyinpic.com/a.png", "image"))
+        self.assertTrue(should_block("douyin", "check", "https://lf.bytecdn.com/a.woff2", "font"))
+        self.assertFalse(should_block("douyin", "check", "https://creator.douyin.com/upload", "document"))
+
+    def test_upload_profile_keeps_images(self):
+        self.assertFalse(should_block("douyin", "upload", "https://p3.douyinpic.com/a.png", "image"))
+        self.assertTrue(should_block("douyin", "upload", "https://v.douyin.com/a.mp4", "media"))
+
+    def test_platform_beacons_blocked_in_every_profile(self):
+        url = "https://mcs.zijieapi.com/list"
+        self.assertTrue(should_block("douyin", "upload", url, "xhr"))
+        self.assertTrue(should_block("douyin", "check", url, "fetch"))
+        self.assertFalse(should_block("kuaishou", "upload", url, "xhr"))
+
+    def test_allow_list_wins(self):
+        self.assertFalse(should_block("douyin", "check", "https://verify.zijieapi.com/captcha/bg.png", "image"))
+
+    def test_first_party_api_paths_are_not_blocked(self):
+        for url in ("https://creator.douyin.com/track/list", "https://edith.xiaohongshu.com/api/collect/add"):
+            self.assertFalse(should_block("douyin", "upload", url, "xhr"))
+        self.assertTrue(should_block("douyin", "upload", "https://www.google-analytics.com/collect?v=1", "xhr"))
+
+
+class RoutePatternTests(unittest.TestCase):
+    def test_only_filtered_requests_are_routed(self):
+        pattern = route_pattern("douyin", "check")
+        self.assertTrue(pattern.search("https://mcs.zijieapi.com/list"))
+        self.assertTrue(pattern.search("https://p3.douyinpic.com/a.png?x=1"))
+        self.assertFalse(pattern.search("https://creator.douyin.com/web/api/media/user/info/"))
+        self.assertFalse(pattern.search("https://creator.douyin.com/track/list"))
+
+    def test_upload_requests_never_reach_the_handler(self):
+        for profile in ("check", "upload"):
+            pattern = route_pattern("douyin", profile)
+            self.assertFalse(pattern.search("https://tos-d-x.snssdk.com/upload/v1/video.mp4"))
+            self.assertFalse(pattern.search("https://vod.bytedanceapi.com/?Action=ApplyUploadInner"))
+
+
+class RouteFilterTests(unittest.TestCase):
+    def test_handler_aborts_or_continues(self):
+        async def run():
+            context = FakeContext()
+            await set_route_filter(context, "xiaohongshu", "check")
+            pattern, handler = context.routes[0]
+            blocked = FakeRoute("https://sns-img.xhscdn.com/a.jpg", "image")
+            allowed = FakeRoute("https://creator.xiaohongshu.com/api/user", "xhr")
+            await handler(blocked)
+            await handler(allowed)
+            return pattern, blocked.result, allowed.result
+
+        self.assertEqual(asyncio.run(run()), (route_pattern("xiaohongshu", "check"), "abort", "continue"))
+
+    def test_set_init_script_only_filters_with_profile(self):
+        async def run():
+            plain, filtered = FakeContext(), FakeContext()
+            await set_init_script(plain)
+            await set_init_script(filtered, platform="tencent", profile="upload")
+            return len(plain.routes), len(filtered.routes), len(filtered.scripts)
+
+        self.assertEqual(asyncio.run(run()), (0, 1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import asyncio
+import sys
+import types
+import unittest
+from unittest.mock import patch
+
+
+if "loguru" not in sys.modules:
+    loguru_mod = types.ModuleType("loguru")
+
+    class _DummyLogger:
+        def add(self, *args, **kwargs):
+            return 1
+
+        def remove(self, *args, **kwargs):
+            return None
+
+        def bind(self, **kwargs):
+            return self
+
+        def __getattr__(self, _name):
+            def _noop(*args, **kwargs):
+                return None
+
+            return _noop
+
+    loguru_mod.logger = _DummyLogger()
+    sys.modules["loguru"] = loguru_mod
+
+if "playwright" not in sys.modules:
+    sys.modules["playwright"] = types.ModuleType("playwright")
+if "playwright.async_api" not in sys.modules:
+    async_api = types.ModuleType("playwright.async_api")
+    async_api.Playwright = object
+    async_api.Page = object
+
+    async def _async_playwright_stub():
+        raise RuntimeError("playwright is not available in test environment")
+
+    async_api.async_playwright = _async_playwright_stub
+    sys.modules["playwright.async_api"] = async_api
+
+from myUtils import postVideo
+
+
+class FakeApp:
+    running = 0
+    peak = 0
+    log = []
+
+    def __init__(self, account_file, name, fail=False):
+        self.account_file = account_file
+        self.name = name
+        self.fail = fail
+
+    async def main(self):
+        cls = type(self)
+        cls.running += 1
+        cls.peak = max(cls.peak, cls.running)
+        cls.log.append(("start", self.account_file, self.name))
+        await asyncio.sleep(0.01)
+        cls.log.append(("end", self.account_file, self.name))
+        cls.running -= 1
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+
+
+class RunUploadsTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        FakeApp.running = 0
+        FakeApp.peak = 0
+        FakeApp.log = []
+
+    async def test_accounts_run_in_parallel_but_each_account_is_serial(self):
+        apps = [FakeApp(account, f"{account}-{i}") for i in range(2) for account in ("a.json", "b.json", "c.json")]
+
+        with patch.object(postVideo, "PUBLISH_CONCURRENCY", 8):
+            await postVideo.run_uploads(apps, "douyin")
+
+        self.assertEqual(FakeApp.peak, 3)
+        for account in ("a.json", "b.json", "c.json"):
+            events = [(event, name) for event, acc, name in FakeApp.log if acc == account]
+            self.assertEqual(events, [
+                ("start", f"{account}-0"), ("end", f"{account}-0"),
+                ("start", f"{account}-1"), ("end", f"{account}-1"),
+            ])
+
+    async def test_platform_limit_caps_concurrency(self):
+        apps = [FakeApp(f"{i}.json", str(i)) for i in range(5)]
+
+        with patch.object(postVideo, "PUBLISH_CONCURRENCY", 8), \
+                patch.object(postVideo, "PLATFORM_CONCURRENCY", {"kuaishou": 2}):
+            await postVideo.run_uploads(apps, "kuaishou")
+
+        self.assertEqual(FakeApp.peak, 2)
+        self.assertEqual(len([item for item in FakeApp.log if item[0] == "end"]), 5)
+
+    async def test_concurrent_batches_share_the_limits(self):
+        batches = [[FakeApp(f"{batch}-{i}.json", f"{batch}-{i}") for i in range(3)] for batch in range(2)]
+
+        with patch.object(postVideo, "PUBLISH_CONCURRENCY", 8), \
+                patch.object(postVideo, "PLATFORM_CONCURRENCY", {"kuaishou": 2}):
+            await asyncio.gather(*(postVideo.run_uploads(apps, "kuaishou") for apps in batches))
+
+        # 同一个循环里的两批任务合计不超过平台上限
+        self.assertEqual(FakeApp.peak, 2)
+        self.assertEqual(len([item for item in FakeApp.log if item[0] == "end"]), 6)
+
+    async def test_failure_does_not_stop_other_uploads(self):
+        apps = [FakeApp("a.json", "a-0", fail=True), FakeApp("a.json", "a-1"), FakeApp("b.json", "b-0")]
+
+        with self.assertRaises(RuntimeError) as ctx:
+            await postVideo.run_uploads(apps, "tencent")
+
+        self.assertIn("1/3", str(ctx.exception))
+        self.assertEqual(len([item for item in FakeApp.log if item[0] == "end"]), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import asyncio
+import unittest
+
+from utils.step_budget import STEP_BUDGETS, StepBudget, StepBudgetExceeded, run_step
+
+
+class StepBudgetTests(unittest.TestCase):
+    def test_default_budget_comes_from_phase(self):
+        async def run():
+            return StepBudget("douyin", "publish").budget
+
+        self.assertEqual(asyncio.run(run()), STEP_BUDGETS["publish"])
+
+    def test_retry_fails_with_phase_and_elapsed(self):
+        async def run():
+            budget = StepBudget("douyin", "publish", budget=0.05, interval=0.01)
+            while True:
+                await budget.retry()
+
+        with self.assertRaises(StepBudgetExceeded) as ctx:
+            asyncio.run(run())
+        error = ctx.exception
+        self.assertEqual((error.platform, error.phase), ("douyin", "publish"))
+        self.assertGreaterEqual(error.elapsed, 0.05)
+        self.assertIn("publish", str(error))
+
+    def test_retry_counts_attempts_within_budget(self):
+        async def run():
+            budget = StepBudget("tencent", "upload", budget=5, interval=0)
+            for _ in range(3):
+                await budget.retry()
+            return budget.attempts
+
+        self.assertEqual(asyncio.run(run()), 3)
+
+    def test_run_step_returns_result_or_fails(self):
+        async def quick():
+            return "ok"
+
+        self.assertEqual(asyncio.run(run_step("kuaishou", "schedule", quick())), "ok")
+        with self.assertRaises(StepBudgetExceeded) as ctx:
+            asyncio.run(run_step("kuaishou", "schedule", asyncio.sleep(1), budget=0.01))
+        self.assertEqual(ctx.exception.phase, "schedule")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from myUtils import thumbnails
+from myUtils.thumbnails import ThumbnailCache
+
+
+class ThumbnailCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.source = Path(self.tmpdir.name)
+        (self.source / "clip.mp4").write_bytes(b"video")
+        (self.source / "cover.png").write_bytes(b"image")
+        self.cache = ThumbnailCache(source_dir=self.source)
+        self.calls = []
+
+        def fake_extract(src, dst, max_edge, seek):
+            self.calls.append(("frame", Path(src).name))
+            Path(dst).write_bytes(b"poster")
+
+        def fake_render(src, dst, max_edge, image_format):
+            self.calls.append(("render", Path(src).name))
+            Path(dst).write_bytes(b"thumb")
+
+        self.patches = [
+            patch.object(thumbnails, "extract_frame", side_effect=fake_extract),
+            patch.object(thumbnails, "render_image", side_effect=fake_render),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.tmpdir.cleanup()
+
+    def test_video_gets_poster_and_thumbnail_from_the_poster(self):
+        self.cache.submit("clip.mp4").result(timeout=5)
+        self.assertEqual(self.calls, [("frame", "clip.mp4"), ("render", "clip.mp4.poster.jpg")])
+        self.assertEqual(self.cache.get("clip.mp4", "poster").read_bytes(), b"poster")
+        self.assertEqual(self.cache.get("clip.mp4").read_bytes(), b"thumb")
+        # 已生成的缩略图直接返回，不再重复生成
+        self.cache.submit("clip.mp4").result(timeout=5)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual([p.name for p in self.cache.cache_dir.iterdir() if p.name.startswith(".")], [])
+
+    def test_image_thumbnail_generated_on_demand(self):
+        thumb = self.cache.get("cover.png", "poster")
+        self.assertEqual(thumb, self.cache.path_for("cover.png", "thumb"))
+        self.assertEqual(self.calls, [("render", "cover.png")])
+
+    def test_concurrent_requests_share_one_job(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_extract(src, dst, max_edge, seek):
+            started.set()
+            release.wait(5)
+            self.calls.append(("frame", Path(src).name))
+            Path(dst).write_bytes(b"poster")
+
+        with patch.object(thumbnails, "extract_frame", side_effect=slow_extract):
+            first = self.cache.submit("clip.mp4")
+            self.assertTrue(started.wait(5))
+            self.assertIs(self.cache.submit("clip.mp4"), first)
+            release.set()
+            first.result(timeout=5)
+        self.assertEqual(self.calls.count(("frame", "clip.mp4")), 1)
+
+    def test_failures_are_remembered_and_discard_cleans_up(self):
+        with patch.object(thumbnails, "extract_frame", side_effect=RuntimeError("no ffmpeg")):
+            self.assertIsNone(self.cache.get("clip.mp4"))
+        self.assertIsNone(self.cache.get("clip.mp4"))
+        self.assertEqual(self.calls, [])
+
+        self.cache.discard("clip.mp4")
+        self.assertIsNotNone(self.cache.get("clip.mp4"))
+        self.cache.discard("clip.mp4")
+        self.assertFalse(self.cache.path_for("clip.mp4").exists())
+        self.assertIsNone(self.cache.get("missing.mp4"))
+
+
+if __name__ == "__main__":
+    unittest.main()
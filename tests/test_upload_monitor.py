@@ -0,0 +1,109 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from utils.upload_monitor import UploadMonitor, format_progress
+
+
+class FakePage:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def emit(self, event, payload):
+        for handler in self.handlers.get(event, []):
+            handler(payload)
+
+
+class FakeRequest:
+    def __init__(self, url, headers):
+        self.url = url
+        self.headers = headers
+
+
+class FakeResponse:
+    def __init__(self, url, ok=True):
+        self.url = url
+        self.ok = ok
+
+
+class UploadMonitorTests(unittest.IsolatedAsyncioTestCase):
+    async def test_commit_response_completes_wait_immediately(self):
+        page = FakePage()
+        monitor = UploadMonitor(page, "douyin")
+        checks = []
+
+        async def dom_check():
+            checks.append(1)
+            return False
+
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.01, page.emit, "response", FakeResponse("https://vod.bytedanceapi.com/?Action=CommitUploadInner"))
+        started = loop.time()
+
+        self.assertTrue(await monitor.wait_until(dom_check, interval=5))
+        self.assertLess(loop.time() - started, 1)
+        self.assertEqual(len(checks), 1)
+        self.assertEqual(monitor.progress, 100)
+
+    async def test_failed_commit_response_is_ignored(self):
+        page = FakePage()
+        monitor = UploadMonitor(page, "tencent")
+        page.emit("response", FakeResponse("https://channels.weixin.qq.com/completepartuploaddfs", ok=False))
+
+        self.assertFalse(monitor.completed.is_set())
+
+    async def test_dom_check_is_the_fallback(self):
+        monitor = UploadMonitor(FakePage(), "kuaishou")
+        pending = []
+        results = iter([False, False, True])
+
+        async def dom_check():
+            return next(results)
+
+        async def on_pending(progress):
+            pending.append(progress)
+
+        self.assertTrue(await monitor.wait_until(dom_check, on_pending, interval=0.01))
+        self.assertEqual(pending, [None, None])
+
+    async def test_wait_gives_up_after_timeout(self):
+        monitor = UploadMonitor(FakePage(), "kuaishou")
+
+        async def dom_check():
+            return False
+
+        self.assertFalse(await monitor.wait_until(dom_check, interval=0.01, timeout=0.03))
+
+    async def test_progress_from_chunk_requests(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(b"x" * 1000)
+        self.addCleanup(os.remove, f.name)
+        page = FakePage()
+        monitor = UploadMonitor(page, "tencent", f.name)
+
+        page.emit("requestfinished", FakeRequest("https://x/uploadpartdfs?part=1", {"content-length": "250"}))
+        self.assertEqual(monitor.progress, 25)
+        page.emit("requestfinished", FakeRequest("https://x/other", {"content-length": "500"}))
+        self.assertEqual(monitor.progress, 25)
+        page.emit("requestfinished", FakeRequest("https://x/uploadpartdfs?part=2", {"content-length": "750"}))
+        # 分片发完但还没提交时停在 99%
+        self.assertEqual(monitor.progress, 99)
+        self.assertEqual(format_progress(monitor.progress), " 99%")
+
+    async def test_progress_from_content_range(self):
+        page = FakePage()
+        monitor = UploadMonitor(page, "douyin")
+
+        page.emit("requestfinished", FakeRequest("https://tos/upload/v1/abc?partNumber=2",
+                                                 {"content-length": "10", "content-range": "bytes 0-499/2000"}))
+
+        self.assertEqual(monitor.progress, 25)
+        self.assertEqual(format_progress(None), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import asyncio
+import unittest
+
+from utils.waits import WaitStats, settle, wait_for_selector, wait_until
+
+
+class FakePage:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    async def wait_for_selector(self, selector, state="visible", timeout=None):
+        self.calls.append((selector, state, timeout))
+        if self.fail:
+            raise TimeoutError("timeout")
+
+    async def wait_for_load_state(self, state, timeout=None):
+        self.calls.append((state, timeout))
+
+
+class WaitStatsTests(unittest.TestCase):
+    def test_records_count_timeouts_and_max(self):
+        stats = WaitStats()
+        stats.record("a", 0.5, False)
+        stats.record("a", 1.5, True)
+        stats.record(None, 3, True)
+
+        snapshot = stats.snapshot()
+        self.assertEqual(list(snapshot), ["a"])
+        self.assertEqual(snapshot["a"]["count"], 2)
+        self.assertEqual(snapshot["a"]["timeouts"], 1)
+        self.assertEqual(snapshot["a"]["total_seconds"], 2.0)
+        self.assertEqual(snapshot["a"]["max_seconds"], 1.5)
+
+
+class WaitHelperTests(unittest.TestCase):
+    def test_wait_until_returns_as_soon_as_check_passes(self):
+        calls = []
+
+        async def check():
+            calls.append(1)
+            return len(calls) >= 3
+
+        result = asyncio.run(wait_until(check, timeout=5, interval=0.01))
+        self.assertTrue(result)
+        self.assertEqual(len(calls), 3)
+
+    def test_wait_until_times_out_without_raising(self):
+        async def check():
+            raise RuntimeError("not ready")
+
+        result = asyncio.run(wait_until(check, timeout=0.05, interval=0.01))
+        self.assertIsNone(result)
+
+    def test_wait_for_selector_reports_result(self):
+        page = FakePage()
+        self.assertTrue(asyncio.run(wait_for_selector(page, "div.ok", timeout=2)))
+        self.assertEqual(page.calls, [("div.ok", "visible", 2000)])
+        self.assertFalse(asyncio.run(wait_for_selector(FakePage(fail=True), "div.missing", timeout=1)))
+
+    def test_wait_for_selector_inside_a_frame_locator(self):
+        calls = []
+
+        class FakeLocator:
+            def __init__(self, selector):
+                self.selector = selector
+
+            @property
+            def first(self):
+                return self
+
+            async def wait_for(self, state="visible", timeout=None):
+                calls.append((self.selector, state, timeout))
+
+        class FakeFrameLocator:
+            def locator(self, selector):
+                return FakeLocator(selector)
+
+        self.assertTrue(asyncio.run(wait_for_selector(FakeFrameLocator(), "span.hour", state="hidden", timeout=1)))
+        self.assertEqual(calls, [("span.hour", "hidden", 1000)])
+
+    def test_settle_never_raises(self):
+        page = FakePage()
+        self.assertTrue(asyncio.run(settle(page, timeout=1)))
+        self.assertEqual(page.calls, [("networkidle", 1000)])
+        self.assertFalse(asyncio.run(settle(object())))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import sys
+import types
+import unittest
+from unittest.mock import patch
+
+
+if "playwright" not in sys.modules:
+    sys.modules["playwright"] = types.ModuleType("playwright")
+if "playwright.sync_api" not in sys.modules:
+    sync_api = types.ModuleType("playwright.sync_api")
+
+    def _sync_playwright_stub():
+        raise RuntimeError("playwright is not available in test environment")
+
+    sync_api.sync_playwright = _sync_playwright_stub
+    sys.modules["playwright.sync_api"] = sync_api
+
+if "requests" not in sys.modules:
+    sys.modules["requests"] = types.ModuleType("requests")
+
+from uploader.xhs_uploader import main as xhs_main
+from utils.network import RetryPolicy
+
+
+class FakePage:
+    def __init__(self, browser):
+        self.browser = browser
+
+    def goto(self, url):
+        self.browser.gotos += 1
+
+    def reload(self):
+        pass
+
+    def wait_for_function(self, expression, timeout=None):
+        pass
+
+    def evaluate(self, script, args):
+        self.browser.evaluations += 1
+        # 第一次签名函数还没就绪
+        if self.browser.evaluations == 1:
+            raise RuntimeError("window._webmsxyw is not a function")
+        return {"X-s": "signed", "X-t": 123}
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages = []
+
+    def add_init_script(self, path=None):
+        pass
+
+    def add_cookies(self, cookies):
+        pass
+
+    def new_page(self):
+        self.browser.new_pages += 1
+        page = FakePage(self.browser)
+        self.pages.append(page)
+        return page
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.gotos = 0
+        self.evaluations = 0
+        self.new_pages = 0
+        self.closed = False
+
+    def new_context(self):
+        return FakeContext(self)
+
+    def close(self):
+        self.closed = True
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.launches = []
+        self.chromium = self
+
+    def launch(self, headless=None):
+        browser = FakeBrowser()
+        self.launches.append(browser)
+        return browser
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class SignLocalTests(unittest.TestCase):
+    def test_retries_reuse_one_browser(self):
+        playwright = FakePlaywright()
+
+        with patch.object(xhs_main, "sync_playwright", lambda: playwright), \
+                patch.object(xhs_main, "SIGN_RETRY_POLICY", RetryPolicy(max_attempts=3, base_delay=0)):
+            signs = xhs_main.sign_local("/api/sns/web/v1/feed", {"a": 1}, a1="a1")
+
+        self.assertEqual(signs, {"x-s": "signed", "x-t": "123"})
+        self.assertEqual(len(playwright.launches), 1)
+        browser = playwright.launches[0]
+        self.assertEqual((browser.evaluations, browser.gotos, browser.new_pages), (2, 2, 1))
+        self.assertTrue(browser.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,13 +4,16 @@ from datetime import datetime
 
 from playwright.async_api import Playwright, async_playwright, Page
 import os
-import time
-import asyncio
 
 from conf import LOCAL_CHROME_PATH, LOCAL_CHROME_HEADLESS
-from utils.base_social_media import set_init_script
+from utils.account_lease import save_storage_state
+from utils.base_social_media import set_init_script, set_route_filter
+from utils.browser_pool import get_browser_pool, use_browser_pool
+from utils.cookie_cache import cookie_cache
 from utils.log import baijiahao_logger
-from utils.network import async_retry
+from utils.step_budget import StepBudget
+from utils.network import UploadRejectedError, async_retry
+from utils.waits import settle, wait_for_selector, wait_until
 
 
 async def baijiahao_cookie_gen(account_file):
@@ -39,15 +42,16 @@ async def cookie_auth(account_file):
     async with async_playwright() as playwright:
         browser = await playwright.chromium.launch(headless=LOCAL_CHROME_HEADLESS)
         context = await browser.new_context(storage_state=account_file)
-        context = await set_init_script(context)
+        context = await set_init_script(context, platform="baijiahao", profile="check")
         # 创建一个新的页面
         page = await context.new_page()
         # 访问指定的 URL
         await page.goto("https://baijiahao.baidu.com/builder/rc/home")
-        await page.wait_for_timeout(timeout=5000)
+        # 首页加载完成后再判断是否出现登录入口，最多等 5 秒
+        await settle(page, timeout=5, label="baijiahao.cookie_check")
 
         if await page.get_by_text('注册/登录百家号').count():
-            baijiahao_logger.error("等待5秒 cookie 失效")
+            baijiahao_logger.error("cookie 失效")
             return False
         else:
             baijiahao_logger.success("[+] cookie 有效")
@@ -90,9 +94,12 @@ class BaiJiaHaoVideo(object):
             except:
                 await page.locator('div.select-wrap').nth(0).click()
         # page.locator(f'div.rc-virtual-list-holder-inner >> text={publish_date_day}').click()
-        await page.wait_for_timeout(2000)
+        await wait_for_selector(page, f'div.rc-virtual-list  div.cheetah-select-item >> text={publish_date_day}',
+                                timeout=2, label="baijiahao.schedule_day")
         await page.locator(f'div.rc-virtual-list  div.cheetah-select-item >> text={publish_date_day}').click()
-        await page.wait_for_timeout(2000)
+        # 日期下拉收起后再展开小时下拉
+        await wait_for_selector(page, 'div.rc-virtual-list:visible', state="hidden", timeout=2,
+                                label="baijiahao.schedule_day_closed")
 
         # 改为随机点击一个 hour
         for _ in range(3):
@@ -102,14 +109,14 @@ class BaiJiaHaoVideo(object):
                 break
             except:
                 await page.locator('div.select-wrap').nth(1).click()
-        await page.wait_for_timeout(2000)
+        await wait_for_selector(page, 'div.rc-virtual-list:visible div.cheetah-select-item-option', timeout=2,
+                                label="baijiahao.schedule_hour")
         current_choice_hour = await page.locator('div.rc-virtual-list:visible div.cheetah-select-item-option').count()
-        await page.wait_for_timeout(2000)
         await page.locator('div.rc-virtual-list:visible div.cheetah-select-item-option').nth(
             random.randint(1, current_choice_hour-3)).click()
         # 2024.08.05 current_choice_hour的获取可能有问题，页面有7，这里获取了10，暂时硬编码至6
 
-        await page.wait_for_timeout(2000)
+        await settle(page, timeout=2, label="baijiahao.schedule_hour_confirm")
         await page.locator("button >> text=定时发布").click()
 
 
@@ -119,73 +126,79 @@ class BaiJiaHaoVideo(object):
         print("视频出错了，重新上传中")
 
     async def upload(self, playwright: Playwright) -> None:
-        # 使用 Chromium 浏览器启动一个浏览器实例
-        browser = await playwright.chromium.launch(headless=self.headless, executable_path=self.local_executable_path, proxy=self.proxy_setting)
-        # 创建一个浏览器上下文，使用指定的 cookie 文件
-        context = await browser.new_context(storage_state=f"{self.account_file}", user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.4324.150 Safari/537.36')
-        # context = await set_init_script(context)
-        await context.grant_permissions(['geolocation'])
-
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://baijiahao.baidu.com/builder/rc/edit?type=videoV2", timeout=60000)
-        baijiahao_logger.info(f"正在上传-------{self.title}.mp4")
-        # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
-        baijiahao_logger.info('正在打开主页...')
-        await page.wait_for_url("https://baijiahao.baidu.com/builder/rc/edit?type=videoV2", timeout=60000)
-
-        # 点击 "上传视频" 按钮
-        await page.locator("div[class^='video-main-container'] input").set_input_files(self.file_path)
-
-        # 等待页面跳转到指定的 URL
-        while True:
-            # 判断是是否进入视频发布页面，没进入，则自动等待到超时
-            try:
-                await page.wait_for_selector("div#formMain:visible")
-                break
-            except:
-                baijiahao_logger.info("正在等待进入视频发布页面...")
-                await asyncio.sleep(0.1)
-
-        # 填充标题和话题
-        # 这里为了避免页面变化，故使用相对位置定位：作品标题父级右侧第一个元素的input子元素
-        await asyncio.sleep(1)
-        baijiahao_logger.info("正在填充标题和话题...")
-        await self.add_title_tags(page)
-
-        upload_status = await self.uploading_video(page)
-        if not upload_status:
-            baijiahao_logger.error(f"发现上传出错了... 文件:{self.file_path}")
-            raise
-
-        # 判断视频封面图是否生成成功
-        while True:
-            baijiahao_logger.info("正在确认封面完成, 准备去点击定时/发布...")
-            if await page.locator("div.cheetah-spin-container img").count():
-                baijiahao_logger.info("封面已完成，点击定时/发布...")
-                break
-            else:
-                baijiahao_logger.info("等待封面生成...")
-                await asyncio.sleep(3)
-
-        await self.publish_video(page, self.publish_date)
-        await page.wait_for_timeout(2000)
-        if await page.locator('div.passMod_dialog-container >> text=百度安全验证:visible').count():
-            baijiahao_logger.error("出现验证，退出")
-            raise Exception("出现验证，退出")
-        await page.wait_for_url("https://baijiahao.baidu.com/builder/rc/clue**", timeout=5000)
-        baijiahao_logger.success("视频发布成功")
-
-        await context.storage_state(path=self.account_file)  # 保存cookie
-        baijiahao_logger.info('cookie更新完毕！')
-        await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
-        # 关闭浏览器上下文和浏览器实例
-        await context.close()
-        await browser.close()
-
-
-    @async_retry(timeout=300)  # 例如，最多重试3次，超时时间为180秒
+        # 从共享浏览器池取一个独立的浏览器上下文，使用指定的 cookie 文件
+        launch_options = {'headless': self.headless, 'executable_path': self.local_executable_path or None, 'proxy': self.proxy_setting}
+        async with get_browser_pool().new_context(playwright.chromium, launch_options, init_script=False, storage_state=f"{self.account_file}", user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.4324.150 Safari/537.36') as context:
+            # context = await set_init_script(context)
+            # 不注入反检测脚本，但仍拦截无用资源
+            await set_route_filter(context, "baijiahao", "upload")
+            await context.grant_permissions(['geolocation'])
+
+            # 创建一个新的页面
+            page = await context.new_page()
+            # 访问指定的 URL
+            await page.goto("https://baijiahao.baidu.com/builder/rc/edit?type=videoV2", timeout=60000)
+            baijiahao_logger.info(f"正在上传-------{self.title}.mp4")
+            # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
+            baijiahao_logger.info('正在打开主页...')
+            await page.wait_for_url("https://baijiahao.baidu.com/builder/rc/edit?type=videoV2", timeout=60000)
+
+            # 点击 "上传视频" 按钮
+            await page.locator("div[class^='video-main-container'] input").set_input_files(self.file_path)
+
+            # 等待页面跳转到指定的 URL
+            budget = StepBudget("baijiahao", "open_page", interval=0.1)
+            while True:
+                # 判断是是否进入视频发布页面，没进入，则自动等待到超时
+                try:
+                    await page.wait_for_selector("div#formMain:visible")
+                    break
+                except:
+                    baijiahao_logger.info("正在等待进入视频发布页面...")
+                    await budget.retry()
+
+            # 填充标题和话题
+            # 这里为了避免页面变化，故使用相对位置定位：作品标题父级右侧第一个元素的input子元素
+            await wait_for_selector(page, '[placeholder="添加标题获得更多推荐"]', timeout=5, label="baijiahao.title_input")
+            baijiahao_logger.info("正在填充标题和话题...")
+            await self.add_title_tags(page)
+
+            upload_status = await self.uploading_video(page)
+            if not upload_status:
+                baijiahao_logger.error(f"发现上传出错了... 文件:{self.file_path}")
+                raise UploadRejectedError(f"百家号视频上传失败: {self.file_path}")
+
+            # 判断视频封面图是否生成成功
+            budget = StepBudget("baijiahao", "upload", interval=3)
+            while True:
+                baijiahao_logger.info("正在确认封面完成, 准备去点击定时/发布...")
+                if await page.locator("div.cheetah-spin-container img").count():
+                    baijiahao_logger.info("封面已完成，点击定时/发布...")
+                    break
+                else:
+                    baijiahao_logger.info("等待封面生成...")
+                    await budget.retry()
+
+            await self.publish_video(page, self.publish_date)
+            verify_dialog = page.locator('div.passMod_dialog-container >> text=百度安全验证:visible')
+
+            async def publish_settled():
+                # 跳转到作品页或弹出安全验证，二者先出现的为准
+                return "/builder/rc/clue" in page.url or await verify_dialog.count() > 0
+
+            await wait_until(publish_settled, timeout=5, label="baijiahao.publish_result")
+            if await verify_dialog.count():
+                baijiahao_logger.error("出现验证，退出")
+                raise Exception("出现验证，退出")
+            await page.wait_for_url("https://baijiahao.baidu.com/builder/rc/clue**", timeout=5000)
+            baijiahao_logger.success("视频发布成功")
+
+            await save_storage_state(context, self.account_file)  # 保存cookie
+            cookie_cache.record(self.account_file, True)  # 刚发布成功，cookie 必然有效
+            baijiahao_logger.info('cookie更新完毕！')
+
+
+    @async_retry(timeout=300)  # 总时长不超过300秒，间隔指数退避
     async def uploading_video(self, page):
         while True:
             upload_failed = await page.locator('div .cover-overlay:has-text("上传失败")').count()
@@ -197,7 +210,9 @@ class BaiJiaHaoVideo(object):
             uploading = await page.locator('div .cover-overlay:has-text("上传中")').count()
             if uploading:
                 baijiahao_logger.info("正在上传视频中...")
-                await asyncio.sleep(2)  # 等待2秒再次检查
+                # 等“上传中”标识消失，最多 2 秒后再次检查
+                await wait_for_selector(page, 'div .cover-overlay:has-text("上传中")', state="detached", timeout=2,
+                                        label="baijiahao.uploading")
                 continue
 
             # 检查上传是否成功
@@ -212,7 +227,7 @@ class BaiJiaHaoVideo(object):
             try:
                 await schedule_element.click()
                 await page.wait_for_selector('div.select-wrap:visible', timeout=3000)
-                await page.wait_for_timeout(timeout=2000)
+                await settle(page, label="baijiahao.schedule_panel")
                 baijiahao_logger.info("开始点击发布定时...")
                 await self.set_schedule_time(page, publish_date)
                 break
@@ -220,7 +235,7 @@ class BaiJiaHaoVideo(object):
                 baijiahao_logger.error(f"定时发布失败: {e}")
                 raise  # 重新抛出异常，让重试装饰器捕获
 
-    @async_retry(timeout=300)  # 例如，最多重试3次，超时时间为180秒
+    @async_retry(timeout=300, max_retries=3, base_delay=2)  # 最多尝试3次，出现验证等不可重试的错误直接失败
     async def publish_video(self, page: Page, publish_date):
         if publish_date != 0:
             # 定时发布
@@ -245,8 +260,8 @@ class BaiJiaHaoVideo(object):
         await title_container.fill(self.title[:30])
 
     async def main(self):
-        async with async_playwright() as playwright:
-            await self.upload(playwright)
+        async with use_browser_pool() as pool:
+            await self.upload(await pool.get_playwright())
 
 
 
@@ -273,7 +288,7 @@ class BaiJiaHaoVideo(object):
 
         # 点击"全网"标签
         await page.locator('div.rounded-lg.border:has-text("全网")').click()
-        await asyncio.sleep(1)  # 这里延迟是为了方便眼睛直观的观看
+        await settle(page, timeout=1, label="baijiahao.ai2video_tab")
 
         # 点击 "上传视频" 按钮
         # await page.locator("div[class^='video-main-container'] input").set_input_files(self.file_path)
@@ -352,7 +367,8 @@ class BaiJiaHaoVideo(object):
                             
                             # 等待可能出现的"温馨提示"窗口
                             print(f"[检查] 是否出现温馨提示窗口")
-                            await page.wait_for_timeout(2000)  # 等待2秒，让窗口有时间显示
+                            await wait_for_selector(page, "div:has-text('温馨提示') >> visible=true", timeout=2,
+                                                    label="baijiahao.ai2video_tip")
                             
                             try:
                                 # 检查是否存在"温馨提示"窗口，设置较短的超时时间
@@ -414,21 +430,15 @@ class BaiJiaHaoVideo(object):
                             current_page_count = len(current_pages)
                             
                             # 等待新标签页打开（最多等待10秒）
-                            new_page = None
-                            max_wait_time = 10  # 最大等待时间（秒）
-                            start_time = time.time()
-                            
-                            while time.time() - start_time < max_wait_time:
-                                # 获取最新的页面列表
+                            async def opened_page():
+                                # 页面数量增加说明新标签页已打开，取最新打开的页面（通常是列表中的最后一个）
                                 pages = context.pages
-                                # 如果页面数量增加，说明新标签页已打开
-                                if len(pages) > current_page_count:
-                                    # 获取最新打开的页面（通常是列表中的最后一个）
-                                    new_page = pages[-1]
-                                    print(f"[发现] 新标签页已打开")
-                                    break
-                                # 短暂等待后再次检查
-                                await asyncio.sleep(0.5)
+                                return pages[-1] if len(pages) > current_page_count else None
+
+                            new_page = await wait_until(opened_page, timeout=10, interval=0.5,
+                                                        label="baijiahao.ai2video_new_page")
+                            if new_page:
+                                print(f"[发现] 新标签页已打开")
                             
                             # 如果找到新标签页，获取其标题和URL并保存
                             if new_page:
@@ -448,9 +458,8 @@ class BaiJiaHaoVideo(object):
                                     
                                     print(f"[保存] 标题和URL已保存到url.txt")
                                     
-                                    # 等待5秒后关闭新标签页
-                                    print(f"[等待] 5秒后将关闭新标签页")
-                                    await asyncio.sleep(5)
+                                    # 等新标签页加载空闲（最多5秒）后关闭
+                                    await settle(new_page, timeout=5, label="baijiahao.ai2video_new_page_idle")
                                     await new_page.close()
                                     print(f"[关闭] 新标签页已关闭")
                                 except Exception as e:
@@ -473,8 +482,9 @@ class BaiJiaHaoVideo(object):
                     if should_exit_while_loop:
                         break
                         
-                    # 每秒检查一次按钮状态
-                    await page.wait_for_timeout(1000)
+                    # 等按钮变为可点击，最多 1 秒后再次检查
+                    await wait_for_selector(page, "button:has-text('一键成片'):not([disabled])", timeout=1,
+                                            label="baijiahao.ai2video_button")
                 
                 # 检查是否需要跳出for循环
                 if should_exit_while_loop:
@@ -489,13 +499,9 @@ class BaiJiaHaoVideo(object):
 
         print(f"[循环完成] 准备关闭浏览器")
 
-        # 暂停 1000s
-        await asyncio.sleep(1000)  # 这里延迟是为了方便眼睛直观的观看
-
         # 退出前保存 storage 信息
-        await context.storage_state(path=self.account_file)  # 保存cookie
+        await save_storage_state(context, self.account_file)  # 保存cookie
         baijiahao_logger.info('cookie更新完毕！')
-        await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
         # 关闭浏览器上下文和浏览器实例
         await context.close()
         await browser.close()
@@ -4,18 +4,29 @@ from pathlib import Path
 
 from playwright.async_api import Playwright, async_playwright, Page
 import os
-import asyncio
 
 from conf import LOCAL_CHROME_PATH, LOCAL_CHROME_HEADLESS
+from utils.account_lease import save_storage_state
 from utils.base_social_media import set_init_script
+from utils.browser_pool import get_browser_pool, use_browser_pool
+from utils.cookie_cache import cookie_cache
+from utils.cookie_probe import probe_cookie
 from utils.log import douyin_logger
+from utils.page_capture import PageCapture
+from utils.step_budget import StepBudget, run_step
+from utils.upload_monitor import UploadMonitor, format_progress
+from utils.waits import settle, wait_for_selector, wait_until
 
 
 async def cookie_auth(account_file):
+    # 先用 HTTP 接口探测登录态，结论不明确时再开浏览器
+    flag = await probe_cookie(3, account_file)
+    if flag is not None:
+        return flag
     async with async_playwright() as playwright:
         browser = await playwright.chromium.launch(headless=LOCAL_CHROME_HEADLESS)
         context = await browser.new_context(storage_state=account_file)
-        context = await set_init_script(context)
+        context = await set_init_script(context, platform="douyin", profile="check")
         # 创建一个新的页面
         page = await context.new_page()
         # 访问指定的 URL
@@ -83,149 +94,147 @@ class DouYinVideo(object):
         label_element = page.locator("[class^='radio']:has-text('定时发布')")
         # 在选中的 label 元素下点击 checkbox
         await label_element.click()
-        await asyncio.sleep(1)
+        # 等日期输入框出现再填写，不再固定等待
+        await wait_for_selector(page, '.semi-input[placeholder="日期和时间"]', timeout=5, label="douyin.schedule_input")
         publish_date_hour = publish_date.strftime("%Y-%m-%d %H:%M")
 
-        await asyncio.sleep(1)
         await page.locator('.semi-input[placeholder="日期和时间"]').click()
         await page.keyboard.press("Control+KeyA")
         await page.keyboard.type(str(publish_date_hour))
         await page.keyboard.press("Enter")
 
-        await asyncio.sleep(1)
+        await settle(page, timeout=1, label="douyin.schedule_confirm")
 
     async def handle_upload_error(self, page):
         douyin_logger.info('视频出错了，重新上传中')
         await page.locator('div.progress-div [class^="upload-btn-input"]').set_input_files(self.file_path)
 
     async def upload(self, playwright: Playwright) -> None:
-        # 使用 Chromium 浏览器启动一个浏览器实例
-        if self.local_executable_path:
-            browser = await playwright.chromium.launch(headless=self.headless, executable_path=self.local_executable_path)
-        else:
-            browser = await playwright.chromium.launch(headless=self.headless)
-        # 创建一个浏览器上下文，使用指定的 cookie 文件
-        context = await browser.new_context(storage_state=f"{self.account_file}")
-        context = await set_init_script(context)
-
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://creator.douyin.com/creator-micro/content/upload")
-        douyin_logger.info(f'[+]正在上传-------{self.title}.mp4')
-        # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
-        douyin_logger.info(f'[-] 正在打开主页...')
-        await page.wait_for_url("https://creator.douyin.com/creator-micro/content/upload")
-        # 点击 "上传视频" 按钮
-        await page.locator("div[class^='container'] input").set_input_files(self.file_path)
-
-        # 等待页面跳转到指定的 URL 2025.01.08修改在原有基础上兼容两种页面
-        while True:
-            try:
-                # 尝试等待第一个 URL
-                await page.wait_for_url(
-                    "https://creator.douyin.com/creator-micro/content/publish?enter_from=publish_page", timeout=3000)
-                douyin_logger.info("[+] 成功进入version_1发布页面!")
-                break  # 成功进入页面后跳出循环
-            except Exception:
+        # 从共享浏览器池取一个独立的浏览器上下文，使用指定的 cookie 文件
+        launch_options = {'headless': self.headless, 'executable_path': self.local_executable_path or None}
+        async with get_browser_pool().new_context(playwright.chromium, launch_options,
+                                                  storage_state=f"{self.account_file}") as context:
+            context = await set_init_script(context, platform="douyin", profile="upload")
+
+            # 创建一个新的页面
+            page = await context.new_page()
+            # 在选择文件前开始监听上传接口
+            self.upload_monitor = UploadMonitor(page, "douyin", self.file_path)
+            # 重试时记录轻量快照，任务失败时才落盘
+            self.page_capture = PageCapture(page, "douyin")
+            # 访问指定的 URL
+            await page.goto("https://creator.douyin.com/creator-micro/content/upload")
+            douyin_logger.info(f'[+]正在上传-------{self.title}.mp4')
+            # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
+            douyin_logger.info(f'[-] 正在打开主页...')
+            await page.wait_for_url("https://creator.douyin.com/creator-micro/content/upload")
+            # 点击 "上传视频" 按钮
+            await page.locator("div[class^='container'] input").set_input_files(self.file_path)
+
+            # 等待页面跳转到指定的 URL 2025.01.08修改在原有基础上兼容两种页面
+            budget = StepBudget("douyin", "open_page")
+            while True:
                 try:
-                    # 如果第一个 URL 超时，再尝试等待第二个 URL
+                    # 尝试等待第一个 URL
                     await page.wait_for_url(
-                        "https://creator.douyin.com/creator-micro/content/post/video?enter_from=publish_page",
-                        timeout=3000)
-                    douyin_logger.info("[+] 成功进入version_2发布页面!")
-
+                        "https://creator.douyin.com/creator-micro/content/publish?enter_from=publish_page", timeout=3000)
+                    douyin_logger.info("[+] 成功进入version_1发布页面!")
                     break  # 成功进入页面后跳出循环
-                except:
-                    print("  [-] 超时未进入视频发布页面，重新尝试...")
-                    await asyncio.sleep(0.5)  # 等待 0.5 秒后重新尝试
-        # 填充标题和话题
-        # 检查是否存在包含输入框的元素
-        # 这里为了避免页面变化，故使用相对位置定位：作品标题父级右侧第一个元素的input子元素
-        await asyncio.sleep(1)
-        douyin_logger.info(f'  [-] 正在填充标题和话题...')
-        title_container = page.get_by_text('作品标题').locator("..").locator("xpath=following-sibling::div[1]").locator("input")
-        if await title_container.count():
-            await title_container.fill(self.title[:30])
-        else:
-            titlecontainer = page.locator(".notranslate")
-            await titlecontainer.click()
-            await page.keyboard.press("Backspace")
-            await page.keyboard.press("Control+KeyA")
-            await page.keyboard.press("Delete")
-            await page.keyboard.type(self.title)
-            await page.keyboard.press("Enter")
-        css_selector = ".zone-container"
-        for index, tag in enumerate(self.tags, start=1):
-            await page.type(css_selector, "#" + tag)
-            await page.press(css_selector, "Space")
-        douyin_logger.info(f'总共添加{len(self.tags)}个话题')
-        while True:
-            # 判断重新上传按钮是否存在，如果不存在，代表视频正在上传，则等待
-            try:
+                except Exception:
+                    try:
+                        # 如果第一个 URL 超时，再尝试等待第二个 URL
+                        await page.wait_for_url(
+                            "https://creator.douyin.com/creator-micro/content/post/video?enter_from=publish_page",
+                            timeout=3000)
+                        douyin_logger.info("[+] 成功进入version_2发布页面!")
+
+                        break  # 成功进入页面后跳出循环
+                    except:
+                        print("  [-] 超时未进入视频发布页面，重新尝试...")
+                        await budget.retry()  # 等待 0.5 秒后重新尝试，超出预算则失败
+            # 填充标题和话题
+            # 检查是否存在包含输入框的元素
+            # 这里为了避免页面变化，故使用相对位置定位：作品标题父级右侧第一个元素的input子元素
+            await wait_for_selector(page, 'text=作品标题', timeout=5, label="douyin.title_editor")
+            douyin_logger.info(f'  [-] 正在填充标题和话题...')
+            title_container = page.get_by_text('作品标题').locator("..").locator("xpath=following-sibling::div[1]").locator("input")
+            if await title_container.count():
+                await title_container.fill(self.title[:30])
+            else:
+                titlecontainer = page.locator(".notranslate")
+                await titlecontainer.click()
+                await page.keyboard.press("Backspace")
+                await page.keyboard.press("Control+KeyA")
+                await page.keyboard.press("Delete")
+                await page.keyboard.type(self.title)
+                await page.keyboard.press("Enter")
+            css_selector = ".zone-container"
+            for index, tag in enumerate(self.tags, start=1):
+                await page.type(css_selector, "#" + tag)
+                await page.press(css_selector, "Space")
+            douyin_logger.info(f'总共添加{len(self.tags)}个话题')
+            # 上传接口提交成功立即继续，页面上出现“重新上传”按钮作为兜底判断
+            async def uploaded():
                 #  新版：定位重新上传
-                number = await page.locator('[class^="long-card"] div:has-text("重新上传")').count()
-                if number > 0:
-                    douyin_logger.success("  [-]视频上传完毕")
-                    break
-                else:
-                    douyin_logger.info("  [-] 正在上传视频中...")
-                    await asyncio.sleep(2)
-
-                    if await page.locator('div.progress-div > div:has-text("上传失败")').count():
-                        douyin_logger.error("  [-] 发现上传出错了... 准备重试")
-                        await self.handle_upload_error(page)
-            except:
-                douyin_logger.info("  [-] 正在上传视频中...")
-                await asyncio.sleep(2)
-
-        if self.productLink and self.productTitle:
-            douyin_logger.info(f'  [-] 正在设置商品链接...')
-            await self.set_product_link(page, self.productLink, self.productTitle)
-            douyin_logger.info(f'  [+] 完成设置商品链接...')
+                return await page.locator('[class^="long-card"] div:has-text("重新上传")').count() > 0
+
+            async def uploading(progress):
+                douyin_logger.info(f"  [-] 正在上传视频中...{format_progress(progress)}")
+                if await page.locator('div.progress-div > div:has-text("上传失败")').count():
+                    douyin_logger.error("  [-] 发现上传出错了... 准备重试")
+                    self.upload_monitor.reset()
+                    await self.handle_upload_error(page)
+
+            budget = StepBudget("douyin", "upload")
+            if not await self.upload_monitor.wait_until(uploaded, uploading, timeout=budget.budget):
+                budget.fail()
+            douyin_logger.success("  [-]视频上传完毕")
+
+            if self.productLink and self.productTitle:
+                douyin_logger.info(f'  [-] 正在设置商品链接...')
+                await self.set_product_link(page, self.productLink, self.productTitle)
+                douyin_logger.info(f'  [+] 完成设置商品链接...')
         
-        #上传视频封面
-        await self.set_thumbnail(page, self.thumbnail_path)
+            #上传视频封面
+            await self.set_thumbnail(page, self.thumbnail_path)
 
-        # 更换可见元素
-        await self.set_location(page, "")
+            # 更换可见元素
+            await self.set_location(page, "")
 
 
-        # 頭條/西瓜
-        third_part_element = '[class^="info"] > [class^="first-part"] div div.semi-switch'
-        # 定位是否有第三方平台
-        if await page.locator(third_part_element).count():
-            # 检测是否是已选中状态
-            if 'semi-switch-checked' not in await page.eval_on_selector(third_part_element, 'div => div.className'):
-                await page.locator(third_part_element).locator('input.semi-switch-native-control').click()
+            # 頭條/西瓜
+            third_part_element = '[class^="info"] > [class^="first-part"] div div.semi-switch'
+            # 定位是否有第三方平台
+            if await page.locator(third_part_element).count():
+                # 检测是否是已选中状态
+                if 'semi-switch-checked' not in await page.eval_on_selector(third_part_element, 'div => div.className'):
+                    await page.locator(third_part_element).locator('input.semi-switch-native-control').click()
 
-        if self.publish_date != 0:
-            await self.set_schedule_time_douyin(page, self.publish_date)
+            if self.publish_date != 0:
+                await run_step("douyin", "schedule", self.set_schedule_time_douyin(page, self.publish_date))
 
-        # 判断视频是否发布成功
-        while True:
             # 判断视频是否发布成功
-            try:
-                publish_button = page.get_by_role('button', name="发布", exact=True)
-                if await publish_button.count():
-                    await publish_button.click()
-                await page.wait_for_url("https://creator.douyin.com/creator-micro/content/manage**",
-                                        timeout=3000)  # 如果自动跳转到作品页面，则代表发布成功
-                douyin_logger.success("  [-]视频发布成功")
-                break
-            except:
-                # 尝试处理封面问题
-                await self.handle_auto_video_cover(page)
-                douyin_logger.info("  [-] 视频正在发布中...")
-                await page.screenshot(full_page=True)
-                await asyncio.sleep(0.5)
-
-        await context.storage_state(path=self.account_file)  # 保存cookie
-        douyin_logger.success('  [-]cookie更新完毕！')
-        await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
-        # 关闭浏览器上下文和浏览器实例
-        await context.close()
-        await browser.close()
+            budget = StepBudget("douyin", "publish")
+            while True:
+                # 判断视频是否发布成功
+                try:
+                    publish_button = page.get_by_role('button', name="发布", exact=True)
+                    if await publish_button.count():
+                        await publish_button.click()
+                    await page.wait_for_url("https://creator.douyin.com/creator-micro/content/manage**",
+                                            timeout=3000)  # 如果自动跳转到作品页面，则代表发布成功
+                    douyin_logger.success("  [-]视频发布成功")
+                    break
+                except Exception as e:
+                    # 尝试处理封面问题
+                    await self.handle_auto_video_cover(page)
+                    douyin_logger.info("  [-] 视频正在发布中...")
+                    await self.page_capture.snapshot("publish")
+                    await budget.retry(e)
+
+            await save_storage_state(context, self.account_file)  # 保存cookie
+            cookie_cache.record(self.account_file, True)  # 刚发布成功，cookie 必然有效
+            douyin_logger.success('  [-]cookie更新完毕！')
 
     async def handle_auto_video_cover(self, page):
         """
@@ -244,7 +253,8 @@ class DouYinVideo(object):
                 print("  [-] 正在选择第一个推荐封面...")
                 try:
                     await recommend_cover.click()
-                    await asyncio.sleep(1)  # 等待选中生效
+                    # 等待选中生效：确认弹窗出现或页面空闲
+                    await settle(page, timeout=1, label="douyin.cover_select")
 
                     # 3. 处理可能的确认弹窗 "是否确认应用此封面？"
                     # 并不一定每次都会出现，健壮性判断：如果出现弹窗，则点击确定
@@ -254,7 +264,8 @@ class DouYinVideo(object):
                         # 直接点击“确定”按钮，不依赖脆弱的 CSS 类名
                         await page.get_by_role("button", name="确定").click()
                         print("  [-] 已点击确认应用封面")
-                        await asyncio.sleep(1)
+                        await wait_for_selector(page, f'text={confirm_text}', state="hidden", timeout=3,
+                                                label="douyin.cover_confirm")
 
                     print("  [-] 已完成封面选择流程")
                     return True
@@ -269,11 +280,13 @@ class DouYinVideo(object):
             await page.click('text="选择封面"')
             await page.wait_for_selector("div.dy-creator-content-modal")
             await page.click('text="设置竖封面"')
-            await page.wait_for_timeout(2000)  # 等待2秒
+            upload_input = "div[class^='semi-upload upload'] >> input.semi-upload-hidden-input"
+            await wait_for_selector(page, upload_input, state="attached", timeout=5, label="douyin.thumbnail_input")
             # 定位到上传区域并点击
-            await page.locator("div[class^='semi-upload upload'] >> input.semi-upload-hidden-input").set_input_files(thumbnail_path)
-            await page.wait_for_timeout(2000)  # 等待2秒
-            await page.locator("div#tooltip-container button:visible:has-text('完成')").click()
+            await page.locator(upload_input).set_input_files(thumbnail_path)
+            finish_button = "div#tooltip-container button:visible:has-text('完成')"
+            await wait_for_selector(page, finish_button, timeout=10, label="douyin.thumbnail_uploaded")
+            await page.locator(finish_button).click()
             # finish_confirm_element = page.locator("div[class^='confirmBtn'] >> div:has-text('完成')")
             # if await finish_confirm_element.count():
             #     await finish_confirm_element.click()
@@ -291,7 +304,7 @@ class DouYinVideo(object):
         #     "div.semi-select-single").nth(0).click()
         await page.locator('div.semi-select span:has-text("输入地理位置")').click()
         await page.keyboard.press("Backspace")
-        await page.wait_for_timeout(2000)
+        await settle(page, label="douyin.location_clear")
         await page.keyboard.type(location)
         await page.wait_for_selector('div[role="listbox"] [role="option"]', timeout=5000)
         await page.locator('div[role="listbox"] [role="option"]').first.click()
@@ -299,7 +312,6 @@ class DouYinVideo(object):
     async def handle_product_dialog(self, page: Page, product_title: str):
         """处理商品编辑弹窗"""
 
-        await page.wait_for_timeout(2000)
         await page.wait_for_selector('input[placeholder="请输入商品短标题"]', timeout=10000)
         short_title_input = page.locator('input[placeholder="请输入商品短标题"]')
         if not await short_title_input.count():
@@ -307,10 +319,11 @@ class DouYinVideo(object):
             return False
         product_title = product_title[:10]
         await short_title_input.fill(product_title)
-        # 等待一下让界面响应
-        await page.wait_for_timeout(1000)
 
         finish_button = page.locator('button:has-text("完成编辑")')
+        # 等待界面响应：填写短标题后“完成编辑”按钮变为可用
+        await wait_for_selector(page, 'button:has-text("完成编辑"):not([class*="disabled"])', timeout=1,
+                                label="douyin.product_title")
         if 'disabled' not in await finish_button.get_attribute('class'):
             await finish_button.click()
             douyin_logger.debug("[+] 成功点击'完成编辑'按钮")
@@ -334,7 +347,6 @@ class DouYinVideo(object):
         
     async def set_product_link(self, page: Page, product_link: str, product_title: str):
         """设置商品链接功能"""
-        await page.wait_for_timeout(2000)  # 等待2秒
         try:
             # 定位"添加标签"文本，然后向上导航到容器，再找到下拉框
             await page.wait_for_selector('text=添加标签', timeout=10000)
@@ -367,8 +379,9 @@ class DouYinVideo(object):
                 return False
             await add_button.click()
             douyin_logger.debug("[+] 成功点击'添加链接'按钮")
-            ## 如果链接不可用
-            await page.wait_for_timeout(2000)
+            ## 如果链接不可用会弹出提示，否则出现商品编辑弹窗
+            await wait_for_selector(page, 'text=未搜索到对应商品 >> visible=true, input[placeholder="请输入商品短标题"]',
+                                    timeout=5, label="douyin.product_link")
             error_modal = page.locator('text=未搜索到对应商品')
             if await error_modal.count():
                 confirm_button = page.locator('button:has-text("确定")')
@@ -389,8 +402,8 @@ class DouYinVideo(object):
             return False
 
     async def main(self):
-        async with async_playwright() as playwright:
-            await self.upload(playwright)
+        async with use_browser_pool() as pool:
+            await self.upload(await pool.get_playwright())
 
 
 class DouYinImage(object):
@@ -445,30 +458,32 @@ class DouYinImage(object):
     async def set_schedule_time_douyin(self, page, publish_date):
         label_element = page.locator("[class^='radio']:has-text('定时发布')")
         await label_element.click()
-        await asyncio.sleep(1)
+        await wait_for_selector(page, '.semi-input[placeholder="日期和时间"]', timeout=5, label="douyin.schedule_input")
         publish_date_hour = publish_date.strftime("%Y-%m-%d %H:%M")
-        await asyncio.sleep(1)
         await page.locator('.semi-input[placeholder="日期和时间"]').click()
         await page.keyboard.press("Control+KeyA")
         await page.keyboard.type(str(publish_date_hour))
         await page.keyboard.press("Enter")
-        await asyncio.sleep(1)
+        await settle(page, timeout=1, label="douyin.schedule_confirm")
 
     async def switch_to_image_mode(self, page: Page, timeout_ms: int = 8000):
         tab_texts = ["发布图文", "上传图文", "图文"]
-        loop = asyncio.get_running_loop()
-        start = loop.time()
-        while (loop.time() - start) * 1000 < timeout_ms:
+
+        async def click_tab():
             for text in tab_texts:
                 button = page.get_by_text(text).first
                 try:
                     if await button.count():
                         await button.click(timeout=4000)
-                        await asyncio.sleep(0.3)
-                        return
+                        return True
                 except Exception:
                     continue
-            await asyncio.sleep(0.2)
+            return False
+
+        # 入口出现即点击，点击后等页面切换完成
+        if await wait_until(click_tab, timeout=timeout_ms / 1000, label="douyin.image_tab"):
+            await settle(page, timeout=1, label="douyin.image_tab_switch")
+            return
 
         debug_path = await self.dump_debug_artifacts(page, "switch_to_image_mode_timeout")
         raise RuntimeError(f"未找到抖音“发布图文”入口，请检查页面结构（诊断目录：{debug_path}）")
@@ -480,11 +495,11 @@ class DouYinImage(object):
             "input[type='file']",
         ]
 
-        loop = asyncio.get_running_loop()
-        start = loop.time()
         found_input = False
         last_exc = None
-        while (loop.time() - start) * 1000 < timeout_ms:
+
+        async def set_files():
+            nonlocal found_input, last_exc
             for selector in upload_selectors:
                 input_group = page.locator(selector)
                 try:
@@ -518,14 +533,18 @@ class DouYinImage(object):
                         try:
                             found_input = True
                             await input_file.set_input_files(self.file_paths)
-                            return
+                            return True
                         except Exception as exc:
                             last_exc = exc
                             continue
                 except Exception as exc:
                     last_exc = exc
                     continue
-            await asyncio.sleep(0.2)
+            return False
+
+        # 上传输入框可能晚于页面出现，出现后立即设置文件
+        if await wait_until(set_files, timeout=timeout_ms / 1000, label="douyin.image_input"):
+            return
 
         debug_path = await self.dump_debug_artifacts(page, "upload_images_timeout")
         if found_input and last_exc is not None:
@@ -543,49 +562,17 @@ class DouYinImage(object):
                 button = page.get_by_text(text).first
                 if await button.count():
                     await button.click(timeout=1000)
-                    await asyncio.sleep(0.2)
+                    await wait_for_selector(page, f"text={text}", state="hidden", timeout=1, label="douyin.overlay")
                     return
             except Exception:
                 continue
 
     async def dump_debug_artifacts(self, page: Page, reason: str) -> str:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        out_dir = Path("logs") / "douyin_debug" / f"{timestamp}_{reason}"
-        out_dir.mkdir(parents=True, exist_ok=True)
-
-        url_text = ""
-        try:
-            url_text = str(page.url)
-        except Exception:
-            url_text = ""
-
-        try:
-            (out_dir / "meta.txt").write_text(f"reason={reason}\nurl={url_text}\n", encoding="utf-8")
-        except Exception:
-            pass
-
-        try:
-            files_text = "\n".join(
-                f"{path}\texists={Path(path).exists()}" for path in self.file_paths
-            )
-            (out_dir / "files.txt").write_text(files_text + "\n", encoding="utf-8")
-        except Exception:
-            pass
-
-        try:
-            if hasattr(page, "screenshot"):
-                await page.screenshot(path=str(out_dir / "page.png"), full_page=True)
-        except Exception:
-            pass
-
-        try:
-            if hasattr(page, "content"):
-                html = await page.content()
-                (out_dir / "page.html").write_text(html, encoding="utf-8")
-        except Exception:
-            pass
-
-        return str(out_dir)
+        # 失败现场：当前页面的截图和 HTML，连同之前的快照一起写到 logs/ 下（受磁盘配额限制）
+        capture = getattr(self, "page_capture", None) or PageCapture(page, "douyin")
+        await capture.snapshot(reason, screenshot=True, html=True)
+        files_text = "\n".join(f"{path}\texists={Path(path).exists()}" for path in self.file_paths)
+        return await capture.persist(reason, {"files.txt": files_text + "\n"})
 
     async def wait_for_image_editor_ready(self, page: Page, timeout_ms: int = 30000):
         editor_selectors = [
@@ -605,28 +592,21 @@ class DouYinImage(object):
             "text=文件上传失败",
         ]
 
-        loop = asyncio.get_running_loop()
-        start = loop.time()
-        while (loop.time() - start) * 1000 < timeout_ms:
+        async def ready():
             for selector in editor_selectors:
                 try:
                     locator = page.locator(selector).first
                     if await locator.count():
-                        return
-                except Exception:
-                    continue
-
-            for selector in upload_error_selectors:
-                try:
-                    if await self.error_text_visible(page, selector):
-                        raise RuntimeError(f"抖音图文素材上传失败：检测到提示“{selector.replace('text=', '')}”")
-                except RuntimeError:
-                    raise
+                        return True
                 except Exception:
                     continue
+            return await self.visible_upload_error(page, upload_error_selectors)
 
-            await asyncio.sleep(0.5)
-
+        result = await wait_until(ready, timeout=timeout_ms / 1000, interval=0.5, label="douyin.image_editor")
+        if result is True:
+            return
+        if result:
+            raise RuntimeError(f"抖音图文素材上传失败：检测到提示“{result}”")
         raise RuntimeError("抖音图文素材上传后未进入编辑页，请确认图片格式为 jpg/jpeg/png/webp 且文件可用")
 
     async def wait_for_image_editor_url(self, page: Page, timeout_ms: int = 45000):
@@ -640,27 +620,30 @@ class DouYinImage(object):
         ]
         target_path = "/creator-micro/content/post/image"
 
-        loop = asyncio.get_running_loop()
-        start = loop.time()
-        while (loop.time() - start) * 1000 < timeout_ms:
+        async def navigated():
             if target_path in page.url:
-                return
-
-            for selector in upload_error_selectors:
-                try:
-                    if await self.error_text_visible(page, selector):
-                        raise RuntimeError(f"抖音图文素材上传失败：检测到提示“{selector.replace('text=', '')}”")
-                except RuntimeError:
-                    raise
-                except Exception:
-                    continue
-
-            await asyncio.sleep(0.5)
+                return True
+            return await self.visible_upload_error(page, upload_error_selectors)
 
+        result = await wait_until(navigated, timeout=timeout_ms / 1000, interval=0.5, label="douyin.image_editor_url")
+        if result is True:
+            return
+        if result:
+            raise RuntimeError(f"抖音图文素材上传失败：检测到提示“{result}”")
         raise RuntimeError(
             f"抖音图文素材上传后未跳转到编辑页({target_path})，当前页面：{page.url}"
         )
 
+    async def visible_upload_error(self, page: Page, selectors):
+        """返回页面上可见的上传错误提示文字，没有时返回 None。"""
+        for selector in selectors:
+            try:
+                if await self.error_text_visible(page, selector):
+                    return selector.replace('text=', '')
+            except Exception:
+                continue
+        return None
+
     async def error_text_visible(self, page: Page, selector: str) -> bool:
         locator = page.locator(selector).first
         if not await locator.count():
@@ -776,7 +759,7 @@ class DouYinImage(object):
             douyin_logger.warning(f"[music] open panel failed, skip. debug={debug_path}")
             return
 
-        await asyncio.sleep(0.5)
+        await wait_for_selector(page, ".semi-sidesheet-content", timeout=3, label="douyin.music_panel")
 
         if self.music_mode == "keyword":
             query = self.build_music_query()
@@ -794,7 +777,9 @@ class DouYinImage(object):
                         if await locator.count():
                             await locator.click(timeout=2000)
                             await locator.fill(query, timeout=3000)
-                            await asyncio.sleep(0.5)
+                            # 等搜索结果里出现“使用”按钮
+                            await wait_for_selector(page, ".semi-sidesheet-content button:has-text('使用')",
+                                                    timeout=5, label="douyin.music_search")
                             input_filled = True
                             douyin_logger.info(f"[music] searched keyword={query}")
                             break
@@ -814,7 +799,7 @@ class DouYinImage(object):
             try:
                 if await locator.count():
                     await locator.click(timeout=3000)
-                    await asyncio.sleep(0.3)
+                    await settle(page, timeout=1, label="douyin.music_apply")
                     douyin_logger.success("[music] selected first available music")
                     return
             except Exception:
@@ -867,8 +852,7 @@ class DouYinImage(object):
                     target_value,
                 )
                 if clicked_by_value:
-                    await asyncio.sleep(0.2)
-                    after_value = await self.read_visibility_value(page)
+                    after_value = await self.wait_for_visibility_value(page, target_value)
                     douyin_logger.info(f"[visibility] clicked_by=value after={after_value}")
                     if self.visibility_applied(after_value, target_value):
                         return
@@ -881,8 +865,7 @@ class DouYinImage(object):
             try:
                 if await locator.count():
                     await locator.click(timeout=3000)
-                    await asyncio.sleep(0.2)
-                    after_value = await self.read_visibility_value(page)
+                    after_value = await self.wait_for_visibility_value(page, target_value)
                     douyin_logger.info(f"[visibility] clicked_by=text:{text} after={after_value}")
                     if self.visibility_applied(after_value, target_value):
                         return
@@ -938,8 +921,7 @@ class DouYinImage(object):
                     self.visibility,
                 )
                 if clicked:
-                    await asyncio.sleep(0.2)
-                    after_value = await self.read_visibility_value(page)
+                    after_value = await self.wait_for_visibility_value(page, target_value)
                     douyin_logger.info(f"[visibility] clicked_by=dom_fallback after={after_value}")
                     if self.visibility_applied(after_value, target_value):
                         return
@@ -973,6 +955,17 @@ class DouYinImage(object):
         except Exception:
             return None
 
+    async def wait_for_visibility_value(self, page: Page, target_value: str, timeout: float = 1):
+        """点击后等待“谁可以看”的选中值变为目标值，返回最后读到的值。"""
+        values = []
+
+        async def applied():
+            values.append(await self.read_visibility_value(page))
+            return self.visibility_applied(values[-1], target_value)
+
+        await wait_until(applied, timeout=timeout, interval=0.1, label="douyin.visibility")
+        return values[-1] if values else None
+
     @staticmethod
     def visibility_applied(after_value, target_value: str) -> bool:
         normalized = None if after_value is None else str(after_value)
@@ -982,63 +975,58 @@ class DouYinImage(object):
         return True
 
     async def upload(self, playwright: Playwright) -> None:
-        if self.local_executable_path:
-            browser = await playwright.chromium.launch(headless=self.headless, executable_path=self.local_executable_path)
-        else:
-            browser = await playwright.chromium.launch(headless=self.headless)
-        context = await browser.new_context(storage_state=f"{self.account_file}")
-        context = await set_init_script(context)
-        page = await context.new_page()
-        await page.goto("https://creator.douyin.com/creator-micro/content/upload")
-        await page.wait_for_url("https://creator.douyin.com/creator-micro/content/upload")
-        douyin_logger.info(f'[+]正在上传抖音图文，共{len(self.file_paths)}张')
-
-        await self.switch_to_image_mode(page)
-        await self.upload_images(page)
-        await self.wait_for_image_editor_url(page, timeout_ms=45000)
-        await self.wait_for_image_editor_ready(page, timeout_ms=30000)
-        await self.fill_title_and_desc(page)
-        await self.set_visibility(page)
-        await self.set_music(page)
-
-        if self.publish_date != 0:
-            await self.set_schedule_time_douyin(page, self.publish_date)
-
-        loop = asyncio.get_running_loop()
-        publish_start = loop.time()
-        while (loop.time() - publish_start) < 90:
-            try:
-                if self.publish_date != 0:
-                    schedule_button = page.get_by_role("button", name="定时发布", exact=True).first
-                    if await schedule_button.count():
-                        await schedule_button.click()
+        launch_options = {'headless': self.headless, 'executable_path': self.local_executable_path or None}
+        async with get_browser_pool().new_context(playwright.chromium, launch_options,
+                                                  storage_state=f"{self.account_file}") as context:
+            context = await set_init_script(context, platform="douyin", profile="upload")
+            page = await context.new_page()
+            self.page_capture = PageCapture(page, "douyin")
+            await page.goto("https://creator.douyin.com/creator-micro/content/upload")
+            await page.wait_for_url("https://creator.douyin.com/creator-micro/content/upload")
+            douyin_logger.info(f'[+]正在上传抖音图文，共{len(self.file_paths)}张')
+
+            await self.switch_to_image_mode(page)
+            await self.upload_images(page)
+            await self.wait_for_image_editor_url(page, timeout_ms=45000)
+            await self.wait_for_image_editor_ready(page, timeout_ms=30000)
+            await run_step("douyin", "metadata", self.fill_title_and_desc(page))
+            await self.set_visibility(page)
+            await self.set_music(page)
+
+            if self.publish_date != 0:
+                await run_step("douyin", "schedule", self.set_schedule_time_douyin(page, self.publish_date))
+
+            async def published():
+                try:
+                    if self.publish_date != 0:
+                        schedule_button = page.get_by_role("button", name="定时发布", exact=True).first
+                        if await schedule_button.count():
+                            await schedule_button.click()
+                        else:
+                            await self.click_publish_button(page)
                     else:
                         await self.click_publish_button(page)
-                else:
-                    await self.click_publish_button(page)
-                await page.wait_for_url(
-                    "https://creator.douyin.com/creator-micro/content/manage**",
-                    timeout=3000
-                )
-                final_visibility = await self.read_visibility_value(page)
-                douyin_logger.success(f"[visibility] publish_success target={self.visibility} dom={final_visibility}")
-                douyin_logger.success("  [-]图文发布成功")
-                break
-            except Exception:
-                elapsed = loop.time() - publish_start
-                if int(elapsed * 2) % 10 == 0:
+                    # 跳转到作品管理页代表发布成功
+                    await page.wait_for_url(
+                        "https://creator.douyin.com/creator-micro/content/manage**",
+                        timeout=3000
+                    )
+                    return True
+                except Exception:
                     douyin_logger.info("  [-] 图文正在发布中...")
-                await asyncio.sleep(0.5)
-        else:
-            debug_path = await self.dump_debug_artifacts(page, "publish_timeout")
-            raise RuntimeError(f"抖音图文发布超时，请检查页面状态（诊断目录：{debug_path}）")
+                    return False
+
+            if not await wait_until(published, timeout=90, interval=0.5, label="douyin.image_publish"):
+                debug_path = await self.dump_debug_artifacts(page, "publish_timeout")
+                raise RuntimeError(f"抖音图文发布超时，请检查页面状态（诊断目录：{debug_path}）")
+            final_visibility = await self.read_visibility_value(page)
+            douyin_logger.success(f"[visibility] publish_success target={self.visibility} dom={final_visibility}")
+            douyin_logger.success("  [-]图文发布成功")
 
-        await context.storage_state(path=self.account_file)
-        douyin_logger.success('  [-]cookie更新完毕！')
-        await asyncio.sleep(5)
-        await context.close()
-        await browser.close()
+            await save_storage_state(context, self.account_file)
+            cookie_cache.record(self.account_file, True)  # 刚发布成功，cookie 必然有效
+            douyin_logger.success('  [-]cookie更新完毕！')
 
     async def main(self):
-        async with async_playwright() as playwright:
-            await self.upload(playwright)
+        async with use_browser_pool() as pool:
+            await self.upload(await pool.get_playwright())
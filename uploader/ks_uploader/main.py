@@ -3,19 +3,30 @@ from datetime import datetime
 
 from playwright.async_api import Playwright, async_playwright
 import os
-import asyncio
 
 from conf import LOCAL_CHROME_PATH, LOCAL_CHROME_HEADLESS
+from utils.account_lease import save_storage_state
 from utils.base_social_media import set_init_script
+from utils.browser_pool import get_browser_pool, use_browser_pool
+from utils.cookie_cache import cookie_cache
+from utils.cookie_probe import probe_cookie
 from utils.files_times import get_absolute_path
 from utils.log import kuaishou_logger
+from utils.page_capture import PageCapture
+from utils.step_budget import StepBudget, run_step
+from utils.upload_monitor import UploadMonitor, format_progress
+from utils.waits import settle, wait_for_selector, wait_until
 
 
 async def cookie_auth(account_file):
+    # 先用 HTTP 接口探测登录态，结论不明确时再开浏览器
+    flag = await probe_cookie(4, account_file)
+    if flag is not None:
+        return flag
     async with async_playwright() as playwright:
         browser = await playwright.chromium.launch(headless=LOCAL_CHROME_HEADLESS)
         context = await browser.new_context(storage_state=account_file)
-        context = await set_init_script(context)
+        context = await set_init_script(context, platform="kuaishou", profile="check")
         # 创建一个新的页面
         page = await context.new_page()
         # 访问指定的 URL
@@ -77,137 +88,126 @@ class KSVideo(object):
         await page.locator('div.progress-div [class^="upload-btn-input"]').set_input_files(self.file_path)
 
     async def upload(self, playwright: Playwright) -> None:
-        # 使用 Chromium 浏览器启动一个浏览器实例
         print(self.local_executable_path)
-        if self.local_executable_path:
-            browser = await playwright.chromium.launch(
-                headless=self.headless,
-                executable_path=self.local_executable_path,
-            )
-        else:
-            browser = await playwright.chromium.launch(
-                headless=self.headless
-            )  # 创建一个浏览器上下文，使用指定的 cookie 文件
-        context = await browser.new_context(storage_state=f"{self.account_file}")
-        context = await set_init_script(context)
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://cp.kuaishou.com/article/publish/video")
-        kuaishou_logger.info('正在上传-------{}.mp4'.format(self.title))
-        # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
-        kuaishou_logger.info('正在打开主页...')
-        await page.wait_for_url("https://cp.kuaishou.com/article/publish/video")
-        # 点击 "上传视频" 按钮
-        upload_button = page.locator("button[class^='_upload-btn']")
-        await upload_button.wait_for(state='visible')  # 确保按钮可见
-
-        async with page.expect_file_chooser() as fc_info:
-            await upload_button.click()
-        file_chooser = await fc_info.value
-        await file_chooser.set_files(self.file_path)
-
-        await asyncio.sleep(2)
-
-        # if not await page.get_by_text("封面编辑").count():
-        #     raise Exception("似乎没有跳转到到编辑页面")
-
-        await asyncio.sleep(1)
-
-        # 等待按钮可交互
-        new_feature_button = page.locator('button[type="button"] span:text("我知道了")')
-        if await new_feature_button.count() > 0:
-            await new_feature_button.click()
-
-        kuaishou_logger.info("正在填充标题和话题...")
-        await page.get_by_text("描述").locator("xpath=following-sibling::div").click()
-        kuaishou_logger.info("clear existing title")
-        await page.keyboard.press("Backspace")
-        await page.keyboard.press("Control+KeyA")
-        await page.keyboard.press("Delete")
-        kuaishou_logger.info("filling new  title")
-        await page.keyboard.type(self.title)
-        await page.keyboard.press("Enter")
-
-        # 快手只能添加3个话题
-        for index, tag in enumerate(self.tags[:3], start=1):
-            kuaishou_logger.info("正在添加第%s个话题" % index)
-            await page.keyboard.type(f"#{tag} ")
-            await asyncio.sleep(2)
-
-        max_retries = 60  # 设置最大重试次数,最大等待时间为 2 分钟
-        retry_count = 0
-
-        while retry_count < max_retries:
-            try:
-                # 获取包含 '上传中' 文本的元素数量
-                number = await page.locator("text=上传中").count()
-
-                if number == 0:
-                    kuaishou_logger.success("视频上传完毕")
+        # 从共享浏览器池取一个独立的浏览器上下文，使用指定的 cookie 文件
+        launch_options = {'headless': self.headless, 'executable_path': self.local_executable_path or None}
+        async with get_browser_pool().new_context(playwright.chromium, launch_options,
+                                                  storage_state=f"{self.account_file}") as context:
+            context = await set_init_script(context, platform="kuaishou", profile="upload")
+            # 创建一个新的页面
+            page = await context.new_page()
+            # 在选择文件前开始监听上传接口
+            self.upload_monitor = UploadMonitor(page, "kuaishou", self.file_path)
+            # 重试时记录轻量快照，任务失败时才落盘
+            self.page_capture = PageCapture(page, "kuaishou")
+            # 访问指定的 URL
+            await page.goto("https://cp.kuaishou.com/article/publish/video")
+            kuaishou_logger.info('正在上传-------{}.mp4'.format(self.title))
+            # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
+            kuaishou_logger.info('正在打开主页...')
+            await page.wait_for_url("https://cp.kuaishou.com/article/publish/video")
+            # 点击 "上传视频" 按钮
+            upload_button = page.locator("button[class^='_upload-btn']")
+            await upload_button.wait_for(state='visible')  # 确保按钮可见
+
+            async with page.expect_file_chooser() as fc_info:
+                await upload_button.click()
+            file_chooser = await fc_info.value
+            await file_chooser.set_files(self.file_path)
+
+            # if not await page.get_by_text("封面编辑").count():
+            #     raise Exception("似乎没有跳转到到编辑页面")
+
+            # 等编辑页的“描述”出现再继续，不再固定等待 3 秒
+            await wait_for_selector(page, 'text=描述', timeout=10, label="kuaishou.editor")
+
+            # 等待按钮可交互
+            new_feature_button = page.locator('button[type="button"] span:text("我知道了")')
+            if await new_feature_button.count() > 0:
+                await new_feature_button.click()
+
+            kuaishou_logger.info("正在填充标题和话题...")
+            await page.get_by_text("描述").locator("xpath=following-sibling::div").click()
+            kuaishou_logger.info("clear existing title")
+            await page.keyboard.press("Backspace")
+            await page.keyboard.press("Control+KeyA")
+            await page.keyboard.press("Delete")
+            kuaishou_logger.info("filling new  title")
+            await page.keyboard.type(self.title)
+            await page.keyboard.press("Enter")
+
+            # 快手只能添加3个话题
+            for index, tag in enumerate(self.tags[:3], start=1):
+                kuaishou_logger.info("正在添加第%s个话题" % index)
+                await page.keyboard.type(f"#{tag} ")
+                await settle(page, timeout=2, label="kuaishou.tag")
+
+            # 上传接口提交成功立即继续，页面上没有“上传中”作为兜底判断，超出上传阶段预算则任务失败
+            async def uploaded():
+                return await page.locator("text=上传中").count() == 0
+
+            async def uploading(progress):
+                kuaishou_logger.info(f"正在上传视频中...{format_progress(progress)}")
+
+            budget = StepBudget("kuaishou", "upload")
+            if not await self.upload_monitor.wait_until(uploaded, uploading, timeout=budget.budget):
+                budget.fail()
+            kuaishou_logger.success("视频上传完毕")
+
+            # 定时任务
+            if self.publish_date != 0:
+                await run_step("kuaishou", "schedule", self.set_schedule_time(page, self.publish_date))
+
+            # 判断视频是否发布成功
+            budget = StepBudget("kuaishou", "publish", interval=1)
+            while True:
+                try:
+                    publish_button = page.get_by_text("发布", exact=True)
+                    if await publish_button.count() > 0:
+                        await publish_button.click()
+
+                    # 等确认弹窗出现或页面已跳转，不再固定等待 1 秒
+                    confirm_button = page.get_by_text("确认发布")
+
+                    async def confirm_or_published():
+                        return await confirm_button.count() > 0 or page.url.startswith(
+                            "https://cp.kuaishou.com/article/manage/video")
+
+                    await wait_until(confirm_or_published, timeout=2, label="kuaishou.confirm")
+                    if await confirm_button.count() > 0:
+                        await confirm_button.click()
+
+                    # 等待页面跳转，确认发布成功
+                    await page.wait_for_url(
+                        "https://cp.kuaishou.com/article/manage/video?status=2&from=publish",
+                        timeout=5000,
+                    )
+                    kuaishou_logger.success("视频发布成功")
                     break
-                else:
-                    if retry_count % 5 == 0:
-                        kuaishou_logger.info("正在上传视频中...")
-                    await asyncio.sleep(2)
-            except Exception as e:
-                kuaishou_logger.error(f"检查上传状态时发生错误: {e}")
-                await asyncio.sleep(2)  # 等待 2 秒后重试
-            retry_count += 1
-
-        if retry_count == max_retries:
-            kuaishou_logger.warning("超过最大重试次数，视频上传可能未完成。")
-
-        # 定时任务
-        if self.publish_date != 0:
-            await self.set_schedule_time(page, self.publish_date)
-
-        # 判断视频是否发布成功
-        while True:
-            try:
-                publish_button = page.get_by_text("发布", exact=True)
-                if await publish_button.count() > 0:
-                    await publish_button.click()
-
-                await asyncio.sleep(1)
-                confirm_button = page.get_by_text("确认发布")
-                if await confirm_button.count() > 0:
-                    await confirm_button.click()
-
-                # 等待页面跳转，确认发布成功
-                await page.wait_for_url(
-                    "https://cp.kuaishou.com/article/manage/video?status=2&from=publish",
-                    timeout=5000,
-                )
-                kuaishou_logger.success("视频发布成功")
-                break
-            except Exception as e:
-                kuaishou_logger.info(f"视频正在发布中... 错误: {e}")
-                await page.screenshot(full_page=True)
-                await asyncio.sleep(1)
-
-        await context.storage_state(path=self.account_file)  # 保存cookie
-        kuaishou_logger.info('cookie更新完毕！')
-        await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
-        # 关闭浏览器上下文和浏览器实例
-        await context.close()
-        await browser.close()
+                except Exception as e:
+                    kuaishou_logger.info(f"视频正在发布中... 错误: {e}")
+                    await self.page_capture.snapshot("publish")
+                    await budget.retry(e)
+
+            await save_storage_state(context, self.account_file)  # 保存cookie
+            cookie_cache.record(self.account_file, True)  # 刚发布成功，cookie 必然有效
+            kuaishou_logger.info('cookie更新完毕！')
 
     async def main(self):
-        async with async_playwright() as playwright:
-            await self.upload(playwright)
+        async with use_browser_pool() as pool:
+            await self.upload(await pool.get_playwright())
 
     async def set_schedule_time(self, page, publish_date):
         kuaishou_logger.info("click schedule")
         publish_date_hour = publish_date.strftime("%Y-%m-%d %H:%M:%S")
         await page.locator("label:text('发布时间')").locator('xpath=following-sibling::div').locator(
             '.ant-radio-input').nth(1).click()
-        await asyncio.sleep(1)
+        await wait_for_selector(page, 'div.ant-picker-input input[placeholder="选择日期时间"]', timeout=5, label="kuaishou.schedule_input")
 
         await page.locator('div.ant-picker-input input[placeholder="选择日期时间"]').click()
-        await asyncio.sleep(1)
+        await wait_for_selector(page, 'div.ant-picker-dropdown', timeout=2, label="kuaishou.schedule_picker")
 
         await page.keyboard.press("Control+KeyA")
         await page.keyboard.type(str(publish_date_hour))
         await page.keyboard.press("Enter")
-        await asyncio.sleep(1)
+        await settle(page, timeout=1, label="kuaishou.schedule_confirm")
@@ -3,12 +3,19 @@ from datetime import datetime
 
 from playwright.async_api import Playwright, async_playwright
 import os
-import asyncio
 
 from conf import LOCAL_CHROME_PATH, LOCAL_CHROME_HEADLESS
+from utils.account_lease import save_storage_state
 from utils.base_social_media import set_init_script
+from utils.browser_pool import get_browser_pool, use_browser_pool
+from utils.cookie_cache import cookie_cache
+from utils.cookie_probe import probe_cookie
 from utils.files_times import get_absolute_path
 from utils.log import tencent_logger
+from utils.page_capture import PageCapture
+from utils.step_budget import StepBudget, run_step
+from utils.upload_monitor import UploadMonitor, format_progress
+from utils.waits import wait_for_selector
 
 
 def format_str_for_short_title(origin_title: str) -> str:
@@ -32,10 +39,14 @@ def format_str_for_short_title(origin_title: str) -> str:
 
 
 async def cookie_auth(account_file):
+    # 先用 HTTP 接口探测登录态，结论不明确时再开浏览器
+    flag = await probe_cookie(2, account_file)
+    if flag is not None:
+        return flag
     async with async_playwright() as playwright:
         browser = await playwright.chromium.launch(headless=LOCAL_CHROME_HEADLESS)
         context = await browser.new_context(storage_state=account_file)
-        context = await set_init_script(context)
+        context = await set_init_script(context, platform="tencent", profile="check")
         # 创建一个新的页面
         page = await context.new_page()
         # 访问指定的 URL
@@ -137,44 +148,46 @@ class TencentVideo(object):
 
     async def upload(self, playwright: Playwright) -> None:
         # 使用 Chromium (这里使用系统内浏览器，用chromium 会造成h264错误
-        browser = await playwright.chromium.launch(headless=self.headless, executable_path=self.local_executable_path)
-        # 创建一个浏览器上下文，使用指定的 cookie 文件
-        context = await browser.new_context(storage_state=f"{self.account_file}")
-        context = await set_init_script(context)
-
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://channels.weixin.qq.com/platform/post/create")
-        tencent_logger.info(f'[+]正在上传-------{self.title}.mp4')
-        # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
-        await page.wait_for_url("https://channels.weixin.qq.com/platform/post/create")
-        # await page.wait_for_selector('input[type="file"]', timeout=10000)
-        file_input = page.locator('input[type="file"]')
-        await file_input.set_input_files(self.file_path)
-        # 填充标题和话题
-        await self.add_title_tags(page)
-        # 添加商品
-        # await self.add_product(page)
-        # 合集功能
-        await self.add_collection(page)
-        # 原创选择
-        await self.add_original(page)
-        # 检测上传状态
-        await self.detect_upload_status(page)
-        if self.publish_date != 0:
-            await self.set_schedule_time_tencent(page, self.publish_date)
-        # 添加短标题
-        await self.add_short_title(page)
-
-        await self.click_publish(page)
-
-        await context.storage_state(path=f"{self.account_file}")  # 保存cookie
-        tencent_logger.success('  [-]cookie更新完毕！')
-        await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
-        # 关闭浏览器上下文和浏览器实例
-        await context.close()
-        await browser.close()
+        # 从共享浏览器池取一个独立的浏览器上下文，使用指定的 cookie 文件
+        launch_options = {'headless': self.headless, 'executable_path': self.local_executable_path}
+        async with get_browser_pool().new_context(playwright.chromium, launch_options,
+                                                  storage_state=f"{self.account_file}") as context:
+            context = await set_init_script(context, platform="tencent", profile="upload")
+
+            # 创建一个新的页面
+            page = await context.new_page()
+            # 在选择文件前开始监听上传接口
+            self.upload_monitor = UploadMonitor(page, "tencent", self.file_path)
+            # 重试时记录轻量快照，任务失败时才落盘
+            self.page_capture = PageCapture(page, "tencent")
+            # 访问指定的 URL
+            await page.goto("https://channels.weixin.qq.com/platform/post/create")
+            tencent_logger.info(f'[+]正在上传-------{self.title}.mp4')
+            # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
+            await page.wait_for_url("https://channels.weixin.qq.com/platform/post/create")
+            # await page.wait_for_selector('input[type="file"]', timeout=10000)
+            file_input = page.locator('input[type="file"]')
+            await file_input.set_input_files(self.file_path)
+            # 填充标题和话题
+            await run_step("tencent", "metadata", self.add_title_tags(page))
+            # 添加商品
+            # await self.add_product(page)
+            # 合集功能
+            await self.add_collection(page)
+            # 原创选择
+            await self.add_original(page)
+            # 检测上传状态
+            await self.detect_upload_status(page)
+            if self.publish_date != 0:
+                await run_step("tencent", "schedule", self.set_schedule_time_tencent(page, self.publish_date))
+            # 添加短标题
+            await self.add_short_title(page)
+
+            await self.click_publish(page)
+
+            await save_storage_state(context, self.account_file)  # 保存cookie
+            cookie_cache.record(self.account_file, True)  # 刚发布成功，cookie 必然有效
+            tencent_logger.success('  [-]cookie更新完毕！')
 
     async def add_short_title(self, page):
         short_title_element = page.get_by_text("短标题", exact=True).locator("..").locator(
@@ -185,6 +198,7 @@ class TencentVideo(object):
             await short_title_element.fill(short_title)
 
     async def click_publish(self, page):
+        budget = StepBudget("tencent", "publish")
         while True:
             try:
                 if self.is_draft:
@@ -217,28 +231,27 @@ class TencentVideo(object):
                         break
                 tencent_logger.exception(f"  [-] Exception: {e}")
                 tencent_logger.info("  [-] 视频正在发布中...")
-                await asyncio.sleep(0.5)
+                await self.page_capture.snapshot("publish")
+                await budget.retry(e)
 
     async def detect_upload_status(self, page):
-        while True:
-            # 匹配删除按钮，代表视频上传完毕，如果不存在，代表视频正在上传，则等待
-            try:
-                # 匹配删除按钮，代表视频上传完毕
-                if "weui-desktop-btn_disabled" not in await page.get_by_role("button", name="发表").get_attribute(
-                        'class'):
-                    tencent_logger.info("  [-]视频上传完毕")
-                    break
-                else:
-                    tencent_logger.info("  [-] 正在上传视频中...")
-                    await asyncio.sleep(2)
-                    # 出错了视频出错
-                    if await page.locator('div.status-msg.error').count() and await page.locator(
-                            'div.media-status-content div.tag-inner:has-text("删除")').count():
-                        tencent_logger.error("  [-] 发现上传出错了...准备重试")
-                        await self.handle_upload_error(page)
-            except:
-                tencent_logger.info("  [-] 正在上传视频中...")
-                await asyncio.sleep(2)
+        # 上传接口提交成功立即继续，“发表”按钮变为可用作为兜底判断
+        async def uploaded():
+            return "weui-desktop-btn_disabled" not in await page.get_by_role("button", name="发表").get_attribute('class')
+
+        async def uploading(progress):
+            tencent_logger.info(f"  [-] 正在上传视频中...{format_progress(progress)}")
+            # 出错了视频出错
+            if await page.locator('div.status-msg.error').count() and await page.locator(
+                    'div.media-status-content div.tag-inner:has-text("删除")').count():
+                tencent_logger.error("  [-] 发现上传出错了...准备重试")
+                self.upload_monitor.reset()
+                await self.handle_upload_error(page)
+
+        budget = StepBudget("tencent", "upload")
+        if not await self.upload_monitor.wait_until(uploaded, uploading, timeout=budget.budget):
+            budget.fail()
+        tencent_logger.info("  [-]视频上传完毕")
 
     async def add_title_tags(self, page):
         await page.locator("div.input-editor").click()
@@ -276,10 +289,12 @@ class TencentVideo(object):
                 await page.locator('div.form-content:visible').click()  # 下拉菜单
                 await page.locator(
                     f'div.form-content:visible ul.weui-desktop-dropdown__list li.weui-desktop-dropdown__list-ele:has-text("{self.category}")').first.click()
-                await page.wait_for_timeout(1000)
+                # 等下拉菜单收起再点“声明原创”
+                await wait_for_selector(page, 'div.form-content ul.weui-desktop-dropdown__list', state="hidden",
+                                        timeout=2, label="tencent.original_type")
             if await page.locator('button:has-text("声明原创"):visible').count():
                 await page.locator('button:has-text("声明原创"):visible').click()
 
     async def main(self):
-        async with async_playwright() as playwright:
-            await self.upload(playwright)
+        async with use_browser_pool() as pool:
+            await self.upload(await pool.get_playwright())
@@ -4,11 +4,15 @@ from datetime import datetime
 
 from playwright.async_api import Playwright, async_playwright
 import os
-import asyncio
 from uploader.tk_uploader.tk_config import Tk_Locator
+from utils.account_lease import save_storage_state
 from utils.base_social_media import set_init_script
 from utils.files_times import get_absolute_path
 from utils.log import tiktok_logger
+from utils.page_capture import PageCapture
+from utils.step_budget import StepBudget, run_step
+from utils.upload_monitor import UploadMonitor, format_progress
+from utils.waits import settle, wait_for_selector
 from conf import LOCAL_CHROME_HEADLESS
 
 
@@ -16,7 +20,7 @@ async def cookie_auth(account_file):
     async with async_playwright() as playwright:
         browser = await playwright.firefox.launch(headless=LOCAL_CHROME_HEADLESS)
         context = await browser.new_context(storage_state=account_file)
-        context = await set_init_script(context)
+        context = await set_init_script(context, platform="tiktok", profile="check")
         # 创建一个新的页面
         page = await context.new_page()
         # 访问指定的 URL
@@ -122,12 +126,14 @@ class TiktokVideo(object):
         minute_selector = f"span.tiktok-timepicker-right:has-text('{minute_str}')"
 
         # pick hour first
+        await wait_for_selector(self.locator_base, hour_selector, timeout=1, label="tiktok.schedule_hour")
         await self.locator_base.locator(hour_selector).click()
-        # click time button again
-        # 等待某个特定的元素出现或状态变化，表明UI已更新
-        await page.wait_for_timeout(1000)  # 等待500毫秒
+        # 选完小时后时间选择器会收起，等它收起再重新打开，不再固定等待 1 秒
+        await wait_for_selector(self.locator_base, hour_selector, state="hidden", timeout=1,
+                                label="tiktok.schedule_hour_closed")
         await scheduled_picker.locator('div.TUXInputBox').nth(0).click()
         # pick minutes after
+        await wait_for_selector(self.locator_base, minute_selector, timeout=1, label="tiktok.schedule_minute")
         await self.locator_base.locator(minute_selector).click()
 
         # click title to remove the focus.
@@ -144,8 +150,12 @@ class TiktokVideo(object):
     async def upload(self, playwright: Playwright) -> None:
         browser = await playwright.firefox.launch(headless=self.headless)
         context = await browser.new_context(storage_state=f"{self.account_file}")
-        context = await set_init_script(context)
+        context = await set_init_script(context, platform="tiktok", profile="upload")
         page = await context.new_page()
+        # 在选择文件前开始监听上传接口
+        self.upload_monitor = UploadMonitor(page, "tiktok", self.file_path)
+        # 重试时记录轻量快照，任务失败时才落盘
+        self.page_capture = PageCapture(page, "tiktok")
 
         await page.goto("https://www.tiktok.com/creator-center/upload")
         tiktok_logger.info(f'[+]Uploading-------{self.title}.mp4')
@@ -169,17 +179,16 @@ class TiktokVideo(object):
         file_chooser = await fc_info.value
         await file_chooser.set_files(self.file_path)
 
-        await self.add_title_tags(page)
+        await run_step("tiktok", "metadata", self.add_title_tags(page))
         # detact upload status
         await self.detect_upload_status(page)
         if self.publish_date != 0:
-            await self.set_schedule_time(page, self.publish_date)
+            await run_step("tiktok", "schedule", self.set_schedule_time(page, self.publish_date))
 
         await self.click_publish(page)
 
-        await context.storage_state(path=f"{self.account_file}")  # save cookie
+        await save_storage_state(context, self.account_file)  # save cookie
         tiktok_logger.info('  [-] update cookie！')
-        await asyncio.sleep(2)  # close delay for look the video status
         # close all
         await context.close()
         await browser.close()
@@ -197,10 +206,10 @@ class TiktokVideo(object):
 
         await page.keyboard.press("End")
 
-        await page.wait_for_timeout(1000)  # 等待1秒
+        await settle(page, timeout=1, label="tiktok.title_clear")
 
         await page.keyboard.insert_text(self.title)
-        await page.wait_for_timeout(1000)  # 等待1秒
+        await settle(page, timeout=1, label="tiktok.title")
         await page.keyboard.press("End")
 
         await page.keyboard.press("Enter")
@@ -209,15 +218,17 @@ class TiktokVideo(object):
         for index, tag in enumerate(self.tags, start=1):
             tiktok_logger.info("Setting the %s tag" % index)
             await page.keyboard.press("End")
-            await page.wait_for_timeout(1000)  # 等待1秒
+            await settle(page, timeout=1, label="tiktok.tag_focus")
             await page.keyboard.insert_text("#" + tag + " ")
             await page.keyboard.press("Space")
-            await page.wait_for_timeout(1000)  # 等待1秒
+            # 等话题联想请求结束再继续，页面空闲时不再固定等 1 秒
+            await settle(page, timeout=1, label="tiktok.tag")
 
             await page.keyboard.press("Backspace")
             await page.keyboard.press("End")
 
     async def click_publish(self, page):
+        budget = StepBudget("tiktok", "publish")
         success_flag_div = '#\\:r9\\:'
         while True:
             try:
@@ -235,24 +246,26 @@ class TiktokVideo(object):
                 else:
                     tiktok_logger.exception(f"  [-] Exception: {e}")
                     tiktok_logger.info("  [-] video publishing")
-                    await page.screenshot(full_page=True)
-                    await asyncio.sleep(0.5)
+                    await self.page_capture.snapshot("publish")
+                    await budget.retry(e)
 
     async def detect_upload_status(self, page):
-        while True:
-            try:
-                if await self.locator_base.locator('div.btn-post > button').get_attribute("disabled") is None:
-                    tiktok_logger.info("  [-]video uploaded.")
-                    break
-                else:
-                    tiktok_logger.info("  [-] video uploading...")
-                    await asyncio.sleep(2)
-                    if await self.locator_base.locator('button[aria-label="Select file"]').count():
-                        tiktok_logger.info("  [-] found some error while uploading now retry...")
-                        await self.handle_upload_error(page)
-            except:
-                tiktok_logger.info("  [-] video uploading...")
-                await asyncio.sleep(2)
+        # upload commit response arrives first; the enabled Post button is the fallback check
+        async def uploaded():
+            return await self.locator_base.locator(
+                'div.btn-post > button').get_attribute("disabled") is None
+
+        async def uploading(progress):
+            tiktok_logger.info(f"  [-] video uploading...{format_progress(progress)}")
+            if await self.locator_base.locator('button[aria-label="Select file"]').count():
+                tiktok_logger.info("  [-] found some error while uploading now retry...")
+                self.upload_monitor.reset()
+                await self.handle_upload_error(page)
+
+        budget = StepBudget("tiktok", "upload")
+        if not await self.upload_monitor.wait_until(uploaded, uploading, timeout=budget.budget):
+            budget.fail()
+        tiktok_logger.info("  [-]video uploaded.")
 
     async def choose_base_locator(self, page):
         # await page.wait_for_selector('div.upload-container')
@@ -4,20 +4,26 @@ from datetime import datetime
 
 from playwright.async_api import Playwright, async_playwright
 import os
-import asyncio
 
 from conf import LOCAL_CHROME_PATH, LOCAL_CHROME_HEADLESS
 from uploader.tk_uploader.tk_config import Tk_Locator
-from utils.base_social_media import set_init_script
+from utils.account_lease import save_storage_state
+from utils.base_social_media import set_init_script, set_route_filter
+from utils.browser_pool import get_browser_pool, use_browser_pool
+from utils.cookie_cache import cookie_cache
 from utils.files_times import get_absolute_path
 from utils.log import tiktok_logger
+from utils.page_capture import PageCapture
+from utils.step_budget import StepBudget, run_step
+from utils.upload_monitor import UploadMonitor, format_progress
+from utils.waits import settle, wait_for_selector
 
 
 async def cookie_auth(account_file):
     async with async_playwright() as playwright:
         browser = await playwright.chromium.launch(headless=LOCAL_CHROME_HEADLESS)
         context = await browser.new_context(storage_state=account_file)
-        context = await set_init_script(context)
+        context = await set_init_script(context, platform="tiktok", profile="check")
         # 创建一个新的页面
         page = await context.new_page()
         # 访问指定的 URL
@@ -128,10 +134,10 @@ class TiktokVideo(object):
         minute_selector = f"span.tiktok-timepicker-right:has-text('{minute_str}')"
 
         # pick hour first
-        await page.wait_for_timeout(1000)  # 等待500毫秒
+        await wait_for_selector(self.locator_base, hour_selector, timeout=1, label="tiktok.schedule_hour")
         await self.locator_base.locator(hour_selector).click()
         # click time button again
-        await page.wait_for_timeout(1000)  # 等待500毫秒
+        await wait_for_selector(self.locator_base, minute_selector, timeout=1, label="tiktok.schedule_minute")
         # pick minutes after
         await self.locator_base.locator(minute_selector).click()
 
@@ -147,54 +153,59 @@ class TiktokVideo(object):
         await file_chooser.set_files(self.file_path)
 
     async def upload(self, playwright: Playwright) -> None:
-        browser = await playwright.chromium.launch(headless=self.headless, executable_path=self.local_executable_path)
-        context = await browser.new_context(storage_state=f"{self.account_file}")
-        # context = await set_init_script(context)
-        page = await context.new_page()
-
-        # change language to eng first
-        await self.change_language(page)
-        await page.goto("https://www.tiktok.com/tiktokstudio/upload")
-        tiktok_logger.info(f'[+]Uploading-------{self.title}.mp4')
-
-        await page.wait_for_url("https://www.tiktok.com/tiktokstudio/upload", timeout=10000)
+        # 从共享浏览器池取一个独立的浏览器上下文
+        launch_options = {'headless': self.headless, 'executable_path': self.local_executable_path or None}
+        async with get_browser_pool().new_context(playwright.chromium, launch_options, init_script=False,
+                                                  storage_state=f"{self.account_file}") as context:
+            # context = await set_init_script(context)
+            # 不注入反检测脚本，但仍拦截无用资源
+            await set_route_filter(context, "tiktok", "upload")
+            page = await context.new_page()
+            # 在选择文件前开始监听上传接口
+            self.upload_monitor = UploadMonitor(page, "tiktok", self.file_path)
+            # 重试时记录轻量快照，任务失败时才落盘
+            self.page_capture = PageCapture(page, "tiktok")
+
+            # change language to eng first
+            await self.change_language(page)
+            await page.goto("https://www.tiktok.com/tiktokstudio/upload")
+            tiktok_logger.info(f'[+]Uploading-------{self.title}.mp4')
+
+            await page.wait_for_url("https://www.tiktok.com/tiktokstudio/upload", timeout=10000)
 
-        try:
-            await page.wait_for_selector('iframe[data-tt="Upload_index_iframe"], div.upload-container', timeout=10000)
-            tiktok_logger.info("Either iframe or div appeared.")
-        except Exception as e:
-            tiktok_logger.error("Neither iframe nor div appeared within the timeout.")
+            try:
+                await page.wait_for_selector('iframe[data-tt="Upload_index_iframe"], div.upload-container', timeout=10000)
+                tiktok_logger.info("Either iframe or div appeared.")
+            except Exception as e:
+                tiktok_logger.error("Neither iframe nor div appeared within the timeout.")
 
-        await self.choose_base_locator(page)
+            await self.choose_base_locator(page)
 
-        upload_button = self.locator_base.locator(
-            'button:has-text("Select video"):visible')
-        await upload_button.wait_for(state='visible')  # 确保按钮可见
+            upload_button = self.locator_base.locator(
+                'button:has-text("Select video"):visible')
+            await upload_button.wait_for(state='visible')  # 确保按钮可见
 
-        async with page.expect_file_chooser() as fc_info:
-            await upload_button.click()
-        file_chooser = await fc_info.value
-        await file_chooser.set_files(self.file_path)
+            async with page.expect_file_chooser() as fc_info:
+                await upload_button.click()
+            file_chooser = await fc_info.value
+            await file_chooser.set_files(self.file_path)
 
-        await self.add_title_tags(page)
-        # detect upload status
-        await self.detect_upload_status(page)
-        if self.thumbnail_path:
-            tiktok_logger.info(f'[+] Uploading thumbnail file {self.title}.png')
-            await self.upload_thumbnails(page)
+            await run_step("tiktok", "metadata", self.add_title_tags(page))
+            # detect upload status
+            await self.detect_upload_status(page)
+            if self.thumbnail_path:
+                tiktok_logger.info(f'[+] Uploading thumbnail file {self.title}.png')
+                await self.upload_thumbnails(page)
 
-        if self.publish_date != 0:
-            await self.set_schedule_time(page, self.publish_date)
+            if self.publish_date != 0:
+                await run_step("tiktok", "schedule", self.set_schedule_time(page, self.publish_date))
 
-        await self.click_publish(page)
-        tiktok_logger.success(f"video_id: {await self.get_last_video_id(page)}")
+            await self.click_publish(page)
+            tiktok_logger.success(f"video_id: {await self.get_last_video_id(page)}")
 
-        await context.storage_state(path=f"{self.account_file}")  # save cookie
-        tiktok_logger.info('  [-] update cookie！')
-        await asyncio.sleep(2)  # close delay for look the video status
-        # close all
-        await context.close()
-        await browser.close()
+            await save_storage_state(context, self.account_file)  # save cookie
+            cookie_cache.record(self.account_file, True)  # 刚发布成功，cookie 必然有效
+            tiktok_logger.info('  [-] update cookie！')
 
     async def add_title_tags(self, page):
 
@@ -209,10 +220,10 @@ class TiktokVideo(object):
 
         await page.keyboard.press("End")
 
-        await page.wait_for_timeout(1000)  # 等待1秒
+        await settle(page, timeout=1, label="tiktok.title_clear")
 
         await page.keyboard.insert_text(self.title)
-        await page.wait_for_timeout(1000)  # 等待1秒
+        await settle(page, timeout=1, label="tiktok.title")
         await page.keyboard.press("End")
 
         await page.keyboard.press("Enter")
@@ -221,10 +232,11 @@ class TiktokVideo(object):
         for index, tag in enumerate(self.tags, start=1):
             tiktok_logger.info("Setting the %s tag" % index)
             await page.keyboard.press("End")
-            await page.wait_for_timeout(1000)  # 等待1秒
+            await settle(page, timeout=1, label="tiktok.tag_focus")
             await page.keyboard.insert_text("#" + tag + " ")
             await page.keyboard.press("Space")
-            await page.wait_for_timeout(1000)  # 等待1秒
+            # 等话题联想请求结束再继续，页面空闲时不再固定等 1 秒
+            await settle(page, timeout=1, label="tiktok.tag")
 
             await page.keyboard.press("Backspace")
             await page.keyboard.press("End")
@@ -238,7 +250,9 @@ class TiktokVideo(object):
             await file_chooser.set_files(self.thumbnail_path)
         await self.locator_base.locator('div.cover-edit-panel:not(.hide-panel)').get_by_role(
             "button", name="Confirm").click()
-        await page.wait_for_timeout(3000)  # wait 3s, fix it later
+        # 等封面编辑面板收起，不再固定等待 3 秒
+        await wait_for_selector(self.locator_base, 'div.cover-edit-panel:not(.hide-panel)', state="hidden",
+                                timeout=3, label="tiktok.thumbnail")
 
     async def change_language(self, page):
         # set the language to english
@@ -254,6 +268,7 @@ class TiktokVideo(object):
         await page.locator('#creator-tools-selection-menu-header >> text=English (US)').click()
 
     async def click_publish(self, page):
+        budget = StepBudget("tiktok", "publish")
         success_flag_div = 'div.common-modal-confirm-modal'
         while True:
             try:
@@ -267,7 +282,8 @@ class TiktokVideo(object):
             except Exception as e:
                 tiktok_logger.exception(f"  [-] Exception: {e}")
                 tiktok_logger.info("  [-] video publishing")
-                await asyncio.sleep(0.5)
+                await self.page_capture.snapshot("publish")
+                await budget.retry(e)
 
     async def get_last_video_id(self, page):
         await page.wait_for_selector('div[data-tt="components_PostTable_Container"]')
@@ -279,23 +295,22 @@ class TiktokVideo(object):
 
 
     async def detect_upload_status(self, page):
-        while True:
-            try:
-                # if await self.locator_base.locator('div.btn-post > button').get_attribute("disabled") is None:
-                if await self.locator_base.locator(
-                        'div.button-group > button >> text=Post').get_attribute("disabled") is None:
-                    tiktok_logger.info("  [-]video uploaded.")
-                    break
-                else:
-                    tiktok_logger.info("  [-] video uploading...")
-                    await asyncio.sleep(2)
-                    if await self.locator_base.locator(
-                            'button[aria-label="Select file"]').count():
-                        tiktok_logger.info("  [-] found some error while uploading now retry...")
-                        await self.handle_upload_error(page)
-            except:
-                tiktok_logger.info("  [-] video uploading...")
-                await asyncio.sleep(2)
+        # upload commit response arrives first; the enabled Post button is the fallback check
+        async def uploaded():
+            return await self.locator_base.locator(
+                'div.button-group > button >> text=Post').get_attribute("disabled") is None
+
+        async def uploading(progress):
+            tiktok_logger.info(f"  [-] video uploading...{format_progress(progress)}")
+            if await self.locator_base.locator('button[aria-label="Select file"]').count():
+                tiktok_logger.info("  [-] found some error while uploading now retry...")
+                self.upload_monitor.reset()
+                await self.handle_upload_error(page)
+
+        budget = StepBudget("tiktok", "upload")
+        if not await self.upload_monitor.wait_until(uploaded, uploading, timeout=budget.budget):
+            budget.fail()
+        tiktok_logger.info("  [-]video uploaded.")
 
     async def choose_base_locator(self, page):
         # await page.wait_for_selector('div.upload-container')
@@ -305,5 +320,5 @@ class TiktokVideo(object):
             self.locator_base = page.locator(Tk_Locator.default) 
 
     async def main(self):
-        async with async_playwright() as playwright:
-            await self.upload(playwright)
+        async with use_browser_pool() as pool:
+            await self.upload(await pool.get_playwright())
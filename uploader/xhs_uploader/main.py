@@ -1,46 +1,58 @@
 import configparser
 import json
 import pathlib
-from time import sleep
 
 import requests
 from playwright.sync_api import sync_playwright
 
 from conf import BASE_DIR, XHS_SERVER, LOCAL_CHROME_HEADLESS
+from utils.network import RetryPolicy
 
 config = configparser.RawConfigParser()
 config.read('accounts.ini')
 
 
-def sign_local(uri, data=None, a1="", web_session=""):
-    for _ in range(10):
-        try:
-            with sync_playwright() as playwright:
-                stealth_js_path = pathlib.Path(BASE_DIR / "utils/stealth.min.js")
-                chromium = playwright.chromium
+# 签名失败时最多尝试 10 次，间隔指数退避；浏览器无法启动等不可重试的错误直接失败
+SIGN_RETRY_POLICY = RetryPolicy(name="xhs.sign_local", max_attempts=10, base_delay=1, max_delay=10)
+
+
+STEALTH_JS_PATH = pathlib.Path(BASE_DIR / "utils/stealth.min.js")
+# 设置 a1 cookie 后等待签名函数就绪的最长时间（毫秒）
+SIGN_READY_TIMEOUT = 10000
+
 
-                # 如果一直失败可尝试设置成 False 让其打开浏览器，适当添加 sleep 可查看浏览器状态
-                browser = chromium.launch(headless=LOCAL_CHROME_HEADLESS)
+def _sign_once(browser_context, uri, data, a1):
+    pages = browser_context.pages
+    context_page = pages[0] if pages else browser_context.new_page()
+    context_page.goto("https://www.xiaohongshu.com")
+    browser_context.add_cookies([
+        {'name': 'a1', 'value': a1, 'domain': ".xiaohongshu.com", 'path': "/"}]
+    )
+    context_page.reload()
+    # 设置完 cookie 重新加载后，等页面脚本注册好签名函数再调用
+    context_page.wait_for_function("() => typeof window._webmsxyw === 'function'", timeout=SIGN_READY_TIMEOUT)
+    encrypt_params = context_page.evaluate("([url, data]) => window._webmsxyw(url, data)", [uri, data])
+    return {
+        "x-s": encrypt_params["X-s"],
+        "x-t": str(encrypt_params["X-t"])
+    }
 
+
+def sign_local(uri, data=None, a1="", web_session=""):
+    # 这儿有时会出现 window._webmsxyw is not a function 或未知跳转错误，因此按重试策略重试；
+    # 浏览器只启动一次，各次重试复用同一个上下文
+    try:
+        with sync_playwright() as playwright:
+            # 如果一直失败可尝试设置成 False 让其打开浏览器查看状态
+            browser = playwright.chromium.launch(headless=LOCAL_CHROME_HEADLESS)
+            try:
                 browser_context = browser.new_context()
-                browser_context.add_init_script(path=stealth_js_path)
-                context_page = browser_context.new_page()
-                context_page.goto("https://www.xiaohongshu.com")
-                browser_context.add_cookies([
-                    {'name': 'a1', 'value': a1, 'domain': ".xiaohongshu.com", 'path': "/"}]
-                )
-                context_page.reload()
-                # 这个地方设置完浏览器 cookie 之后，如果这儿不 sleep 一下签名获取就失败了，如果经常失败请设置长一点试试
-                sleep(2)
-                encrypt_params = context_page.evaluate("([url, data]) => window._webmsxyw(url, data)", [uri, data])
-                return {
-                    "x-s": encrypt_params["X-s"],
-                    "x-t": str(encrypt_params["X-t"])
-                }
-        except Exception:
-            # 这儿有时会出现 window._webmsxyw is not a function 或未知跳转错误，因此加一个失败重试趴
-            pass
-    raise Exception("重试了这么多次还是无法签名成功，寄寄寄")
+                browser_context.add_init_script(path=STEALTH_JS_PATH)
+                return SIGN_RETRY_POLICY.run_sync(_sign_once, browser_context, uri, data, a1)
+            finally:
+                browser.close()
+    except Exception as e:
+        raise Exception("重试了这么多次还是无法签名成功，寄寄寄") from e
 
 
 def sign(uri, data=None, a1="", web_session=""):
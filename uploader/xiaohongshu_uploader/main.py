@@ -3,18 +3,35 @@ from datetime import datetime
 
 from playwright.async_api import Playwright, async_playwright, Page
 import os
-import asyncio
 
 from conf import LOCAL_CHROME_PATH, LOCAL_CHROME_HEADLESS
+from utils.account_lease import save_storage_state
 from utils.base_social_media import set_init_script
+from utils.browser_pool import get_browser_pool, use_browser_pool
+from utils.cookie_cache import cookie_cache
+from utils.cookie_probe import probe_cookie
 from utils.log import xiaohongshu_logger
+from utils.page_capture import PageCapture
+from utils.step_budget import StepBudget, run_step
+from utils.waits import settle, wait_for_selector, wait_until
+
+# 图文编辑页标题输入框的几种写法，出现即说明图片已上传进入编辑页
+IMAGE_TITLE_SELECTORS = [
+    "div.plugin.title-container input.d-text",
+    "input[placeholder*='标题']",
+    "textarea[placeholder*='标题']",
+]
 
 
 async def cookie_auth(account_file):
+    # 先用 HTTP 接口探测登录态，结论不明确时再开浏览器
+    flag = await probe_cookie(1, account_file)
+    if flag is not None:
+        return flag
     async with async_playwright() as playwright:
         browser = await playwright.chromium.launch(headless=LOCAL_CHROME_HEADLESS)
         context = await browser.new_context(storage_state=account_file)
-        context = await set_init_script(context)
+        context = await set_init_script(context, platform="xiaohongshu", profile="check")
         # 创建一个新的页面
         page = await context.new_page()
         # 访问指定的 URL
@@ -102,171 +119,172 @@ class XiaoHongShuVideo(object):
         label_element = page.locator("label:has-text('定时发布')")
         # # 在选中的 label 元素下点击 checkbox
         await label_element.click()
-        await asyncio.sleep(1)
+        # 等日期输入框出现再填写，不再固定等待
+        await wait_for_selector(page, '.el-input__inner[placeholder="选择日期和时间"]', timeout=5, label="xhs.schedule_input")
         publish_date_hour = publish_date.strftime("%Y-%m-%d %H:%M")
         print(f"publish_date_hour: {publish_date_hour}")
 
-        await asyncio.sleep(1)
         await page.locator('.el-input__inner[placeholder="选择日期和时间"]').click()
         await page.keyboard.press("Control+KeyA")
         await page.keyboard.type(str(publish_date_hour))
         await page.keyboard.press("Enter")
 
-        await asyncio.sleep(1)
+        await settle(page, timeout=1, label="xhs.schedule_confirm")
 
     async def handle_upload_error(self, page):
         xiaohongshu_logger.info('视频出错了，重新上传中')
         await page.locator('div.progress-div [class^="upload-btn-input"]').set_input_files(self.file_path)
 
     async def upload(self, playwright: Playwright) -> None:
-        # 使用 Chromium 浏览器启动一个浏览器实例
-        if self.local_executable_path:
-            browser = await playwright.chromium.launch(headless=self.headless, executable_path=self.local_executable_path)
-        else:
-            browser = await playwright.chromium.launch(headless=self.headless)
-        # 创建一个浏览器上下文，使用指定的 cookie 文件
-        context = await browser.new_context(
-            viewport={"width": 1600, "height": 900},
-            storage_state=f"{self.account_file}"
-        )
-        context = await set_init_script(context)
-
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=video")
-        xiaohongshu_logger.info(f'[+]正在上传-------{self.title}.mp4')
-        # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
-        xiaohongshu_logger.info(f'[-] 正在打开主页...')
-        await page.wait_for_url("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=video")
-        # 点击 "上传视频" 按钮
-        await page.locator("div[class^='upload-content'] input[class='upload-input']").set_input_files(self.file_path)
-
-        # 等待页面跳转到指定的 URL 2025.01.08修改在原有基础上兼容两种页面
-        while True:
-            try:
-                # 等待upload-input元素出现
-                upload_input = await page.wait_for_selector('input.upload-input', timeout=3000)
-                # 获取下一个兄弟元素
-                preview_new = await upload_input.query_selector(
-                    'xpath=following-sibling::div[contains(@class, "preview-new")]')
-                if preview_new:
-                    # 在preview-new元素中查找包含"上传成功"的stage元素
-                    stage_elements = await preview_new.query_selector_all('div.stage')
-                    upload_success = False
-                    for stage in stage_elements:
-                        text_content = await page.evaluate('(element) => element.textContent', stage)
-                        if '上传成功' in text_content:
-                            upload_success = True
-                            break
-                    if upload_success:
-                        xiaohongshu_logger.info("[+] 检测到上传成功标识!")
-                        break  # 成功检测到上传成功后跳出循环
+        # 从共享浏览器池取一个独立的浏览器上下文，使用指定的 cookie 文件
+        launch_options = {'headless': self.headless, 'executable_path': self.local_executable_path or None}
+        async with get_browser_pool().new_context(
+                playwright.chromium,
+                launch_options,
+                viewport={"width": 1600, "height": 900},
+                storage_state=f"{self.account_file}"
+        ) as context:
+            context = await set_init_script(context, platform="xiaohongshu", profile="upload")
+
+            # 创建一个新的页面
+            page = await context.new_page()
+            # 重试时记录轻量快照，任务失败时才落盘
+            self.page_capture = PageCapture(page, "xiaohongshu")
+            # 访问指定的 URL
+            await page.goto("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=video")
+            xiaohongshu_logger.info(f'[+]正在上传-------{self.title}.mp4')
+            # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
+            xiaohongshu_logger.info(f'[-] 正在打开主页...')
+            await page.wait_for_url("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=video")
+            # 点击 "上传视频" 按钮
+            await page.locator("div[class^='upload-content'] input[class='upload-input']").set_input_files(self.file_path)
+
+            # 等待页面跳转到指定的 URL 2025.01.08修改在原有基础上兼容两种页面
+            budget = StepBudget("xiaohongshu", "upload", interval=1)
+            while True:
+                try:
+                    # 等待upload-input元素出现
+                    upload_input = await page.wait_for_selector('input.upload-input', timeout=3000)
+                    # 获取下一个兄弟元素
+                    preview_new = await upload_input.query_selector(
+                        'xpath=following-sibling::div[contains(@class, "preview-new")]')
+                    if preview_new:
+                        # 在preview-new元素中查找包含"上传成功"的stage元素
+                        stage_elements = await preview_new.query_selector_all('div.stage')
+                        upload_success = False
+                        for stage in stage_elements:
+                            text_content = await page.evaluate('(element) => element.textContent', stage)
+                            if '上传成功' in text_content:
+                                upload_success = True
+                                break
+                        if upload_success:
+                            xiaohongshu_logger.info("[+] 检测到上传成功标识!")
+                            break  # 成功检测到上传成功后跳出循环
+                        else:
+                            print("  [-] 未找到上传成功标识，继续等待...")
                     else:
-                        print("  [-] 未找到上传成功标识，继续等待...")
-                else:
-                    print("  [-] 未找到预览元素，继续等待...")
-                    await asyncio.sleep(1)
-            except Exception as e:
-                print(f"  [-] 检测过程出错: {str(e)}，重新尝试...")
-                await asyncio.sleep(0.5)  # 等待0.5秒后重新尝试
-
-        # 填充标题和话题
-        # 检查是否存在包含输入框的元素
-        # 这里为了避免页面变化，故使用相对位置定位：作品标题父级右侧第一个元素的input子元素
-        await asyncio.sleep(1)
-        xiaohongshu_logger.info(f'  [-] 正在填充标题和话题...')
-        title_container = page.locator('div.plugin.title-container').locator('input.d-text')
-        if await title_container.count():
-            await title_container.fill(self.title[:30])
-        else:
-            titlecontainer = page.locator(".notranslate")
-            await titlecontainer.click()
-            await page.keyboard.press("Backspace")
-            await page.keyboard.press("Control+KeyA")
-            await page.keyboard.press("Delete")
-            await page.keyboard.type(self.title)
-            await page.keyboard.press("Enter")
-        css_selector = ".ql-editor" # 不能加上 .ql-blank 属性，这样只能获取第一次非空状态
-        for index, tag in enumerate(self.tags, start=1):
-            await page.type(css_selector, "#" + tag)
-            await page.press(css_selector, "Space")
-        xiaohongshu_logger.info(f'总共添加{len(self.tags)}个话题')
-
-        # while True:
-        #     # 判断重新上传按钮是否存在，如果不存在，代表视频正在上传，则等待
-        #     try:
-        #         #  新版：定位重新上传
-        #         number = await page.locator('[class^="long-card"] div:has-text("重新上传")').count()
-        #         if number > 0:
-        #             xiaohongshu_logger.success("  [-]视频上传完毕")
-        #             break
-        #         else:
-        #             xiaohongshu_logger.info("  [-] 正在上传视频中...")
-        #             await asyncio.sleep(2)
-
-        #             if await page.locator('div.progress-div > div:has-text("上传失败")').count():
-        #                 xiaohongshu_logger.error("  [-] 发现上传出错了... 准备重试")
-        #                 await self.handle_upload_error(page)
-        #     except:
-        #         xiaohongshu_logger.info("  [-] 正在上传视频中...")
-        #         await asyncio.sleep(2)
+                        print("  [-] 未找到预览元素，继续等待...")
+                except Exception as e:
+                    print(f"  [-] 检测过程出错: {str(e)}，重新尝试...")
+                await budget.retry()  # 等待1秒后重新检查，超出预算则失败
+
+            # 填充标题和话题
+            # 检查是否存在包含输入框的元素
+            # 这里为了避免页面变化，故使用相对位置定位：作品标题父级右侧第一个元素的input子元素
+            await wait_for_selector(page, 'div.plugin.title-container input.d-text, .notranslate', timeout=5,
+                                    label="xiaohongshu.title_editor")
+            xiaohongshu_logger.info(f'  [-] 正在填充标题和话题...')
+            title_container = page.locator('div.plugin.title-container').locator('input.d-text')
+            if await title_container.count():
+                await title_container.fill(self.title[:30])
+            else:
+                titlecontainer = page.locator(".notranslate")
+                await titlecontainer.click()
+                await page.keyboard.press("Backspace")
+                await page.keyboard.press("Control+KeyA")
+                await page.keyboard.press("Delete")
+                await page.keyboard.type(self.title)
+                await page.keyboard.press("Enter")
+            css_selector = ".ql-editor" # 不能加上 .ql-blank 属性，这样只能获取第一次非空状态
+            for index, tag in enumerate(self.tags, start=1):
+                await page.type(css_selector, "#" + tag)
+                await page.press(css_selector, "Space")
+            xiaohongshu_logger.info(f'总共添加{len(self.tags)}个话题')
+
+            # while True:
+            #     # 判断重新上传按钮是否存在，如果不存在，代表视频正在上传，则等待
+            #     try:
+            #         #  新版：定位重新上传
+            #         number = await page.locator('[class^="long-card"] div:has-text("重新上传")').count()
+            #         if number > 0:
+            #             xiaohongshu_logger.success("  [-]视频上传完毕")
+            #             break
+            #         else:
+            #             xiaohongshu_logger.info("  [-] 正在上传视频中...")
+            #             await asyncio.sleep(2)
+
+            #             if await page.locator('div.progress-div > div:has-text("上传失败")').count():
+            #                 xiaohongshu_logger.error("  [-] 发现上传出错了... 准备重试")
+            #                 await self.handle_upload_error(page)
+            #     except:
+            #         xiaohongshu_logger.info("  [-] 正在上传视频中...")
+            #         await asyncio.sleep(2)
         
-        # 上传视频封面
-        # await self.set_thumbnail(page, self.thumbnail_path)
+            # 上传视频封面
+            # await self.set_thumbnail(page, self.thumbnail_path)
 
-        await self.apply_publish_options(page)
+            await self.apply_publish_options(page)
 
-        # 更换可见元素
-        # await self.set_location(page, "青岛市")
+            # 更换可见元素
+            # await self.set_location(page, "青岛市")
 
-        # # 頭條/西瓜
-        # third_part_element = '[class^="info"] > [class^="first-part"] div div.semi-switch'
-        # # 定位是否有第三方平台
-        # if await page.locator(third_part_element).count():
-        #     # 检测是否是已选中状态
-        #     if 'semi-switch-checked' not in await page.eval_on_selector(third_part_element, 'div => div.className'):
-        #         await page.locator(third_part_element).locator('input.semi-switch-native-control').click()
+            # # 頭條/西瓜
+            # third_part_element = '[class^="info"] > [class^="first-part"] div div.semi-switch'
+            # # 定位是否有第三方平台
+            # if await page.locator(third_part_element).count():
+            #     # 检测是否是已选中状态
+            #     if 'semi-switch-checked' not in await page.eval_on_selector(third_part_element, 'div => div.className'):
+            #         await page.locator(third_part_element).locator('input.semi-switch-native-control').click()
 
-        if self.publish_date != 0:
-            await self.set_schedule_time_xiaohongshu(page, self.publish_date)
+            if self.publish_date != 0:
+                await run_step("xiaohongshu", "schedule", self.set_schedule_time_xiaohongshu(page, self.publish_date))
 
-        # 判断视频是否发布成功
-        while True:
-            try:
-                # 等待包含"定时发布"文本的button元素出现并点击
-                if self.publish_date != 0:
-                    await page.locator('button:has-text("定时发布")').click()
-                else:
-                    await page.locator('button:has-text("发布")').click()
-                await page.wait_for_url(
-                    "https://creator.xiaohongshu.com/publish/success?**",
-                    timeout=3000
-                )  # 如果自动跳转到作品页面，则代表发布成功
-                xiaohongshu_logger.success("  [-]视频发布成功")
-                break
-            except:
-                xiaohongshu_logger.info("  [-] 视频正在发布中...")
-                await page.screenshot(full_page=True)
-                await asyncio.sleep(0.5)
-
-        await context.storage_state(path=self.account_file)  # 保存cookie
-        xiaohongshu_logger.success('  [-]cookie更新完毕！')
-        await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
-        # 关闭浏览器上下文和浏览器实例
-        await context.close()
-        await browser.close()
+            # 判断视频是否发布成功
+            budget = StepBudget("xiaohongshu", "publish")
+            while True:
+                try:
+                    # 等待包含"定时发布"文本的button元素出现并点击
+                    if self.publish_date != 0:
+                        await page.locator('button:has-text("定时发布")').click()
+                    else:
+                        await page.locator('button:has-text("发布")').click()
+                    await page.wait_for_url(
+                        "https://creator.xiaohongshu.com/publish/success?**",
+                        timeout=3000
+                    )  # 如果自动跳转到作品页面，则代表发布成功
+                    xiaohongshu_logger.success("  [-]视频发布成功")
+                    break
+                except Exception as e:
+                    xiaohongshu_logger.info("  [-] 视频正在发布中...")
+                    await self.page_capture.snapshot("publish")
+                    await budget.retry(e)
+
+            await save_storage_state(context, self.account_file)  # 保存cookie
+            cookie_cache.record(self.account_file, True)  # 刚发布成功，cookie 必然有效
+            xiaohongshu_logger.success('  [-]cookie更新完毕！')
     
     async def set_thumbnail(self, page: Page, thumbnail_path: str):
         if thumbnail_path:
             await page.click('text="选择封面"')
             await page.wait_for_selector("div.semi-modal-content:visible")
             await page.click('text="设置竖封面"')
-            await page.wait_for_timeout(2000)  # 等待2秒
+            upload_input = "div[class^='semi-upload upload'] >> input.semi-upload-hidden-input"
+            await wait_for_selector(page, upload_input, state="attached", timeout=5, label="xiaohongshu.thumbnail_input")
             # 定位到上传区域并点击
-            await page.locator("div[class^='semi-upload upload'] >> input.semi-upload-hidden-input").set_input_files(thumbnail_path)
-            await page.wait_for_timeout(2000)  # 等待2秒
-            await page.locator("div[class^='extractFooter'] button:visible:has-text('完成')").click()
+            await page.locator(upload_input).set_input_files(thumbnail_path)
+            finish_button = "div[class^='extractFooter'] button:visible:has-text('完成')"
+            await wait_for_selector(page, finish_button, timeout=10, label="xiaohongshu.thumbnail_uploaded")
+            await page.locator(finish_button).click()
             # finish_confirm_element = page.locator("div[class^='confirmBtn'] >> div:has-text('完成')")
             # if await finish_confirm_element.count():
             #     await finish_confirm_element.click()
@@ -283,24 +301,22 @@ class XiaoHongShuVideo(object):
         print("点击地点输入框完成")
         
         # 输入位置名称
-        print(f"等待1秒后输入位置名称: {location}")
-        await page.wait_for_timeout(1000)
+        await settle(page, timeout=1, label="xiaohongshu.location_input")
+        print(f"输入位置名称: {location}")
         await page.keyboard.type(location)
         print(f"位置名称输入完成: {location}")
         
         # 等待下拉列表加载
         print("等待下拉列表加载...")
         dropdown_selector = 'div.d-popover.d-popover-default.d-dropdown.--size-min-width-large'
-        await page.wait_for_timeout(3000)
         try:
             await page.wait_for_selector(dropdown_selector, timeout=3000)
             print("下拉列表已加载")
         except:
             print("下拉列表未按预期显示，可能结构已变化")
         
-        # 增加等待时间以确保内容加载完成
-        print("额外等待1秒确保内容渲染完成...")
-        await page.wait_for_timeout(1000)
+        # 等待下拉内容渲染完成
+        await settle(page, timeout=1, label="xiaohongshu.location_dropdown")
         
         # 尝试更灵活的XPath选择器
         print("尝试使用更灵活的XPath选择器...")
@@ -310,7 +326,6 @@ class XiaoHongShuVideo(object):
             f'//div[contains(@class, "d-grid") and contains(@class, "d-options")]'
             f'//div[contains(@class, "name") and text()="{location}"]'
         )
-        await page.wait_for_timeout(3000)
         
         # 尝试定位元素
         print(f"尝试定位包含'{location}'的选项...")
@@ -423,7 +438,9 @@ class XiaoHongShuVideo(object):
                         await agreement.click(timeout=2000, force=True)
                 else:
                     await agreement.click(timeout=2000)
-                await page.wait_for_timeout(100)
+                # 等勾选生效，“声明原创”按钮才会变为可用
+                await wait_until(page.locator(".d-modal .d-checkbox input[type='checkbox']").first.is_checked,
+                                 timeout=1, interval=0.1, label="xiaohongshu.original_agreement")
                 break
             except Exception:
                 continue
@@ -439,7 +456,6 @@ class XiaoHongShuVideo(object):
             if await button.count():
                 try:
                     await button.click(timeout=2000)
-                    await page.wait_for_timeout(200)
                 except Exception:
                     pass
                 break
@@ -486,8 +502,8 @@ class XiaoHongShuVideo(object):
         await self.set_visibility(page)
 
     async def main(self):
-        async with async_playwright() as playwright:
-            await self.upload(playwright)
+        async with use_browser_pool() as pool:
+            await self.upload(await pool.get_playwright())
 
 
 class XiaoHongShuImage(object):
@@ -525,22 +541,17 @@ class XiaoHongShuImage(object):
     async def set_schedule_time_xiaohongshu(self, page, publish_date):
         label_element = page.locator("label:has-text('定时发布')")
         await label_element.click()
-        await asyncio.sleep(1)
+        await wait_for_selector(page, '.el-input__inner[placeholder="选择日期和时间"]', timeout=5, label="xhs.schedule_input")
         publish_date_hour = publish_date.strftime("%Y-%m-%d %H:%M")
         await page.locator('.el-input__inner[placeholder="选择日期和时间"]').click()
         await page.keyboard.press("Control+KeyA")
         await page.keyboard.type(str(publish_date_hour))
         await page.keyboard.press("Enter")
-        await asyncio.sleep(1)
+        await settle(page, timeout=1, label="xhs.schedule_confirm")
 
     async def fill_title_and_tags(self, page):
-        await asyncio.sleep(1)
         xiaohongshu_logger.info('  [-] 正在填充标题和话题...')
-        title_selectors = [
-            "div.plugin.title-container input.d-text",
-            "input[placeholder*='标题']",
-            "textarea[placeholder*='标题']",
-        ]
+        title_selectors = IMAGE_TITLE_SELECTORS
         title_filled = False
         for selector in title_selectors:
             locator = page.locator(selector).first
@@ -595,69 +606,70 @@ class XiaoHongShuImage(object):
         xiaohongshu_logger.info(f'正文长度{len(self.body)}，总共添加{len(self.tags)}个话题')
 
     async def upload(self, playwright: Playwright) -> None:
-        if self.local_executable_path:
-            browser = await playwright.chromium.launch(headless=self.headless, executable_path=self.local_executable_path)
-        else:
-            browser = await playwright.chromium.launch(headless=self.headless)
-        context = await browser.new_context(
-            viewport={"width": 1600, "height": 900},
-            storage_state=f"{self.account_file}"
-        )
-        context = await set_init_script(context)
-        page = await context.new_page()
-        await page.goto("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=normal")
-        await page.wait_for_url("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=normal")
-        xiaohongshu_logger.info(f'[+]正在上传图文，共{len(self.file_paths)}张')
-
-        # 平台现状：默认先落在 normal，需要点击“上传图文”切换到 image。
-        try:
-            switch_btn = page.get_by_text("上传图文").first
-            if await switch_btn.count():
-                await switch_btn.click(timeout=5000)
-                await page.wait_for_url("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=image", timeout=10000)
-            else:
+        launch_options = {'headless': self.headless, 'executable_path': self.local_executable_path or None}
+        async with get_browser_pool().new_context(
+                playwright.chromium,
+                launch_options,
+                viewport={"width": 1600, "height": 900},
+                storage_state=f"{self.account_file}"
+        ) as context:
+            context = await set_init_script(context, platform="xiaohongshu", profile="upload")
+            page = await context.new_page()
+            self.page_capture = PageCapture(page, "xiaohongshu")
+            await page.goto("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=normal")
+            await page.wait_for_url("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=normal")
+            xiaohongshu_logger.info(f'[+]正在上传图文，共{len(self.file_paths)}张')
+
+            # 平台现状：默认先落在 normal，需要点击“上传图文”切换到 image。
+            try:
+                switch_btn = page.get_by_text("上传图文").first
+                if await switch_btn.count():
+                    await switch_btn.click(timeout=5000)
+                    await page.wait_for_url("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=image", timeout=10000)
+                else:
+                    await page.goto("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=image")
+                    await page.wait_for_url("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=image", timeout=10000)
+            except Exception:
+                # 容错：按钮文本或位置变化时，直接跳 image 链接
                 await page.goto("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=image")
                 await page.wait_for_url("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=image", timeout=10000)
-        except Exception:
-            # 容错：按钮文本或位置变化时，直接跳 image 链接
-            await page.goto("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=image")
-            await page.wait_for_url("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=image", timeout=10000)
 
-        await page.locator("input.upload-input").set_input_files(self.file_paths)
+            await page.locator("input.upload-input").set_input_files(self.file_paths)
 
-        # 图文上传完成状态在不同版本页面结构差异较大，先采用保守等待。
-        await asyncio.sleep(8)
+            # 图文上传完成状态在不同版本页面结构差异较大：等标题输入框出现、网络空闲即继续，最多仍是原来的 8 秒
+            await wait_for_selector(page, ", ".join(IMAGE_TITLE_SELECTORS), timeout=8, label="xhs.image_editor")
+            await settle(page, timeout=3, label="xhs.image_uploaded")
 
-        await self.fill_title_and_tags(page)
-        await self.apply_publish_options(page)
-        if self.publish_date != 0:
-            await self.set_schedule_time_xiaohongshu(page, self.publish_date)
+            await run_step("xiaohongshu", "metadata", self.fill_title_and_tags(page))
+            await self.apply_publish_options(page)
+            if self.publish_date != 0:
+                await run_step("xiaohongshu", "schedule", self.set_schedule_time_xiaohongshu(page, self.publish_date))
 
-        while True:
-            try:
-                if self.publish_date != 0:
-                    await page.locator('button:has-text("定时发布")').click()
-                else:
-                    await page.locator('button:has-text("发布")').click()
-                await page.wait_for_url(
-                    "https://creator.xiaohongshu.com/publish/success?**",
-                    timeout=3000
-                )
-                xiaohongshu_logger.success("  [-]图文发布成功")
-                break
-            except Exception:
-                xiaohongshu_logger.info("  [-] 图文正在发布中...")
-                await asyncio.sleep(0.5)
+            budget = StepBudget("xiaohongshu", "publish")
+            while True:
+                try:
+                    if self.publish_date != 0:
+                        await page.locator('button:has-text("定时发布")').click()
+                    else:
+                        await page.locator('button:has-text("发布")').click()
+                    await page.wait_for_url(
+                        "https://creator.xiaohongshu.com/publish/success?**",
+                        timeout=3000
+                    )
+                    xiaohongshu_logger.success("  [-]图文发布成功")
+                    break
+                except Exception as e:
+                    xiaohongshu_logger.info("  [-] 图文正在发布中...")
+                    await self.page_capture.snapshot("publish")
+                    await budget.retry(e)
 
-        await context.storage_state(path=self.account_file)
-        xiaohongshu_logger.success('  [-]cookie更新完毕！')
-        await asyncio.sleep(2)
-        await context.close()
-        await browser.close()
+            await save_storage_state(context, self.account_file)
+            cookie_cache.record(self.account_file, True)  # 刚发布成功，cookie 必然有效
+            xiaohongshu_logger.success('  [-]cookie更新完毕！')
 
     async def main(self):
-        async with async_playwright() as playwright:
-            await self.upload(playwright)
+        async with use_browser_pool() as pool:
+            await self.upload(await pool.get_playwright())
 
     async def probe_publish_options(self, page: Page, prefix: str):
         original_count = await page.locator(".original-wrapper").count()
@@ -707,7 +719,9 @@ class XiaoHongShuImage(object):
                         await agreement.click(timeout=2000, force=True)
                 else:
                     await agreement.click(timeout=2000)
-                await page.wait_for_timeout(100)
+                # 等勾选生效，“声明原创”按钮才会变为可用
+                await wait_until(page.locator(".d-modal .d-checkbox input[type='checkbox']").first.is_checked,
+                                 timeout=1, interval=0.1, label="xiaohongshu.original_agreement")
                 break
             except Exception:
                 continue
@@ -723,7 +737,6 @@ class XiaoHongShuImage(object):
             if await button.count():
                 try:
                     await button.click(timeout=2000)
-                    await page.wait_for_timeout(200)
                 except Exception:
                     pass
                 break
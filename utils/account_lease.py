@@ -0,0 +1,156 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 等待账号租约时的轮询间隔（秒）
+LEASE_POLL_INTERVAL = 0.05
+
+
+class AccountLeaseManager(object):
+    """
+    账号租约：同一个 cookie 文件同一时刻只允许一个任务使用，跨线程、跨事件循环生效。
+    只在本进程内有效；跨进程、跨机器由任务认领时的账号检查保证（见 PublishJobQueue.claim_next）。
+    记录每个账号的等待次数和等待时长，便于观察账号争用。
+    """
+
+    def __init__(self, poll_interval=None):
+        self.poll_interval = poll_interval or LEASE_POLL_INTERVAL
+        self._locks = {}
+        self._metrics = {}
+        self._guard = threading.Lock()
+
+    @staticmethod
+    def _key(account_file):
+        return os.path.abspath(str(account_file))
+
+    def _lock_for(self, key):
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _record_wait(self, key, waited):
+        with self._guard:
+            metrics = self._metrics.setdefault(key, {"leases": 0, "waited": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0})
+            metrics["leases"] += 1
+            if waited > 0:
+                metrics["waited"] += 1
+                metrics["wait_seconds"] += waited
+                metrics["max_wait_seconds"] = max(metrics["max_wait_seconds"], waited)
+
+    @asynccontextmanager
+    async def lease(self, account_file):
+        key = self._key(account_file)
+        lock = self._lock_for(key)
+        started = time.monotonic()
+        waited = 0
+        # threading.Lock 不能在协程里阻塞等待，这里非阻塞轮询，取消时也不会遗留已持有的锁
+        while not lock.acquire(blocking=False):
+            await asyncio.sleep(self.poll_interval)
+            waited = time.monotonic() - started
+        self._record_wait(key, waited)
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def is_leased(self, account_file):
+        return self._lock_for(self._key(account_file)).locked()
+
+    def stats(self):
+        with self._guard:
+            return {key: dict(metrics) for key, metrics in self._metrics.items()}
+
+
+def _cookie_key(cookie):
+    return cookie.get("name"), cookie.get("domain"), cookie.get("path")
+
+
+def merge_storage_state(old_state, new_state, now=None):
+    """
+    合并两份 storage_state：同名 cookie（name+domain+path）以新的为准，
+    旧文件里独有且未过期的 cookie 保留；localStorage 按 origin 合并。
+    """
+    now = time.time() if now is None else now
+    cookies = {}
+    for cookie in (old_state or {}).get("cookies", []):
+        expires = cookie.get("expires", -1)
+        if expires is None or expires <= 0 or expires > now:
+            cookies[_cookie_key(cookie)] = cookie
+    for cookie in (new_state or {}).get("cookies", []):
+        cookies[_cookie_key(cookie)] = cookie
+    origins = {origin.get("origin"): origin for origin in (old_state or {}).get("origins", [])}
+    for origin in (new_state or {}).get("origins", []):
+        origins[origin.get("origin")] = origin
+    return {"cookies": list(cookies.values()), "origins": list(origins.values())}
+
+
+def write_json_atomic(path, data):
+    """先写同目录临时文件再 rename，读者不会看到写了一半的 cookie 文件。"""
+    path = os.path.abspath(str(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def file_lock(path):
+    """
+    跨进程的排他文件锁，锁文件为同目录下的 .{文件名}.lock。
+    同一台机器上的多个 worker 进程依次进入；共享目录上的效果取决于文件系统对 flock 的支持。
+    """
+    path = os.path.abspath(str(path))
+    lock_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.lock")
+    with open(lock_path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def merge_storage_state_file(account_file, state):
+    """在文件锁内读出账号文件、合并 state 并原子写回，多个进程同时写同一账号时不会丢 cookie。"""
+    with file_lock(account_file):
+        try:
+            with open(account_file, "r", encoding="utf-8") as f:
+                old_state = json.load(f)
+        except (OSError, ValueError):
+            old_state = None
+        write_json_atomic(account_file, merge_storage_state(old_state, state))
+
+
+async def save_storage_state(context, account_file):
+    """把浏览器上下文的最新 cookie 合并进账号文件并原子写回。"""
+    state = await context.storage_state()
+    # 等文件锁可能阻塞，放到线程里执行，不卡住事件循环
+    await asyncio.to_thread(merge_storage_state_file, account_file, state)
+
+
+account_leases = AccountLeaseManager()
@@ -1,6 +1,11 @@
+import os
+import re
+import threading
+import weakref
 from pathlib import Path
 from typing import List
 
+import conf
 from conf import BASE_DIR
 
 SOCIAL_MEDIA_DOUYIN = "douyin"
@@ -9,6 +14,62 @@ SOCIAL_MEDIA_TIKTOK = "tiktok"
 SOCIAL_MEDIA_BILIBILI = "bilibili"
 SOCIAL_MEDIA_KUAISHOU = "kuaishou"
 SOCIAL_MEDIA_XIAOHONGSHU = "xiaohongshu"
+SOCIAL_MEDIA_BAIJIAHAO = "baijiahao"
+
+STEALTH_JS_PATH = Path(BASE_DIR / "utils/stealth.min.js")
+
+# 是否拦截页面上用不到的资源请求（图片、字体、埋点、推荐流等）
+ROUTE_FILTER_ENABLED = getattr(conf, "ROUTE_FILTER_ENABLED", True)
+
+# 各场景拦截的资源类型：check 为 cookie 校验，只看 DOM；upload 为上传流程，保留图片和样式供封面等交互使用
+BLOCKED_RESOURCE_TYPES = {
+    "check": {"image", "media", "font"},
+    "upload": {"media", "font"},
+}
+
+# 按资源类型拦截时，只有 URL 以这些扩展名结尾的请求才会被拦截（见 route_pattern）
+RESOURCE_TYPE_EXTENSIONS = {
+    "image": ["png", "jpe?g", "gif", "webp", "avif", "svg", "ico"],
+    "media": ["mp4", "m4s", "m3u8", "webm", "flv", "mp3"],
+    "font": ["woff2?", "ttf", "otf", "eot"],
+}
+
+# 各平台的埋点、监控、推荐流请求（正则），任何场景都拦截；common 对所有平台生效，只列已知的统计域名
+BLOCKED_URL_PATTERNS = {
+    "common": [r"google-analytics\.com", r"googletagmanager\.com", r"hm\.baidu\.com"],
+    SOCIAL_MEDIA_DOUYIN: [r"mcs\.zijieapi\.com", r"mon\.zijieapi\.com", r"/monitor_browser/", r"/aweme/v1/web/tab/feed"],
+    SOCIAL_MEDIA_TENCENT: [r"badjs", r"/cgi-bin/mmfinderassistant-bin/helper/hel_report", r"aegis\.qq\.com"],
+    SOCIAL_MEDIA_KUAISHOU: [r"log-sdk\.ksapisrv\.com", r"/rest/wd/common/log", r"/rest/n/feed/"],
+    SOCIAL_MEDIA_XIAOHONGSHU: [r"apm-fe\.xiaohongshu\.com", r"t2\.xiaohongshu\.com", r"/api/sns/web/v1/homefeed"],
+    SOCIAL_MEDIA_TIKTOK: [r"mcs\.tiktokw?\.(com|us)", r"mon\.tiktokv\.com", r"/api/recommend/item_list"],
+    SOCIAL_MEDIA_BAIJIAHAO: [r"hmma\.baidu\.com", r"/ztbox\?action="],
+}
+
+# 必须放行的请求（正则），优先于上面的拦截规则：验证码、扫码等流程要用到图片
+ALLOWED_URL_PATTERNS = {
+    "common": [r"captcha", r"verify", r"qrcode"],
+    SOCIAL_MEDIA_DOUYIN: [r"douyinpic\.com/.*cover"],
+    SOCIAL_MEDIA_XIAOHONGSHU: [r"xhscdn\.com/.*cover"],
+}
+
+# 视频上传接口（正则），完全不经过拦截路由，几百 MB 的上传请求不会被转发到 Python
+UPLOAD_URL_PATTERNS = {
+    "common": [r"upload"],
+    SOCIAL_MEDIA_DOUYIN: [r"vod\.bytedanceapi\.com"],
+}
+
+
+def _load_patterns(table, overrides):
+    # conf 中同名平台的规则追加到默认规则之后
+    merged = {key: list(patterns) for key, patterns in table.items()}
+    for key, patterns in (overrides or {}).items():
+        merged.setdefault(key, []).extend(patterns)
+    return {key: [re.compile(pattern) for pattern in patterns] for key, patterns in merged.items()}
+
+
+_blocked_patterns = _load_patterns(BLOCKED_URL_PATTERNS, getattr(conf, "ROUTE_FILTER_BLOCK", None))
+_allowed_patterns = _load_patterns(ALLOWED_URL_PATTERNS, getattr(conf, "ROUTE_FILTER_ALLOW", None))
+_upload_patterns = _load_patterns(UPLOAD_URL_PATTERNS, getattr(conf, "ROUTE_FILTER_SKIP", None))
 
 
 def get_supported_social_media() -> List[str]:
@@ -19,7 +80,81 @@ def get_cli_action() -> List[str]:
     return ["upload", "login", "watch"]
 
 
-async def set_init_script(context):
-    stealth_js_path = Path(BASE_DIR / "utils/stealth.min.js")
-    await context.add_init_script(path=stealth_js_path)
+def should_block(platform, profile, url, resource_type) -> bool:
+    """判断某个请求在指定平台、场景下是否应被拦截。"""
+    if any(p.search(url) for key in ("common", platform) for p in _allowed_patterns.get(key, [])):
+        return False
+    if resource_type in BLOCKED_RESOURCE_TYPES.get(profile, ()):
+        return True
+    return any(p.search(url) for key in ("common", platform) for p in _blocked_patterns.get(key, []))
+
+
+def route_pattern(platform, profile):
+    """
+    拦截路由要匹配的 URL 正则：该平台的拦截规则，加上本场景拦截类型对应的扩展名，排除上传接口。
+    正则交给浏览器侧匹配，不匹配的请求（包括上传请求）不会被转发到 Python。
+    """
+    def joined(table):
+        return "|".join(p.pattern for key in ("common", platform) for p in table.get(key, []))
+
+    targets = [joined(_blocked_patterns)]
+    extensions = [ext for kind in sorted(BLOCKED_RESOURCE_TYPES.get(profile, ()))
+                  for ext in RESOURCE_TYPE_EXTENSIONS.get(kind, [])]
+    if extensions:
+        targets.append(rf"\.(?:{'|'.join(extensions)})(?:[?#]|$)")
+    skip = joined(_upload_patterns)
+    prefix = rf"^(?!.*(?:{skip}))" if skip else "^"
+    return re.compile(prefix + rf".*(?:{'|'.join(t for t in targets if t)})")
+
+
+async def set_route_filter(context, platform, profile="upload"):
+    async def handle(route):
+        request = route.request
+        try:
+            if should_block(platform, profile, request.url, request.resource_type):
+                await route.abort()
+            else:
+                await route.continue_()
+        except Exception:
+            # 上下文关闭时仍在途的请求会处理失败，忽略即可
+            pass
+
+    await context.route(route_pattern(platform, profile), handle)
+    return context
+
+
+_stealth_cache = {"key": None, "source": None}
+_stealth_lock = threading.Lock()
+# 已注入过反检测脚本的上下文，浏览器池创建时已注入的不再重复注入
+_stealth_contexts = weakref.WeakSet()
+
+
+def load_stealth_script(path=STEALTH_JS_PATH) -> str:
+    """
+    读取反检测脚本并常驻内存，每个进程只读一次；文件修改时间或大小变化时自动重新读取。
+    """
+    stat = os.stat(path)
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    with _stealth_lock:
+        if _stealth_cache["key"] != key:
+            with open(path, "r", encoding="utf-8") as f:
+                _stealth_cache["source"] = f.read()
+            _stealth_cache["key"] = key
+        return _stealth_cache["source"]
+
+
+async def add_stealth_script(context):
+    if context in _stealth_contexts:
+        return context
+    # 直接传脚本内容，避免每个上下文都让 Playwright 重新读文件
+    await context.add_init_script(script=load_stealth_script())
+    _stealth_contexts.add(context)
+    return context
+
+
+async def set_init_script(context, platform=None, profile=None):
+    """注入反检测脚本；传入 platform 和 profile（check/upload）时同时按场景拦截无用资源。"""
+    await add_stealth_script(context)
+    if ROUTE_FILTER_ENABLED and platform and profile:
+        await set_route_filter(context, platform, profile)
     return context
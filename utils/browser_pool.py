@@ -0,0 +1,263 @@
+import asyncio
+import contextvars
+import threading
+import weakref
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+import conf
+from utils.base_social_media import add_stealth_script
+
+# 同一组启动参数最多常驻的浏览器数量
+BROWSER_POOL_SIZE = getattr(conf, "BROWSER_POOL_SIZE", 2)
+# 单个浏览器同时持有的上下文上限
+BROWSER_POOL_MAX_CONTEXTS = getattr(conf, "BROWSER_POOL_MAX_CONTEXTS", 8)
+# 单个浏览器累计服务多少个任务后回收重启
+BROWSER_POOL_MAX_JOBS = getattr(conf, "BROWSER_POOL_MAX_JOBS", 50)
+# 池中新建的上下文默认注入反检测脚本
+BROWSER_POOL_STEALTH = getattr(conf, "BROWSER_POOL_STEALTH", True)
+
+
+class _PooledBrowser(object):
+    def __init__(self, browser):
+        self.browser = browser
+        self.active = 0
+        self.jobs = 0
+
+    @property
+    def healthy(self):
+        return self.browser.is_connected()
+
+    @property
+    def retired(self):
+        return self.jobs >= BROWSER_POOL_MAX_JOBS
+
+
+class BrowserPool(object):
+    """
+    进程内共享的浏览器池：按启动参数复用少量常驻浏览器，每个任务拿到独立的上下文。
+    Playwright 对象绑定事件循环，所以每个事件循环各有一个池，见 get_browser_pool。
+    """
+
+    def __init__(self, size=None, max_contexts=None, stealth=None):
+        self.size = size or BROWSER_POOL_SIZE
+        self.max_contexts = max_contexts or BROWSER_POOL_MAX_CONTEXTS
+        self.stealth = BROWSER_POOL_STEALTH if stealth is None else stealth
+        self._playwright_manager = None
+        self._playwright = None
+        self._browsers = {}
+        self._owners = {}
+        self._condition = asyncio.Condition()
+
+    async def get_playwright(self):
+        if self._playwright is None:
+            self._playwright_manager = async_playwright()
+            self._playwright = await self._playwright_manager.start()
+        return self._playwright
+
+    @staticmethod
+    def _pool_key(browser_type, launch_options):
+        return browser_type, repr(sorted(launch_options.items()))
+
+    async def _drop(self, key, pooled):
+        self._browsers[key].remove(pooled)
+        try:
+            await pooled.browser.close()
+        except Exception:
+            pass
+
+    async def _checkout(self, browser_type, launch_options):
+        key = self._pool_key(browser_type, launch_options)
+        async with self._condition:
+            while True:
+                browsers = self._browsers.setdefault(key, [])
+                # 健康检查：断开连接的浏览器直接丢弃
+                for pooled in [item for item in browsers if not item.healthy]:
+                    await self._drop(key, pooled)
+                candidates = [item for item in browsers if not item.retired and item.active < self.max_contexts]
+                if candidates:
+                    pooled = min(candidates, key=lambda item: item.active)
+                elif len([item for item in browsers if not item.retired]) < self.size:
+                    pooled = _PooledBrowser(await browser_type.launch(**launch_options))
+                    browsers.append(pooled)
+                else:
+                    await self._condition.wait()
+                    continue
+                pooled.active += 1
+                return key, pooled
+
+    async def _checkin(self, key, pooled):
+        async with self._condition:
+            pooled.active -= 1
+            pooled.jobs += 1
+            # 达到任务上限且空闲时回收，下一次取用会重新启动
+            if pooled.retired and pooled.active == 0 and pooled in self._browsers.get(key, []):
+                await self._drop(key, pooled)
+            self._condition.notify_all()
+
+    async def acquire_context(self, browser_type, launch_options=None, init_script=True, **context_options):
+        """
+        从池中取一个浏览器并创建独立上下文，用完必须调用 release_context。
+        init_script 为 False 时不注入反检测脚本。
+        """
+        launch_options = {k: v for k, v in (launch_options or {}).items() if v is not None}
+        key, pooled = await self._checkout(browser_type, launch_options)
+        try:
+            context = await pooled.browser.new_context(**context_options)
+        except BaseException:
+            await asyncio.shield(self._checkin(key, pooled))
+            raise
+        if self.stealth and init_script:
+            try:
+                await add_stealth_script(context)
+            except BaseException:
+                try:
+                    await context.close()
+                finally:
+                    await asyncio.shield(self._checkin(key, pooled))
+                raise
+        self._owners[id(context)] = (key, pooled)
+        return context
+
+    async def release_context(self, context):
+        key, pooled = self._owners.pop(id(context), (None, None))
+        try:
+            await context.close()
+        except Exception:
+            pass
+        finally:
+            # 关闭途中被取消也要归还，否则浏览器的 active 计数泄漏
+            if pooled is not None:
+                await asyncio.shield(self._checkin(key, pooled))
+
+    @asynccontextmanager
+    async def new_context(self, browser_type, launch_options=None, init_script=True, **context_options):
+        context = await self.acquire_context(browser_type, launch_options, init_script, **context_options)
+        try:
+            yield context
+        finally:
+            await self.release_context(context)
+
+    def stats(self):
+        return [
+            {"active": pooled.active, "jobs": pooled.jobs, "healthy": pooled.healthy}
+            for browsers in self._browsers.values()
+            for pooled in browsers
+        ]
+
+    async def close(self):
+        async with self._condition:
+            for key in list(self._browsers):
+                for pooled in list(self._browsers[key]):
+                    await self._drop(key, pooled)
+            self._browsers.clear()
+            self._owners.clear()
+        if self._playwright_manager is not None:
+            await self._playwright_manager.__aexit__(None, None, None)
+            self._playwright_manager = None
+            self._playwright = None
+
+
+_pools = weakref.WeakKeyDictionary()
+_pool_users = weakref.WeakKeyDictionary()
+
+
+def get_browser_pool() -> BrowserPool:
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = BrowserPool()
+    return pool
+
+
+@asynccontextmanager
+async def use_browser_pool():
+    """
+    声明一段使用浏览器池的作用域，可嵌套；最外层退出时关闭池中所有浏览器。
+    长期运行的事件循环（后台任务线程）只需在最外层进入一次，期间的任务都会复用浏览器。
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_browser_pool()
+    _pool_users[loop] = _pool_users.get(loop, 0) + 1
+    try:
+        yield pool
+    finally:
+        _pool_users[loop] -= 1
+        if _pool_users[loop] == 0:
+            del _pool_users[loop]
+            _pools.pop(loop, None)
+            await pool.close()
+
+
+class BrowserLoop(object):
+    """
+    常驻事件循环线程，整个生命周期内持有浏览器池：交给它执行的协程共用同一批浏览器，
+    浏览器在任务之间不关闭，累计 BROWSER_POOL_MAX_JOBS 个任务后按池的规则回收。
+    其他线程用 submit / run 把协程交给它执行，调用方的上下文变量随协程一起带过去。
+    """
+
+    def __init__(self, name="browser-loop"):
+        self.name = name
+        self._loop = None
+        self._stopped = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._loop is None:
+                ready = threading.Event()
+                self._thread = threading.Thread(target=self._run_loop, args=(ready,), name=self.name, daemon=True)
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    def _run_loop(self, ready):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._stopped = asyncio.Event()
+        self._loop = loop
+        ready.set()
+        try:
+            loop.run_until_complete(self._serve())
+        finally:
+            loop.close()
+
+    async def _serve(self):
+        async with use_browser_pool():
+            await self._stopped.wait()
+
+    def submit(self, coro):
+        """把协程交给常驻循环执行，返回 concurrent.futures.Future。"""
+        loop = self.start()
+        values = list(contextvars.copy_context().items())
+
+        async def run():
+            for var, value in values:
+                var.set(value)
+            return await coro
+
+        return asyncio.run_coroutine_threadsafe(run(), loop)
+
+    def run(self, coro):
+        """在常驻循环里执行协程，阻塞到结束并返回结果。"""
+        return self.submit(coro).result()
+
+    def stop(self):
+        """结束事件循环线程并关闭池中的浏览器。"""
+        with self._lock:
+            if self._loop is None:
+                return
+            self._loop.call_soon_threadsafe(self._stopped.set)
+            self._thread.join()
+            self._loop = None
+
+
+@asynccontextmanager
+async def pooled_context(launch_options=None, **context_options):
+    """在当前事件循环的浏览器池里开一个 Chromium 上下文，退出时归还。"""
+    async with use_browser_pool() as pool:
+        playwright = await pool.get_playwright()
+        async with pool.new_context(playwright.chromium, launch_options, **context_options) as context:
+            yield context
@@ -0,0 +1,198 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import conf
+from utils.state_db import transaction
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+PLATFORMS = ("douyin", "tencent", "kuaishou", "xiaohongshu", "tiktok", "baijiahao", "bilibili")
+
+# 同一平台连续失败多少次后熔断，以及熔断后多久放行一个探测任务（秒）
+CIRCUIT_FAILURE_THRESHOLD = getattr(conf, "CIRCUIT_FAILURE_THRESHOLD", 3)
+CIRCUIT_COOLDOWN = getattr(conf, "CIRCUIT_COOLDOWN", 300)
+# 半开状态的探测任务多久没有结论（如所在 worker 挂掉）就把探测名额放给其他 worker（秒）
+CIRCUIT_PROBE_TIMEOUT = getattr(conf, "CIRCUIT_PROBE_TIMEOUT", 1800)
+
+# 持久化到 circuit_breakers 表的字段
+_FIELDS = ("state", "failures", "trips", "opened_at", "probe_owner", "probe_started_at", "last_error")
+
+
+class CircuitOpenError(RuntimeError):
+    """平台处于熔断状态，任务暂缓执行。"""
+
+    def __init__(self, platform, retry_after):
+        self.platform = platform
+        self.retry_after = retry_after
+        super().__init__(f"{platform} 已熔断，{retry_after:.0f} 秒后再试")
+
+
+class CircuitBreaker(object):
+    """
+    单个平台的熔断器：连续失败达到阈值后熔断（open），期间任务留在队列里不执行；
+    冷却结束进入半开（half_open），只放行一个探测任务，成功则恢复（closed），失败则重新熔断。
+    store 不为空时每次操作都先从数据库读出最新状态、改完写回，各进程共享同一份状态；
+    方法的 conn 参数为调用方已开启的事务，传入时在该事务内读写。
+    """
+
+    def __init__(self, platform, failure_threshold=None, cooldown=None, clock=time.time, store=None,
+                 probe_timeout=None):
+        self.platform = platform
+        self.failure_threshold = failure_threshold or CIRCUIT_FAILURE_THRESHOLD
+        self.cooldown = CIRCUIT_COOLDOWN if cooldown is None else cooldown
+        self.probe_timeout = probe_timeout or CIRCUIT_PROBE_TIMEOUT
+        self.clock = clock
+        self.store = store
+        self._load(None)
+        self._lock = threading.Lock()
+
+    def _load(self, row):
+        if row is None:
+            row = (CLOSED, 0, 0, None, None, None, None)
+        (self.state, self.failures, self.trips, self.opened_at,
+         self.probe_owner, self.probe_started_at, self.last_error) = row
+
+    def _dump(self):
+        return tuple(getattr(self, field) for field in _FIELDS)
+
+    @contextmanager
+    def _synced(self, conn=None, write=True):
+        if self.store is None:
+            with self._lock:
+                yield
+            return
+        # 先拿数据库写锁再拿进程内的锁，和认领任务时的加锁顺序一致，避免互相等待
+        with self.store.transaction(conn, write) as db:
+            with self._lock:
+                row = db.execute(f"SELECT {', '.join(_FIELDS)} FROM circuit_breakers WHERE platform = ?",
+                                 (self.platform,)).fetchone()
+                self._load(tuple(row) if row is not None else None)
+                before = self._dump()
+                yield
+                if write and self._dump() != before:
+                    db.execute(
+                        f"INSERT OR REPLACE INTO circuit_breakers (platform, {', '.join(_FIELDS)}) "
+                        f"VALUES (?, {', '.join('?' * len(_FIELDS))})",
+                        (self.platform, *self._dump()),
+                    )
+
+    def _refresh(self):
+        now = self.clock()
+        if self.state == OPEN and now - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+        # 探测任务所在的 worker 挂掉时不会交还名额，超时后放给其他 worker
+        if self.probe_owner is not None and now - (self.probe_started_at or 0) >= self.probe_timeout:
+            self.probe_owner = None
+
+    def try_acquire(self, owner, conn=None):
+        """判断 owner 能否执行该平台的任务；半开状态下第一个调用者成为探测任务。"""
+        with self._synced(conn):
+            self._refresh()
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self.probe_owner in (None, owner):
+                if self.probe_owner is None:
+                    self.probe_owner = owner
+                    self.probe_started_at = self.clock()
+                return True
+            return False
+
+    def release(self, owner, conn=None):
+        """探测任务没有给出结论（没认领到任务、非平台原因失败）时交还探测名额。"""
+        with self._synced(conn):
+            if self.probe_owner == owner:
+                self.probe_owner = None
+
+    def is_open(self, conn=None):
+        with self._synced(conn, write=False):
+            self._refresh()
+            return self.state == OPEN
+
+    def retry_after(self, conn=None):
+        with self._synced(conn, write=False):
+            if self.state != OPEN:
+                return 0
+            return max(0, self.cooldown - (self.clock() - self.opened_at))
+
+    def record_success(self, conn=None):
+        with self._synced(conn):
+            self.state = CLOSED
+            self.failures = 0
+            self.probe_owner = None
+
+    def record_failure(self, error=None, conn=None):
+        with self._synced(conn):
+            self.failures += 1
+            self.last_error = str(error) if error is not None else None
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.trips += 1
+                self.state = OPEN
+                self.opened_at = self.clock()
+                self.probe_owner = None
+
+    def reset(self):
+        self.record_success()
+
+    def snapshot(self):
+        with self._synced(write=False):
+            self._refresh()
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "trips": self.trips,
+                "openedAt": self.opened_at,
+                "probing": self.probe_owner is not None,
+                "lastError": self.last_error,
+            }
+
+
+class CircuitBreakerRegistry(object):
+    """
+    各平台的熔断器。db_path 不为空时状态存放在该数据库的 circuit_breakers 表里，
+    所有 worker 进程和 Web 进程看到、修改的是同一份状态；为空时只在本进程内有效。
+    """
+
+    def __init__(self, db_path=None, **options):
+        self.db_path = db_path
+        self._options = options
+        self._breakers = {}
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def get(self, platform):
+        with self._lock:
+            breaker = self._breakers.get(platform)
+            if breaker is None:
+                store = self if self.db_path is not None else None
+                breaker = self._breakers[platform] = CircuitBreaker(platform, store=store, **self._options)
+            return breaker
+
+    @contextmanager
+    def transaction(self, conn=None, write=True):
+        with transaction(self.db_path, conn, write) as db:
+            if not self._ready:
+                db.execute('''
+                CREATE TABLE IF NOT EXISTS circuit_breakers (
+                    platform TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    trips INTEGER NOT NULL DEFAULT 0,
+                    opened_at REAL,
+                    probe_owner TEXT,
+                    probe_started_at REAL,
+                    last_error TEXT
+                )
+                ''')
+                self._ready = True
+            yield db
+
+    def snapshot(self):
+        platforms = list(PLATFORMS) + [p for p in self._breakers if p not in PLATFORMS]
+        return {platform: self.get(platform).snapshot() for platform in platforms}
+
+
+circuit_breakers = CircuitBreakerRegistry()
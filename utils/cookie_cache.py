@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+import time
+
+import conf
+
+# 校验结果的缓存时长（秒），cookie 文件被改写后缓存立即失效
+COOKIE_CACHE_TTL = getattr(conf, "COOKIE_CACHE_TTL", 600)
+
+# 代表登录态的 cookie，名字里带 session 的也算
+SESSION_COOKIE_NAMES = {
+    "sid_tt",
+    "sid_guard",
+    "passport_auth_token",
+    "kuaishou.web.cp.api_st",
+    "kuaishou.web.cp.api_ph",
+    "access-token-creator.xiaohongshu.com",
+}
+
+
+def is_session_cookie(name: str) -> bool:
+    return name in SESSION_COOKIE_NAMES or "session" in name.lower()
+
+
+def session_expiry(account_file):
+    """
+    读取 storage_state 中登录态 cookie 的 expires，返回最早的过期时间戳。
+    没有可判断的登录态 cookie（或都是浏览器会话 cookie）时返回 None。
+    """
+    with open(account_file, "r", encoding="utf-8") as f:
+        cookies = json.load(f).get("cookies", [])
+    expires = [
+        cookie["expires"]
+        for cookie in cookies
+        if is_session_cookie(cookie.get("name", "")) and cookie.get("expires", -1) > 0
+    ]
+    return min(expires) if expires else None
+
+
+class CookieValidityCache(object):
+    """
+    cookie 有效性缓存：按 文件路径+mtime 记录最近一次校验的时间和结果，
+    并根据登录态 cookie 的 expires 给出硬过期时间，命中时无需再开浏览器。
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = COOKIE_CACHE_TTL if ttl is None else ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _stat(self, account_file):
+        key = os.path.abspath(str(account_file))
+        try:
+            return key, os.stat(key).st_mtime_ns
+        except OSError:
+            return key, None
+
+    def _expiry(self, key, mtime):
+        entry = self._entries.get(key)
+        if entry and entry["mtime"] == mtime:
+            return entry["expires_at"]
+        try:
+            return session_expiry(key)
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def get(self, account_file):
+        """命中缓存时返回 True/False，需要真正校验时返回 None。"""
+        key, mtime = self._stat(account_file)
+        if mtime is None:
+            return False
+        now = time.time()
+        with self._lock:
+            expires_at = self._expiry(key, mtime)
+            if expires_at is not None and expires_at <= now:
+                return False
+            entry = self._entries.get(key)
+            if entry and entry["mtime"] == mtime and now - entry["checked_at"] < self.ttl:
+                return entry["valid"]
+            # 文件已变化或缓存过期，保留解析出的过期时间，校验结果待重新记录
+            self._entries[key] = {"mtime": mtime, "checked_at": 0, "valid": None, "expires_at": expires_at}
+        return None
+
+    def record(self, account_file, valid):
+        key, mtime = self._stat(account_file)
+        if mtime is None:
+            return
+        with self._lock:
+            self._entries[key] = {
+                "mtime": mtime,
+                "checked_at": time.time(),
+                "valid": bool(valid),
+                "expires_at": self._expiry(key, mtime),
+            }
+
+    def invalidate(self, account_file):
+        key, _ = self._stat(account_file)
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+cookie_cache = CookieValidityCache()
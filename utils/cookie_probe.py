@@ -0,0 +1,143 @@
+import asyncio
+import json
+import time
+import weakref
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import httpx
+
+import conf
+
+# 是否先用 HTTP 接口探测登录态，关闭后直接走浏览器校验
+COOKIE_PROBE_ENABLED = getattr(conf, "COOKIE_PROBE_ENABLED", True)
+# 单次探测的超时时间（秒）
+COOKIE_PROBE_TIMEOUT = getattr(conf, "COOKIE_PROBE_TIMEOUT", 5)
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
+
+
+def _xhs_result(status, data):
+    if data.get("success") and (data.get("data") or {}).get("userId"):
+        return True
+    if status == 401 or data.get("code") == -100:
+        return False
+    return None
+
+
+def _tencent_result(status, data):
+    if data.get("errCode") == 0 and (data.get("data") or {}).get("finderUser"):
+        return True
+    if data.get("errCode") in (300333, 300334):
+        return False
+    return None
+
+
+def _douyin_result(status, data):
+    if data.get("status_code") == 0 and data.get("user"):
+        return True
+    if data.get("status_code") == 8:
+        return False
+    return None
+
+
+def _ks_result(status, data):
+    if data.get("result") == 1 and data.get("data"):
+        return True
+    if data.get("result") == 109:
+        return False
+    return None
+
+
+# 各平台用于探测登录态的轻量接口，type 与 check_cookie 一致
+PROBES = {
+    # 小红书
+    1: {"method": "GET", "url": "https://creator.xiaohongshu.com/api/galaxy/user/info", "parse": _xhs_result},
+    # 视频号
+    2: {"method": "POST", "url": "https://channels.weixin.qq.com/cgi-bin/mmfinderassistant-bin/auth/auth_data",
+        "json": {}, "parse": _tencent_result},
+    # 抖音
+    3: {"method": "GET", "url": "https://creator.douyin.com/web/api/media/user/info/", "parse": _douyin_result},
+    # 快手
+    4: {"method": "POST", "url": "https://cp.kuaishou.com/rest/cp/creator/pc/home/infoV2",
+        "json": {}, "parse": _ks_result},
+}
+
+
+def cookie_header(cookies, url, now=None):
+    """按域名、路径和过期时间从 storage_state 的 cookies 中挑出该 URL 应携带的 Cookie 头。"""
+    now = time.time() if now is None else now
+    parts = urlsplit(url)
+    host, path = parts.hostname or "", parts.path or "/"
+    pairs = []
+    for cookie in cookies:
+        domain = cookie.get("domain", "").lstrip(".")
+        if not domain or not (host == domain or host.endswith("." + domain)):
+            continue
+        if not path.startswith(cookie.get("path") or "/"):
+            continue
+        expires = cookie.get("expires", -1)
+        if expires is not None and 0 < expires <= now:
+            continue
+        pairs.append(f"{cookie['name']}={cookie['value']}")
+    return "; ".join(pairs)
+
+
+_clients = weakref.WeakKeyDictionary()
+_client_users = weakref.WeakKeyDictionary()
+
+
+@asynccontextmanager
+async def use_http_client():
+    """当前事件循环共享的 httpx 连接池，可嵌套；最外层退出时关闭。"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = httpx.AsyncClient(
+            timeout=COOKIE_PROBE_TIMEOUT, follow_redirects=False, headers={"User-Agent": USER_AGENT})
+    _client_users[loop] = _client_users.get(loop, 0) + 1
+    try:
+        yield client
+    finally:
+        _client_users[loop] -= 1
+        if _client_users[loop] == 0:
+            del _client_users[loop]
+            _clients.pop(loop, None)
+            await client.aclose()
+
+
+async def probe_cookie(type, account_file):
+    """
+    用 storage_state 里的 cookie 直接请求平台的用户信息接口判断登录态。
+    明确有效/失效时返回 True/False；接口异常或结果无法判断时返回 None，由调用方退回浏览器校验。
+    """
+    probe = PROBES.get(type)
+    if not COOKIE_PROBE_ENABLED or probe is None:
+        return None
+    try:
+        with open(account_file, "r", encoding="utf-8") as f:
+            cookies = json.load(f).get("cookies", [])
+    except (OSError, ValueError, AttributeError):
+        return None
+    header = cookie_header(cookies, probe["url"])
+    if not header:
+        return None
+
+    async with use_http_client() as client:
+        try:
+            response = await client.request(probe["method"], probe["url"], json=probe.get("json"),
+                                            headers={"Cookie": header})
+        except httpx.HTTPError:
+            return None
+    # 被重定向到登录页说明登录态已失效
+    if response.is_redirect:
+        location = response.headers.get("location", "")
+        return False if "login" in location or "passport" in location else None
+    try:
+        data = response.json()
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return probe["parse"](response.status_code, data)
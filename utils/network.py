@@ -1,28 +1,155 @@
 import asyncio
+import random
+import threading
 import time
 from functools import wraps
 
+RETRYABLE = "retryable"
+FATAL = "fatal"
 
-def async_retry(timeout=60, max_retries=None):
+
+class FatalError(Exception):
+    """重试也无法解决的错误，抛出后不再重试。"""
+
+
+class LoginExpiredError(FatalError):
+    """登录失效，需要重新扫码。"""
+
+
+class UploadRejectedError(FatalError):
+    """平台拒绝了上传内容（格式、审核等）。"""
+
+
+# 按错误信息判断不可重试的情况：登录失效、内容被拒、人机验证、浏览器本身不可用
+FATAL_KEYWORDS = (
+    "扫码登录", "登录失效", "cookie 失效", "cookie失效", "未登录",
+    "格式不支持", "违规", "审核不通过",
+    "出现验证", "安全验证",
+    "Executable doesn't exist", "Target page, context or browser has been closed",
+)
+
+
+def classify_error(error) -> str:
+    """把异常分为可重试（选择器超时、网络抖动等）和不可重试两类。"""
+    if isinstance(error, FatalError):
+        return FATAL
+    if isinstance(error, (asyncio.CancelledError, KeyboardInterrupt)):
+        return FATAL
+    message = str(error)
+    if any(keyword in message for keyword in FATAL_KEYWORDS):
+        return FATAL
+    return RETRYABLE
+
+
+class RetryMetrics(object):
+    """按名称统计每次尝试的结果，用来观察哪些步骤在反复重试。"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, outcome, elapsed, delay=0.0):
+        with self._lock:
+            metrics = self._metrics.setdefault(name, {
+                "attempts": 0, "success": 0, "retryable": 0, "fatal": 0, "gave_up": 0,
+                "attempt_seconds": 0.0, "backoff_seconds": 0.0,
+            })
+            metrics["attempts"] += 1
+            metrics[outcome] += 1
+            metrics["attempt_seconds"] += elapsed
+            metrics["backoff_seconds"] += delay
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(metrics) for name, metrics in self._metrics.items()}
+
+
+retry_metrics = RetryMetrics()
+
+
+class RetryPolicy(object):
+    """
+    重试策略：指数退避加随机抖动，限制最大次数和总时长，不可重试的错误直接抛出。
+    同一个策略可用于协程（run）和同步函数（run_sync）。
+    """
+
+    def __init__(self, name=None, max_attempts=None, timeout=None, base_delay=1.0, max_delay=30.0,
+                 multiplier=2.0, jitter=0.5, classify=classify_error):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.classify = classify
+
+    def delay(self, attempt):
+        """第 attempt 次失败后的等待时间，抖动避免多个任务同时重试。"""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** max(0, attempt - 1))
+        return delay * (1 - self.jitter * random.random())
+
+    def _next_delay(self, name, error, attempt, started, elapsed):
+        """返回下一次重试前的等待时间；不该再试时抛出异常。"""
+        if self.classify(error) == FATAL:
+            retry_metrics.record(name, FATAL, elapsed)
+            print(f"{name} 第 {attempt} 次失败，错误不可重试: {error}")
+            raise error
+        if self.max_attempts is not None and attempt >= self.max_attempts:
+            retry_metrics.record(name, "gave_up", elapsed)
+            print(f"Reached maximum retries of {self.max_attempts}.")
+            raise Exception(f"Failed after {self.max_attempts} retries.") from error
+        delay = self.delay(attempt)
+        if self.timeout is not None and time.monotonic() - started + delay > self.timeout:
+            retry_metrics.record(name, "gave_up", elapsed)
+            print(f"Function timeout after {self.timeout} seconds.")
+            raise TimeoutError(f"Function execution exceeded {self.timeout} seconds timeout.") from error
+        retry_metrics.record(name, RETRYABLE, elapsed, delay)
+        print(f"Attempt {attempt} failed: {error}. Retrying in {delay:.1f}s...")
+        return delay
+
+    async def run(self, func, *args, **kwargs):
+        name = self.name or getattr(func, "__qualname__", repr(func))
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            attempt_started = time.monotonic()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                delay = self._next_delay(name, e, attempt, started, time.monotonic() - attempt_started)
+                await asyncio.sleep(delay)
+                continue
+            retry_metrics.record(name, "success", time.monotonic() - attempt_started)
+            return result
+
+    def run_sync(self, func, *args, **kwargs):
+        name = self.name or getattr(func, "__qualname__", repr(func))
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            attempt_started = time.monotonic()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                time.sleep(self._next_delay(name, e, attempt, started, time.monotonic() - attempt_started))
+                continue
+            retry_metrics.record(name, "success", time.monotonic() - attempt_started)
+            return result
+
+
+def async_retry(timeout=60, max_retries=None, policy=None, **policy_options):
+    """按 RetryPolicy 重试协程函数；不传 policy 时用 timeout / max_retries 和 policy_options 构造。"""
     def decorator(func):
+        retry_policy = policy or RetryPolicy(
+            name=func.__qualname__, max_attempts=max_retries, timeout=timeout, **policy_options)
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            start_time = time.time()
-            attempts = 0
-            while True:
-                try:
-                    return await func(*args, **kwargs)
-                except Exception as e:
-                    attempts += 1
-                    if max_retries is not None and attempts >= max_retries:
-                        print(f"Reached maximum retries of {max_retries}.")
-                        raise Exception(f"Failed after {max_retries} retries.") from e
-                    if time.time() - start_time > timeout:
-                        print(f"Function timeout after {timeout} seconds.")
-                        raise TimeoutError(f"Function execution exceeded {timeout} seconds timeout.") from e
-                    print(f"Attempt {attempts} failed: {e}. Retrying...")
-                    await asyncio.sleep(1)  # Sleep to avoid tight loop or provide backoff logic here
+            return await retry_policy.run(func, *args, **kwargs)
 
         return wrapper
 
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+import conf
+from conf import BASE_DIR
+
+# 每个页面在内存里保留的最近快照数
+CAPTURE_RING_SIZE = getattr(conf, "CAPTURE_RING_SIZE", 5)
+# 快照是否附带低清截图，以及两次截图的最小间隔（秒），避免重试循环里频繁编码图片
+CAPTURE_SCREENSHOTS = getattr(conf, "CAPTURE_SCREENSHOTS", True)
+CAPTURE_SCREENSHOT_INTERVAL = getattr(conf, "CAPTURE_SCREENSHOT_INTERVAL", 5)
+# 失败现场的保存目录和磁盘配额（MB），超出配额时删除最早的记录
+CAPTURE_DIR = Path(getattr(conf, "CAPTURE_DIR", BASE_DIR / "logs" / "captures"))
+CAPTURE_QUOTA_MB = getattr(conf, "CAPTURE_QUOTA_MB", 200)
+
+# 页面标题、元素数量和可见文本开头，用来判断两次快照之间页面是否变化
+_DOM_SUMMARY_JS = """() => [
+    document.title,
+    document.getElementsByTagName('*').length,
+    (document.body && document.body.innerText || '').slice(0, 2000),
+]"""
+
+
+class PageCapture(object):
+    """
+    在内存环形缓冲里保留页面最近几次的轻量快照（URL、DOM 摘要、可选低清截图），
+    只有任务失败时才调用 persist 写到 logs/ 下，平时不落盘。
+    """
+
+    def __init__(self, page, platform, size=None, screenshots=None):
+        self.page = page
+        self.platform = platform
+        self.screenshots = CAPTURE_SCREENSHOTS if screenshots is None else screenshots
+        self.ring = deque(maxlen=size or CAPTURE_RING_SIZE)
+        self._last_screenshot = None
+
+    async def snapshot(self, label="", screenshot=None, html=False):
+        """记录一次快照，任何步骤失败都只记下错误，不影响调用方。"""
+        item = {"label": label, "time": datetime.now().isoformat(timespec="seconds")}
+        try:
+            item["url"] = str(self.page.url)
+        except Exception:
+            item["url"] = ""
+        try:
+            title, elements, text = await self.page.evaluate(_DOM_SUMMARY_JS)
+            item["title"] = title
+            item["elements"] = elements
+            item["text"] = text[:500]
+            item["dom_digest"] = hashlib.sha1(f"{title}\n{elements}\n{text}".encode("utf-8")).hexdigest()[:16]
+        except Exception as e:
+            item["error"] = str(e)
+        now = time.monotonic()
+        if screenshot is None:
+            screenshot = self.screenshots and (
+                self._last_screenshot is None or now - self._last_screenshot >= CAPTURE_SCREENSHOT_INTERVAL)
+        if screenshot:
+            try:
+                # 只截可视区域、低质量 JPEG，比整页 PNG 小一个数量级
+                item["screenshot"] = await self.page.screenshot(type="jpeg", quality=40, scale="css")
+                self._last_screenshot = now
+            except Exception:
+                pass
+        if html:
+            try:
+                item["html"] = await self.page.content()
+            except Exception:
+                pass
+        self.ring.append(item)
+        return item
+
+    async def persist(self, reason, extra_files=None):
+        """把缓冲里的快照写到磁盘（在线程里执行），返回保存目录。"""
+        name = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self.platform}_{reason}"
+        snapshots = list(self.ring)
+        return await asyncio.to_thread(_write_capture, CAPTURE_DIR / name, snapshots, extra_files or {})
+
+
+def _write_capture(out_dir, snapshots, extra_files):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    meta = []
+    for index, item in enumerate(snapshots):
+        item = dict(item)
+        screenshot = item.pop("screenshot", None)
+        html = item.pop("html", None)
+        if screenshot:
+            item["screenshot"] = f"{index}.jpg"
+            (out_dir / item["screenshot"]).write_bytes(screenshot)
+        if html:
+            item["html"] = f"{index}.html"
+            (out_dir / item["html"]).write_text(html, encoding="utf-8")
+        meta.append(item)
+    (out_dir / "snapshots.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+    for filename, content in extra_files.items():
+        (out_dir / filename).write_text(content, encoding="utf-8")
+    enforce_quota(out_dir.parent, CAPTURE_QUOTA_MB * 1024 * 1024, keep=out_dir)
+    return str(out_dir)
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for filename in files:
+            try:
+                total += os.path.getsize(os.path.join(root, filename))
+            except OSError:
+                pass
+    return total
+
+
+def enforce_quota(base_dir, quota_bytes, keep=None):
+    """目录总大小超过配额时按修改时间从旧到新删除记录，keep 指定的目录保留。"""
+    entries = []
+    for entry in Path(base_dir).iterdir():
+        if entry.is_dir():
+            entries.append((entry.stat().st_mtime, entry, _dir_size(entry)))
+    total = sum(size for _, _, size in entries)
+    for _, entry, size in sorted(entries, key=lambda item: item[0]):
+        if total <= quota_bytes:
+            break
+        if keep is not None and entry == Path(keep):
+            continue
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
@@ -0,0 +1,206 @@
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import conf
+from utils.state_db import transaction
+
+# 各平台的发布频率：per_hour 每小时最多发布数，min_interval 两次发布的最小间隔（秒），burst 允许的连续发布数（默认等于 per_hour）；
+# account_ 开头的同名配置作用于该平台的单个账号。未配置的平台不限速
+PUBLISH_RATE_LIMITS = getattr(conf, "PUBLISH_RATE_LIMITS", {})
+
+
+class RateLimitedError(RuntimeError):
+    """平台或账号的发布频率已达上限，任务暂缓执行。"""
+
+    def __init__(self, platform, retry_after, account=None):
+        self.platform = platform
+        self.account = account
+        self.retry_after = retry_after
+        target = f"{platform} 账号 {account}" if account else platform
+        super().__init__(f"{target} 发布过于频繁，{retry_after:.0f} 秒后再试")
+
+
+class TokenBucket(object):
+    """
+    令牌桶：按 per_hour 匀速补充令牌，最多攒 burst 个，每次发布消耗一个；
+    另外要求两次发布至少相隔 min_interval 秒。
+    """
+
+    def __init__(self, per_hour=None, min_interval=0, burst=None, clock=time.time):
+        self.rate = per_hour / 3600 if per_hour else None
+        self.capacity = max(1, burst or per_hour or 1)
+        self.min_interval = min_interval or 0
+        self.clock = clock
+        self.load(None)
+
+    def load(self, row):
+        """从 (tokens, updated_at, last_at) 恢复状态，None 表示从未发布过的满桶。"""
+        if row is None:
+            self.tokens, self.updated_at, self.last_at = float(self.capacity), self.clock(), None
+        else:
+            tokens, self.updated_at, self.last_at = row
+            # 配置调小后不超过新的容量
+            self.tokens = min(float(self.capacity), tokens)
+
+    def dump(self):
+        return self.tokens, self.updated_at, self.last_at
+
+    def _refill(self, now):
+        if self.rate is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self, now=None):
+        """距离下一次可以发布还要等多少秒，0 表示现在就可以。"""
+        now = self.clock() if now is None else now
+        self._refill(now)
+        wait = 0.0
+        if self.rate is not None and self.tokens < 1:
+            wait = (1 - self.tokens) / self.rate
+        if self.last_at is not None:
+            wait = max(wait, self.last_at + self.min_interval - now)
+        return max(0.0, wait)
+
+    def consume(self, now=None):
+        now = self.clock() if now is None else now
+        self._refill(now)
+        if self.rate is not None:
+            self.tokens -= 1
+        self.last_at = now
+
+
+def account_key(account):
+    """账号统一用 cookie 文件名标识，任务参数里的文件名和上传器里的完整路径指向同一个账号。"""
+    return Path(str(account)).name
+
+
+class RateLimiter(object):
+    """
+    按平台、按账号分别维护令牌桶。任务队列认领任务前用 delay 查看是否可发（不消耗令牌），
+    真正发布前用 reserve 同时占用平台和账号的令牌；超限时返回需要等待的秒数，由调用方把任务延后，而不是原地 sleep。
+    db_path 不为空时令牌桶状态存放在该数据库的 rate_limits 表里，所有 worker 进程共用同一份额度；
+    方法的 conn 参数为调用方已开启的事务（如认领任务），传入时在该事务内读写。
+    """
+
+    def __init__(self, limits=None, clock=time.time, db_path=None):
+        self.limits = PUBLISH_RATE_LIMITS if limits is None else limits
+        self.clock = clock
+        self.db_path = db_path
+        self._buckets = {}
+        self._ready = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(platform, account=None):
+        return f"{platform}:{account_key(account)}" if account else platform
+
+    def _configs(self, platform):
+        config = self.limits.get(platform) or {}
+        platform_config = {name: config[name] for name in ("per_hour", "min_interval", "burst") if config.get(name)}
+        account_config = {name: config[f"account_{name}"] for name in ("per_hour", "min_interval", "burst")
+                          if config.get(f"account_{name}")}
+        return platform_config, account_config
+
+    def _bucket(self, key, config):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(clock=self.clock, **config)
+        return bucket
+
+    def _buckets_for(self, platform, accounts):
+        platform_config, account_config = self._configs(platform)
+        buckets = []
+        if platform_config:
+            buckets.append((self._key(platform), self._bucket(self._key(platform), platform_config)))
+        if account_config:
+            for account in accounts:
+                key = self._key(platform, account)
+                buckets.append((key, self._bucket(key, account_config)))
+        return buckets
+
+    @contextmanager
+    def _transaction(self, conn=None, write=True):
+        with transaction(self.db_path, conn, write) as db:
+            if not self._ready:
+                db.execute('''
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    last_at REAL
+                )
+                ''')
+                self._ready = True
+            yield db
+
+    @contextmanager
+    def _synced(self, platform, accounts, conn=None, write=True):
+        """取出平台和账号的令牌桶；持久化时先从数据库读出最新状态，write 为 True 时把改动写回。"""
+        if self.db_path is None:
+            with self._lock:
+                yield [bucket for _, bucket in self._buckets_for(platform, accounts)]
+            return
+        # 先拿数据库写锁再拿进程内的锁，和认领任务时的加锁顺序一致
+        with self._transaction(conn, write) as db:
+            with self._lock:
+                buckets = self._buckets_for(platform, accounts)
+                before = {}
+                for key, bucket in buckets:
+                    row = db.execute("SELECT tokens, updated_at, last_at FROM rate_limits WHERE key = ?",
+                                     (key,)).fetchone()
+                    bucket.load(tuple(row) if row is not None else None)
+                    before[key] = bucket.dump()
+                yield [bucket for _, bucket in buckets]
+                if write:
+                    for key, bucket in buckets:
+                        if bucket.dump() != before[key]:
+                            db.execute("INSERT OR REPLACE INTO rate_limits (key, tokens, updated_at, last_at) "
+                                       "VALUES (?, ?, ?, ?)", (key, *bucket.dump()))
+
+    def delay(self, platform, accounts=(), conn=None):
+        """平台和给定账号都能发布之前还要等多少秒。"""
+        with self._synced(platform, accounts, conn, write=False) as buckets:
+            now = self.clock()
+            return max([bucket.delay(now) for bucket in buckets], default=0.0)
+
+    def reserve(self, platform, account=None, conn=None):
+        """平台和账号都有余量时占用一次发布并返回 0，否则不占用并返回需要等待的秒数。"""
+        with self._synced(platform, [account] if account else [], conn) as buckets:
+            now = self.clock()
+            wait = max([bucket.delay(now) for bucket in buckets], default=0.0)
+            if wait > 0:
+                return wait
+            for bucket in buckets:
+                bucket.consume(now)
+            return 0.0
+
+    def _states(self):
+        if self.db_path is None:
+            with self._lock:
+                return [(key, bucket.dump()) for key, bucket in self._buckets.items()]
+        with self._transaction(write=False) as db:
+            return [(row[0], tuple(row[1:]))
+                    for row in db.execute("SELECT key, tokens, updated_at, last_at FROM rate_limits ORDER BY key")]
+
+    def snapshot(self):
+        now = self.clock()
+        result = {}
+        for key, state in self._states():
+            platform, _, account = key.partition(":")
+            platform_config, account_config = self._configs(platform)
+            config = account_config if account else platform_config
+            if not config:
+                continue
+            bucket = TokenBucket(clock=self.clock, **config)
+            bucket.load(state)
+            retry_after = bucket.delay(now)
+            result[key] = {
+                "tokens": round(bucket.tokens, 2) if bucket.rate is not None else None,
+                "retryAfter": round(retry_after, 1),
+            }
+        return result
+
+
+rate_limiter = RateLimiter()
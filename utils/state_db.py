@@ -0,0 +1,25 @@
+import sqlite3
+from contextlib import contextmanager
+
+
+@contextmanager
+def transaction(db_path, conn=None, write=True):
+    """
+    在 SQLite 事务里执行，多个进程共用同一个数据库文件时状态一致。
+    传入 conn 时沿用调用方已开启的事务（如认领任务时的 BEGIN IMMEDIATE），由调用方提交；
+    否则新开连接，write 为 True 时先用 BEGIN IMMEDIATE 拿写锁，正常结束提交、出错回滚。
+    """
+    if conn is not None:
+        yield conn
+        return
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        if write:
+            conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
@@ -0,0 +1,84 @@
+import asyncio
+
+import conf
+from utils.network import FATAL, FatalError, RetryPolicy, retry_metrics
+
+# 各上传阶段的时间预算（秒）：打开页面、上传文件、填写信息、设置定时、点击发布；可在 conf.STEP_BUDGETS 中按阶段覆盖
+STEP_BUDGETS = {
+    "open_page": 60,
+    "upload": 1800,
+    "metadata": 120,
+    "schedule": 60,
+    "publish": 180,
+}
+STEP_BUDGETS.update(getattr(conf, "STEP_BUDGETS", {}))
+# 阶段内两次重试之间的起始间隔和最大间隔（秒），间隔按次数指数增长并带随机抖动
+STEP_RETRY_INTERVAL = getattr(conf, "STEP_RETRY_INTERVAL", 0.5)
+STEP_RETRY_MAX_INTERVAL = getattr(conf, "STEP_RETRY_MAX_INTERVAL", 5)
+
+
+class StepBudgetExceeded(FatalError, RuntimeError):
+    """某个上传阶段用完了时间预算。"""
+
+    def __init__(self, platform, phase, elapsed, budget):
+        self.platform = platform
+        self.phase = phase
+        self.elapsed = elapsed
+        self.budget = budget
+        super().__init__(f"{platform} 上传阶段 {phase} 超时：已用 {elapsed:.1f} 秒，预算 {budget} 秒")
+
+
+class StepBudget(object):
+    """
+    单个上传阶段的截止时间和重试节奏，替代原来无限重试的 while True：
+    每次重试前调用 retry()，预算用完时抛出 StepBudgetExceeded，任务失败后 worker 和浏览器即可回收。
+    """
+
+    def __init__(self, platform, phase, budget=None, interval=None):
+        self.platform = platform
+        self.phase = phase
+        self.budget = budget if budget is not None else STEP_BUDGETS[phase]
+        self.interval = interval if interval is not None else STEP_RETRY_INTERVAL
+        self.policy = RetryPolicy(name=f"{platform}.{phase}", base_delay=self.interval,
+                                  max_delay=max(self.interval, STEP_RETRY_MAX_INTERVAL), multiplier=1.5)
+        self.attempts = 0
+        self._loop = asyncio.get_running_loop()
+        self._started = self._loop.time()
+
+    @property
+    def elapsed(self):
+        return self._loop.time() - self._started
+
+    @property
+    def remaining(self):
+        return max(0, self.budget - self.elapsed)
+
+    def fail(self):
+        raise StepBudgetExceeded(self.platform, self.phase, self.elapsed, self.budget)
+
+    def check(self):
+        if self.elapsed >= self.budget:
+            self.fail()
+
+    async def retry(self, error=None):
+        """
+        按退避间隔等待下一次重试；error 不可重试（如登录失效）时直接抛出，预算不够再试一次时失败。
+        """
+        self.attempts += 1
+        if error is not None and self.policy.classify(error) == FATAL:
+            retry_metrics.record(self.policy.name, FATAL, 0)
+            raise error
+        self.check()
+        delay = min(self.policy.delay(self.attempts), self.remaining)
+        retry_metrics.record(self.policy.name, "retryable", 0, delay)
+        await asyncio.sleep(delay)
+        self.check()
+
+
+async def run_step(platform, phase, awaitable, budget=None):
+    """在阶段预算内执行一步操作，超时抛出 StepBudgetExceeded。"""
+    step = StepBudget(platform, phase, budget)
+    try:
+        return await asyncio.wait_for(awaitable, timeout=step.budget)
+    except asyncio.TimeoutError:
+        step.fail()
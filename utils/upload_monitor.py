@@ -0,0 +1,112 @@
+import asyncio
+import os
+import re
+
+# 各平台视频上传相关接口：chunk 为分片上传请求，用于估算进度；commit 为上传完成/提交接口
+UPLOAD_ENDPOINTS = {
+    "douyin": {
+        "chunk": r"/upload/v1/|partNumber=",
+        "commit": r"Action=CommitUploadInner",
+    },
+    "tencent": {
+        "chunk": r"uploadpartdfs",
+        "commit": r"completepartuploaddfs",
+    },
+    "kuaishou": {
+        "chunk": r"/api/upload/fragment",
+        "commit": r"/api/upload/complete|/upload/finish",
+    },
+    "tiktok": {
+        "chunk": r"/upload/v1/|partNumber=",
+        "commit": r"Action=CommitUploadInner",
+    },
+}
+
+_CONTENT_RANGE = re.compile(r"bytes\s+\d+-(\d+)/(\d+)")
+
+
+class UploadMonitor(object):
+    """
+    监听页面上传相关的网络请求：提交接口返回成功即视为上传完成，分片请求用于估算上传进度。
+    接口规则对不上或平台改版时，wait_until 仍会按原来的页面元素检查兜底。
+    """
+
+    def __init__(self, page, platform, file_path=None):
+        endpoints = UPLOAD_ENDPOINTS.get(platform, {})
+        self.chunk_pattern = re.compile(endpoints["chunk"]) if endpoints.get("chunk") else None
+        self.commit_pattern = re.compile(endpoints["commit"]) if endpoints.get("commit") else None
+        try:
+            self.file_size = os.path.getsize(file_path) if file_path else None
+        except OSError:
+            self.file_size = None
+        self.uploaded_bytes = 0
+        self.progress = None
+        self.completed = asyncio.Event()
+        self.page = page
+        page.on("requestfinished", self._on_request_finished)
+        page.on("response", self._on_response)
+
+    def reset(self):
+        """重新上传前清空进度和完成状态。"""
+        self.uploaded_bytes = 0
+        self.progress = None
+        self.completed.clear()
+
+    def _on_request_finished(self, request):
+        if self.chunk_pattern is None or not self.chunk_pattern.search(request.url):
+            return
+        headers = request.headers
+        if not headers.get("content-length", "0").isdigit():
+            return
+        content_range = _CONTENT_RANGE.search(headers.get("content-range", ""))
+        if content_range:
+            end, total = int(content_range.group(1)), int(content_range.group(2))
+            self._set_progress((end + 1) * 100 / total)
+        elif self.file_size:
+            self.uploaded_bytes += int(headers.get("content-length") or 0)
+            self._set_progress(self.uploaded_bytes * 100 / self.file_size)
+
+    def _on_response(self, response):
+        if self.commit_pattern is not None and self.commit_pattern.search(response.url) and response.ok:
+            self.completed.set()
+            self._set_progress(100)
+
+    def _set_progress(self, percent):
+        # 分片全部发完但还没提交时停在 99%，以提交接口返回为准
+        if not self.completed.is_set():
+            percent = min(percent, 99)
+        self.progress = max(self.progress or 0, round(percent, 1))
+
+    async def wait_until(self, dom_check, on_pending=None, interval=2, timeout=None):
+        """
+        等待上传完成：提交接口返回成功时立即返回，否则每隔 interval 秒用 dom_check() 检查页面。
+        每次检查未完成时调用 on_pending(progress)，可用于打日志或处理上传失败。
+        超过 timeout 秒仍未完成返回 False。
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+        while True:
+            if self.completed.is_set():
+                return True
+            try:
+                if await dom_check():
+                    return True
+            except Exception:
+                pass
+            if on_pending is not None:
+                try:
+                    await on_pending(self.progress)
+                except Exception:
+                    pass
+            wait = interval if deadline is None else min(interval, deadline - loop.time())
+            if wait <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self.completed.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+
+def format_progress(progress):
+    """日志里显示的上传进度，未知时为空。"""
+    return f" {progress}%" if progress is not None else ""
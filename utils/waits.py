@@ -0,0 +1,87 @@
+import asyncio
+import re
+import threading
+
+
+class WaitStats(object):
+    """按 label 统计每类等待的次数、实际耗时和超时次数，用来找出还可以再收紧的等待。"""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, label, elapsed, timed_out):
+        if not label:
+            return
+        with self._lock:
+            stats = self._stats.setdefault(label, {"count": 0, "timeouts": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            stats["count"] += 1
+            stats["timeouts"] += int(timed_out)
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+
+    def snapshot(self):
+        with self._lock:
+            return {label: dict(stats) for label, stats in self._stats.items()}
+
+
+wait_stats = WaitStats()
+
+
+async def _timed(label, wait):
+    # wait 为返回 awaitable 的函数，页面对象不支持对应方法时同样按“没等到”处理
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        await wait()
+        ok = True
+    except Exception:
+        ok = False
+    wait_stats.record(label, loop.time() - started, not ok)
+    return ok
+
+
+async def wait_until(check, timeout=10, interval=0.2, label=None):
+    """
+    反复执行异步 check() 直到返回真值，最多等 timeout 秒；check 抛异常视为未满足。
+    返回最后一次 check 的结果，超时不抛异常。
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    result = None
+    while True:
+        try:
+            result = await check()
+        except Exception:
+            result = None
+        if result or loop.time() - started >= timeout:
+            break
+        await asyncio.sleep(min(interval, max(0, timeout - (loop.time() - started))))
+    wait_stats.record(label, loop.time() - started, not result)
+    return result
+
+
+async def wait_for_selector(target, selector, state="visible", timeout=10, label=None):
+    """
+    等待元素达到指定状态（visible/attached/hidden/detached），最多 timeout 秒，返回是否等到。
+    target 可以是 Page/Frame，也可以是 Locator/FrameLocator（如 iframe 里的上传页）。
+    """
+    if hasattr(target, "wait_for_selector"):
+        return await _timed(label, lambda: target.wait_for_selector(selector, state=state, timeout=timeout * 1000))
+    return await _timed(label, lambda: target.locator(selector).first.wait_for(state=state, timeout=timeout * 1000))
+
+
+async def wait_for_response(page, pattern, timeout=10, label=None):
+    """等待 URL 匹配 pattern 且状态正常的响应，最多 timeout 秒，返回是否等到。"""
+    regex = re.compile(pattern)
+    return await _timed(label, lambda: page.wait_for_event(
+        "response", predicate=lambda response: bool(regex.search(response.url)) and response.ok,
+        timeout=timeout * 1000))
+
+
+async def settle(page, timeout=2, label=None):
+    """
+    等待页面网络空闲，最多 timeout 秒；用来替代“操作后固定等几秒让页面反应”的写法，
+    页面已空闲时几乎不耗时。
+    """
+    return await _timed(label, lambda: page.wait_for_load_state("networkidle", timeout=timeout * 1000))